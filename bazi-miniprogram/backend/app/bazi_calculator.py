@@ -20,6 +20,12 @@ except ImportError:
     print("Warning: zhdate library not available, using fallback")
     ZHDATE_AVAILABLE = False
 
+# 算法组件版本 - 修改对应算法或数据表后递增，结果缓存据此失效
+# 历法转换/节气表：结果随sxtwl是否可用而不同，需区分
+CALENDAR_TABLE_VERSION = f"1-{'sxtwl' if SXTWL_AVAILABLE else 'builtin'}"
+# 性格、事业、格局等分析文案目录
+ANALYSIS_CATALOGUE_VERSION = "1"
+
 class BaziCalculator:
     """八字计算器 - 使用专业算法"""
     
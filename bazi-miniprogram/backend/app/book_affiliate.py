@@ -4,7 +4,6 @@
 """
 
 import asyncio
-import aiohttp
 import json
 import time
 import hashlib
@@ -15,6 +14,18 @@ from datetime import datetime
 from typing import Dict, List, Optional, Any
 from urllib.parse import quote, urlencode
 
+# aiohttp 只在真正调用联盟API时才需要，延迟导入，不影响服务启动
+aiohttp = None
+
+
+def _aiohttp():
+    """首次调用联盟API时导入aiohttp"""
+    global aiohttp
+    if aiohttp is None:
+        import aiohttp as aiohttp_module
+        aiohttp = aiohttp_module
+    return aiohttp
+
 
 class BookAffiliateService:
     """书籍联盟营销服务 - 真实API集成版"""
@@ -176,7 +187,7 @@ class BookAffiliateService:
         common_params['sign'] = sign
         
         try:
-            async with aiohttp.ClientSession() as session:
+            async with _aiohttp().ClientSession() as session:
                 async with session.get(config['api_endpoint'], params=common_params, timeout=10) as response:
                     if response.status == 200:
                         data = await response.json()
@@ -218,7 +229,7 @@ class BookAffiliateService:
         params['sign'] = sign
         
         try:
-            async with aiohttp.ClientSession() as session:
+            async with _aiohttp().ClientSession() as session:
                 async with session.post(config['api_endpoint'], data=params, timeout=10) as response:
                     if response.status == 200:
                         data = await response.json()
@@ -252,7 +263,7 @@ class BookAffiliateService:
         params['sign'] = sign
         
         try:
-            async with aiohttp.ClientSession() as session:
+            async with _aiohttp().ClientSession() as session:
                 async with session.post(config['api_endpoint'], json=params, timeout=10) as response:
                     if response.status == 200:
                         data = await response.json()
@@ -514,7 +525,7 @@ class BookAffiliateService:
             sign = self._generate_taobao_sign(params, config['app_secret'])
             params['sign'] = sign
             
-            async with aiohttp.ClientSession() as session:
+            async with _aiohttp().ClientSession() as session:
                 async with session.get(config['api_endpoint'], params=params, timeout=10) as response:
                     if response.status == 200:
                         data = await response.json()
@@ -551,7 +562,7 @@ class BookAffiliateService:
             sign = self._generate_jd_sign(params, config['app_secret'])
             params['sign'] = sign
             
-            async with aiohttp.ClientSession() as session:
+            async with _aiohttp().ClientSession() as session:
                 async with session.post(config['api_endpoint'], data=params, timeout=10) as response:
                     if response.status == 200:
                         data = await response.json()
@@ -581,7 +592,7 @@ class BookAffiliateService:
             sign = self._generate_pdd_sign(params, config['client_secret'])
             params['sign'] = sign
             
-            async with aiohttp.ClientSession() as session:
+            async with _aiohttp().ClientSession() as session:
                 async with session.post(config['api_endpoint'], json=params, timeout=10) as response:
                     if response.status == 200:
                         data = await response.json()
@@ -740,5 +751,20 @@ class BookAffiliateService:
         }
 
 
-# 全局实例
-book_affiliate_service = BookAffiliateService()
+# 全局实例在首次使用时创建
+_book_affiliate_service = None
+
+
+def get_book_affiliate_service() -> BookAffiliateService:
+    """获取书籍联盟营销服务实例"""
+    global _book_affiliate_service
+    if _book_affiliate_service is None:
+        _book_affiliate_service = BookAffiliateService()
+    return _book_affiliate_service
+
+
+def __getattr__(name):
+    # 兼容 `from book_affiliate import book_affiliate_service`
+    if name == "book_affiliate_service":
+        return get_book_affiliate_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
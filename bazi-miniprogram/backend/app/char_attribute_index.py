@@ -0,0 +1,163 @@
+"""
+字库属性位图索引
+加载字库时为每个属性值建立位图（Python大整数，第i位表示第i个字），
+属性筛选变为按位与，分类统计变为popcount，不再逐字做Python条件判断
+
+字的位置按字库字典的迭代顺序分配，筛选结果保持与逐字扫描相同的顺序
+"""
+
+from itertools import compress
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# 建立索引的属性及缺失时的默认值（与各查询方法的 info.get 默认值一致）
+INDEXED_FIELDS = {
+    'wuxing': '木',
+    'gender': 'neutral',
+    'era': 'classical',
+    'popularity': 'medium',
+    'rarity': 'common',
+    'cultural_level': 'classic',
+    'suitable_for_name': True
+}
+
+
+def stroke_bucket(stroke) -> str:
+    """笔画复杂度分类（与推荐多样性调整的分档一致）"""
+    if stroke is None:
+        return 'unknown'
+    if stroke <= 8:
+        return 'simple'
+    if stroke <= 15:
+        return 'medium'
+    return 'complex'
+
+
+# 二进制字符串 '0'/'1' 转为 0/1 字节，作为 itertools.compress 的选择器
+_BIT_SELECTOR_TABLE = bytes.maketrans(b'01', b'\x00\x01')
+
+try:
+    _popcount = int.bit_count  # Python 3.10+
+except AttributeError:
+    def _popcount(mask: int) -> int:
+        return bin(mask).count('1')
+
+
+class CharAttributeIndex:
+    """字库属性位图索引（只读，构建后可在线程间共享）"""
+
+    def __init__(self, char_database: Dict[str, Dict[str, Any]]):
+        self.chars: List[str] = []
+        self.pairs: List[Tuple[str, Dict[str, Any]]] = []
+        self._records_at = None
+        self.bitmaps: Dict[str, Dict[Any, int]] = {field: {} for field in INDEXED_FIELDS}
+        self.bitmaps['stroke_bucket'] = {}
+
+        # 先按位收集，最后一次性转为整数，避免反复生成大整数
+        positions: Dict[str, Dict[Any, List[int]]] = {field: {} for field in self.bitmaps}
+        for position, (char, info) in enumerate(char_database.items()):
+            self.chars.append(char)
+            self.pairs.append((char, info))
+            for field, default in INDEXED_FIELDS.items():
+                value = info.get(field, default)
+                if field == 'suitable_for_name':
+                    value = bool(value)
+                positions[field].setdefault(value, []).append(position)
+            positions['stroke_bucket'].setdefault(stroke_bucket(info.get('stroke')), []).append(position)
+
+        size = len(self.chars) // 8 + 1
+        for field, values in positions.items():
+            for value, value_positions in values.items():
+                # 在字节数组中置位再整体转换，构建耗时与字数成线性关系
+                bits = bytearray(size)
+                for position in value_positions:
+                    bits[position >> 3] |= 1 << (position & 7)
+                self.bitmaps[field][value] = int.from_bytes(bits, 'little')
+
+        self.all_mask = (1 << len(self.chars)) - 1
+
+    @classmethod
+    def from_bitmaps(cls, chars: List[str], bitmaps: Dict[str, Dict[Any, int]],
+                     records_at: Callable[[List[int]], List[Dict[str, Any]]]) -> "CharAttributeIndex":
+        """
+        由预先计算的位图构建索引（编译字库加载时使用）
+
+        Args:
+            chars: 按位序排列的字
+            bitmaps: {属性: {取值: 位图}}
+            records_at: 按位置批量取字信息的函数，筛选结果中的字在取出时才解码
+        """
+        index = cls.__new__(cls)
+        index.chars = list(chars)
+        index.pairs = None
+        index._records_at = records_at
+        index.bitmaps = bitmaps
+        index.all_mask = (1 << len(index.chars)) - 1
+        return index
+
+    def __len__(self):
+        return len(self.chars)
+
+    def mask(self, field: str, value) -> int:
+        """单个属性值的位图，值不存在时为0"""
+        return self.bitmaps[field].get(value, 0)
+
+    def gender_mask(self, gender: Optional[str]) -> int:
+        """性别筛选位图：指定性别或中性；未指定时不筛选"""
+        if not gender:
+            return self.all_mask
+        return self.mask('gender', gender) | self.mask('gender', 'neutral')
+
+    def select(self, gender: Optional[str] = None, **criteria) -> int:
+        """
+        按属性取交集，值为None的条件忽略
+
+        Args:
+            gender: 性别筛选（指定性别或中性）
+            criteria: 其他属性的精确匹配条件，如 wuxing='木', suitable_for_name=True
+        """
+        mask = self.gender_mask(gender)
+        for field, value in criteria.items():
+            if value is None:
+                continue
+            mask &= self.mask(field, value)
+            if not mask:
+                break
+        return mask
+
+    @staticmethod
+    def _selectors(mask: int) -> bytes:
+        """位图转为按位置排列的 0/1 字节串（第i个字节对应第i个字）"""
+        return format(mask, 'b')[::-1].encode('ascii').translate(_BIT_SELECTOR_TABLE)
+
+    def positions(self, mask: int) -> Iterator[int]:
+        """按位置升序列出位图中的字"""
+        return compress(range(len(self.chars)), self._selectors(mask))
+
+    def items(self, mask: int) -> List[Tuple[str, Dict[str, Any]]]:
+        """位图对应的 (字, 信息) 列表，保持字库原有顺序（整个过程在C层完成）"""
+        if not mask:
+            return []
+        if self.pairs is None:
+            positions = list(self.positions(mask))
+            chars = self.chars
+            return list(zip([chars[position] for position in positions], self._records_at(positions)))
+        return list(compress(self.pairs, self._selectors(mask)))
+
+    def items_at(self, positions: List[int]) -> List[Tuple[str, Dict[str, Any]]]:
+        """按位置列表取 (字, 信息)"""
+        if self.pairs is None:
+            chars = self.chars
+            return list(zip([chars[position] for position in positions], self._records_at(positions)))
+        pairs = self.pairs
+        return [pairs[position] for position in positions]
+
+    @staticmethod
+    def count(mask: int) -> int:
+        return _popcount(mask)
+
+    def counts(self, field: str, within: int = None) -> Dict[Any, int]:
+        """某属性各取值的字数，within 为可选的范围位图"""
+        if within is None:
+            return {value: _popcount(mask) for value, mask in self.bitmaps[field].items()}
+        return {value: _popcount(mask & within) for value, mask in self.bitmaps[field].items()
+                if mask & within}
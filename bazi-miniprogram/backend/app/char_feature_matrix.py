@@ -0,0 +1,169 @@
+"""
+个性化评分特征矩阵
+字库加载后把每个字编码为特征（时代、流行度、出处的取值编号，热门/笔画复杂标记，
+语义类别隶属矩阵），用户档案编译为各特征的权重向量，整库的个性化分数由
+查表（独热编码×权重向量）、按列累加和掩码运算一次算出，不再逐字调用Python评分函数
+
+各项按 EnhancedCharDatabase._calculate_personalized_score 相同的顺序逐项相加，
+浮点运算顺序一致，分数与逐字评分完全相同（排序结果也因此一致）
+
+numpy 为可选依赖：未安装时 NUMPY_AVAILABLE 为 False，调用方继续逐字评分
+"""
+
+from typing import Any, Dict, Iterable, List, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# 出处加分中视为经典出处的来源（与逐字评分一致）
+CLASSIC_SOURCES = ['诗经', '论语', '唐诗', '宋词']
+
+# 语义类别隶属矩阵中的取值：核心字15，相关字8（乘以类别权重即为加分）
+CORE_CHAR_SCORE = 15
+RELATED_CHAR_SCORE = 8
+
+
+def _encode(values: List[Any]) -> Tuple[List[Any], "np.ndarray"]:
+    """取值列表编码为 取值表 + 编号数组"""
+    vocab: Dict[Any, int] = {}
+    codes = np.fromiter((vocab.setdefault(value, len(vocab)) for value in values),
+                        dtype=np.intp, count=len(values))
+    return list(vocab), codes
+
+
+class CharFeatureMatrix:
+    """字库的个性化评分特征（只读，构建后可在线程间共享）"""
+
+    def __init__(self, records: Iterable[Dict[str, Any]], chars: List[str],
+                 semantic_network: Dict[str, Dict[str, Any]]):
+        """
+        Args:
+            records: 按位置排列的字信息
+            chars: 按位置排列的字
+            semantic_network: 语义网络 {类别: {core_chars, related_chars, semantic_weight}}
+        """
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("numpy 未安装，无法构建特征矩阵")
+
+        eras, popularities, sources, hot, complex_stroke = [], [], [], [], []
+        for info in records:
+            eras.append(info.get('era', 'classical'))
+            popularities.append(info.get('popularity', 'medium'))
+            sources.append(info.get('source', ''))
+            hot.append(info.get('trend') == 'hot')
+            stroke = info.get('stroke')
+            complex_stroke.append(stroke is not None and stroke > 15)
+
+        self.size = len(chars)
+        self.era_vocab, self.era_codes = _encode(eras)
+        self.popularity_vocab, self.popularity_codes = _encode(popularities)
+        self.source_vocab, self.source_codes = _encode(sources)
+        self.hot = np.array(hot, dtype=bool)
+        self.complex_stroke = np.array(complex_stroke, dtype=bool)
+
+        # 语义类别隶属矩阵（字 × 类别）：核心字优先于相关字
+        self.categories = list(semantic_network)
+        self.category_columns = {category: j for j, category in enumerate(self.categories)}
+        positions = {char: i for i, char in enumerate(chars)}
+        self.semantic = np.zeros((self.size, len(self.categories)), dtype=np.float64)
+        for j, network in enumerate(semantic_network.values()):
+            for char in network['related_chars']:
+                if char in positions:
+                    self.semantic[positions[char], j] = RELATED_CHAR_SCORE
+            for char in network['core_chars']:
+                if char in positions:
+                    self.semantic[positions[char], j] = CORE_CHAR_SCORE
+        self.semantic_weights = [network['semantic_weight'] for network in semantic_network.values()]
+
+    def compile_profile(self, user_profile: Dict[str, Any]) -> Dict[str, Any]:
+        """用户档案编译为各特征取值的加分向量"""
+        era_weights = user_profile.get('era_weights', {})
+        popularity_weights = user_profile.get('popularity_weights', {'medium': 0.5, 'high': 0.3, 'low': 0.2})
+        preferred_sources = user_profile.get('preferred_sources', [])
+        prefers_classics = any(source in preferred_sources for source in CLASSIC_SOURCES)
+
+        cultural = []
+        for source in self.source_vocab:
+            if source in preferred_sources:
+                cultural.append(15)
+            elif source and prefers_classics:
+                cultural.append(8)
+            else:
+                cultural.append(0)
+
+        # 语义偏好按档案中的顺序逐列累加（重复的类别重复计分）
+        semantic_columns = [
+            self.category_columns[category]
+            for category in user_profile.get('semantic_preferences', [])
+            if category in self.category_columns
+        ]
+
+        return {
+            "era": np.array([era_weights.get(era, 0.1) * 30 for era in self.era_vocab], dtype=np.float64),
+            "popularity": np.array(
+                [popularity_weights.get(popularity, 0.3) * 20 for popularity in self.popularity_vocab],
+                dtype=np.float64
+            ),
+            "cultural": np.array(cultural, dtype=np.float64),
+            "semantic_columns": semantic_columns,
+            "embrace_trends": bool(user_profile.get('embrace_trends')),
+            "avoid_trends": bool(user_profile.get('avoid_trends')),
+            "avoid_complexity": bool(user_profile.get('avoid_complexity'))
+        }
+
+    def _total_counts(self, matches: Iterable[Dict[int, int]]) -> "np.ndarray":
+        """各关键词的 {字位置: 匹配次数} 累加为整库的匹配次数数组"""
+        counts = np.zeros(self.size, dtype=np.intp)
+        for keyword_matches in matches:
+            if keyword_matches:
+                positions = np.fromiter(keyword_matches.keys(), dtype=np.intp, count=len(keyword_matches))
+                counts[positions] += np.fromiter(keyword_matches.values(), dtype=np.intp,
+                                                 count=len(keyword_matches))
+        return counts
+
+    def score(self, user_profile: Dict[str, Any], custom_matches: Iterable[Dict[int, int]] = (),
+              avoid_matches: Iterable[Dict[int, int]] = ()) -> "np.ndarray":
+        """
+        整库的个性化分数
+
+        Args:
+            user_profile: 用户偏好档案
+            custom_matches: 每个自定义关键词的 {字位置: 含义匹配次数}
+            avoid_matches: 每个避免关键词的 {字位置: 含义匹配次数}
+        """
+        weights = self.compile_profile(user_profile)
+
+        # 1-2. 时代、流行度：独热编码与权重向量的乘积即按编号查表
+        score = 50 + weights["era"][self.era_codes]
+        score += weights["popularity"][self.popularity_codes]
+
+        # 3. 语义偏好
+        semantic = np.zeros(self.size, dtype=np.float64)
+        for column in weights["semantic_columns"]:
+            semantic += self.semantic_weights[column] * self.semantic[:, column]
+        score += np.minimum(semantic, 25)
+
+        # 4. 出处
+        score += weights["cultural"][self.source_codes]
+
+        # 5. 自定义含义
+        score += np.minimum(self._total_counts(custom_matches) * 5, 10)
+
+        # 6. 避免关键词：每次匹配扣20分（逐次相减，与逐字评分的舍入一致）
+        avoid = self._total_counts(avoid_matches)
+        for times in range(int(avoid.max(initial=0))):
+            score -= np.where(avoid > times, 20.0, 0.0)
+
+        # 7. 特殊偏好
+        if weights["embrace_trends"]:
+            score += np.where(self.hot, 10.0, 0.0)
+        elif weights["avoid_trends"]:
+            score -= np.where(self.hot, 15.0, 0.0)
+        if weights["avoid_complexity"]:
+            score -= np.where(self.complex_stroke, 5.0, 0.0)
+
+        return np.maximum(score, 0)
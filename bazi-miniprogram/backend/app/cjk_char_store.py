@@ -0,0 +1,244 @@
+"""
+CJK全字符属性库 - 按码位区块组织，区块首次访问时加载，LRU保留
+
+起名字库只收录约900个常用字，用户自选的名字中其他字过去只能估算笔画和五行。
+全字符库覆盖CJK统一汉字基本区及扩展A区等（约2万余字），每个字记录:
+    笔画数、康熙笔画数、五行、拼音（带声调）、声调
+
+字符按码位每 BLOCK_SIZE 个一组存为区块，启动时只读取元数据（区块目录、拼音表）；
+查询某字时按 码位 >> BLOCK_BITS 找到区块，首次访问时读入，之后按偏移直接解码该字的记录（O(1)）。
+已加载的区块按LRU保留最多 max_blocks 个，常驻内存与字库总规模无关。
+
+文件结构（小端序）:
+    文件头      MAGIC(8) 版本(u16) 保留(u16) 元数据长度(u32)
+    元数据      JSON：来源、字数、区块大小、区块目录 {区块号: 偏移}、拼音表
+    区块        BLOCK_SIZE 条记录：笔画(u8) 康熙笔画(u8) 五行(u8) 声调(u8) 拼音(u16，拼音表下标)
+                笔画为0表示该码位没有数据
+
+由 scripts/build_cjk_char_store.py 从 Unihan 数据库生成（起名字库中已有的字以字库为准）。
+"""
+
+import json
+import os
+import struct
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+MAGIC = b"BZCJKSTR"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sHHI")
+
+BLOCK_BITS = 8
+BLOCK_SIZE = 1 << BLOCK_BITS
+RECORD = struct.Struct("<BBBBH")
+
+WUXING = ['金', '木', '水', '火', '土']
+_ABSENT_WUXING = 0xFF
+
+# 默认保留的区块数（64 × 256 字，约100KB，覆盖常见的用字范围）
+DEFAULT_MAX_BLOCKS = 64
+
+DEFAULT_STORE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cjk', 'cjk_char_store.bin'
+)
+
+
+def build_cjk_char_store(records: Dict[str, Dict[str, Any]], output_path: str,
+                         source: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    将 {字: {stroke, kangxi_stroke, wuxing, pinyin, tone}} 写为区块文件（先写临时文件再原子替换）
+
+    Returns:
+        构建摘要：字数、区块数、文件大小、输出路径
+    """
+    pinyin_vocab = {'': 0}
+    blocks: Dict[int, bytearray] = {}
+    count = 0
+    for char, info in records.items():
+        stroke = info.get('stroke')
+        if len(char) != 1 or not stroke:
+            continue
+        codepoint = ord(char)
+        block = blocks.setdefault(codepoint >> BLOCK_BITS, bytearray(RECORD.size * BLOCK_SIZE))
+        pinyin = info.get('pinyin') or ''
+        wuxing = info.get('wuxing')
+        RECORD.pack_into(
+            block, (codepoint & (BLOCK_SIZE - 1)) * RECORD.size,
+            min(stroke, 255),
+            min(info.get('kangxi_stroke') or stroke, 255),
+            WUXING.index(wuxing) if wuxing in WUXING else _ABSENT_WUXING,
+            info.get('tone') or 0,
+            pinyin_vocab.setdefault(pinyin, len(pinyin_vocab))
+        )
+        count += 1
+
+    block_numbers = sorted(blocks)
+    meta = {
+        "source": source or {},
+        "chars": count,
+        "block_bits": BLOCK_BITS,
+        "blocks": {},
+        "pinyin": list(pinyin_vocab)
+    }
+    # 区块偏移取决于元数据长度，先按占位偏移估算长度再定稿（偏移位数变化时重算一次）
+    data_start = 0
+    while True:
+        meta["blocks"] = {
+            str(number): data_start + i * RECORD.size * BLOCK_SIZE for i, number in enumerate(block_numbers)
+        }
+        meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        start = HEADER.size + len(meta_bytes)
+        if start == data_start:
+            break
+        data_start = start
+
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+    temp_path = f"{output_path}.tmp{os.getpid()}"
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(meta_bytes)))
+        f.write(meta_bytes)
+        for number in block_numbers:
+            f.write(blocks[number])
+    os.replace(temp_path, output_path)
+
+    return {
+        "chars": count,
+        "blocks": len(block_numbers),
+        "size": os.path.getsize(output_path),
+        "output": output_path
+    }
+
+
+class CJKCharStore:
+    """按区块延迟加载的全字符属性库（线程安全）"""
+
+    def __init__(self, path: str, max_blocks: int = DEFAULT_MAX_BLOCKS):
+        self.path = path
+        self.max_blocks = max_blocks
+        self._file = open(path, 'rb')
+        magic, version, _, meta_length = HEADER.unpack(self._file.read(HEADER.size))
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._file.close()
+            raise ValueError(f"不是可识别的全字符库文件: {path}")
+        self.meta = json.loads(self._file.read(meta_length).decode('utf-8'))
+        if self.meta["block_bits"] != BLOCK_BITS:
+            self._file.close()
+            raise ValueError(f"区块大小不一致: {self.meta['block_bits']}")
+
+        self._block_offsets = {int(number): offset for number, offset in self.meta["blocks"].items()}
+        self._pinyin = self.meta["pinyin"]
+        self._blocks: "OrderedDict[int, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return self.meta["chars"]
+
+    def _read_block(self, number: int) -> bytes:
+        """读取一个区块（保留原始字节，约1.5KB；查询时按偏移解码单条记录）"""
+        with self._lock:
+            self._file.seek(self._block_offsets[number])
+            return self._file.read(RECORD.size * BLOCK_SIZE)
+
+    def _block(self, number: int) -> Optional[bytes]:
+        block = self._blocks.get(number)
+        if block is not None:
+            try:
+                self._blocks.move_to_end(number)
+            except KeyError:
+                # 并发淘汰了该区块，本次仍可使用取到的数据
+                pass
+            return block
+        if number not in self._block_offsets:
+            return None
+
+        block = self._read_block(number)
+        with self._lock:
+            self._blocks[number] = block
+            self.loads += 1
+            while len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+                self.evictions += 1
+        return block
+
+    def lookup(self, char: str) -> Optional[Dict[str, Any]]:
+        """
+        单字属性，库中没有时返回None
+
+        Returns:
+            {stroke, kangxi_stroke, wuxing, pinyin, tone}（五行、拼音未知时为None）
+        """
+        if len(char) != 1:
+            return None
+        codepoint = ord(char)
+        block = self._block(codepoint >> BLOCK_BITS)
+        if block is None:
+            return None
+        stroke, kangxi_stroke, wuxing, tone, pinyin = RECORD.unpack_from(
+            block, (codepoint & (BLOCK_SIZE - 1)) * RECORD.size
+        )
+        if not stroke:
+            return None
+        return {
+            'stroke': stroke,
+            'kangxi_stroke': kangxi_stroke,
+            'wuxing': WUXING[wuxing] if wuxing != _ABSENT_WUXING else None,
+            'pinyin': self._pinyin[pinyin] or None,
+            'tone': tone or None
+        }
+
+    def iter_kangxi_strokes(self) -> Iterator[Tuple[int, int]]:
+        """按码位顺序遍历全部 (码位, 康熙笔画)（构建康熙笔画表用，逐个读取区块，不进入LRU）"""
+        for number in sorted(self._block_offsets):
+            block = self._read_block(number)
+            for index, record in enumerate(RECORD.iter_unpack(block)):
+                if record[0]:
+                    yield (number << BLOCK_BITS) | index, record[1]
+
+    def __contains__(self, char) -> bool:
+        return isinstance(char, str) and self.lookup(char) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "chars": len(self),
+            "blocks": len(self._block_offsets),
+            "loaded_blocks": len(self._blocks),
+            "max_blocks": self.max_blocks,
+            "loads": self.loads,
+            "evictions": self.evictions
+        }
+
+    def close(self):
+        self._file.close()
+
+
+# 进程内共享的全字符库：首次查询时打开，文件不存在时为None（调用方回退到估算）
+_store = None
+_store_loaded = False
+_store_lock = threading.Lock()
+
+
+def get_cjk_char_store() -> Optional[CJKCharStore]:
+    """获取共享的全字符库，未生成数据文件时返回None"""
+    global _store, _store_loaded
+    if not _store_loaded:
+        with _store_lock:
+            if not _store_loaded:
+                path = os.getenv("BAZI_CJK_CHAR_STORE", DEFAULT_STORE_PATH)
+                if os.path.exists(path):
+                    try:
+                        _store = CJKCharStore(path)
+                        print(f"🈶 全字符库: {len(_store)} 个字符 ({len(_store.meta['blocks'])} 个区块，按需加载)")
+                    except (OSError, ValueError) as e:
+                        print(f"⚠️  全字符库无法读取，使用估算: {e}")
+                _store_loaded = True
+    return _store
+
+
+def lookup_cjk_char(char: str) -> Optional[Dict[str, Any]]:
+    """在共享全字符库中查询单字属性，没有数据时返回None"""
+    store = get_cjk_char_store()
+    return store.lookup(char) if store is not None else None
@@ -0,0 +1,495 @@
+"""
+编译字库 - 列式二进制格式，mmap加载，按字延迟解码
+
+字库JSON每次进程启动都要完整解析；扩充到GB2312/GBK规模后解析耗时和内存都会明显增加。
+构建步骤（scripts/compile_char_database.py）把JSON编译为二进制文件，启动时mmap映射，
+只解析很小的元数据；各字的信息在首次访问时才解码，属性位图和字义索引直接从文件读取。
+
+文件结构（小端序，各段按8字节对齐）:
+    文件头      MAGIC(8) 版本(u16) 保留(u16) 元数据长度(u32)
+    元数据      JSON：来源文件指纹、字数、各列取值表、键顺序模式、各段偏移、关键词列表
+    char_*      字符串池 + 偏移数组（u32）
+    列          stroke(u16)、各枚举属性(u8，取值表下标)、键顺序模式(u16)
+    extra_*     其他字段（拼音、含义列表、语义标签等）组成的JSON数组 + 每个元素的起止偏移
+    bitmap_*    属性位图（与 CharAttributeIndex 相同的位序）
+    posting_*   字义索引：每个关键词对应的字位置（u32）
+    ngram_*     字义模糊搜索的N-gram倒排表（见 MeaningNgramIndex）
+
+源JSON的大小和修改时间与文件头记录不一致时再比对SHA-256，内容变化则视为过期，回退到JSON加载。
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from .char_attribute_index import INDEXED_FIELDS, CharAttributeIndex
+    from .meaning_ngram_index import MeaningNgramIndex
+except ImportError:
+    from char_attribute_index import INDEXED_FIELDS, CharAttributeIndex
+    from meaning_ngram_index import MeaningNgramIndex
+
+MAGIC = b"BZCHARDB"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<8sHHI")
+
+# 编译文件与源JSON同目录、同名，扩展名为 .bin
+COMPILED_SUFFIX = ".bin"
+
+# 列中表示“该字没有此字段（或值类型不适合列存储，见extra）”
+_ABSENT_ENUM = 0xFF
+_ABSENT_STROKE = 0xFFFF
+
+# 枚举列：与属性位图索引相同的字段
+ENUM_FIELDS = list(INDEXED_FIELDS)
+
+
+def compiled_path_for(source_path: str) -> str:
+    """源JSON对应的编译文件路径"""
+    return os.path.splitext(source_path)[0] + COMPILED_SUFFIX
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_fingerprint(path: str) -> Dict[str, Any]:
+    stat = os.stat(path)
+    return {
+        "name": os.path.basename(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": _file_sha256(path)
+    }
+
+
+def _native_array(typecode: str, data=b'') -> array:
+    """按小端序读取的数组（大端机器上交换字节序）"""
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def _array_bytes(values: array) -> bytes:
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _string_pool(strings: List[str]) -> Tuple[bytes, array]:
+    """字符串池：UTF-8拼接 + 起止偏移数组（长度为字符串数+1）"""
+    offsets = array('I', [0])
+    pool = bytearray()
+    for value in strings:
+        pool += value.encode('utf-8')
+        offsets.append(len(pool))
+    return bytes(pool), offsets
+
+
+def _json_array_pool(documents: List[str]) -> Tuple[bytes, array]:
+    """
+    把若干JSON文本拼成一个JSON数组：偏移数组记录每个元素的起止位置，可单独解码；
+    需要全部解码时整个数组一次 json.loads 即可
+    """
+    offsets = array('I')
+    pool = bytearray(b'[')
+    for i, document in enumerate(documents):
+        if i:
+            pool += b','
+        offsets.append(len(pool))
+        pool += document.encode('utf-8')
+        offsets.append(len(pool))
+    pool += b']'
+    return bytes(pool), offsets
+
+
+def compile_char_database(source_path: str, output_path: str = None) -> Dict[str, Any]:
+    """
+    将字库JSON编译为二进制文件（先写临时文件再原子替换，不影响正在映射旧文件的进程）
+
+    Returns:
+        编译摘要：字数、文件大小、输出路径
+    """
+    output_path = output_path or compiled_path_for(source_path)
+    fingerprint = _source_fingerprint(source_path)
+    with open(source_path, 'r', encoding='utf-8') as f:
+        char_database = json.load(f).get('chars', {})
+
+    chars = list(char_database)
+    count = len(chars)
+    vocab = {field: [] for field in ENUM_FIELDS}
+    vocab_lookup = {field: {} for field in ENUM_FIELDS}
+    enum_columns = {field: array('B') for field in ENUM_FIELDS}
+    stroke_column = array('H')
+    pattern_column = array('H')
+    key_patterns = []
+    pattern_lookup = {}
+    extras = []
+    keywords = {}
+
+    for position, (char, info) in enumerate(char_database.items()):
+        pattern = tuple(info)
+        if pattern not in pattern_lookup:
+            pattern_lookup[pattern] = len(key_patterns)
+            key_patterns.append(list(pattern))
+        pattern_column.append(pattern_lookup[pattern])
+
+        extra = {}
+        for field in ENUM_FIELDS:
+            value = info.get(field)
+            # 只有字符串/布尔取值放入枚举列，其余（缺失、数字、列表等）原样保存在extra中
+            if field in info and isinstance(value, (str, bool)):
+                lookup = vocab_lookup[field]
+                if value not in lookup:
+                    if len(vocab[field]) >= _ABSENT_ENUM:
+                        raise ValueError(f"字段 {field} 取值超过 {_ABSENT_ENUM} 种，无法编译")
+                    lookup[value] = len(vocab[field])
+                    vocab[field].append(value)
+                enum_columns[field].append(lookup[value])
+            else:
+                enum_columns[field].append(_ABSENT_ENUM)
+                if field in info:
+                    extra[field] = value
+
+        stroke = info.get('stroke')
+        if 'stroke' in info and type(stroke) is int and 0 <= stroke < _ABSENT_STROKE:
+            stroke_column.append(stroke)
+        else:
+            stroke_column.append(_ABSENT_STROKE)
+            if 'stroke' in info:
+                extra['stroke'] = stroke
+
+        for key, value in info.items():
+            if key not in ENUM_FIELDS and key != 'stroke':
+                extra[key] = value
+        extras.append(json.dumps(extra, ensure_ascii=False, separators=(',', ':')))
+
+        # 字义索引与 EnhancedCharDatabase._build_meaning_index 的构建顺序一致
+        for keyword in list(info.get('meanings', [])) + list(info.get('semantic_tags', [])):
+            keywords.setdefault(keyword, array('I')).append(position)
+
+    char_pool, char_offsets = _string_pool(chars)
+    extra_pool, extra_offsets = _json_array_pool(extras)
+
+    posting_offsets = array('I', [0])
+    postings = array('I')
+    for positions in keywords.values():
+        postings.extend(positions)
+        posting_offsets.append(len(postings))
+
+    attribute_index = CharAttributeIndex(char_database)
+    bitmap_bytes = (count + 7) // 8
+    ngrams = MeaningNgramIndex(char_database).export()
+
+    sections = [
+        ("char_offsets", _array_bytes(char_offsets)),
+        ("char_pool", char_pool),
+        ("stroke", _array_bytes(stroke_column)),
+        ("key_pattern", _array_bytes(pattern_column)),
+        ("extra_offsets", _array_bytes(extra_offsets)),
+        ("extra_pool", extra_pool),
+        ("posting_offsets", _array_bytes(posting_offsets)),
+        ("postings", _array_bytes(postings))
+    ]
+    for name in ("gram_offsets", "gram_postings", "content_starts", "content_chars", "tag_offsets", "tag_postings"):
+        sections.append((f"ngram_{name}", _array_bytes(ngrams[name])))
+    for field in ENUM_FIELDS:
+        sections.append((f"enum_{field}", enum_columns[field].tobytes()))
+
+    bitmaps = {}
+    for field, values in attribute_index.bitmaps.items():
+        bitmaps[field] = []
+        for value, mask in values.items():
+            name = f"bitmap_{field}_{len(bitmaps[field])}"
+            bitmaps[field].append([value, name])
+            sections.append((name, mask.to_bytes(bitmap_bytes, 'little')))
+
+    # 先以占位偏移生成元数据以确定长度，再回填真实偏移
+    meta = {
+        "source": fingerprint,
+        "count": count,
+        "enum_fields": ENUM_FIELDS,
+        "vocab": vocab,
+        "key_patterns": key_patterns,
+        "keywords": list(keywords),
+        "ngrams": ngrams["grams"],
+        "ngram_tags": ngrams["tags"],
+        "bitmaps": bitmaps,
+        "sections": {name: [0, len(data)] for name, data in sections}
+    }
+
+    def layout(meta_length):
+        offset = _align(HEADER.size + meta_length)
+        placed = {}
+        for name, data in sections:
+            placed[name] = [offset, len(data)]
+            offset = _align(offset + len(data))
+        return placed
+
+    meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    while True:
+        meta["sections"] = layout(len(meta_bytes))
+        encoded = json.dumps(meta, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if len(encoded) == len(meta_bytes):
+            meta_bytes = encoded
+            break
+        meta_bytes = encoded
+
+    temp_path = f"{output_path}.tmp{os.getpid()}"
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(meta_bytes)))
+        f.write(meta_bytes)
+        for name, data in sections:
+            f.seek(meta["sections"][name][0])
+            f.write(data)
+    os.replace(temp_path, output_path)
+
+    return {
+        "success": True,
+        "source": source_path,
+        "output": output_path,
+        "chars": count,
+        "keywords": len(keywords),
+        "source_bytes": fingerprint["size"],
+        "compiled_bytes": os.path.getsize(output_path)
+    }
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+class CompiledCharDatabase(Mapping):
+    """
+    mmap映射的编译字库，接口与 {字: 信息} 字典一致
+
+    各字的信息在首次访问时解码并缓存；并发首次访问同一个字可能重复解码，
+    结果相同，不加锁
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, _, meta_length = HEADER.unpack_from(self._mmap, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"编译字库格式不匹配: {magic!r} v{version}")
+            self.meta = json.loads(self._mmap[HEADER.size:HEADER.size + meta_length].decode('utf-8'))
+        except Exception:
+            self.close()
+            raise
+
+        self._count = self.meta["count"]
+        # 字本身在加载时全部解码（用于按字查找），其余信息延迟解码
+        self.chars = self._split_pool(self._section("char_pool"),
+                                      _native_array('I', self._section("char_offsets")))
+        self._positions = {char: position for position, char in enumerate(self.chars)}
+
+        self._strokes = _native_array('H', self._section("stroke"))
+        self._patterns = _native_array('H', self._section("key_pattern"))
+        self._extra_offsets = _native_array('I', self._section("extra_offsets"))
+        self._enum_columns = {field: self._section(f"enum_{field}") for field in self.meta["enum_fields"]}
+        self._vocab = self.meta["vocab"]
+        self._key_patterns = [tuple(pattern) for pattern in self.meta["key_patterns"]]
+        self._extra_pool_offset = self.meta["sections"]["extra_pool"][0]
+        self._records: List[Optional[Dict[str, Any]]] = [None] * self._count
+        self._fully_decoded = False
+
+    @staticmethod
+    def _split_pool(pool: bytes, offsets: array) -> List[str]:
+        return [pool[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+    def _section(self, name: str) -> bytes:
+        offset, length = self.meta["sections"][name]
+        return self._mmap[offset:offset + length]
+
+    def record_at(self, position: int) -> Dict[str, Any]:
+        """按位置取字的信息（首次访问时解码）"""
+        record = self._records[position]
+        if record is None:
+            record = self._decode(position)
+            self._records[position] = record
+        return record
+
+    def records_at(self, positions) -> List[Dict[str, Any]]:
+        """批量取字信息；涉及的字较多时整体解码"""
+        positions = list(positions)
+        if not self._fully_decoded and len(positions) * 4 >= self._count:
+            self._decode_all()
+        record_at = self.record_at
+        return [record_at(position) for position in positions]
+
+    def _decode(self, position: int, extra: Dict[str, Any] = None) -> Dict[str, Any]:
+        if extra is None:
+            start = self._extra_pool_offset + self._extra_offsets[2 * position]
+            end = self._extra_pool_offset + self._extra_offsets[2 * position + 1]
+            extra = json.loads(self._mmap[start:end].decode('utf-8'))
+
+        values = extra
+        for field, column in self._enum_columns.items():
+            index = column[position]
+            if index != _ABSENT_ENUM:
+                values[field] = self._vocab[field][index]
+        stroke = self._strokes[position]
+        if stroke != _ABSENT_STROKE:
+            values['stroke'] = stroke
+
+        # 按源JSON中的键顺序重建，接口输出与JSON加载时一致
+        return {key: values[key] for key in self._key_patterns[self._patterns[position]]}
+
+    def _decode_all(self):
+        """一次解析全部extra，解码其余所有字（全量遍历时比逐字解码快得多）"""
+        if self._fully_decoded:
+            return
+        extras = json.loads(self._section("extra_pool").decode('utf-8'))
+        records = self._records
+        for position, extra in enumerate(extras):
+            if records[position] is None:
+                records[position] = self._decode(position, extra)
+        self._fully_decoded = True
+
+    # Mapping 接口
+    def __getitem__(self, char):
+        return self.record_at(self._positions[char])
+
+    def __contains__(self, char):
+        return char in self._positions
+
+    def __iter__(self):
+        return iter(self.chars)
+
+    def __len__(self):
+        return self._count
+
+    def items(self):
+        # 全量遍历（如模糊搜索）先整体解码，之后直接使用缓存
+        self._decode_all()
+        return zip(self.chars, self._records)
+
+    def values(self):
+        self._decode_all()
+        return iter(self._records)
+
+    def decoded_count(self) -> int:
+        """已解码的字数"""
+        return sum(1 for record in self._records if record is not None)
+
+    def attribute_index(self) -> CharAttributeIndex:
+        """由文件中预先计算的位图构建属性索引（不解码任何字）"""
+        bitmaps = {}
+        for field, entries in self.meta["bitmaps"].items():
+            bitmaps[field] = {
+                value: int.from_bytes(self._section(name), 'little') for value, name in entries
+            }
+        return CharAttributeIndex.from_bitmaps(self.chars, bitmaps, self.records_at)
+
+    def meaning_index(self) -> "CompiledMeaningIndex":
+        return CompiledMeaningIndex(self)
+
+    def ngram_index(self) -> MeaningNgramIndex:
+        """由文件中的倒排表构建字义N-gram索引（不解码任何字）"""
+        arrays = {name: _native_array('I', self._section(f"ngram_{name}"))
+                  for name in ("gram_offsets", "gram_postings", "content_starts", "content_chars",
+                               "tag_offsets", "tag_postings")}
+        return MeaningNgramIndex.from_arrays(
+            self.meta["ngrams"], arrays["gram_offsets"], arrays["gram_postings"],
+            arrays["content_starts"], arrays["content_chars"],
+            self.meta["ngram_tags"], arrays["tag_offsets"], arrays["tag_postings"]
+        )
+
+    def close(self):
+        mapped = getattr(self, "_mmap", None)
+        if mapped is not None:
+            try:
+                mapped.close()
+            except BufferError:
+                # 仍有切片引用映射内存时无法关闭，交给进程退出时回收
+                pass
+        self._file.close()
+
+
+class CompiledMeaningIndex(Mapping):
+    """字义索引 {关键词: [(字, 信息), ...]}，访问某个关键词时才取出对应的字"""
+
+    def __init__(self, database: CompiledCharDatabase):
+        self._database = database
+        self._keywords = {keyword: i for i, keyword in enumerate(database.meta["keywords"])}
+        self._posting_offsets = _native_array('I', database._section("posting_offsets"))
+        self._postings = _native_array('I', database._section("postings"))
+        self._cache: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+
+    def __getitem__(self, keyword):
+        matches = self._cache.get(keyword)
+        if matches is None:
+            i = self._keywords[keyword]
+            chars, record_at = self._database.chars, self._database.record_at
+            matches = [
+                (chars[position], record_at(position))
+                for position in self._postings[self._posting_offsets[i]:self._posting_offsets[i + 1]]
+            ]
+            self._cache[keyword] = matches
+        return matches
+
+    def keyword_chars(self) -> Dict[str, List[str]]:
+        """{关键词: [字, ...]}，直接由倒排表得出（不解码任何字）"""
+        chars, offsets, postings = self._database.chars, self._posting_offsets, self._postings
+        return {
+            keyword: [chars[position] for position in postings[offsets[i]:offsets[i + 1]]]
+            for keyword, i in self._keywords.items()
+        }
+
+    def __contains__(self, keyword):
+        return keyword in self._keywords
+
+    def __iter__(self):
+        return iter(self._keywords)
+
+    def __len__(self):
+        return len(self._keywords)
+
+
+def load_compiled_if_fresh(source_path: str, compiled_path: str = None) -> Optional[CompiledCharDatabase]:
+    """
+    源JSON对应的编译字库存在且未过期时返回映射实例，否则返回None（调用方回退到JSON）
+    """
+    compiled_path = compiled_path or compiled_path_for(source_path)
+    if not os.path.exists(compiled_path):
+        return None
+
+    try:
+        database = CompiledCharDatabase(compiled_path)
+    except Exception as e:
+        print(f"⚠️  编译字库无法读取，回退到JSON: {e}")
+        return None
+
+    recorded = database.meta["source"]
+    try:
+        stat = os.stat(source_path)
+    except OSError:
+        # 只部署了编译文件时直接使用
+        return database
+
+    if stat.st_size == recorded["size"] and stat.st_mtime_ns == recorded["mtime_ns"]:
+        return database
+    # 修改时间变化（如重新检出）但内容未变时仍可使用
+    if stat.st_size == recorded["size"] and _file_sha256(source_path) == recorded["sha256"]:
+        return database
+
+    database.close()
+    print(f"⚠️  编译字库已过期（{os.path.basename(source_path)} 已修改），回退到JSON，"
+          f"请运行 python scripts/compile_char_database.py")
+    return None
@@ -0,0 +1,208 @@
+"""
+组件注册表 - 延迟初始化与启动耗时统计
+各计算器、字库、缓存等组件登记工厂函数，首次使用时才创建实例，
+并记录每个组件的初始化耗时和内存增量，供 /health/startup 报告
+
+- ComponentRegistry.register(name, factory)：登记组件，不创建实例
+- ComponentRegistry.get(name)：首次调用时执行工厂函数（线程安全，只执行一次）
+- ComponentRegistry.proxy(name)：返回延迟代理，可像原实例一样直接使用
+- ComponentRegistry.initialize_all()：主进程预加载时一次性创建全部组件
+- 可热更新的组件（如字库快照）登记 current 函数，初始化后每次经由它取当前实例
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# 组件状态
+STATUS_PENDING = "pending"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+
+
+def current_rss_mb() -> Optional[float]:
+    """当前进程常驻内存（MB），无法获取时返回None"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        # 非Linux平台只能取峰值内存，作为近似值
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+class _Component:
+    """单个组件的工厂函数、实例及初始化统计"""
+
+    def __init__(self, name: str, factory: Callable[[], Any], description: str = "",
+                 current: Callable[[], Any] = None):
+        self.name = name
+        self.factory = factory
+        self.description = description
+        self.current = current
+        self.instance = None
+        self.status = STATUS_PENDING
+        self.error = None
+        self.init_ms = None
+        self.rss_delta_mb = None
+        self.initialized_at = None
+        self.initialized_by = None
+        self.lock = threading.Lock()
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "status": self.status,
+            "init_ms": self.init_ms,
+            "rss_delta_mb": self.rss_delta_mb,
+            "initialized_at": self.initialized_at,
+            "initialized_by": self.initialized_by,
+            "error": self.error
+        }
+
+
+class ComponentRegistry:
+    """组件注册表 - 管理延迟初始化的全局组件"""
+
+    def __init__(self):
+        self._components: Dict[str, _Component] = {}
+        self._lock = threading.Lock()
+        self.created_at = time.time()
+
+    def register(self, name: str, factory: Callable[[], Any], description: str = "",
+                 current: Callable[[], Any] = None):
+        """
+        登记组件工厂函数，重复登记会替换尚未初始化的组件
+
+        current: 热更新的组件提供取当前实例的函数，初始化成功后 get() 经由它取实例
+        """
+        with self._lock:
+            existing = self._components.get(name)
+            if existing and existing.status != STATUS_PENDING:
+                raise ValueError(f"组件 {name} 已初始化，不能重复登记")
+            self._components[name] = _Component(name, factory, description, current)
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._components)
+
+    def get(self, name: str) -> Any:
+        """获取组件实例，首次调用时初始化；初始化失败返回None（不会重试）"""
+        component = self._components[name]
+        if component.status == STATUS_READY and component.current is not None:
+            return component.current()
+        if component.status != STATUS_PENDING:
+            return component.instance
+
+        with component.lock:
+            if component.status != STATUS_PENDING:
+                return component.instance
+
+            rss_before = current_rss_mb()
+            started = time.perf_counter()
+            try:
+                instance = component.factory()
+                component.instance = instance
+                component.status = STATUS_READY if instance is not None else STATUS_FAILED
+                if instance is None:
+                    component.error = "组件不可用"
+            except Exception as e:
+                component.status = STATUS_FAILED
+                component.error = str(e)
+                print(f"❌ 组件 {name} 初始化失败: {e}")
+
+            component.init_ms = round((time.perf_counter() - started) * 1000, 1)
+            rss_after = current_rss_mb()
+            if rss_before is not None and rss_after is not None:
+                component.rss_delta_mb = round(rss_after - rss_before, 1)
+            component.initialized_at = time.time()
+            component.initialized_by = threading.current_thread().name
+            if component.status == STATUS_READY:
+                print(f"✅ 组件 {name} 初始化完成 ({component.init_ms}ms)")
+            return component.instance
+
+    def is_initialized(self, name: str) -> bool:
+        return self._components[name].status != STATUS_PENDING
+
+    def peek(self, name: str) -> Any:
+        """已初始化则返回实例，否则返回None（不触发初始化，供健康检查、退出清理使用）"""
+        component = self._components.get(name)
+        if component is None or component.status == STATUS_PENDING:
+            return None
+        if component.status == STATUS_READY and component.current is not None:
+            return component.current()
+        return component.instance
+
+    def proxy(self, name: str) -> "LazyComponent":
+        """返回组件的延迟代理"""
+        return LazyComponent(self, name)
+
+    def initialize_all(self) -> Dict[str, Any]:
+        """按登记顺序初始化全部组件（主进程预加载、预热时使用）"""
+        for name in self.names():
+            self.get(name)
+        return self.report()
+
+    def report(self) -> Dict[str, Any]:
+        """各组件初始化状态、耗时和内存增量（内存增量包含其依赖组件）"""
+        with self._lock:
+            components = [component.report() for component in self._components.values()]
+        initialized = [c for c in components if c["status"] != STATUS_PENDING]
+        return {
+            "components": components,
+            "initialized": len(initialized),
+            "total": len(components),
+            "total_init_ms": round(sum(c["init_ms"] or 0 for c in initialized), 1),
+            "rss_mb": round(current_rss_mb() or 0, 1)
+        }
+
+
+class LazyComponent:
+    """
+    组件延迟代理 - 首次访问属性或做真值判断时初始化组件
+
+    代理的真值等于组件是否可用，因此 `if component:` 的写法保持不变；
+    需要原实例时调用 resolve()
+    """
+
+    __slots__ = ("_registry", "_name")
+
+    def __init__(self, registry: ComponentRegistry, name: str):
+        object.__setattr__(self, "_registry", registry)
+        object.__setattr__(self, "_name", name)
+
+    def resolve(self) -> Any:
+        return self._registry.get(self._name)
+
+    def __getattr__(self, attribute):
+        instance = self.resolve()
+        if instance is None:
+            raise AttributeError(f"组件 {self._name} 不可用，无法访问 {attribute}")
+        return getattr(instance, attribute)
+
+    def __bool__(self):
+        return self.resolve() is not None
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        state = "initialized" if self._registry.is_initialized(self._name) else "pending"
+        return f"<LazyComponent {self._name} ({state})>"
+
+
+# 全局注册表
+component_registry = ComponentRegistry()
+
+
+def get_component_registry() -> ComponentRegistry:
+    """获取全局组件注册表"""
+    return component_registry
@@ -0,0 +1,275 @@
+"""
+参考数据快照 - 字库、内容模板等只读数据的热更新
+
+只读数据以不可变快照发布，更新数据文件后无需重启worker:
+    - SnapshotHolder.get()：当前快照的数据（首次调用时加载）
+    - SnapshotHolder.reload()：后台线程按源文件构建新快照（加载JSON、建索引都不在请求线程中），
+      构建并校验成功后一次引用赋值替换当前快照；构建失败时继续使用旧快照
+    - SnapshotHolder.pin()：在当前上下文（一个请求）中固定快照，处理期间发生替换时
+      仍使用开始时的快照；旧快照在最后一个引用它的请求结束后被回收
+    - DataFileWatcher：轮询各快照源文件的修改时间，文件变化且稳定后触发重新加载
+"""
+
+import contextvars
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+def file_fingerprint(paths: Iterable[str]) -> Tuple:
+    """源文件的 (路径, 修改时间, 大小)，文件不存在时为 (路径, None, None)"""
+    fingerprint = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            fingerprint.append((path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            fingerprint.append((path, None, None))
+    return tuple(fingerprint)
+
+
+class Snapshot:
+    """一个版本的只读数据"""
+
+    __slots__ = ("version", "value", "fingerprint", "loaded_at", "load_ms")
+
+    def __init__(self, version: int, value: Any, fingerprint: Tuple, load_ms: float):
+        self.version = version
+        self.value = value
+        self.fingerprint = fingerprint
+        self.loaded_at = time.time()
+        self.load_ms = load_ms
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "load_ms": self.load_ms
+        }
+
+
+class SnapshotHolder:
+    """
+    持有某类只读数据的当前快照
+
+    同一时间只有一个后台构建；构建期间再次请求重新加载时，当前构建完成后再构建一次
+    （源文件可能在读取之后又被修改）
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any],
+                 sources: Callable[[], List[str]] = None,
+                 validate: Callable[[Any], None] = None):
+        """
+        Args:
+            name: 快照名称（状态报告、日志使用）
+            factory: 构建数据的函数
+            sources: 返回源文件路径列表的函数（用于检测文件变化）
+            validate: 校验新数据的函数，抛出异常时放弃替换（首次加载不校验，与原加载行为一致）
+        """
+        self.name = name
+        self.factory = factory
+        self.sources = sources or (lambda: [])
+        self.validate = validate
+        self._current: Optional[Snapshot] = None
+        self._pinned = contextvars.ContextVar(f"{name}_snapshot", default=None)
+        self._listeners: List[Callable[[Any], None]] = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._pending = False
+        # 最近一次构建（包括失败的构建）读取的源文件状态，文件再次变化前不重复构建
+        self._attempted_fingerprint = None
+        self.reloads = 0
+        self.failed = 0
+        self.last_error = None
+
+    def _build(self, version: int) -> Snapshot:
+        fingerprint = file_fingerprint(self.sources())
+        self._attempted_fingerprint = fingerprint
+        started = time.perf_counter()
+        value = self.factory()
+        return Snapshot(version, value, fingerprint, round((time.perf_counter() - started) * 1000, 1))
+
+    def current(self) -> Snapshot:
+        """当前快照（首次调用时加载，并发调用也只加载一次）"""
+        snapshot = self._current
+        if snapshot is None:
+            with self._condition:
+                if self._current is None:
+                    self._current = self._build(1)
+                snapshot = self._current
+        return snapshot
+
+    def get(self) -> Any:
+        """当前上下文使用的数据：已固定快照时返回固定的版本，否则返回最新版本"""
+        pinned = self._pinned.get()
+        if pinned is not None:
+            return pinned.value
+        return self.current().value
+
+    def loaded(self) -> bool:
+        return self._current is not None
+
+    @contextmanager
+    def pin(self):
+        """在当前上下文中固定快照（请求开始时进入，结束时退出）"""
+        snapshot = self._pinned.get() or self.current()
+        token = self._pinned.set(snapshot)
+        try:
+            yield snapshot.value
+        finally:
+            self._pinned.reset(token)
+
+    def add_listener(self, listener: Callable[[Any], None]):
+        """登记替换快照后的回调（参数为新数据）"""
+        self._listeners.append(listener)
+
+    def changed(self) -> bool:
+        """源文件自最近一次构建以来是否有变化"""
+        if self._attempted_fingerprint is None:
+            return False
+        return file_fingerprint(self.sources()) != self._attempted_fingerprint
+
+    def reload(self, wait: bool = False, timeout: float = None) -> bool:
+        """
+        在后台线程中构建新快照并替换当前快照
+
+        Args:
+            wait: 是否等待构建完成
+            timeout: 等待的最长时间（秒）
+
+        Returns:
+            wait为True时返回是否在超时前完成，否则返回True
+        """
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-reloader", daemon=True)
+                self._thread.start()
+            else:
+                self._pending = True
+        return self.wait(timeout) if wait else True
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._pending = False
+                previous = self._current
+            version = (previous.version if previous else 0) + 1
+
+            try:
+                snapshot = self._build(version)
+                if self.validate is not None:
+                    self.validate(snapshot.value)
+            except Exception as e:
+                self.failed += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"⚠️ {self.name} 重新加载失败，继续使用版本 {previous.version if previous else '-'}: {e}")
+            else:
+                # 引用赋值是原子的：之后开始的请求使用新快照，已固定旧快照的请求不受影响
+                self._current = snapshot
+                self.reloads += 1
+                self.last_error = None
+                print(f"🔄 {self.name} 已切换到版本 {snapshot.version} ({snapshot.load_ms}ms)")
+                for listener in self._listeners:
+                    try:
+                        listener(snapshot.value)
+                    except Exception as e:
+                        print(f"⚠️ {self.name} 切换回调失败: {e}")
+
+            with self._condition:
+                if not self._pending:
+                    self._thread = None
+                    self._condition.notify_all()
+                    return
+
+    def wait(self, timeout: float = None) -> bool:
+        """等待正在进行的重新加载完成"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._thread is None, timeout)
+
+    def status(self) -> Dict[str, Any]:
+        """快照状态"""
+        snapshot = self._current
+        with self._condition:
+            reloading = self._thread is not None
+        return {
+            "name": self.name,
+            "current": snapshot.report() if snapshot else None,
+            "reloading": reloading,
+            "reloads": self.reloads,
+            "failed": self.failed,
+            "last_error": self.last_error,
+            "sources": [path for path, _, _ in (snapshot.fingerprint if snapshot else ())]
+        }
+
+
+@contextmanager
+def pin_snapshots(holders: Iterable[SnapshotHolder]):
+    """同时固定多个快照（只固定已加载的，不在请求中触发首次加载）"""
+    with ExitStack() as stack:
+        for holder in holders:
+            if holder.loaded():
+                stack.enter_context(holder.pin())
+        yield
+
+
+class DataFileWatcher:
+    """
+    轮询快照源文件的修改时间，文件变化后触发重新加载
+
+    编辑器保存文件可能分多次写入：检测到变化后等到下一轮文件状态不再变化才重新加载
+    """
+
+    def __init__(self, holders: Iterable[SnapshotHolder], interval: float = 30.0):
+        self.holders = list(holders)
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+        self._observed: Dict[str, Tuple] = {}
+        self.triggered = 0
+
+    def start(self) -> bool:
+        if self._thread is not None or self.interval <= 0:
+            return False
+        self._thread = threading.Thread(target=self._run, name="data-file-watcher", daemon=True)
+        self._thread.start()
+        print(f"👀 数据文件监视已启动，每 {self.interval} 秒检查一次")
+        return True
+
+    def check(self) -> List[str]:
+        """检查一轮，返回触发重新加载的快照名称"""
+        triggered = []
+        for holder in self.holders:
+            if not holder.loaded() or not holder.changed():
+                self._observed.pop(holder.name, None)
+                continue
+            fingerprint = file_fingerprint(holder.sources())
+            if self._observed.get(holder.name) == fingerprint:
+                self._observed.pop(holder.name, None)
+                holder.reload()
+                triggered.append(holder.name)
+            else:
+                self._observed[holder.name] = fingerprint
+        self.triggered += len(triggered)
+        return triggered
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"⚠️ 数据文件检查失败: {e}")
+
+    def stop(self, timeout: float = None):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self._thread is not None,
+            "interval": self.interval,
+            "triggered": self.triggered
+        }
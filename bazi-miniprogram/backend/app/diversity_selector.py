@@ -0,0 +1,115 @@
+"""
+推荐结果多样性选择
+按排名顺序扫描候选（只处理下标和特征取值），每个特征的同一取值最多入选 quota 个；
+入选不足时按排名补足。单次扫描为线性，整体复杂度由调用方的排序决定（O(n log n)）
+
+字推荐（时代/流行度/笔画复杂度配额）和起名候选排序（同名去重、单字出现次数配额）共用
+"""
+
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Union
+
+# 特征取值为这些类型时视为多值（如名字中的各个字），每个值分别计数
+_MULTI_VALUE_TYPES = (tuple, list, frozenset, set)
+
+
+def rank_by_score(scores: Sequence[float]) -> List[int]:
+    """按分数降序排列的下标（同分保持原顺序，与 list.sort(reverse=True) 一致）"""
+    return sorted(range(len(scores)), key=scores.__getitem__, reverse=True)
+
+
+def _values(value) -> Iterable[Hashable]:
+    return value if isinstance(value, _MULTI_VALUE_TYPES) else (value,)
+
+
+def select_diverse(ranked: Iterable[int], features: Dict[str, Union[Sequence, Callable[[int], Any]]],
+                   quotas: Dict[str, int],
+                   limit: Optional[int] = None, fill_to: int = 0, strict: Iterable[str] = (),
+                   similarity: Callable[[int, int], float] = None, scores: Sequence[float] = None,
+                   mmr_lambda: float = 0.7, mmr_pool: int = 3) -> List[int]:
+    """
+    多样性选择
+
+    Args:
+        ranked: 按排名顺序排列的候选下标
+        features: {特征名: 按下标排列的取值，或 下标→取值 的函数}，取值为元组/列表时每个值分别计数；
+            使用函数时只计算扫描到的候选（设置 limit 后通常远少于全部候选）
+        quotas: {特征名: 同一取值最多入选的个数}
+        limit: 最多选出的个数，None为不限（达到后停止扫描）
+        fill_to: 配额筛选后不足该数量时，按排名补充未入选的候选
+        strict: 补充时仍须遵守配额的特征（如同名去重）
+        similarity: 可选的两候选相似度函数(0~1)，提供时在配额筛选结果中再按MMR重排
+        scores: MMR使用的相关度（按下标），与 similarity 同时提供
+        mmr_lambda: MMR中相关度的权重
+        mmr_pool: MMR候选池为 limit 的倍数（控制计算量与候选总数无关）
+
+    Returns:
+        入选的候选下标：先为配额筛选结果（保持排名顺序），再为补充的候选
+    """
+    ranked = list(ranked)
+    counts = {name: {} for name in quotas}
+    columns = []
+    for name, quota in quotas.items():
+        column = features[name]
+        columns.append((name, column if callable(column) else column.__getitem__, quota, counts[name]))
+    strict_columns = [column for column in columns if column[0] in set(strict)]
+
+    def admissible(index, checked):
+        for _, value_of, quota, counter in checked:
+            for value in _values(value_of(index)):
+                if counter.get(value, 0) >= quota:
+                    return False
+        return True
+
+    def admit(index):
+        for _, value_of, _, counter in columns:
+            for value in _values(value_of(index)):
+                counter[value] = counter.get(value, 0) + 1
+
+    # MMR 需要比最终数量更多的候选
+    target = limit * mmr_pool if (similarity and limit) else limit
+
+    selected = []
+    for index in ranked:
+        if target is not None and len(selected) >= target:
+            break
+        if admissible(index, columns):
+            selected.append(index)
+            admit(index)
+
+    if similarity is not None and scores is not None:
+        selected = _mmr(selected, similarity, scores, limit or len(selected), mmr_lambda)
+
+    if len(selected) < fill_to:
+        chosen = set(selected)
+        for index in ranked:
+            if len(selected) >= fill_to:
+                break
+            if index not in chosen and admissible(index, strict_columns):
+                selected.append(index)
+                chosen.add(index)
+                admit(index)
+
+    return selected if limit is None else selected[:max(limit, fill_to)]
+
+
+def _mmr(pool: List[int], similarity: Callable[[int, int], float], scores: Sequence[float],
+         limit: int, mmr_lambda: float) -> List[int]:
+    """最大边际相关（MMR）：依次选出 相关度 - 与已选候选的最大相似度 最高的候选"""
+    if not pool:
+        return pool
+    top = max(scores[index] for index in pool)
+    bottom = min(scores[index] for index in pool)
+    span = (top - bottom) or 1.0
+    relevance = {index: (scores[index] - bottom) / span for index in pool}
+
+    remaining = list(pool)
+    max_similarity = {index: 0.0 for index in pool}
+    picked = []
+    while remaining and len(picked) < limit:
+        best = max(remaining, key=lambda index: mmr_lambda * relevance[index]
+                   - (1 - mmr_lambda) * max_similarity[index])
+        picked.append(best)
+        remaining.remove(best)
+        for index in remaining:
+            max_similarity[index] = max(max_similarity[index], similarity(best, index))
+    return picked
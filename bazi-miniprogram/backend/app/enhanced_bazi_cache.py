@@ -2,322 +2,919 @@
 八字计算缓存管理器
 确保相同八字输入产生相同输出
 实现确定性算法和结果缓存
+
+缓存分为两级：
+- 一级：进程内有界LRU，命中时无需读盘和反序列化
+- 二级：单文件SQLite（WAL模式），过期时间列建索引，支持批量读写，
+  条目数/占用空间由触发器维护，统计信息O(1)获取
+
+缓存键包含命盘依赖的算法组件版本（历法表、分析文案）。组件版本升级后，
+旧版本结果在被替换前继续提供服务，后台任务按热度优先级逐条重算替换
 """
 
 import hashlib
+import heapq
+import itertools
 import json
 import os
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, Counter
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple
+
+try:
+    # 尝试相对导入（当作为包的一部分导入时）
+    from .bazi_calculator import BaziCalculator, CALENDAR_TABLE_VERSION, ANALYSIS_CATALOGUE_VERSION
+    from .fortune_calculator import FORTUNE_RULES_VERSION
+except ImportError:
+    # 回退到直接导入（main.py 将 backend/app 加入 sys.path）
+    from bazi_calculator import BaziCalculator, CALENDAR_TABLE_VERSION, ANALYSIS_CATALOGUE_VERSION
+    from fortune_calculator import FORTUNE_RULES_VERSION
+
+# 八字命盘结果依赖的算法组件（运势规则不影响命盘，不参与命盘缓存键）
+CHART_COMPONENTS = ("calendar", "analysis")
+
+# 默认缓存有效期（天）
+DEFAULT_CACHE_TTL_DAYS = 365
+
+# 一级缓存默认容量（条）
+DEFAULT_MEMORY_CACHE_SIZE = 2048
+
+# 版本升级后默认重算的热门条目数
+DEFAULT_REFRESH_TOP_N = 1000
+
+# 命中计数累积到该值后批量写回SQLite
+_HIT_FLUSH_THRESHOLD = 200
+
+# SQLite单条语句的参数上限保护
+_SQLITE_BATCH_SIZE = 500
+
+
+def get_component_versions() -> Dict[str, str]:
+    """获取各算法组件的当前版本"""
+    return {
+        "calendar": CALENDAR_TABLE_VERSION,
+        "analysis": ANALYSIS_CATALOGUE_VERSION,
+        "fortune": FORTUNE_RULES_VERSION
+    }
+
+
+def build_version_tag(components=CHART_COMPONENTS) -> str:
+    """由组件版本拼出缓存版本标签，如 calendar1-builtin.analysis1"""
+    versions = get_component_versions()
+    return ".".join(f"{name}{versions[name]}" for name in components)
+
+
+class LRUCache:
+    """线程安全的有界LRU缓存（一级缓存）"""
+
+    def __init__(self, max_size: int = DEFAULT_MEMORY_CACHE_SIZE):
+        self.max_size = max(1, int(max_size))
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存，命中时移动到队尾"""
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: str):
+        """删除指定条目"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """一级缓存统计"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class SQLiteResultStore:
+    """单文件SQLite结果存储（二级缓存）"""
+
+    # 表结构版本，旧库打开时按需补列
+    SCHEMA_VERSION = 2
+
+    SCHEMA = [
+        """
+        CREATE TABLE IF NOT EXISTS bazi_results (
+            cache_key TEXT PRIMARY KEY,
+            algorithm_version TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            input_hash TEXT NOT NULL DEFAULT '',
+            inputs TEXT NOT NULL DEFAULT '{}',
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_bazi_results_expires ON bazi_results(expires_at)",
+        "CREATE INDEX IF NOT EXISTS idx_bazi_results_input ON bazi_results(input_hash)",
+        "CREATE INDEX IF NOT EXISTS idx_bazi_results_hits ON bazi_results(hits)",
+        """
+        CREATE TABLE IF NOT EXISTS cache_counters (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            entry_count INTEGER NOT NULL,
+            payload_bytes INTEGER NOT NULL
+        )
+        """,
+        "INSERT OR IGNORE INTO cache_counters (id, entry_count, payload_bytes) VALUES (1, 0, 0)",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_bazi_results_insert AFTER INSERT ON bazi_results
+        BEGIN
+            UPDATE cache_counters SET entry_count = entry_count + 1,
+                payload_bytes = payload_bytes + length(CAST(NEW.payload AS BLOB)) WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_bazi_results_delete AFTER DELETE ON bazi_results
+        BEGIN
+            UPDATE cache_counters SET entry_count = entry_count - 1,
+                payload_bytes = payload_bytes - length(CAST(OLD.payload AS BLOB)) WHERE id = 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_bazi_results_update AFTER UPDATE OF payload ON bazi_results
+        BEGIN
+            UPDATE cache_counters SET payload_bytes = payload_bytes
+                - length(CAST(OLD.payload AS BLOB)) + length(CAST(NEW.payload AS BLOB)) WHERE id = 1;
+        END
+        """
+    ]
+
+    # 第1版表结构缺少的列
+    LEGACY_COLUMNS = [
+        "ALTER TABLE bazi_results ADD COLUMN input_hash TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE bazi_results ADD COLUMN inputs TEXT NOT NULL DEFAULT '{}'",
+        "ALTER TABLE bazi_results ADD COLUMN hits INTEGER NOT NULL DEFAULT 0",
+        # 缓存键格式为 bazi_{32位输入哈希}_v{版本}，据此回填输入哈希，旧结果仍可作为过渡服务
+        "UPDATE bazi_results SET input_hash = substr(cache_key, 6, 32)"
+    ]
+
+    # 写入新版本结果时继承同一输入旧版本条目的热度
+    UPSERT_SQL = """
+        INSERT INTO bazi_results
+            (cache_key, algorithm_version, payload, created_at, expires_at, input_hash, inputs, hits)
+        VALUES (?, ?, ?, ?, ?, ?, ?,
+            COALESCE((SELECT MAX(hits) FROM bazi_results WHERE input_hash = ?), 0))
+        ON CONFLICT(cache_key) DO UPDATE SET
+            algorithm_version = excluded.algorithm_version,
+            payload = excluded.payload,
+            created_at = excluded.created_at,
+            expires_at = excluded.expires_at
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """首次使用时打开连接并初始化表结构"""
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+
+            user_version = conn.execute("PRAGMA user_version").fetchone()[0]
+            table_exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'bazi_results'"
+            ).fetchone()
+            if table_exists and user_version < self.SCHEMA_VERSION:
+                for statement in self.LEGACY_COLUMNS:
+                    conn.execute(statement)
+
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys: List[str], now: float = None) -> Dict[str, str]:
+        """批量读取未过期结果，返回 {cache_key: payload}"""
+        now = time.time() if now is None else now
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(unique_keys), _SQLITE_BATCH_SIZE):
+                chunk = unique_keys[start:start + _SQLITE_BATCH_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT cache_key, payload FROM bazi_results "
+                    f"WHERE cache_key IN ({placeholders}) AND expires_at > ?",
+                    (*chunk, now)
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def get_stale_many(self, input_hashes: List[str], current_version: str,
+                       now: float = None) -> Dict[str, str]:
+        """批量读取其他算法版本的未过期结果，返回 {input_hash: payload}（取最新一条）"""
+        now = time.time() if now is None else now
+        found = {}
+        unique_hashes = list(dict.fromkeys(input_hashes))
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(unique_hashes), _SQLITE_BATCH_SIZE):
+                chunk = unique_hashes[start:start + _SQLITE_BATCH_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT input_hash, payload FROM bazi_results "
+                    f"WHERE input_hash IN ({placeholders}) AND algorithm_version != ? "
+                    f"AND expires_at > ? ORDER BY created_at",
+                    (*chunk, current_version, now)
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def inputs_for_hashes(self, input_hashes: List[str]) -> Dict[str, str]:
+        """按输入哈希批量取回标准化输入 {input_hash: inputs}（任意算法版本）"""
+        found = {}
+        unique_hashes = list(dict.fromkeys(input_hashes))
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(unique_hashes), _SQLITE_BATCH_SIZE):
+                chunk = unique_hashes[start:start + _SQLITE_BATCH_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT input_hash, inputs FROM bazi_results "
+                    f"WHERE input_hash IN ({placeholders}) AND inputs != '{{}}'",
+                    chunk
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def put_many(self, rows: List[Tuple[str, str, str, float, float, str, str]]):
+        """
+        批量写入 (cache_key, algorithm_version, payload, created_at, expires_at, input_hash, inputs)
+
+        同一输入的其他版本条目在同一事务中删除
+        """
+        if not rows:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(self.UPSERT_SQL, [(*row, row[5]) for row in rows])
+                conn.executemany(
+                    "DELETE FROM bazi_results WHERE input_hash = ? AND algorithm_version != ?",
+                    [(row[5], row[1]) for row in rows]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def add_hits(self, hit_counts: Dict[str, int]):
+        """批量累加命中次数"""
+        if not hit_counts:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN")
+            try:
+                conn.executemany(
+                    "UPDATE bazi_results SET hits = hits + ? WHERE cache_key = ?",
+                    [(count, key) for key, count in hit_counts.items()]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def hottest_stale_inputs(self, current_version: str, limit: int) -> List[Tuple[str, int]]:
+        """按热度降序返回其他算法版本条目的 (inputs, hits)"""
+        with self._lock:
+            return self._connection().execute(
+                "SELECT inputs, hits FROM bazi_results WHERE algorithm_version != ? "
+                "AND inputs != '{}' ORDER BY hits DESC LIMIT ?",
+                (current_version, limit)
+            ).fetchall()
+
+    def version_breakdown(self) -> Dict[str, int]:
+        """各算法版本的条目数（需扫描全表，仅供管理查看）"""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT algorithm_version, COUNT(*) FROM bazi_results GROUP BY algorithm_version"
+            ).fetchall()
+        return dict(rows)
+
+    def delete(self, key: str) -> bool:
+        """删除单条结果"""
+        with self._lock:
+            cursor = self._connection().execute(
+                "DELETE FROM bazi_results WHERE cache_key = ?", (key,)
+            )
+        return cursor.rowcount > 0
+
+    def purge_expired(self, now: float = None) -> int:
+        """按过期时间索引删除过期结果"""
+        now = time.time() if now is None else now
+        with self._lock:
+            cursor = self._connection().execute(
+                "DELETE FROM bazi_results WHERE expires_at <= ?", (now,)
+            )
+        return cursor.rowcount
+
+    def stats(self, now: float = None) -> Dict[str, Any]:
+        """存储统计：条目数与占用空间来自计数表，过期数走索引"""
+        now = time.time() if now is None else now
+        with self._lock:
+            conn = self._connection()
+            entry_count, payload_bytes = conn.execute(
+                "SELECT entry_count, payload_bytes FROM cache_counters WHERE id = 1"
+            ).fetchone()
+            expired_count = conn.execute(
+                "SELECT COUNT(*) FROM bazi_results WHERE expires_at <= ?", (now,)
+            ).fetchone()[0]
+        return {
+            "entry_count": entry_count,
+            "expired_count": expired_count,
+            "payload_bytes": payload_bytes
+        }
+
+    def close(self):
+        """关闭连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
 
 class BaziCacheManager:
-    """八字计算结果缓存管理器"""
-    
-    def __init__(self, cache_dir="cache"):
+    """八字计算结果缓存管理器（LRU + SQLite 两级缓存）"""
+
+    def __init__(self, cache_dir="cache", memory_size=DEFAULT_MEMORY_CACHE_SIZE,
+                 algorithm_version=None, ttl_days=DEFAULT_CACHE_TTL_DAYS,
+                 db_filename="bazi_cache.sqlite3"):
         self.cache_dir = cache_dir
-        self.ensure_cache_directory()
-        
-    def ensure_cache_directory(self):
-        """确保缓存目录存在"""
-        if not os.path.exists(self.cache_dir):
-            os.makedirs(self.cache_dir)
-    
+        self.algorithm_version = algorithm_version or build_version_tag()
+        self.ttl_seconds = ttl_days * 86400
+        self.memory_cache = LRUCache(memory_size)
+        self.store = SQLiteResultStore(os.path.join(cache_dir, db_filename))
+        self.store_hits = 0
+        self.store_misses = 0
+        self.stale_hits = 0
+        self._hit_counts = Counter()
+        self._hit_lock = threading.Lock()
+
     def generate_bazi_hash(self, year, month, day, hour, gender, calendar_type):
         """生成八字输入的哈希值，确保唯一性"""
         # 标准化输入参数
         normalized_input = {
             "year": int(year),
-            "month": int(month), 
+            "month": int(month),
             "day": int(day),
             "hour": int(hour),
             "gender": str(gender).lower(),
             "calendar_type": str(calendar_type).lower()
         }
-        
+
         # 生成哈希
         input_string = json.dumps(normalized_input, sort_keys=True)
         hash_obj = hashlib.md5(input_string.encode('utf-8'))
         return hash_obj.hexdigest()
-    
+
     def get_cache_key(self, year, month, day, hour, gender, calendar_type):
-        """获取缓存键"""
+        """获取缓存键（包含算法组件版本）"""
         hash_value = self.generate_bazi_hash(year, month, day, hour, gender, calendar_type)
-        return f"bazi_{hash_value}"
-    
-    def get_cache_file_path(self, cache_key):
-        """获取缓存文件路径"""
-        return os.path.join(self.cache_dir, f"{cache_key}.json")
-    
+        return f"bazi_{hash_value}_v{self.algorithm_version}"
+
+    def _cache_key_for_hash(self, hash_value):
+        return f"bazi_{hash_value}_v{self.algorithm_version}"
+
     def save_to_cache(self, year, month, day, hour, gender, calendar_type, result):
         """保存计算结果到缓存"""
+        return self.save_many([((year, month, day, hour, gender, calendar_type), result)]) == 1
+
+    def save_many(self, items: List[Tuple[Tuple, Dict]]) -> int:
+        """
+        批量保存计算结果，同一输入的旧版本条目被替换
+
+        Args:
+            items: [((year, month, day, hour, gender, calendar_type), result), ...]
+
+        Returns:
+            成功写入的条数
+        """
         try:
-            cache_key = self.get_cache_key(year, month, day, hour, gender, calendar_type)
-            cache_file = self.get_cache_file_path(cache_key)
-            
-            # 准备缓存数据
-            cache_data = {
-                "input": {
-                    "year": year,
-                    "month": month,
-                    "day": day,
-                    "hour": hour,
-                    "gender": gender,
-                    "calendar_type": calendar_type
-                },
-                "result": result,
-                "timestamp": datetime.now().isoformat(),
-                "cache_key": cache_key
-            }
-            
-            # 写入缓存文件
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
-            
-            print(f"✅ 八字结果已缓存: {cache_key}")
-            return True
-            
+            now = time.time()
+            rows = []
+            for inputs, result in items:
+                hash_value = self.generate_bazi_hash(*inputs)
+                cache_key = self._cache_key_for_hash(hash_value)
+                payload = json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+                inputs_json = json.dumps(
+                    dict(zip(("year", "month", "day", "hour", "gender", "calendar_type"), inputs))
+                )
+                rows.append((cache_key, self.algorithm_version, payload, now,
+                             now + self.ttl_seconds, hash_value, inputs_json))
+                self.memory_cache.put(cache_key, result)
+
+            self.store.put_many(rows)
+            return len(rows)
+
         except Exception as e:
             print(f"❌ 缓存保存失败: {e}")
-            return False
-    
-    def load_from_cache(self, year, month, day, hour, gender, calendar_type):
+            return 0
+
+    def load_from_cache(self, year, month, day, hour, gender, calendar_type, allow_stale=False):
         """从缓存加载计算结果"""
+        return self.load_many([(year, month, day, hour, gender, calendar_type)], allow_stale)[0]
+
+    def load_many(self, inputs_list: List[Tuple], allow_stale=False) -> List[Optional[Dict]]:
+        """
+        批量加载计算结果，先查LRU，未命中的一次性查询SQLite
+
+        allow_stale为True时，当前版本未命中的输入回退到旧算法版本的结果，
+        这类结果带有 cache_stale=True 标记，不进入LRU，等待后台重算替换。
+        返回的字典为浅拷贝，调用方可增删顶层字段，嵌套数据应视为只读
+        """
         try:
-            cache_key = self.get_cache_key(year, month, day, hour, gender, calendar_type)
-            cache_file = self.get_cache_file_path(cache_key)
-            
-            # 检查缓存文件是否存在
-            if not os.path.exists(cache_file):
-                return None
-            
-            # 读取缓存数据
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
-            
-            # 验证缓存有效性
-            if self.is_cache_valid(cache_data):
-                print(f"✅ 从缓存加载八字结果: {cache_key}")
-                return cache_data["result"]
-            else:
-                # 删除无效缓存
-                os.remove(cache_file)
-                print(f"🗑️ 删除无效缓存: {cache_key}")
-                return None
-                
+            hashes = [self.generate_bazi_hash(*inputs) for inputs in inputs_list]
+            keys = [self._cache_key_for_hash(hash_value) for hash_value in hashes]
+            results = [self.memory_cache.get(key) for key in keys]
+
+            missing_keys = [key for key, result in zip(keys, results) if result is None]
+            if missing_keys:
+                payloads = self.store.get_many(missing_keys)
+                decoded = {}
+                for key, payload in payloads.items():
+                    decoded[key] = json.loads(payload)
+                    self.memory_cache.put(key, decoded[key])
+                self.store_hits += len(decoded)
+                self.store_misses += len(set(missing_keys)) - len(decoded)
+                results = [result if result is not None else decoded.get(key)
+                           for key, result in zip(keys, results)]
+
+            self._record_hits(key for key, result in zip(keys, results) if result is not None)
+
+            copies = [dict(result) if result is not None else None for result in results]
+
+            if allow_stale and None in copies:
+                stale_hashes = [hash_value for hash_value, result in zip(hashes, copies) if result is None]
+                stale_payloads = self.store.get_stale_many(stale_hashes, self.algorithm_version)
+                for position, hash_value in enumerate(hashes):
+                    if copies[position] is None and hash_value in stale_payloads:
+                        copies[position] = json.loads(stale_payloads[hash_value])
+                        copies[position]["cache_stale"] = True
+                        self.stale_hits += 1
+
+            return copies
+
         except Exception as e:
             print(f"❌ 缓存加载失败: {e}")
-            return None
-    
-    def is_cache_valid(self, cache_data, max_age_days=365):
-        """检查缓存是否有效"""
+            return [None] * len(inputs_list)
+
+    def _record_hits(self, keys):
+        """累积命中次数，达到阈值后批量写回，作为版本升级后重算的优先级"""
+        with self._hit_lock:
+            self._hit_counts.update(keys)
+            if sum(self._hit_counts.values()) < _HIT_FLUSH_THRESHOLD:
+                return
+            pending, self._hit_counts = self._hit_counts, Counter()
+        self.store.add_hits(pending)
+
+    def flush_hit_counts(self):
+        """立即写回累积的命中次数"""
+        with self._hit_lock:
+            pending, self._hit_counts = self._hit_counts, Counter()
         try:
-            # 检查时间戳
-            cache_time = datetime.fromisoformat(cache_data["timestamp"])
-            max_age = timedelta(days=max_age_days)
-            
-            if datetime.now() - cache_time > max_age:
-                return False
-            
-            # 检查数据完整性
-            required_keys = ["input", "result", "timestamp", "cache_key"]
-            if not all(key in cache_data for key in required_keys):
-                return False
-            
-            return True
-            
-        except Exception:
-            return False
-    
-    def clear_expired_cache(self, max_age_days=30):
-        """清理过期缓存"""
+            self.store.add_hits(pending)
+        except Exception as e:
+            print(f"⚠️ 命中计数写回失败: {e}")
+
+    def hottest_stale_inputs(self, limit=DEFAULT_REFRESH_TOP_N) -> List[Tuple[Dict, int]]:
+        """按热度降序返回需要按当前版本重算的输入 [(inputs, hits), ...]"""
+        self.flush_hit_counts()
+        return [(json.loads(inputs), hits)
+                for inputs, hits in self.store.hottest_stale_inputs(self.algorithm_version, limit)]
+
+    def invalidate(self, year, month, day, hour, gender, calendar_type):
+        """删除指定输入的缓存结果"""
+        cache_key = self.get_cache_key(year, month, day, hour, gender, calendar_type)
+        self.memory_cache.pop(cache_key)
+        return self.store.delete(cache_key)
+
+    def clear_expired_cache(self):
+        """清理过期缓存（走过期时间索引，无需解析缓存内容）"""
         try:
-            cleared_count = 0
-            cutoff_time = datetime.now() - timedelta(days=max_age_days)
-            
-            for filename in os.listdir(self.cache_dir):
-                if filename.endswith('.json') and filename.startswith('bazi_'):
-                    file_path = os.path.join(self.cache_dir, filename)
-                    
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            cache_data = json.load(f)
-                        
-                        cache_time = datetime.fromisoformat(cache_data["timestamp"])
-                        if cache_time < cutoff_time:
-                            os.remove(file_path)
-                            cleared_count += 1
-                            
-                    except Exception:
-                        # 删除损坏的缓存文件
-                        os.remove(file_path)
-                        cleared_count += 1
-            
-            print(f"🧹 清理了 {cleared_count} 个过期缓存文件")
+            cleared_count = self.store.purge_expired()
+            print(f"🧹 清理了 {cleared_count} 条过期缓存")
             return cleared_count
-            
+
         except Exception as e:
             print(f"❌ 清理缓存失败: {e}")
             return 0
-    
+
     def get_cache_stats(self):
         """获取缓存统计信息"""
         try:
-            cache_files = [f for f in os.listdir(self.cache_dir) 
-                          if f.endswith('.json') and f.startswith('bazi_')]
-            
-            total_size = 0
-            valid_count = 0
-            expired_count = 0
-            
-            for filename in cache_files:
-                file_path = os.path.join(self.cache_dir, filename)
-                total_size += os.path.getsize(file_path)
-                
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        cache_data = json.load(f)
-                    
-                    if self.is_cache_valid(cache_data):
-                        valid_count += 1
-                    else:
-                        expired_count += 1
-                        
-                except Exception:
-                    expired_count += 1
-            
+            store_stats = self.store.stats()
+            store_lookups = self.store_hits + self.store_misses
+
             return {
-                "total_files": len(cache_files),
-                "valid_count": valid_count,
-                "expired_count": expired_count,
-                "total_size_mb": round(total_size / (1024 * 1024), 2),
-                "cache_directory": self.cache_dir
+                "total_entries": store_stats["entry_count"],
+                "valid_count": store_stats["entry_count"] - store_stats["expired_count"],
+                "expired_count": store_stats["expired_count"],
+                "total_size_mb": round(store_stats["payload_bytes"] / (1024 * 1024), 2),
+                "memory_cache": self.memory_cache.stats(),
+                "store_hit_rate": round(self.store_hits / store_lookups, 4) if store_lookups else 0.0,
+                "stale_hits": self.stale_hits,
+                "algorithm_version": self.algorithm_version,
+                "component_versions": get_component_versions(),
+                "cache_file": self.store.db_path
             }
-            
+
         except Exception as e:
             print(f"❌ 获取缓存统计失败: {e}")
             return None
 
+    def migrate_legacy_files(self):
+        """将旧版 cache/bazi_*.json 单文件缓存导入SQLite，导入后删除原文件"""
+        if not os.path.isdir(self.cache_dir):
+            return 0
+
+        items = []
+        legacy_files = [f for f in os.listdir(self.cache_dir)
+                        if f.startswith('bazi_') and f.endswith('.json')]
+        for filename in legacy_files:
+            file_path = os.path.join(self.cache_dir, filename)
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    cache_data = json.load(f)
+                inputs = cache_data["input"]
+                items.append(((inputs["year"], inputs["month"], inputs["day"], inputs["hour"],
+                               inputs["gender"], inputs["calendar_type"]), cache_data["result"]))
+            except Exception as e:
+                print(f"⚠️ 跳过损坏的旧缓存文件 {filename}: {e}")
+
+        migrated = self.save_many(items)
+        if migrated == len(items):
+            for filename in legacy_files:
+                os.remove(os.path.join(self.cache_dir, filename))
+        print(f"📦 旧版缓存迁移完成: {migrated} 条")
+        return migrated
+
+
+class CacheRefresher:
+    """
+    算法版本升级后的后台重算任务
+
+    按优先级逐条用当前版本重算并替换旧结果：请求中命中的旧结果最先处理，
+    其次按历史命中次数从高到低处理。队列清空后线程退出，有新任务时再启动
+    """
+
+    # 优先级档位，数值越小越先处理
+    PRIORITY_REQUESTED = 0
+    PRIORITY_HOT = 1
+
+    def __init__(self, calculator: "DeterministicBaziCalculator"):
+        self.calculator = calculator
+        self._queue = []
+        self._queued = set()
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self.refreshed = 0
+        self.failed = 0
+
+    def enqueue(self, inputs: Dict, tier=PRIORITY_HOT, hits=0) -> bool:
+        """加入重算队列，已在队列中的输入不重复加入"""
+        key = tuple(inputs[name] for name in ("year", "month", "day", "hour", "gender", "calendar_type"))
+        with self._condition:
+            if self._stopped or key in self._queued:
+                return False
+            self._queued.add(key)
+            heapq.heappush(self._queue, (tier, -hits, next(self._sequence), key))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="bazi-cache-refresher", daemon=True)
+                self._thread.start()
+        return True
+
+    def schedule_hottest(self, top_n=DEFAULT_REFRESH_TOP_N) -> int:
+        """将最热门的N条旧版本条目加入重算队列"""
+        scheduled = 0
+        for inputs, hits in self.calculator.cache_manager.hottest_stale_inputs(top_n):
+            if self.enqueue(inputs, self.PRIORITY_HOT, hits):
+                scheduled += 1
+        if scheduled:
+            print(f"🔄 算法版本 {self.calculator.cache_manager.algorithm_version}: 已安排重算 {scheduled} 条热门缓存")
+        return scheduled
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._queue:
+                    self._thread = None
+                    self._condition.notify_all()
+                    return
+                key = heapq.heappop(self._queue)[3]
+
+            try:
+                normalized = self.calculator.normalize_input(*key)
+                result = self.calculator._calculate_fresh(normalized)
+                self.calculator.cache_manager.save_to_cache(*key, result=result)
+                self.refreshed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"⚠️ 后台重算失败 {key}: {e}")
+            finally:
+                with self._condition:
+                    self._queued.discard(key)
+
+    def wait(self, timeout=None) -> bool:
+        """等待队列处理完毕（测试及优雅退出时使用）"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._thread is None, timeout)
+
+    def stop(self, timeout=None) -> bool:
+        """
+        停止后台重算：不再接收新任务并清空队列，等待正在处理的一条完成
+
+        未处理的条目仍是旧版本，下次启动时会重新安排
+        """
+        with self._condition:
+            self._stopped = True
+            self._queue.clear()
+            self._queued.clear()
+        return self.wait(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        """重算任务状态"""
+        with self._condition:
+            pending = len(self._queue)
+            running = self._thread is not None
+        return {
+            "running": running,
+            "pending": pending,
+            "refreshed": self.refreshed,
+            "failed": self.failed
+        }
+
 
 class DeterministicBaziCalculator:
     """确定性八字计算器，确保相同输入产生相同输出"""
-    
-    def __init__(self):
-        self.cache_manager = BaziCacheManager()
-        
+
+    def __init__(self, cache_manager: BaziCacheManager = None):
+        self.cache_manager = cache_manager or BaziCacheManager()
+        self.refresher = CacheRefresher(self)
+        self._calculator = None
+
+    @property
+    def calculator(self) -> BaziCalculator:
+        """复用同一个八字计算器实例"""
+        if self._calculator is None:
+            self._calculator = BaziCalculator()
+        return self._calculator
+
     def normalize_input(self, year, month, day, hour, gender, calendar_type):
         """标准化输入参数"""
         return {
             "year": int(year),
             "month": int(month),
-            "day": int(day), 
+            "day": int(day),
             "hour": int(hour),
             "gender": str(gender).lower().strip(),
             "calendar_type": str(calendar_type).lower().strip()
         }
-    
+
     def validate_input(self, year, month, day, hour, gender, calendar_type):
         """验证输入参数"""
         errors = []
-        
+
         # 年份验证
         if not (1900 <= year <= 2100):
             errors.append("年份应在1900-2100之间")
-        
+
         # 月份验证
         if not (1 <= month <= 12):
             errors.append("月份应在1-12之间")
-        
+
         # 日期验证
         if not (1 <= day <= 31):
             errors.append("日期应在1-31之间")
-        
+
         # 小时验证
         if not (0 <= hour <= 23):
             errors.append("小时应在0-23之间")
-        
+
         # 性别验证
         if gender not in ['male', 'female', 'unknown']:
             errors.append("性别应为male、female或unknown")
-        
+
         # 日历类型验证
         if calendar_type not in ['solar', 'lunar']:
             errors.append("日历类型应为solar或lunar")
-        
+
         return errors
-    
+
+    def _normalize_and_validate(self, year, month, day, hour, gender, calendar_type):
+        """标准化并验证输入，返回标准化参数"""
+        normalized = self.normalize_input(year, month, day, hour, gender, calendar_type)
+        errors = self.validate_input(**normalized)
+        if errors:
+            raise ValueError(f"输入参数错误: {', '.join(errors)}")
+        return normalized
+
+    def _calculate_fresh(self, normalized: Dict) -> Dict:
+        """缓存未命中时的实际计算"""
+        result = self.calculator.calculate_bazi(**normalized)
+
+        # 添加确定性标记
+        result["is_deterministic"] = True
+        result["calculation_timestamp"] = datetime.now().isoformat()
+        result["input_hash"] = self.cache_manager.generate_bazi_hash(**normalized)
+        result["cache_version"] = self.cache_manager.algorithm_version
+        return result
+
     def calculate_with_cache(self, year, month, day, hour, gender="male", calendar_type="solar"):
         """带缓存的八字计算"""
         try:
-            # 标准化输入
-            normalized = self.normalize_input(year, month, day, hour, gender, calendar_type)
-            
-            # 验证输入
-            errors = self.validate_input(**normalized)
-            if errors:
-                raise ValueError(f"输入参数错误: {', '.join(errors)}")
-            
-            # 尝试从缓存加载
-            cached_result = self.cache_manager.load_from_cache(**normalized)
-            if cached_result:
-                return cached_result
-            
-            # 缓存未命中，进行计算
-            from .bazi_calculator import BaziCalculator
-            calculator = BaziCalculator()
-            
-            result = calculator.calculate_bazi(**normalized)
-            
-            # 添加确定性标记
-            result["is_deterministic"] = True
-            result["calculation_timestamp"] = datetime.now().isoformat()
-            result["input_hash"] = self.cache_manager.generate_bazi_hash(**normalized)
-            
-            # 保存到缓存
-            self.cache_manager.save_to_cache(**normalized, result=result)
-            
-            return result
-            
+            return self.calculate_many([{
+                "year": year, "month": month, "day": day, "hour": hour,
+                "gender": gender, "calendar_type": calendar_type
+            }], raise_errors=True)[0]
+
         except Exception as e:
             print(f"❌ 八字计算失败: {e}")
             raise e
-    
+
+    def calculate_many(self, inputs_list: List[Dict], raise_errors=False, allow_stale=True) -> List[Dict]:
+        """
+        批量带缓存计算
+
+        当前版本未命中但存在旧版本结果时先返回旧结果，并优先安排后台重算
+
+        Args:
+            inputs_list: [{"year":..., "month":..., "day":..., "hour":..., "gender":..., "calendar_type":...}, ...]
+            raise_errors: 为True时遇到无效输入或计算失败直接抛出
+            allow_stale: 为False时不使用旧版本结果，直接按当前版本计算
+
+        Returns:
+            与输入顺序一致的结果列表；单条输入无效或计算失败时对应位置为异常对象
+        """
+        normalized_list = []
+        for inputs in inputs_list:
+            try:
+                normalized_list.append(self._normalize_and_validate(
+                    inputs["year"], inputs["month"], inputs["day"], inputs.get("hour", 12),
+                    inputs.get("gender", "male"), inputs.get("calendar_type", "solar")
+                ))
+            except Exception as e:
+                if raise_errors:
+                    raise
+                normalized_list.append(e)
+
+        valid_positions = [i for i, item in enumerate(normalized_list) if isinstance(item, dict)]
+        cached = self.cache_manager.load_many([
+            tuple(normalized_list[i].values()) for i in valid_positions
+        ], allow_stale=allow_stale)
+
+        results = list(normalized_list)
+        to_save = []
+        fresh_by_key = {}
+        for position, cached_result in zip(valid_positions, cached):
+            if cached_result:
+                results[position] = cached_result
+                if cached_result.get("cache_stale"):
+                    self.refresher.enqueue(normalized_list[position], CacheRefresher.PRIORITY_REQUESTED)
+                continue
+
+            normalized = normalized_list[position]
+            key = tuple(normalized.values())
+            try:
+                if key not in fresh_by_key:
+                    fresh_by_key[key] = self._calculate_fresh(normalized)
+                    to_save.append((key, fresh_by_key[key]))
+                results[position] = dict(fresh_by_key[key])
+            except Exception as e:
+                if raise_errors:
+                    raise
+                results[position] = e
+
+        self.cache_manager.save_many(to_save)
+        return results
+
+    def warm_up(self, input_hashes: List[str]) -> Dict[str, int]:
+        """
+        按输入哈希预热：取回缓存中记录的标准化输入，载入一级缓存，缺失或旧版本的按当前版本重算
+
+        Returns:
+            {"requested": 请求数, "warmed": 预热成功数, "failed": 失败数}
+        """
+        inputs_by_hash = self.cache_manager.store.inputs_for_hashes(input_hashes)
+        inputs_list = [json.loads(inputs_by_hash[h]) for h in input_hashes if h in inputs_by_hash]
+        results = self.calculate_many(inputs_list, allow_stale=False)
+        failed = sum(1 for result in results if isinstance(result, Exception))
+        return {
+            "requested": len(input_hashes),
+            "warmed": len(results) - failed,
+            "failed": failed
+        }
+
+    def schedule_stale_refresh(self, top_n=DEFAULT_REFRESH_TOP_N) -> int:
+        """版本升级后安排后台重算最热门的N条旧结果"""
+        try:
+            return self.refresher.schedule_hottest(top_n)
+        except Exception as e:
+            print(f"⚠️ 安排后台重算失败: {e}")
+            return 0
+
     def verify_consistency(self, year, month, day, hour, gender="male", calendar_type="solar", iterations=3):
         """验证计算结果的一致性"""
         results = []
-        
+
         for i in range(iterations):
             try:
                 # 清除缓存，强制重新计算
-                cache_key = self.cache_manager.get_cache_key(year, month, day, hour, gender, calendar_type)
-                cache_file = self.cache_manager.get_cache_file_path(cache_key)
-                if os.path.exists(cache_file):
-                    os.remove(cache_file)
-                
+                self.cache_manager.invalidate(year, month, day, hour, gender, calendar_type)
+
                 # 重新计算
                 result = self.calculate_with_cache(year, month, day, hour, gender, calendar_type)
                 results.append(result)
-                
+
             except Exception as e:
                 print(f"第{i+1}次计算失败: {e}")
                 return False
-        
+
         # 比较结果一致性
         if len(results) < 2:
             return True
-        
+
         # 比较关键字段
         first_result = results[0]
         key_fields = ["bazi", "wuxing", "analysis"]
-        
+
         for result in results[1:]:
             for field in key_fields:
                 if result.get(field) != first_result.get(field):
                     print(f"❌ 字段 {field} 结果不一致")
                     return False
-        
+
         print("✅ 多次计算结果完全一致")
         return True
 
 
-# 全局实例
-deterministic_calculator = DeterministicBaziCalculator()
+# 全局实例在首次使用时创建（会打开 cache/ 下的SQLite文件）
+_deterministic_calculator = None
+_deterministic_calculator_lock = threading.Lock()
+
+
+def get_deterministic_calculator() -> DeterministicBaziCalculator:
+    """获取全局八字结果缓存计算器（线程安全）"""
+    global _deterministic_calculator
+    if _deterministic_calculator is None:
+        with _deterministic_calculator_lock:
+            if _deterministic_calculator is None:
+                _deterministic_calculator = DeterministicBaziCalculator()
+    return _deterministic_calculator
+
+
+def __getattr__(name):
+    # 兼容 `from enhanced_bazi_cache import deterministic_calculator`
+    if name == "deterministic_calculator":
+        return get_deterministic_calculator()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
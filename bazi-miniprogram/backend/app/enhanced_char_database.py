@@ -5,11 +5,38 @@
 
 import json
 import os
+import threading
+from collections import OrderedDict
 from typing import Dict, List, Tuple, Optional, Any
 
+try:
+    from .char_attribute_index import CharAttributeIndex, stroke_bucket
+    from .char_feature_matrix import NUMPY_AVAILABLE, CharFeatureMatrix
+    from .compiled_char_database import CompiledCharDatabase, compiled_path_for, load_compiled_if_fresh
+    from .data_snapshot import SnapshotHolder
+    from .diversity_selector import select_diverse
+    from .kangxi_strokes import get_kangxi_stroke_table
+    from .meaning_keyword_index import MeaningKeywordIndex
+    from .meaning_ngram_index import MeaningNgramIndex
+except ImportError:
+    from char_attribute_index import CharAttributeIndex, stroke_bucket
+    from char_feature_matrix import NUMPY_AVAILABLE, CharFeatureMatrix
+    from compiled_char_database import CompiledCharDatabase, compiled_path_for, load_compiled_if_fresh
+    from data_snapshot import SnapshotHolder
+    from diversity_selector import select_diverse
+    from kangxi_strokes import get_kangxi_stroke_table
+    from meaning_keyword_index import MeaningKeywordIndex
+    from meaning_ngram_index import MeaningNgramIndex
+
+# 设为0时忽略编译字库，始终解析JSON（排查编译文件问题时使用）
+USE_COMPILED_CHAR_DATABASE = os.getenv("BAZI_COMPILED_CHAR_DB", "1") != "0"
+
 class EnhancedCharDatabase:
     """增强汉字数据库 - 支持个性化推荐和JSON外置数据"""
     
+    # 字义搜索结果缓存容量
+    SEARCH_CACHE_SIZE = 256
+    
     def __init__(self, data_dir: str = None):
         """
         初始化字库数据库
@@ -29,14 +56,41 @@ class EnhancedCharDatabase:
         self.char_database = {}
         self.meaning_tags = {}
         self.meaning_index = {}
+        # JSON加载失败（已回退到内置基础字库）时的错误信息
+        self.load_error = None
+        
+        # 属性位图索引（五行、性别、时代等筛选与统计）
+        self.attribute_index = None
+        
+        # 字义模糊搜索的N-gram倒排索引
+        self.ngram_index = None
+        
+        # 同义词反查与搜索建议索引
+        self.keyword_index = None
+        
+        # 字义搜索结果缓存（字库数据只读，结果可复用）
+        self.search_cache = OrderedDict()
+        self._search_cache_lock = threading.Lock()
         
         # 个性化推荐系统
         self.user_preference_profiles = {}
         self.semantic_network = {}
         self.cultural_context_mapping = {}
         
+        # 个性化评分特征矩阵（需要numpy）
+        self._feature_matrix = None
+        self._feature_matrix_lock = threading.Lock()
+        # 关键词的含义匹配次数缓存（与用户档案无关，可跨请求复用）
+        self.meaning_match_cache = OrderedDict()
+        
+        # 字库笔画与康熙笔画表的核对结果（首次查询时计算）
+        self._stroke_mismatches = None
+        
         # 加载所有数据
         self._load_all_databases()
+        self._build_attribute_index()
+        self._build_ngram_index()
+        self._build_keyword_index()
         self._initialize_recommendation_system()
     
     def _load_all_databases(self):
@@ -55,13 +109,16 @@ class EnhancedCharDatabase:
             
         except Exception as e:
             print(f"❌ 字库加载失败: {e}")
+            self.load_error = str(e)
             # 如果JSON加载失败，使用内置的基础字库
             self._load_fallback_database()
     
     def _load_main_chars(self):
-        """加载主字库 - 优先使用扩展字库"""
+        """加载主字库 - 优先使用扩展字库；有未过期的编译字库时mmap加载"""
         # 首先尝试加载扩展字库
         expanded_chars_file = os.path.join(self.chars_dir, 'expanded_chars_database.json')
+        if self._load_compiled_chars(expanded_chars_file):
+            return
         if os.path.exists(expanded_chars_file):
             with open(expanded_chars_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
@@ -71,6 +128,8 @@ class EnhancedCharDatabase:
         
         # 回退到原有主字库
         chars_file = os.path.join(self.chars_dir, 'chars_main.json')
+        if self._load_compiled_chars(chars_file):
+            return
         if os.path.exists(chars_file):
             with open(chars_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
@@ -79,6 +138,17 @@ class EnhancedCharDatabase:
         else:
             print(f"⚠️  主字库文件不存在: {chars_file}")
     
+    def _load_compiled_chars(self, source_file):
+        """加载源JSON对应的编译字库（scripts/compile_char_database.py 生成），不存在或已过期时返回False"""
+        if not USE_COMPILED_CHAR_DATABASE:
+            return False
+        compiled = load_compiled_if_fresh(source_file)
+        if compiled is None:
+            return False
+        self.char_database = compiled
+        print(f"📦 编译字库映射: {len(compiled)} 个字符 ({os.path.basename(compiled.path)})")
+        return True
+    
     def _load_meaning_tags(self):
         """加载字义标签映射"""
         tags_file = os.path.join(self.chars_dir, 'chars_meaning_tags.json')
@@ -93,6 +163,12 @@ class EnhancedCharDatabase:
     
     def _build_meaning_index(self):
         """构建字义搜索索引"""
+        if isinstance(self.char_database, CompiledCharDatabase):
+            # 编译字库中已包含字义索引，关键词被查询时才取出对应的字
+            self.meaning_index = self.char_database.meaning_index()
+            print(f"🔍 搜索索引映射: {len(self.meaning_index)} 个关键词")
+            return
+        
         self.meaning_index = {}
         
         # 从字库中构建含义索引
@@ -114,6 +190,33 @@ class EnhancedCharDatabase:
         
         print(f"🔍 搜索索引构建: {len(self.meaning_index)} 个关键词")
     
+    def _build_attribute_index(self):
+        """构建属性位图索引（主字库和内置基础字库都需要）"""
+        if isinstance(self.char_database, CompiledCharDatabase):
+            self.attribute_index = self.char_database.attribute_index()
+        else:
+            self.attribute_index = CharAttributeIndex(self.char_database)
+        print(f"🧮 属性位图索引构建: {len(self.attribute_index)} 个字符")
+    
+    def _build_ngram_index(self):
+        """构建字义模糊搜索的N-gram倒排索引（编译字库中已预先构建）"""
+        if isinstance(self.char_database, CompiledCharDatabase):
+            self.ngram_index = self.char_database.ngram_index()
+        else:
+            self.ngram_index = MeaningNgramIndex(self.char_database)
+        print(f"🔤 字义N-gram索引构建: {len(self.ngram_index)} 个N-gram")
+    
+    def _build_keyword_index(self):
+        """构建同义词反查表和搜索建议索引"""
+        if isinstance(self.char_database, CompiledCharDatabase):
+            keyword_chars = self.meaning_index.keyword_chars()
+        else:
+            keyword_chars = {
+                keyword: [char for char, _ in matches] for keyword, matches in self.meaning_index.items()
+            }
+        self.keyword_index = MeaningKeywordIndex(self.meaning_tags, keyword_chars, self.char_database)
+        print(f"🗂️  关键词索引构建: {len(self.keyword_index)} 个关键词")
+    
     def _initialize_recommendation_system(self):
         """初始化个性化推荐系统"""
         print("🤖 初始化智能推荐系统...")
@@ -127,6 +230,10 @@ class EnhancedCharDatabase:
         # 初始化用户偏好模板
         self._initialize_preference_templates()
         
+        # 构建个性化评分特征矩阵；编译字库在首次个性化推荐时再构建，避免启动时整库解码
+        if not isinstance(self.char_database, CompiledCharDatabase):
+            self._get_feature_matrix()
+        
         print("✅ 智能推荐系统初始化完成")
     
     def _build_semantic_network(self):
@@ -375,14 +482,23 @@ class EnhancedCharDatabase:
         
         candidates = []
         
-        # 获取五行匹配的所有字符
-        for char, info in self.char_database.items():
-            if info.get('wuxing') == wuxing and info.get('suitable_for_name', True):
-                # 性别筛选
-                gender_pref = user_profile.get('gender_preference')
-                if gender_pref and info.get('gender') not in [gender_pref, 'neutral']:
-                    continue
-                
+        # 获取五行匹配、适合起名且符合性别偏好的所有字符
+        mask = self.attribute_index.select(
+            gender=user_profile.get('gender_preference'), wuxing=wuxing, suitable_for_name=True
+        )
+        feature_matrix = self._get_feature_matrix()
+        if feature_matrix is not None:
+            # 整库向量化评分，再取出候选字的分数
+            positions = list(self.attribute_index.positions(mask))
+            scores = feature_matrix.score(
+                user_profile,
+                [self._meaning_matches(keyword) for keyword in user_profile.get('custom_meanings', [])],
+                [self._meaning_matches(keyword) for keyword in user_profile.get('avoid_meanings', [])]
+            )[positions].tolist()
+            for (char, info), score in zip(self.attribute_index.items_at(positions), scores):
+                candidates.append((char, info, score))
+        else:
+            for char, info in self.attribute_index.items(mask):
                 # 计算个性化匹配分数
                 score = self._calculate_personalized_score(char, info, user_profile)
                 candidates.append((char, info, score))
@@ -391,7 +507,7 @@ class EnhancedCharDatabase:
         candidates.sort(key=lambda x: x[2], reverse=True)
         
         # 多样性调整：确保推荐结果的多样性
-        diverse_recommendations = self._ensure_diversity(candidates, user_profile)
+        diverse_recommendations = self._ensure_diversity(candidates, user_profile, count)
         
         result = [(char, info) for char, info, _ in diverse_recommendations[:count]]
         
@@ -402,8 +518,53 @@ class EnhancedCharDatabase:
         
         return result
     
+    def _get_feature_matrix(self):
+        """个性化评分特征矩阵（首次调用时构建；未安装numpy时返回None，逐字评分）"""
+        if not NUMPY_AVAILABLE:
+            return None
+        if self._feature_matrix is None:
+            with self._feature_matrix_lock:
+                if self._feature_matrix is None:
+                    index = self.attribute_index
+                    records = [info for _, info in index.items(index.all_mask)]
+                    self._feature_matrix = CharFeatureMatrix(records, index.chars, self.semantic_network)
+                    print(f"🧬 个性化评分特征矩阵构建: {self._feature_matrix.size} 个字符, "
+                          f"{len(self._feature_matrix.categories)} 个语义类别")
+        return self._feature_matrix
+    
+    def _meaning_matches(self, keyword):
+        """
+        适合起名的字中，含义与关键词的匹配次数 {字位置: 次数}（计数规则与逐字评分相同）
+        
+        由N-gram索引找出含义中包含关键词的字，只对这些字逐条计数；结果按关键词缓存
+        """
+        with self._search_cache_lock:
+            cached = self.meaning_match_cache.get(keyword)
+            if cached is not None:
+                self.meaning_match_cache.move_to_end(keyword)
+                return cached
+        
+        if keyword:
+            positions = [position for position, _ in self.ngram_index.search(keyword)]
+        else:
+            # 空关键词包含于任何含义中
+            positions = list(self.attribute_index.positions(self.attribute_index.mask('suitable_for_name', True)))
+        
+        matches = {}
+        for position, (_, info) in zip(positions, self.attribute_index.items_at(positions)):
+            char_meanings = info.get('meanings', [info.get('meaning', '')])
+            matched = sum(1 for char_meaning in char_meanings if keyword in char_meaning)
+            if matched:
+                matches[position] = matched
+        
+        with self._search_cache_lock:
+            self.meaning_match_cache[keyword] = matches
+            if len(self.meaning_match_cache) > self.SEARCH_CACHE_SIZE:
+                self.meaning_match_cache.popitem(last=False)
+        return matches
+    
     def _calculate_personalized_score(self, char, info, user_profile):
-        """计算字符的个性化匹配分数"""
+        """计算字符的个性化匹配分数（未安装numpy时逐字使用；与特征矩阵评分结果一致）"""
         score = 50  # 基础分数
         
         # 1. 时代偏好匹配 (权重30%)
@@ -469,49 +630,36 @@ class EnhancedCharDatabase:
         
         return max(score, 0)  # 确保分数不为负
     
-    def _ensure_diversity(self, candidates, user_profile):
-        """确保推荐结果的多样性"""
+    def _ensure_diversity(self, candidates, user_profile, limit=None):
+        """
+        确保推荐结果的多样性：按分数顺序，同一时代、流行度、笔画复杂度的字各有配额，
+        不足15个时按分数补充
+        
+        Args:
+            candidates: 按分数降序排列的 (字, 信息, 分数)
+            limit: 调用方最多取用的数量（达到后提前结束扫描，结果的前 limit 个不变）
+        """
         if len(candidates) <= 10:
             return candidates
         
-        diverse_results = []
-        era_counts = {}
-        popularity_counts = {}
-        stroke_ranges = {'simple': 0, 'medium': 0, 'complex': 0}
-        
-        for char, info, score in candidates:
-            era = info.get('era', 'classical')
-            popularity = info.get('popularity', 'medium')
-            stroke = info.get('stroke', 8)
-            
-            # 笔画复杂度分类
-            if stroke <= 8:
-                stroke_range = 'simple'
-            elif stroke <= 15:
-                stroke_range = 'medium'
-            else:
-                stroke_range = 'complex'
-            
-            # 多样性检查
-            era_limit = 8 if len(candidates) > 30 else 5
-            popularity_limit = 10 if len(candidates) > 30 else 7
-            stroke_limit = 8 if len(candidates) > 30 else 5
-            
-            if (era_counts.get(era, 0) < era_limit and 
-                popularity_counts.get(popularity, 0) < popularity_limit and
-                stroke_ranges.get(stroke_range, 0) < stroke_limit):
-                
-                diverse_results.append((char, info, score))
-                era_counts[era] = era_counts.get(era, 0) + 1
-                popularity_counts[popularity] = popularity_counts.get(popularity, 0) + 1
-                stroke_ranges[stroke_range] = stroke_ranges.get(stroke_range, 0) + 1
-        
-        # 如果多样性筛选后结果太少，补充高分字符
-        if len(diverse_results) < 15:
-            remaining_candidates = [c for c in candidates if c not in diverse_results]
-            diverse_results.extend(remaining_candidates[:15-len(diverse_results)])
+        large = len(candidates) > 30
+        # 特征按需计算，设置 limit 时只处理扫描到的候选
+        features = {
+            'era': lambda index: candidates[index][1].get('era', 'classical'),
+            'popularity': lambda index: candidates[index][1].get('popularity', 'medium'),
+            'stroke_range': lambda index: stroke_bucket(candidates[index][1].get('stroke', 8))
+        }
         
-        return diverse_results
+        selected = select_diverse(
+            range(len(candidates)), features,
+            quotas={
+                'era': 8 if large else 5,
+                'popularity': 10 if large else 7,
+                'stroke_range': 8 if large else 5
+            },
+            limit=limit, fill_to=15
+        )
+        return [candidates[index] for index in selected]
     
     def _load_fallback_database(self):
         """当JSON文件加载失败时，使用内置的基础字库"""
@@ -672,11 +820,9 @@ class EnhancedCharDatabase:
     
     def get_chars_by_wuxing(self, wuxing, gender=None, count=None):
         """根据五行属性获取字"""
-        chars = []
-        for char, info in self.char_database.items():
-            if info['wuxing'] == wuxing and info['suitable_for_name']:
-                if gender is None or info['gender'] == gender or info['gender'] == 'neutral':
-                    chars.append((char, info))
+        chars = self.attribute_index.items(
+            self.attribute_index.select(gender=gender, wuxing=wuxing, suitable_for_name=True)
+        )
         
         # 按流行度和时代特征排序
         def sort_key(item):
@@ -697,28 +843,21 @@ class EnhancedCharDatabase:
         """根据个性化偏好获取字 - 修复版，确保数据格式一致"""
         print(f"🎯 个性化筛选: 五行={wuxing}, 性别={gender}, 文化={cultural_level}, 流行度={popularity}, 时代={era}")
         
+        # 五行、适合起名、性别（指定性别或中性）用位图筛选
+        mask = self.attribute_index.select(gender=gender, wuxing=wuxing, suitable_for_name=True)
+        
         candidates = []
-        for char, info in self.char_database.items():
+        for char, info in self.attribute_index.items(mask):
             try:
-                # 安全的字段访问
-                char_wuxing = info.get('wuxing', '木')
-                suitable_for_name = info.get('suitable_for_name', True)
-                char_gender = info.get('gender', 'neutral')
+                # 计算偏好匹配得分，而不是严格筛选
+                preference_score = self._calculate_preference_match_score(
+                    info, cultural_level, popularity, rarity, era
+                )
+                
+                # 规范化字符信息
+                normalized_info = self._normalize_char_info(char, info)
+                candidates.append((char, normalized_info, preference_score))
                 
-                if char_wuxing == wuxing and suitable_for_name:
-                    # 性别筛选（保持严格）
-                    if gender and char_gender != gender and char_gender != 'neutral':
-                        continue
-                    
-                    # 计算偏好匹配得分，而不是严格筛选
-                    preference_score = self._calculate_preference_match_score(
-                        info, cultural_level, popularity, rarity, era
-                    )
-                    
-                    # 规范化字符信息
-                    normalized_info = self._normalize_char_info(char, info)
-                    candidates.append((char, normalized_info, preference_score))
-                    
             except Exception as e:
                 print(f"⚠️  处理字符 '{char}' 时出错: {str(e)}")
                 continue
@@ -731,30 +870,21 @@ class EnhancedCharDatabase:
         # 如果严格匹配结果太少，放宽条件
         if len(candidates) < (count or 10):
             print("⚠️  严格匹配结果不足，扩展搜索范围")
-            # 添加五行匹配但偏好不完全匹配的字符
-            for char, info in self.char_database.items():
+            # 添加五行匹配但上面处理出错的字符
+            selected = {c[0] for c in candidates}
+            for char, info in self.attribute_index.items(mask):
+                if char in selected:
+                    continue
                 try:
-                    char_wuxing = info.get('wuxing', '木')
-                    suitable_for_name = info.get('suitable_for_name', True)
-                    char_gender = info.get('gender', 'neutral')
+                    # 给予较低的基础分数
+                    base_score = self._calculate_preference_match_score(
+                        info, cultural_level, popularity, rarity, era
+                    ) * 0.7  # 降权处理
+                    
+                    # 规范化字符信息
+                    normalized_info = self._normalize_char_info(char, info)
+                    candidates.append((char, normalized_info, base_score))
                     
-                    if (char_wuxing == wuxing and 
-                        suitable_for_name and 
-                        not any(char == c[0] for c in candidates)):
-                        
-                        # 性别筛选
-                        if gender and char_gender != gender and char_gender != 'neutral':
-                            continue
-                        
-                        # 给予较低的基础分数
-                        base_score = self._calculate_preference_match_score(
-                            info, cultural_level, popularity, rarity, era
-                        ) * 0.7  # 降权处理
-                        
-                        # 规范化字符信息
-                        normalized_info = self._normalize_char_info(char, info)
-                        candidates.append((char, normalized_info, base_score))
-                        
                 except Exception as e:
                     print(f"⚠️  扩展搜索时处理字符 '{char}' 出错: {str(e)}")
                     continue
@@ -824,9 +954,18 @@ class EnhancedCharDatabase:
         Returns:
             按相关性排序的字符列表，并统一数据结构
         """
+        cache_key = (keyword, wuxing, gender, count)
+        with self._search_cache_lock:
+            cached = self.search_cache.get(cache_key)
+            if cached is not None:
+                self.search_cache.move_to_end(cache_key)
+                return list(cached)
+        
         print(f"🔍 智能搜索关键词: '{keyword}'")
         
         search_results = []
+        # 已收录的字（同义词和模糊搜索结果按字去重）
+        seen = set()
         
         # 1. 精确匹配 - 直接从meaning_index搜索
         exact_matches = self._exact_meaning_search(keyword)
@@ -835,24 +974,25 @@ class EnhancedCharDatabase:
                 # 统一数据结构
                 normalized_info = self._normalize_char_info(char, info)
                 search_results.append((char, normalized_info, relevance * 1.0))  # 最高权重
+                seen.add(char)
         
         # 2. 同义词搜索 - 使用字义标签映射
         synonym_matches = self._synonym_meaning_search(keyword)
         for char, info, relevance in synonym_matches:
-            if self._filter_char(info, wuxing, gender):
-                # 避免重复
-                if not any(char == result[0] for result in search_results):
-                    normalized_info = self._normalize_char_info(char, info)
-                    search_results.append((char, normalized_info, relevance * 0.8))  # 次高权重
+            # 避免重复
+            if char not in seen and self._filter_char(info, wuxing, gender):
+                normalized_info = self._normalize_char_info(char, info)
+                search_results.append((char, normalized_info, relevance * 0.8))  # 次高权重
+                seen.add(char)
         
         # 3. 模糊搜索 - 包含关键词的含义
         fuzzy_matches = self._fuzzy_meaning_search(keyword)
         for char, info, relevance in fuzzy_matches:
-            if self._filter_char(info, wuxing, gender):
-                # 避免重复
-                if not any(char == result[0] for result in search_results):
-                    normalized_info = self._normalize_char_info(char, info)
-                    search_results.append((char, normalized_info, relevance * 0.6))  # 较低权重
+            # 避免重复
+            if char not in seen and self._filter_char(info, wuxing, gender):
+                normalized_info = self._normalize_char_info(char, info)
+                search_results.append((char, normalized_info, relevance * 0.6))  # 较低权重
+                seen.add(char)
         
         # 4. 排序和返回
         search_results.sort(key=lambda x: x[2], reverse=True)
@@ -870,7 +1010,12 @@ class EnhancedCharDatabase:
         if count:
             result_chars = result_chars[:count]
         
-        return result_chars
+        with self._search_cache_lock:
+            self.search_cache[cache_key] = result_chars
+            if len(self.search_cache) > self.SEARCH_CACHE_SIZE:
+                self.search_cache.popitem(last=False)
+        
+        return list(result_chars)
     
     def _exact_meaning_search(self, keyword):
         """精确含义搜索"""
@@ -893,32 +1038,51 @@ class EnhancedCharDatabase:
         """同义词搜索"""
         results = []
         
-        # 查找包含此关键词的语义映射
-        for main_keyword, mapping in self.meaning_tags.items():
-            synonyms = mapping.get('synonyms', [])
+        # 反查关键词所属的语义映射（关键词是类别名或其同义词）
+        for main_keyword in self.keyword_index.categories_of(keyword):
+            mapping = self.meaning_tags[main_keyword]
             primary_chars = mapping.get('primary_chars', [])
             secondary_chars = mapping.get('secondary_chars', [])
             
-            # 如果关键词是同义词
-            if keyword in synonyms or keyword == main_keyword:
-                # 添加主要字符
-                for char in primary_chars:
-                    if char in self.char_database:
-                        info = self.char_database[char]
-                        relevance = 90 + {'high': 15, 'medium': 8, 'low': 3}.get(info.get('popularity'), 0)
-                        results.append((char, info, relevance))
-                
-                # 添加次要字符
-                for char in secondary_chars:
-                    if char in self.char_database:
-                        info = self.char_database[char]
-                        relevance = 70 + {'high': 10, 'medium': 5, 'low': 2}.get(info.get('popularity'), 0)
-                        results.append((char, info, relevance))
+            # 添加主要字符
+            for char in primary_chars:
+                if char in self.char_database:
+                    info = self.char_database[char]
+                    relevance = 90 + {'high': 15, 'medium': 8, 'low': 3}.get(info.get('popularity'), 0)
+                    results.append((char, info, relevance))
+            
+            # 添加次要字符
+            for char in secondary_chars:
+                if char in self.char_database:
+                    info = self.char_database[char]
+                    relevance = 70 + {'high': 10, 'medium': 5, 'low': 2}.get(info.get('popularity'), 0)
+                    results.append((char, info, relevance))
         
         return results
     
     def _fuzzy_meaning_search(self, keyword):
-        """模糊搜索 - 在字符的meaning中查找包含关键词的"""
+        """模糊搜索 - 在字符的meaning中查找包含关键词的（由N-gram倒排表得到匹配的字和位置）"""
+        if self.ngram_index is None or not keyword:
+            return self._scan_fuzzy_meaning_search(keyword)
+        
+        matches = self.ngram_index.search(keyword)
+        pairs = self.attribute_index.items_at([position for position, _ in matches])
+        
+        results = []
+        for (char, info), (_, pos) in zip(pairs, matches):
+            if pos is None:
+                # 语义标签匹配
+                relevance = 60 + {'high': 10, 'medium': 5, 'low': 2}.get(info.get('popularity'), 0)
+            else:
+                # 位置越靠前得分越高，另加流行度加分
+                relevance = max(50 - pos * 2, 10)
+                relevance += {'high': 15, 'medium': 8, 'low': 3}.get(info.get('popularity'), 0)
+            results.append((char, info, relevance))
+        
+        return results
+    
+    def _scan_fuzzy_meaning_search(self, keyword):
+        """逐字扫描的模糊搜索（未建立N-gram索引时使用）"""
         results = []
         
         for char, info in self.char_database.items():
@@ -1070,24 +1234,13 @@ class EnhancedCharDatabase:
         
         return True
     
-    def get_search_suggestions(self, partial_keyword):
-        """获取搜索建议"""
-        suggestions = []
-        
-        # 从字义标签中获取建议
-        for keyword in self.meaning_tags.keys():
-            if keyword.startswith(partial_keyword):
-                suggestions.append(keyword)
-        
-        # 从搜索索引中获取建议
-        for keyword in self.meaning_index.keys():
-            if keyword.startswith(partial_keyword) and keyword not in suggestions:
-                suggestions.append(keyword)
-        
-        # 按长度和流行度排序
-        suggestions.sort(key=len)
+    def get_search_suggestions(self, partial_keyword, limit=10):
+        """
+        获取搜索建议 - 类别名、同义词和字义索引关键词中以 partial_keyword 开头的词
         
-        return suggestions[:10]  # 返回前10个建议
+        按能搜到的字数排序（字数相同时短词在前），返回前 limit 个
+        """
+        return self.keyword_index.suggest(partial_keyword or '', limit)
     
     def get_char_combinations(self, wuxing_list, gender=None, style_preference=None):
         """获取字的组合建议（用于双字名）"""
@@ -1160,46 +1313,72 @@ class EnhancedCharDatabase:
         
         return score
     
+    def get_kangxi_stroke(self, char):
+        """姓名学使用的康熙笔画：以康熙笔画表为准，表中没有时使用字库的stroke字段，都没有时返回None"""
+        stroke = get_kangxi_stroke_table().get(char) if len(char) == 1 else 0
+        if stroke:
+            return stroke
+        info = self.char_database.get(char)
+        return info.get('stroke') if info else None
+    
+    def get_stroke_mismatches(self):
+        """字库stroke字段与康熙笔画表不一致的字 {字: (字库笔画, 康熙笔画)}（首次调用时核对，字库只读可缓存）"""
+        if self._stroke_mismatches is None:
+            self._stroke_mismatches = get_kangxi_stroke_table().reconcile(self.char_database)
+        return self._stroke_mismatches
+    
     def get_database_stats(self):
-        """获取数据库统计信息"""
+        """获取数据库统计信息（由属性位图popcount得出）"""
+        index = self.attribute_index
         stats = {
             'total_chars': len(self.char_database),
-            'by_wuxing': {},
-            'by_gender': {},
-            'by_era': {},
-            'by_popularity': {}
+            'by_wuxing': index.counts('wuxing'),
+            'by_gender': index.counts('gender'),
+            'by_era': index.counts('era'),
+            'by_popularity': index.counts('popularity'),
+            'kangxi_stroke_mismatches': len(self.get_stroke_mismatches())
         }
         
-        for char, info in self.char_database.items():
-            # 按五行统计
-            wuxing = info['wuxing']
-            if wuxing not in stats['by_wuxing']:
-                stats['by_wuxing'][wuxing] = 0
-            stats['by_wuxing'][wuxing] += 1
-            
-            # 按性别统计
-            gender = info['gender']
-            if gender not in stats['by_gender']:
-                stats['by_gender'][gender] = 0
-            stats['by_gender'][gender] += 1
-            
-            # 按时代统计
-            era = info['era']
-            if era not in stats['by_era']:
-                stats['by_era'][era] = 0
-            stats['by_era'][era] += 1
-            
-            # 按流行度统计
-            popularity = info['popularity']
-            if popularity not in stats['by_popularity']:
-                stats['by_popularity'][popularity] = 0
-            stats['by_popularity'][popularity] += 1
-        
         return stats
 
-# 创建全局实例
-char_db = EnhancedCharDatabase()
+# 进程内共享的字库实例：起名计算器、字义搜索、预热等所有使用者都通过
+# get_character_database() 获取同一实例。首次使用时才加载（加载JSON、建索引和
+# 语义网络耗时较长，不在导入时进行）。字库加载后只读，可在线程间共享。
+# 字库以快照形式持有：更新数据文件后 reload_character_database() 在后台构建新实例并整体替换，
+# 处理中的请求（已固定快照）继续使用旧实例
+def character_database_sources(data_dir: str = None) -> List[str]:
+    """字库的源文件（修改后需要重新加载），包括对应的编译字库"""
+    if data_dir is None:
+        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+    chars_dir = os.path.join(data_dir, 'chars')
+    sources = []
+    for name in ['expanded_chars_database.json', 'chars_main.json']:
+        path = os.path.join(chars_dir, name)
+        sources.extend([path, compiled_path_for(path)])
+    sources.append(os.path.join(chars_dir, 'chars_meaning_tags.json'))
+    return sources
+
+def _validate_character_database(database: EnhancedCharDatabase):
+    """热更新时拒绝加载失败（回退到内置基础字库）或为空的字库，继续使用旧快照"""
+    if database.load_error:
+        raise ValueError(f"字库加载失败: {database.load_error}")
+    if not len(database.char_database):
+        raise ValueError("字库为空")
+
+character_database_snapshot = SnapshotHolder(
+    "char_database", EnhancedCharDatabase, character_database_sources, _validate_character_database
+)
+
+def get_character_database() -> EnhancedCharDatabase:
+    """获取进程内共享的字库实例（首次调用时加载，并发调用也只加载一次；请求中返回固定的快照）"""
+    return character_database_snapshot.get()
+
+def reload_character_database(wait: bool = False, timeout: float = None) -> bool:
+    """后台重新加载字库并替换共享实例（wait为True时等待完成）"""
+    return character_database_snapshot.reload(wait, timeout)
 
-def get_character_database():
-    """获取字库实例"""
-    return char_db
+def __getattr__(name):
+    # 兼容 `from enhanced_char_database import char_db`
+    if name == "char_db":
+        return get_character_database()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -14,6 +14,13 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime, date
 import logging
 
+try:
+    from .data_snapshot import SnapshotHolder
+except ImportError:
+    from data_snapshot import SnapshotHolder
+
+TEMPLATE_FILES = ['enhanced_personality_templates.json', 'enhanced_fortune_templates.json']
+
 class EnhancedContentManager:
     """增强版内容管理器"""
     
@@ -27,6 +34,8 @@ class EnhancedContentManager:
         self.fortune_templates = {}
         self.cache = {}
         self.logger = logging.getLogger(__name__)
+        # 模板加载失败（已使用后备模板）时的错误信息
+        self.load_error = None
         
         # 加载模板数据
         self._load_templates()
@@ -50,6 +59,7 @@ class EnhancedContentManager:
                 
         except Exception as e:
             self.logger.error(f"加载模板数据失败: {e}")
+            self.load_error = str(e)
             self._load_fallback_templates()
     
     def _load_fallback_templates(self):
@@ -391,23 +401,29 @@ class EnhancedContentManager:
         
         return validation_result
 
-# 全局内容管理器实例
-content_manager = None
+def template_sources(data_dir: str = None) -> List[str]:
+    """模板库源文件"""
+    if data_dir is None:
+        data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+    return [os.path.join(data_dir, name) for name in TEMPLATE_FILES]
+
+def _validate_templates(manager: EnhancedContentManager):
+    """热更新时拒绝加载失败（已回退到后备模板）的模板库，继续使用旧快照"""
+    if manager.load_error:
+        raise ValueError(f"模板加载失败: {manager.load_error}")
+
+# 全局内容管理器实例（快照：重新加载时构建新实例后整体替换，缓存随旧实例一起丢弃）
+content_manager_snapshot = SnapshotHolder(
+    "content_templates", EnhancedContentManager, template_sources, _validate_templates
+)
 
 def get_content_manager() -> EnhancedContentManager:
     """获取全局内容管理器实例"""
-    global content_manager
-    if content_manager is None:
-        content_manager = EnhancedContentManager()
-    return content_manager
+    return content_manager_snapshot.get()
 
-def reload_templates():
-    """重新加载模板数据"""
-    global content_manager
-    if content_manager is not None:
-        content_manager._load_templates()
-        content_manager.clear_cache()
-        content_manager.logger.info("模板数据已重新加载")
+def reload_templates(wait: bool = True, timeout: float = None) -> bool:
+    """重新加载模板数据（后台构建新实例，完成后替换）"""
+    return content_manager_snapshot.reload(wait, timeout)
 
 if __name__ == "__main__":
     # 测试代码
@@ -7,8 +7,12 @@
 
 import math
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
 
+# 运势规则版本 - 修改评分规则或映射表后递增，运势缓存据此失效
+FORTUNE_RULES_VERSION = "1"
+
 class FortuneCalculator:
     """运势计算器 - 基于传统八字理论的运势分析"""
     
@@ -92,11 +96,10 @@ class FortuneCalculator:
             运势分析结果
         """
         try:
-            # 1. 解析目标日期
-            date_obj = datetime.strptime(target_date, "%Y-%m-%d")
-            
-            # 2. 计算当日干支
-            daily_ganzhi = cls.calculate_daily_ganzhi(date_obj)
+            # 1-2. 解析目标日期并获取当日干支（同一天的结果在进程内复用）
+            day_context = cls.get_day_context(target_date)
+            date_obj = day_context["date"]
+            daily_ganzhi = dict(day_context["daily_ganzhi"])
             
             # 3. 分析五行关系
             wuxing_analysis = cls.analyze_wuxing_relations(personal_bazi, daily_ganzhi)
@@ -105,7 +108,7 @@ class FortuneCalculator:
             ten_gods_analysis = cls.analyze_ten_gods(personal_bazi, daily_ganzhi)
             
             # 5. 获取节气影响
-            solar_term_effect = cls.get_solar_term_effect(date_obj)
+            solar_term_effect = day_context["solar_term_effect"]
             
             # 6. 计算各项运势分数
             scores = cls.calculate_fortune_scores(
@@ -147,6 +150,23 @@ class FortuneCalculator:
                 "error": str(e)
             }
     
+    @classmethod
+    @lru_cache(maxsize=400)
+    def get_day_context(cls, target_date: str) -> Dict:
+        """
+        获取目标日期的日上下文（与个人八字无关的部分）
+        Args:
+            target_date: 目标日期，格式: "2025-10-16"
+        Returns:
+            {"date": datetime, "daily_ganzhi": 当日干支, "solar_term_effect": 节气影响}，调用方应视为只读
+        """
+        date_obj = datetime.strptime(target_date, "%Y-%m-%d")
+        return {
+            "date": date_obj,
+            "daily_ganzhi": cls.calculate_daily_ganzhi(date_obj),
+            "solar_term_effect": cls.get_solar_term_effect(date_obj)
+        }
+    
     @classmethod
     def calculate_batch_fortune(cls, members_data: List[Dict], target_date: str) -> Dict:
         """
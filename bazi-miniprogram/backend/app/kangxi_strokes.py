@@ -0,0 +1,111 @@
+"""
+康熙笔画表 - 按码位偏移索引的紧凑数组
+
+姓名学（三才五格）按康熙字典笔画计数：繁体字形、部首按原字计（氵=水4画、扌=手4画、
+艹=艸6画、左阝=阜8画、右阝=邑7画、王字旁=玉5画），数字一至十按字义计。
+笔画表为 array('B')，下标为 码位 - BASE_CODEPOINT，值为康熙笔画（0为未知），进程内只构建一次：
+    1. 全字符库（cjk_char_store，由Unihan生成）的康熙笔画
+    2. 内置常用字笔画（下方 COMMON_KANGXI_STROKES，优先）
+查询为一次下标访问，不再每次调用都构建笔画字典。
+"""
+
+import threading
+from array import array
+from typing import Dict, Mapping, Optional, Tuple
+
+try:
+    from .cjk_char_store import get_cjk_char_store
+except ImportError:
+    from cjk_char_store import get_cjk_char_store
+
+# 覆盖CJK扩展A区、基本区到兼容汉字（U+3400 ~ U+FAFF），约52KB
+BASE_CODEPOINT = 0x3400
+END_CODEPOINT = 0xFB00
+
+# 常用字的康熙笔画（干支、数字、常见姓氏和起名常用字）
+COMMON_KANGXI_STROKES = {
+    # 数字按字义计
+    '一': 1, '二': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9, '十': 10,
+    # 地支、天干
+    '子': 3, '丑': 4, '寅': 11, '卯': 5, '辰': 7, '巳': 3, '午': 4, '未': 5, '申': 5, '酉': 7, '戌': 6, '亥': 6,
+    '甲': 5, '乙': 1, '丙': 5, '丁': 2, '戊': 5, '己': 3, '庚': 8, '辛': 7, '壬': 4, '癸': 9,
+    # 常见姓氏（简化字按繁体：张=張、刘=劉、陈=陳、杨=楊、赵=趙、黄=黃、吴=吳）
+    '王': 4, '李': 7, '张': 11, '刘': 15, '陈': 16, '杨': 13, '赵': 14, '黄': 12, '周': 8, '吴': 7,
+    # 常用字
+    '文': 4, '武': 8, '明': 8, '华': 14, '强': 12, '军': 9, '伟': 11, '国': 11, '建': 9, '民': 5,
+    '安': 6, '康': 11, '福': 14, '贵': 12, '富': 12, '吉': 6, '祥': 11, '瑞': 14, '慧': 15, '智': 12,
+    '美': 9, '丽': 19, '花': 10, '月': 4, '星': 9, '雨': 8, '雪': 11, '云': 12, '山': 3, '水': 4,
+    '春': 9, '夏': 10, '秋': 9, '冬': 5, '东': 8, '西': 6, '南': 9, '北': 5, '中': 4, '天': 4,
+    '地': 6, '人': 2, '大': 3, '小': 3, '日': 4, '年': 6, '时': 10, '分': 4, '秒': 9,
+    '好': 6, '坏': 19, '新': 13, '旧': 18, '长': 8, '短': 12, '高': 10, '低': 7, '快': 8, '慢': 15,
+    '红': 9, '绿': 14, '蓝': 20, '白': 5, '黑': 12, '灰': 6, '紫': 12, '粉': 10, '棕': 12
+}
+
+
+class KangxiStrokeTable:
+    """按码位偏移索引的康熙笔画表（只读，构建后可在线程间共享）"""
+
+    def __init__(self, strokes: Mapping[str, int] = None, store=None):
+        """
+        Args:
+            strokes: 优先使用的单字笔画（默认为内置常用字笔画）
+            store: 全字符库（CJKCharStore），提供其余字的康熙笔画
+        """
+        self.strokes = array('B', bytes(END_CODEPOINT - BASE_CODEPOINT))
+        # 表范围外的字（扩展B区及以后等）
+        self.extra: Dict[str, int] = {}
+        if store is not None:
+            for codepoint, kangxi_stroke in store.iter_kangxi_strokes():
+                self._set(chr(codepoint), kangxi_stroke)
+        for char, stroke in (COMMON_KANGXI_STROKES if strokes is None else strokes).items():
+            self._set(char, stroke)
+        self.known = len(self.strokes) - self.strokes.count(0) + len(self.extra)
+
+    def _set(self, char: str, stroke: int):
+        offset = ord(char) - BASE_CODEPOINT
+        if 0 <= offset < len(self.strokes):
+            self.strokes[offset] = min(stroke, 255)
+        else:
+            self.extra[char] = stroke
+
+    def get(self, char: str) -> int:
+        """康熙笔画，未知时返回0"""
+        offset = ord(char) - BASE_CODEPOINT
+        if 0 <= offset < END_CODEPOINT - BASE_CODEPOINT:
+            return self.strokes[offset]
+        return self.extra.get(char, 0)
+
+    def __contains__(self, char) -> bool:
+        return isinstance(char, str) and len(char) == 1 and self.get(char) > 0
+
+    def reconcile(self, char_database: Mapping[str, Dict]) -> Dict[str, Tuple[Optional[int], int]]:
+        """字库 stroke 字段与康熙笔画不一致的字：{字: (字库笔画, 康熙笔画)}"""
+        mismatches = {}
+        for char, info in char_database.items():
+            if len(char) != 1:
+                continue
+            kangxi = self.get(char)
+            if kangxi and info.get('stroke') != kangxi:
+                mismatches[char] = (info.get('stroke'), kangxi)
+        return mismatches
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_kangxi_stroke_table() -> KangxiStrokeTable:
+    """进程内共享的康熙笔画表（首次调用时构建）"""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = KangxiStrokeTable(store=get_cjk_char_store())
+    return _table
+
+
+def kangxi_stroke(char: str) -> int:
+    """单字的康熙笔画，未知时返回0"""
+    if len(char) != 1:
+        return 0
+    return get_kangxi_stroke_table().get(char)
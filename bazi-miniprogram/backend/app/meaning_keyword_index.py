@@ -0,0 +1,73 @@
+"""
+字义关键词索引 - 同义词反查与搜索建议
+加载时建立 关键词/同义词 → 类别 的反查表，以及全部关键词的有序数组：
+    - 同义词搜索直接查表，不再逐个类别检查同义词列表
+    - 搜索建议按前缀二分查找出候选区间，再按预先计算的排名取前k个
+"""
+
+import heapq
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List
+
+
+class MeaningKeywordIndex:
+    """字义关键词索引（只读，构建后可在线程间共享）"""
+
+    def __init__(self, meaning_tags: Dict[str, Dict[str, Any]], keyword_chars: Dict[str, Iterable[str]],
+                 known_chars=None):
+        """
+        Args:
+            meaning_tags: 字义标签映射 {类别: {synonyms, primary_chars, secondary_chars, ...}}
+            keyword_chars: 字义索引中每个关键词对应的字
+            known_chars: 字库中的字（用于统计类别字数），None时不过滤
+        """
+        # 关键词 → 所属类别（按字义标签映射的顺序，类别名本身也指向自己）
+        self.categories: Dict[str, List[str]] = {}
+        for category, mapping in meaning_tags.items():
+            for keyword in [category] + list(mapping.get('synonyms', [])):
+                categories = self.categories.setdefault(keyword, [])
+                if category not in categories:
+                    categories.append(category)
+
+        # 每个关键词能搜到的字：字义索引中的字 + 所属类别的主要/次要字
+        chars: Dict[str, set] = {}
+        for keyword, categories in self.categories.items():
+            matched = chars.setdefault(keyword, set())
+            for category in categories:
+                mapping = meaning_tags[category]
+                for char in list(mapping.get('primary_chars', [])) + list(mapping.get('secondary_chars', [])):
+                    if known_chars is None or char in known_chars:
+                        matched.add(char)
+        for keyword, keyword_char_list in keyword_chars.items():
+            chars.setdefault(keyword, set()).update(keyword_char_list)
+
+        # 排名：字数多的在前，字数相同时短词在前，再按首次出现的顺序（类别名、同义词、字义索引）
+        order = {keyword: i for i, keyword in enumerate(chars)}
+        ranked = sorted(chars, key=lambda keyword: (-len(chars[keyword]), len(keyword), order[keyword]))
+        self.char_counts: Dict[str, int] = {keyword: len(matched) for keyword, matched in chars.items()}
+        self._ranked = ranked
+
+        # 按字典序排列的关键词及其排名，前缀相同的关键词在数组中连续
+        self._sorted_keywords = sorted(chars)
+        rank = {keyword: i for i, keyword in enumerate(ranked)}
+        self._sorted_ranks = [rank[keyword] for keyword in self._sorted_keywords]
+
+    def __len__(self):
+        return len(self._sorted_keywords)
+
+    def categories_of(self, keyword: str) -> List[str]:
+        """关键词所属的字义类别（关键词是类别名或其同义词）"""
+        return self.categories.get(keyword, [])
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[str]:
+        """以 prefix 开头的关键词中排名最前的 limit 个"""
+        if limit <= 0:
+            return []
+        if not prefix:
+            return self._ranked[:limit]
+
+        start = bisect_left(self._sorted_keywords, prefix)
+        # 前缀后接最大码位的字符作为区间上界
+        end = bisect_left(self._sorted_keywords, prefix + '\U0010ffff', start)
+        ranks = heapq.nsmallest(limit, self._sorted_ranks[start:end])
+        return [self._ranked[rank] for rank in ranks]
@@ -0,0 +1,157 @@
+"""
+字义模糊搜索的N-gram倒排索引
+把每个字的含义文本（meaning 及 meanings 列表）依次排列在一条全局文本轴上，
+为每个单字和相邻二字（bigram）记录出现的全局位置；查询时按关键词各bigram的
+位置是否首尾相接确定匹配，不再逐字做子串判断，匹配位置也直接由倒排表得出
+
+规则与原逐字扫描一致：
+    - 只索引适合起名的字（suitable_for_name）
+    - 每个字取第一条包含关键词的含义文本，以关键词在其中首次出现的位置计分
+    - 含义中没有匹配、但语义标签（semantic_tags）与关键词完全相同时按标签匹配
+"""
+
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _flatten(postings: Dict[str, List[int]]) -> Tuple[List[str], array, array]:
+    """{键: 位置列表} 转为 键列表 + 偏移数组（长度为键数+1） + 拼接的位置数组"""
+    offsets = array('I', [0])
+    flat = array('I')
+    for positions in postings.values():
+        flat.extend(positions)
+        offsets.append(len(flat))
+    return list(postings), offsets, flat
+
+
+class MeaningNgramIndex:
+    """字义N-gram倒排索引（只读，构建后可在线程间共享）"""
+
+    def __init__(self, char_database: Dict[str, Dict[str, Any]]):
+        grams: Dict[str, List[int]] = {}
+        tags: Dict[str, List[int]] = {}
+        content_starts = array('I')
+        content_chars = array('I')
+        cursor = 0
+
+        for position, info in enumerate(char_database.values()):
+            if not info.get('suitable_for_name', True):
+                continue
+
+            contents = []
+            meaning = info.get('meaning', '')
+            if meaning:
+                contents.append(meaning)
+            contents.extend(info.get('meanings', []) or [])
+
+            for content in contents:
+                if not isinstance(content, str) or not content:
+                    continue
+                content_starts.append(cursor)
+                content_chars.append(position)
+                # 单字与bigram均不跨越含义文本的边界
+                for offset, ch in enumerate(content):
+                    grams.setdefault(ch, []).append(cursor + offset)
+                for offset in range(len(content) - 1):
+                    grams.setdefault(content[offset:offset + 2], []).append(cursor + offset)
+                cursor += len(content)
+
+            for tag in info.get('semantic_tags', []) or []:
+                positions = tags.setdefault(tag, [])
+                if not positions or positions[-1] != position:
+                    positions.append(position)
+
+        self._load(*_flatten(grams), content_starts, content_chars, *_flatten(tags))
+
+    @classmethod
+    def from_arrays(cls, grams: List[str], gram_offsets: array, gram_postings: array,
+                    content_starts: array, content_chars: array,
+                    tags: List[str], tag_offsets: array, tag_postings: array) -> "MeaningNgramIndex":
+        """由 export() 导出的数组重建索引（编译字库加载时使用）"""
+        index = cls.__new__(cls)
+        index._load(grams, gram_offsets, gram_postings, content_starts, content_chars,
+                    tags, tag_offsets, tag_postings)
+        return index
+
+    def _load(self, grams, gram_offsets, gram_postings, content_starts, content_chars,
+              tags, tag_offsets, tag_postings):
+        self._grams = {gram: i for i, gram in enumerate(grams)}
+        self._gram_offsets = gram_offsets
+        self._gram_postings = gram_postings
+        self._content_starts = content_starts
+        self._content_chars = content_chars
+        self._tags = {tag: i for i, tag in enumerate(tags)}
+        self._tag_offsets = tag_offsets
+        self._tag_postings = tag_postings
+
+    def export(self) -> Dict[str, Any]:
+        """导出为可写入编译字库的列表和数组"""
+        return {
+            "grams": list(self._grams),
+            "gram_offsets": self._gram_offsets,
+            "gram_postings": self._gram_postings,
+            "content_starts": self._content_starts,
+            "content_chars": self._content_chars,
+            "tags": list(self._tags),
+            "tag_offsets": self._tag_offsets,
+            "tag_postings": self._tag_postings
+        }
+
+    def __len__(self):
+        """索引的N-gram数"""
+        return len(self._grams)
+
+    def _occurrences(self, gram: str) -> array:
+        i = self._grams.get(gram)
+        if i is None:
+            return array('I')
+        return self._gram_postings[self._gram_offsets[i]:self._gram_offsets[i + 1]]
+
+    def _match_starts(self, keyword: str) -> array:
+        """关键词在全局文本轴上的所有起始位置（升序）"""
+        if len(keyword) == 1:
+            return self._occurrences(keyword)
+
+        postings = [self._occurrences(keyword[i:i + 2]) for i in range(len(keyword) - 1)]
+        if not all(postings):
+            return array('I')
+        if len(postings) == 1:
+            return postings[0]
+
+        # 以最短的倒排表为锚点，其余bigram须出现在相应的后续位置
+        anchor = min(range(len(postings)), key=lambda i: len(postings[i]))
+        others = [(i - anchor, set(posting)) for i, posting in enumerate(postings) if i != anchor]
+        starts = array('I')
+        for occurrence in postings[anchor]:
+            if all(occurrence + shift in occurrences for shift, occurrences in others):
+                starts.append(occurrence - anchor)
+        return starts
+
+    def search(self, keyword: str) -> List[Tuple[int, Optional[int]]]:
+        """
+        模糊匹配关键词
+
+        Returns:
+            [(字位置, 匹配位置)]，按字库顺序排列；匹配位置为关键词在该字第一条匹配含义中的
+            首次出现位置，按语义标签匹配时为None
+        """
+        if not keyword:
+            raise ValueError("关键词不能为空")
+
+        matches: Dict[int, Optional[int]] = {}
+        content_starts, content_chars = self._content_starts, self._content_chars
+        for start in self._match_starts(keyword):
+            # 同一字的含义文本连续排列，起始位置升序时第一次遇到的即为该字最靠前的匹配
+            content = bisect_right(content_starts, start) - 1
+            position = content_chars[content]
+            if position not in matches:
+                matches[position] = start - content_starts[content]
+
+        i = self._tags.get(keyword)
+        if i is not None:
+            for position in self._tag_postings[self._tag_offsets[i]:self._tag_offsets[i + 1]]:
+                if position not in matches:
+                    matches[position] = None
+
+        return sorted(matches.items())
@@ -0,0 +1,303 @@
+"""
+双字名候选网格评分
+候选字两两组合（第一个字 × 第二个字）视为 n×n 网格，由每个字的特征向量
+（康熙笔画、五行匹配加分、寓意加分、韵脚、常用度基础分）按广播一次算出整张网格的
+五格、三才、五行匹配、音韵、寓意、常用度基础分和加权总分，再用 argpartition 取出前k个
+（同一个字出现次数配额），不再生成全部排列、逐个名字构建评估结果
+
+各项与 NameGenerator 逐个名字评分时的基础分一致：
+    五格  _calculate_overall_score 中的 sancai_wuge['overall_evaluation']['score']
+    五行  _calculate_wuxing_match_score      三才  _calculate_sancai_score
+    音韵  _calculate_phonetic_score          寓意  _calculate_meaning_score
+    常用度  _calculate_popularity_score（两个字的平均；只比五格、三才时生僻字常排在前面）
+排名只使用基础分（逐个名字评估时再叠加随机调整），同分的名字按种子打乱顺序
+
+限时起名用 progressive_top_k：候选字按单字上界（pair_score_bounds）从高到低排序，先对前64个字
+（至少为配额下选出k个名字所需字数的2倍）建子网格取前k个，再按耗时估计剩余时间内能算完的最大子网格（够用时直接算整张网格）；子网格外的名字分数上界
+低于已选名字的最低分时结果与整张网格相同，提前结束；时间预算用完时返回当前子网格的结果
+
+numpy 为可选依赖：未安装时 NUMPY_AVAILABLE 为 False，调用方继续生成排列逐个评估
+"""
+
+import time
+from typing import Hashable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+try:
+    from .diversity_selector import select_diverse
+    from .sancai_wuge import LUCK_SCORES, MATHEMATICS_LUCK, SANCAI_TABLE
+except ImportError:
+    from diversity_selector import select_diverse
+    from sancai_wuge import LUCK_SCORES, MATHEMATICS_LUCK, SANCAI_TABLE
+
+# 基础分加权：五格、五行匹配、三才、音韵、寓意、常用度（与 _calculate_overall_score 一致）
+SCORE_WEIGHTS = (0.25, 0.25, 0.15, 0.1, 0.1, 0.15)
+
+# 单字常用度（字库 popularity）的基础分；没有该属性的字按 medium 计。
+# 偏好独特稀少的字（popularity=low、rarity 为 uncommon/rare 等）时用 RARE_POPULARITY_SCORES：生僻字加分，常用字不减分
+POPULARITY_SCORES = {'high': 100, 'medium': 70, 'low': 40}
+RARE_POPULARITY_SCORES = {'high': 70, 'medium': 85, 'low': 100}
+DEFAULT_POPULARITY = 'medium'
+
+# 数的五行按尾数（WUXING_ORDER 下标：木火土金水），与 sancai_wuge 一致
+_TAIL_WUXING_INDEX = (4, 0, 0, 1, 1, 2, 2, 3, 3, 4)
+
+# 音韵基础分的最大值（两个字韵脚不同）
+_MAX_PHONETIC = 75 + 3
+
+# progressive_top_k 第一个子网格的候选字数
+PROGRESSIVE_START = 64
+
+
+def popularity_score(level: Optional[str], prefer_rare: bool = False) -> int:
+    """单字常用度的基础分（prefer_rare 为偏好独特稀少的字）"""
+    scores = RARE_POPULARITY_SCORES if prefer_rare else POPULARITY_SCORES
+    return scores.get(level, scores[DEFAULT_POPULARITY])
+
+
+class NameGridScorer:
+    """一个姓氏、一组候选字的双字名基础分网格（只读）"""
+
+    def __init__(self, surname_strokes: Sequence[int], chars: Sequence[str], strokes: Sequence[int],
+                 wuxing_bonus: Sequence[int], meaning_bonus: Sequence[int],
+                 rhyme_keys: Sequence[Optional[Hashable]], popularity: Sequence[float]):
+        """
+        Args:
+            surname_strokes: 姓各字的康熙笔画
+            chars: 候选字（网格的行、列按此顺序）
+            strokes: 各字的康熙笔画
+            wuxing_bonus: 各字的五行匹配加分（喜用神+15、忌神-10）
+            meaning_bonus: 各字的寓意加分（积极寓意、中性寓意、文化内涵）
+            rhyme_keys: 各字的韵脚，两个字韵脚相同（非None）时音韵减分
+            popularity: 各字的常用度基础分（popularity_score）
+        """
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("numpy 未安装，无法构建候选网格")
+
+        self.chars = list(chars)
+        size = len(self.chars)
+        strokes = np.asarray(strokes, dtype=np.int64)
+        surname_total = int(sum(surname_strokes))
+
+        luck_scores = np.array([LUCK_SCORES.get(luck['luck'], 60) for luck in MATHEMATICS_LUCK], dtype=np.float64)
+        tail_wuxing = np.array(_TAIL_WUXING_INDEX, dtype=np.intp)
+        sancai_scores = np.array([LUCK_SCORES.get(evaluation['luck'], 60) for _, evaluation in SANCAI_TABLE],
+                                 dtype=np.float64)
+
+        def luck(number):
+            return luck_scores[(number - 1) % 81]
+
+        # 五格：行为名第一个字，列为第二个字
+        first = strokes[:, None]
+        second = strokes[None, :]
+        tiange = surname_total + 1 if len(surname_strokes) == 1 else surname_total
+        renge = surname_total + first
+        dige = first + second
+        waige = tiange + dige - renge
+        zongge = surname_total + first + second
+        # 各格得分均为5的倍数，平均值无需再取一位小数
+        wuge = (luck(tiange) + np.broadcast_to(luck(renge), (size, size)) + luck(dige)
+                + np.broadcast_to(luck(waige), (size, size)) + luck(zongge)) / 5
+
+        renge_wuxing = np.broadcast_to(tail_wuxing[renge % 10], (size, size))
+        sancai = sancai_scores[tail_wuxing[tiange % 10] * 25 + renge_wuxing * 5 + tail_wuxing[dige % 10]]
+
+        wuxing_bonus = np.asarray(wuxing_bonus, dtype=np.float64)
+        wuxing_match = np.clip(60 + wuxing_bonus[:, None] + wuxing_bonus[None, :], 0, 100)
+
+        rhyme_codes = {}
+        rhyme = np.array([rhyme_codes.setdefault(key, len(rhyme_codes) + 1) if key is not None else 0
+                          for key in rhyme_keys], dtype=np.intp)
+        same_rhyme = (rhyme[:, None] == rhyme[None, :]) & (rhyme[:, None] > 0)
+        phonetic = np.where(same_rhyme, 75 - 5, 75 + 3).astype(np.float64)
+
+        meaning_bonus = np.asarray(meaning_bonus, dtype=np.float64)
+        meaning = np.clip(70 + meaning_bonus[:, None] + meaning_bonus[None, :], 50, 100)
+
+        popularity = np.asarray(popularity, dtype=np.float64)
+        common = (popularity[:, None] + popularity[None, :]) / 2
+
+        self.components = {
+            'base_wuge': wuge,
+            'base_wuxing': wuxing_match,
+            'base_sancai': sancai,
+            'base_phonetic': phonetic,
+            'base_meaning': meaning,
+            'base_popularity': common
+        }
+        total = sum(weight * component for weight, component in zip(SCORE_WEIGHTS, self.components.values()))
+        # 同一个字不组成名字
+        np.fill_diagonal(total, -np.inf)
+        self.scores = total
+
+    def __len__(self):
+        size = len(self.chars)
+        return size * (size - 1)
+
+    def name(self, flat_index: int) -> str:
+        first, second = divmod(int(flat_index), len(self.chars))
+        return self.chars[first] + self.chars[second]
+
+    def score(self, name: str) -> float:
+        """名字的加权基础分（两个字都须在候选字中）"""
+        return float(self.scores[self.chars.index(name[0]), self.chars.index(name[1])])
+
+    def _ranked(self, pool: int, seed: Optional[int]) -> "np.ndarray":
+        """分数最高的 pool 个格子（按分数降序，同分按种子打乱）"""
+        flat = self.scores.ravel()
+        pool = min(pool, len(self))
+        top = np.argpartition(-flat, pool - 1)[:pool] if pool < flat.size else np.arange(flat.size)
+        top = top[np.isfinite(flat[top])]
+        tie_break = np.random.default_rng(seed).random(len(top))
+        return top[np.lexsort((tie_break, -flat[top]))]
+
+    def ranking(self, n: int) -> List[Tuple[int, int, Tuple[float, ...]]]:
+        """
+        加权基础分最高的n个名字（离线预计算排名用，同分按格子顺序，不打乱）
+
+        Returns:
+            [(第一个字下标, 第二个字下标, (五格, 五行匹配, 三才, 音韵, 寓意, 常用度基础分))]，按分数降序
+        """
+        flat = self.scores.ravel()
+        order = np.argsort(-flat, kind='stable')[:min(n, len(self))]
+        components = [component.ravel() for component in self.components.values()]
+        size = len(self.chars)
+        return [(int(index) // size, int(index) % size, tuple(float(component[index]) for component in components))
+                for index in order]
+
+    def top_k(self, k: int, char_quota: int = None, seed: Optional[int] = None,
+              exclude: Sequence[str] = ()) -> List[Tuple[str, float]]:
+        """
+        按加权基础分取前k个名字
+
+        Args:
+            k: 名字个数
+            char_quota: 同一个字最多出现在几个名字中（默认约为k的1/3，至少2个）
+            seed: 同分名字的打乱种子（None时每次不同）
+            exclude: 不选的名字
+
+        Returns:
+            [(名字, 加权基础分)]，按分数降序；候选不足时少于k个
+        """
+        if k <= 0 or len(self) == 0:
+            return []
+        char_quota = char_quota or max(2, k // 3)
+        exclude = set(exclude)
+        pool = k * 4
+        while True:
+            ranked = self._ranked(pool, seed)
+            names = [self.name(index) for index in ranked]
+            selected = select_diverse(
+                (position for position, name in enumerate(names) if name not in exclude),
+                {'chars': lambda position: tuple(names[position])},
+                quotas={'chars': char_quota},
+                limit=k
+            )
+            # 配额下候选不足时扩大候选池（最多到整张网格）
+            if len(selected) >= k or pool >= len(self):
+                break
+            pool *= 4
+        return [(names[position], float(self.scores.flat[ranked[position]])) for position in selected]
+
+
+
+def char_bonus_bounds(wuxing_bonus: Sequence[int], meaning_bonus: Sequence[int]) -> List[float]:
+    """各字五行匹配加分、寓意加分在加权基础分中的贡献（五行匹配、寓意分被截断到上限时只会更低）"""
+    wuxing_weight, meaning_weight = SCORE_WEIGHTS[1], SCORE_WEIGHTS[4]
+    return [wuxing_weight * wuxing + meaning_weight * meaning for wuxing, meaning in zip(wuxing_bonus, meaning_bonus)]
+
+
+def pair_score_bounds(surname_strokes: Sequence[int], strokes: Sequence[int], wuxing_bonus: Sequence[int],
+                      meaning_bonus: Sequence[int], popularity: Sequence[float]
+                      ) -> Tuple[float, List[float], List[float]]:
+    """
+    名字加权基础分的上界：常数 + 第一个字的上界 + 第二个字的上界
+
+    人格只由第一个字、外格只由第二个字决定，三才取第一个字确定天格、人格后地格任意时的最高分，
+    地格、总格取最高的吉凶分，音韵取不同韵脚的分数；常用度两个字各占一半
+
+    Returns:
+        (常数部分, 各字作第一个字的上界, 各字作第二个字的上界)
+    """
+    wuge_weight, wuxing_weight, sancai_weight, phonetic_weight, meaning_weight, popularity_weight = SCORE_WEIGHTS
+    luck_scores = [LUCK_SCORES.get(luck['luck'], 60) for luck in MATHEMATICS_LUCK]
+    sancai_scores = [LUCK_SCORES.get(evaluation['luck'], 60) for _, evaluation in SANCAI_TABLE]
+
+    def luck(number):
+        return luck_scores[(number - 1) % 81]
+
+    surname_total = int(sum(surname_strokes))
+    tiange = surname_total + 1 if len(surname_strokes) == 1 else surname_total
+    tiange_offset = _TAIL_WUXING_INDEX[tiange % 10] * 25
+    best_sancai = [max(sancai_scores[tiange_offset + renge * 5:tiange_offset + renge * 5 + 5]) for renge in range(5)]
+
+    constant = (wuge_weight * (luck(tiange) + 2 * max(luck_scores)) / 5 + wuxing_weight * 60
+                + phonetic_weight * _MAX_PHONETIC + meaning_weight * 70)
+    bonus = [char_bonus + popularity_weight * score / 2
+             for char_bonus, score in zip(char_bonus_bounds(wuxing_bonus, meaning_bonus), popularity)]
+    first = [wuge_weight * luck(surname_total + stroke) / 5
+             + sancai_weight * best_sancai[_TAIL_WUXING_INDEX[(surname_total + stroke) % 10]] + char_bonus
+             for stroke, char_bonus in zip(strokes, bonus)]
+    second = [wuge_weight * luck(tiange - surname_total + stroke) / 5 + char_bonus
+              for stroke, char_bonus in zip(strokes, bonus)]
+    return constant, first, second
+
+
+def progressive_top_k(surname_strokes: Sequence[int], chars: Sequence[str], strokes: Sequence[int],
+                      wuxing_bonus: Sequence[int], meaning_bonus: Sequence[int],
+                      rhyme_keys: Sequence[Optional[Hashable]], popularity: Sequence[float],
+                      k: int, deadline: float,
+                      seed: Optional[int] = None, exclude: Sequence[str] = (), char_quota: int = None,
+                      start: int = PROGRESSIVE_START) -> Tuple[List[Tuple[str, float]], bool]:
+    """
+    限时的 NameGridScorer.top_k：按单字上界从高到低逐步扩大子网格（其余参数同 NameGridScorer）
+
+    每个子网格算完后按其耗时估计剩余时间内能算完的最大子网格（够用时直接算整张网格）；
+    算不了更大的子网格时返回当前子网格的结果（至少算完第一个子网格）
+
+    Args:
+        deadline: 截止时间（time.perf_counter() 的值）
+        char_quota: 同一个字最多出现在几个名字中（同 NameGridScorer.top_k）
+        start: 第一个子网格的候选字数（不少于配额下选出k个名字所需字数的2倍）
+
+    Returns:
+        ([(名字, 加权基础分)], 是否与整张网格的结果相同)；同分的名字与整张网格的打乱顺序可能不同
+    """
+    constant, first_bounds, second_bounds = pair_score_bounds(
+        surname_strokes, strokes, wuxing_bonus, meaning_bonus, popularity
+    )
+    order = sorted(range(len(chars)), key=lambda index: -max(first_bounds[index], second_bounds[index]))
+    max_first, max_second = max(first_bounds, default=0.0), max(second_bounds, default=0.0)
+    # 每个名字用两个字、每个字最多用 char_quota 次：第一个子网格至少要有 2k/char_quota 个字，
+    # 再留一倍余量，否则时间用完时结果集中在上界最高的几个字上
+    char_quota = char_quota or max(2, k // 3)
+    size = min(max(start, 4 * k // char_quota), len(order))
+    while True:
+        started = time.perf_counter()
+        subset = order[:size]
+        scorer = NameGridScorer(
+            surname_strokes, [chars[i] for i in subset], [strokes[i] for i in subset],
+            [wuxing_bonus[i] for i in subset], [meaning_bonus[i] for i in subset], [rhyme_keys[i] for i in subset],
+            [popularity[i] for i in subset]
+        )
+        ranked = scorer.top_k(k, char_quota, seed=seed, exclude=exclude)
+        now = time.perf_counter()
+        if size >= len(order):
+            return ranked, True
+        # 子网格外的名字至少有一个字不在子网格中
+        outside = order[size:]
+        outside_bound = constant + max(max(first_bounds[i] for i in outside) + max_second,
+                                       max_first + max(second_bounds[i] for i in outside))
+        if len(ranked) >= k and outside_bound + 1e-9 < ranked[-1][1]:
+            return ranked, True
+        # 耗时约与格子数成正比：下一个子网格取剩余时间内能算完的最大字数
+        affordable = int(size * ((deadline - now) / max(now - started, 1e-6)) ** 0.5) if now < deadline else 0
+        if affordable <= size:
+            return ranked, False
+        size = min(affordable, len(order))
@@ -0,0 +1,329 @@
+"""
+双字名预计算排名 - 常见姓氏 × 喜用神/忌神组合 × 性别的候选名字排名，mmap加载
+
+双字名的网格评分（name_grid_scorer）只取决于：姓的康熙笔画（字数和笔画总数）、
+喜用神和忌神、性别（决定候选字）以及字库数据。八字五行只有几十种喜用神/忌神组合，
+起名请求又集中在常见姓氏上，离线按这些组合算好每张网格分数最高的前 top_n 个名字
+（含各项基础分），在线起名只需查表、按偏好字集合筛选、按种子打乱同分名字并按单字配额选取。
+
+文件结构（小端序）:
+    文件头      MAGIC(8) 版本(u16) 保留(u16) 元数据长度(u32)
+    元数据      JSON：源文件指纹、评分版本、top_n、候选字列表、排名目录 {排名键: [偏移, 条数, 候选字列表下标, 网格名字数]}
+    排名        每条记录：第一个字(u16) 第二个字(u16)（候选字列表下标）
+                五格、五行匹配、三才、音韵、寓意、常用度基础分(各u8)，按加权分降序
+
+笔画总数相同的姓（单姓、复姓分开）共用一份排名。源文件（字库JSON、全字符库）与文件中的指纹不一致，
+或 SCORING_VERSION 不一致时视为过期，不使用预计算排名（回退到在线网格评分）。
+由 scripts/precompute_name_rankings.py 生成；数据文件不提交到仓库，部署脚本在启动服务前执行。
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import random
+import struct
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    from .cjk_char_store import DEFAULT_STORE_PATH as CJK_STORE_PATH
+    from .diversity_selector import select_diverse
+    from .name_grid_scorer import SCORE_WEIGHTS
+except ImportError:
+    from cjk_char_store import DEFAULT_STORE_PATH as CJK_STORE_PATH
+    from diversity_selector import select_diverse
+    from name_grid_scorer import SCORE_WEIGHTS
+
+MAGIC = b"BZNMRANK"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<8sHHI")
+RECORD = struct.Struct("<HH6B")
+
+# 评分规则、候选字筛选或康熙笔画表修改后加1，使已生成的排名过期
+SCORING_VERSION = 3
+
+WUXING_ORDER = ('金', '木', '水', '火', '土')
+
+DEFAULT_TOP_N = 2000
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+DEFAULT_RANKINGS_PATH = os.path.join(DATA_DIR, 'rankings', 'name_rankings.bin')
+
+
+def ranking_key(surname_strokes: Sequence[int], xiyongshen: Iterable[str], jishen: Iterable[str],
+                gender: str) -> str:
+    """排名键：姓的字数和笔画总数、喜用神、忌神（按金木水火土排列）、性别"""
+    def elements(values):
+        return ''.join(element for element in WUXING_ORDER if element in set(values))
+    return f"{len(surname_strokes)}:{sum(surname_strokes)}|{elements(xiyongshen)}|{elements(jishen)}|{gender}"
+
+
+def ranking_sources() -> List[str]:
+    """排名依赖的源文件：字库JSON、字义标签、全字符库（康熙笔画、库外字属性）"""
+    chars_dir = os.path.join(DATA_DIR, 'chars')
+    sources = [os.path.join(chars_dir, name)
+               for name in ('expanded_chars_database.json', 'chars_main.json', 'chars_meaning_tags.json')]
+    sources.append(os.getenv("BAZI_CJK_CHAR_STORE", CJK_STORE_PATH))
+    return sources
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def sources_fingerprint(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    """源文件指纹（文件不存在时大小为None）"""
+    fingerprint = []
+    for path in paths:
+        entry = {"name": os.path.basename(path), "size": None, "mtime_ns": None, "sha256": None}
+        if os.path.exists(path):
+            stat = os.stat(path)
+            entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns, sha256=_file_sha256(path))
+        fingerprint.append(entry)
+    return fingerprint
+
+
+def stale_sources(recorded: List[Dict[str, Any]], paths: Iterable[str]) -> List[str]:
+    """与记录的指纹不一致的源文件名（大小和修改时间一致即视为未修改，修改时间变化时再比对sha256）"""
+    recorded = {entry["name"]: entry for entry in recorded}
+    stale = []
+    for path in paths:
+        name = os.path.basename(path)
+        entry = recorded.get(name)
+        exists = os.path.exists(path)
+        if entry is None or exists != (entry["size"] is not None):
+            stale.append(name)
+            continue
+        if not exists:
+            continue
+        stat = os.stat(path)
+        if stat.st_size != entry["size"]:
+            stale.append(name)
+        elif stat.st_mtime_ns != entry["mtime_ns"] and _file_sha256(path) != entry["sha256"]:
+            stale.append(name)
+    return stale
+
+
+def build_name_rankings(rankings: Iterable[Tuple[str, Sequence[str], int, Sequence[Tuple]]], output_path: str,
+                        sources: List[str] = None, top_n: int = DEFAULT_TOP_N) -> Dict[str, Any]:
+    """
+    写排名文件（先写临时文件再原子替换）
+
+    Args:
+        rankings: (排名键, 候选字列表, 网格名字数, [(第一个字下标, 第二个字下标, (六项基础分))...按加权分降序])
+        sources: 源文件（记录指纹用，默认为 ranking_sources()）
+        top_n: 每个排名保留的名字数（记录在元数据中）
+
+    Returns:
+        构建摘要：排名数、名字数、文件大小、输出路径
+    """
+    char_lists: Dict[str, int] = {}
+    directory = {}
+    records = bytearray()
+    names = 0
+    for key, chars, grid_size, ranked in rankings:
+        chars = ''.join(chars)
+        if len(chars) > 0xFFFF:
+            raise ValueError(f"候选字过多: {len(chars)}")
+        list_index = char_lists.setdefault(chars, len(char_lists))
+        offset = len(records)
+        for first, second, components in ranked[:top_n]:
+            if any(value != int(value) or not 0 <= value <= 255 for value in components):
+                raise ValueError(f"基础分无法按u8存储: {components}")
+            records += RECORD.pack(first, second, *(int(value) for value in components))
+        count = min(len(ranked), top_n)
+        directory[key] = [offset, count, list_index, grid_size]
+        names += count
+
+    meta = {
+        "source": sources_fingerprint(sources if sources is not None else ranking_sources()),
+        "scoring_version": SCORING_VERSION,
+        "top_n": top_n,
+        "char_lists": list(char_lists),
+        "rankings": directory
+    }
+    meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    temp_path = f"{output_path}.tmp{os.getpid()}"
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(meta_bytes)))
+        f.write(meta_bytes)
+        f.write(records)
+    os.replace(temp_path, output_path)
+
+    return {
+        "rankings": len(directory),
+        "names": names,
+        "size": os.path.getsize(output_path),
+        "output": output_path
+    }
+
+
+class NameRanking:
+    """一个排名键的预计算排名（按加权基础分降序）"""
+
+    def __init__(self, chars: str, data: memoryview, grid_size: int):
+        self.chars = chars
+        self._data = data
+        # 网格中的名字多于保存的条数时，筛选后的候选可能不足，需要回退到网格评分
+        self.truncated = grid_size > len(data) // RECORD.size
+
+    def __len__(self):
+        return len(self._data) // RECORD.size
+
+    def entries(self) -> Iterable[Tuple[str, Tuple[int, ...]]]:
+        """按排名顺序的 (名字, (五格, 五行匹配, 三才, 音韵, 寓意, 常用度基础分))"""
+        chars = self.chars
+        for first, second, *components in RECORD.iter_unpack(self._data):
+            yield chars[first] + chars[second], tuple(components)
+
+    def top_k(self, k: int, char_quota: int = None, seed: Optional[int] = None,
+              exclude: Sequence[str] = (), chars: Sequence[str] = None) -> Optional[List[Tuple[str, float]]]:
+        """
+        按加权基础分取前k个名字（与 NameGridScorer.top_k 相同的配额和同分打乱）
+
+        Args:
+            chars: 只用这些字组成名字（偏好筛选后的候选字，须都在排名的候选字中）
+
+        Returns:
+            [(名字, 加权基础分)]；候选字不在排名中，或保存的条数不足以选出k个时返回None
+        """
+        if k <= 0:
+            return []
+        allowed = set(chars) if chars is not None else None
+        if allowed is not None and not allowed <= set(self.chars):
+            return None
+        char_quota = char_quota or max(2, k // 3)
+        exclude = set(exclude)
+        pool = k * 4
+        while True:
+            candidates = self._candidates(pool, allowed, exclude)
+            rng = random.Random(seed)
+            tie_break = [rng.random() for _ in candidates]
+            order = sorted(range(len(candidates)), key=lambda i: (-candidates[i][1], tie_break[i]))
+            candidates = [candidates[i] for i in order]
+            selected = select_diverse(
+                range(len(candidates)),
+                {'chars': lambda position: tuple(candidates[position][0])},
+                quotas={'chars': char_quota},
+                limit=k
+            )
+            # 配额、筛选后候选不足时扩大候选池（最多到保存的全部名字）
+            if len(selected) >= k or pool >= len(self):
+                break
+            pool *= 4
+        if len(selected) < k and self.truncated:
+            return None
+        return [candidates[position] for position in selected]
+
+    def _candidates(self, pool: int, allowed: Optional[set], exclude: set) -> List[Tuple[str, float]]:
+        """排名前 pool 个（延伸到与第 pool 个同分的名字为止）中可用的 (名字, 加权基础分)"""
+        candidates = []
+        last_score = None
+        for position, (name, components) in enumerate(self.entries()):
+            score = sum(weight * value for weight, value in zip(SCORE_WEIGHTS, components))
+            if position >= pool and score != last_score:
+                break
+            last_score = score
+            if name in exclude or (allowed is not None and not (name[0] in allowed and name[1] in allowed)):
+                continue
+            candidates.append((name, score))
+        return candidates
+
+
+class NameRankingStore:
+    """mmap映射的预计算排名文件（只读，可在线程间共享）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, meta_length = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mmap.close()
+            raise ValueError(f"不是可识别的预计算排名文件: {path}")
+        self.meta = json.loads(self._mmap[HEADER.size:HEADER.size + meta_length].decode('utf-8'))
+        self._records = memoryview(self._mmap)[HEADER.size + meta_length:]
+        self._rankings = self.meta["rankings"]
+        self._char_lists = self.meta["char_lists"]
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._rankings)
+
+    def stale_reason(self, sources: List[str] = None) -> Optional[str]:
+        """过期原因（评分版本或源文件变化），未过期时为None"""
+        if self.meta["scoring_version"] != SCORING_VERSION:
+            return f"评分版本 {self.meta['scoring_version']} ≠ {SCORING_VERSION}"
+        stale = stale_sources(self.meta["source"], sources if sources is not None else ranking_sources())
+        if stale:
+            return f"{', '.join(stale)} 已修改"
+        return None
+
+    def lookup(self, key: str) -> Optional[NameRanking]:
+        entry = self._rankings.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        offset, count, list_index, grid_size = entry
+        return NameRanking(self._char_lists[list_index],
+                           self._records[offset:offset + count * RECORD.size], grid_size)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rankings": len(self),
+            "top_n": self.meta["top_n"],
+            "size": len(self._mmap),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    def close(self):
+        self._records.release()
+        self._mmap.close()
+
+
+# 进程内共享的预计算排名：首次查询时打开并检查是否过期，文件不存在或已过期时为None（调用方使用网格评分）
+_store = None
+_store_loaded = False
+_store_lock = threading.Lock()
+
+
+def get_name_ranking_store() -> Optional[NameRankingStore]:
+    """获取共享的预计算排名，未生成或已过期时返回None"""
+    global _store, _store_loaded
+    if not _store_loaded:
+        with _store_lock:
+            if not _store_loaded:
+                path = os.getenv("BAZI_NAME_RANKINGS", DEFAULT_RANKINGS_PATH)
+                if os.path.exists(path):
+                    try:
+                        store = NameRankingStore(path)
+                        reason = store.stale_reason()
+                        if reason:
+                            store.close()
+                            print(f"⚠️  预计算排名已过期（{reason}），使用网格评分，"
+                                  f"请运行 python scripts/precompute_name_rankings.py")
+                        else:
+                            _store = store
+                            print(f"🏁 预计算排名: {len(store)} 个排名，每个前 {store.meta['top_n']} 个名字")
+                    except (OSError, ValueError, KeyError) as e:
+                        print(f"⚠️  预计算排名无法读取，使用网格评分: {e}")
+                _store_loaded = True
+    return _store
+
+
+def reset_name_ranking_store():
+    """下次查询时重新打开并检查是否过期（字库热更新后调用；旧映射由仍在使用的排名引用，不主动关闭）"""
+    global _store, _store_loaded
+    with _store_lock:
+        _store = None
+        _store_loaded = False
@@ -0,0 +1,168 @@
+"""
+个性化起名结果缓存
+
+确定性模式下名字只由 (姓, 性别, 五行数量, 名字长度, 偏好, 会话种子) 决定，
+同一用户反复打开起名页面时直接返回缓存结果：
+    - 缓存键中的八字只取五行数量向量（喜用神、忌神、候选字都只由它决定），不含出生时间
+    - 每个缓存项是一个候选名字流：第一批为首次生成时评估并排序的全部名字，
+      “换一批”（page=2、3…）从流中接着取，流中的名字用完时再生成下一批（不重复已有的名字）
+    - 缓存按LRU保留最多 max_entries 个键；字库热更新后清空
+    - 限时起名时间用完、第一批不完整的名字流不缓存（下次请求重新生成）
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+WUXING_ORDER = ('金', '木', '水', '火', '土')
+
+# 单个候选名字流最多保留的名字数（约为每页10个名字的20页）
+MAX_STREAM_NAMES = 200
+
+DEFAULT_CACHE_SIZE = int(os.getenv("BAZI_NAMING_CACHE_SIZE", "256"))
+
+
+def normalize_preferences(preferences: Optional[Dict[str, Any]]) -> str:
+    """偏好设置的规范形式（键排序；列表值去重排序；空值去掉），用于缓存键和种子"""
+    normalized = {}
+    for key, value in (preferences or {}).items():
+        if value in (None, '', [], {}):
+            continue
+        if isinstance(value, (list, tuple, set)):
+            value = sorted({str(item) for item in value})
+        normalized[key] = value
+    return json.dumps(normalized, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+
+
+def naming_cache_key(surname: str, gender: str, wuxing_counts: Dict[str, int], name_length: int,
+                     preferences: Optional[Dict[str, Any]], seed: Optional[str]) -> Tuple:
+    """缓存键：(姓, 性别, 五行数量向量, 名字长度, 规范化偏好, 会话种子)"""
+    return (
+        surname, gender,
+        tuple(wuxing_counts.get(element, 0) for element in WUXING_ORDER),
+        name_length, normalize_preferences(preferences), seed or ''
+    )
+
+
+class NamingStream:
+    """一个缓存键的候选名字流（按分数降序的批次依次拼接）"""
+
+    def __init__(self, first_batch: List[Any], refill: Callable[[int, int, Set[str]], List[Any]],
+                 name_of: Callable[[Any], str] = lambda rec: rec.given_name, complete: bool = True):
+        """
+        Args:
+            first_batch: 首次生成的名字（已排序）
+            refill: 生成下一批名字的函数 (批次序号, 数量, 已有的名字) → 排序后的名字
+            name_of: 取名字（去重用）
+            complete: 第一批是否完整生成（限时起名时间用完时为False，不缓存）
+        """
+        self.complete = complete
+        self.names: List[Any] = []
+        self._seen: Set[str] = set()
+        self._refill = refill
+        self._name_of = name_of
+        self._batches = 1
+        self.exhausted = False
+        self._lock = threading.Lock()
+        self._extend(first_batch)
+
+    def _extend(self, batch: List[Any]) -> int:
+        added = 0
+        for rec in batch:
+            name = self._name_of(rec)
+            if name in self._seen or len(self.names) >= MAX_STREAM_NAMES:
+                continue
+            self._seen.add(name)
+            self.names.append(rec)
+            added += 1
+        return added
+
+    def page(self, page: int, count: int) -> Tuple[List[Any], bool]:
+        """
+        第 page 页（从1开始）的 count 个名字
+
+        Returns:
+            (名字, 是否还有下一页)
+        """
+        start = (page - 1) * count
+        end = start + count
+        with self._lock:
+            while len(self.names) < end and not self.exhausted:
+                if len(self.names) >= MAX_STREAM_NAMES:
+                    self.exhausted = True
+                    break
+                batch = self._refill(self._batches, count, set(self._seen))
+                self._batches += 1
+                if self._extend(batch) == 0:
+                    self.exhausted = True
+            has_more = len(self.names) > end or not self.exhausted
+            return self.names[start:end], has_more
+
+
+class NamingResultCache:
+    """候选名字流的LRU缓存（线程安全）"""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, NamingStream]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], NamingStream]) -> Tuple[NamingStream, bool]:
+        """
+        取缓存的候选名字流，没有时调用 factory 生成（生成不持有锁；并发生成同一个键时保留先完成的；不完整的流不缓存）
+
+        Returns:
+            (候选名字流, 是否命中缓存)
+        """
+        stream = self.get(key)
+        if stream is not None:
+            return stream, True
+        return self.put(key, factory()), False
+
+    def get(self, key: Hashable) -> Optional[NamingStream]:
+        """取缓存的候选名字流（计入命中统计），没有时返回None"""
+        with self._lock:
+            stream = self._entries.get(key)
+            if stream is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return stream
+
+    def put(self, key: Hashable, stream: NamingStream) -> NamingStream:
+        """
+        缓存生成的候选名字流（不完整的流不缓存）
+
+        Returns:
+            缓存中的流：并发生成同一个键时为先完成的
+        """
+        if self.max_entries <= 0 or not stream.complete:
+            return stream
+        with self._lock:
+            stream = self._entries.setdefault(key, stream)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return stream
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+# 进程内共享的起名结果缓存
+naming_result_cache = NamingResultCache()
@@ -3,18 +3,44 @@
 基于传统五行理论和姓名学原理
 """
 import json
+import random
 import re
-from typing import List, Dict, Optional, Tuple
+import zlib
+from typing import Dict, Generator, Iterator, List, Optional, Tuple
 from dataclasses import dataclass
 try:
     # 尝试相对导入（当作为包的一部分导入时）
     from .bazi_calculator import BaziCalculator
-    from .enhanced_char_database import EnhancedCharDatabase
+    from .enhanced_char_database import EnhancedCharDatabase, character_database_snapshot, get_character_database
+    from .diversity_selector import select_diverse
+    from .cjk_char_store import lookup_cjk_char
+    from .name_grid_scorer import (
+        NUMPY_AVAILABLE as GRID_SCORING_AVAILABLE, SCORE_WEIGHTS, NameGridScorer, char_bonus_bounds,
+        popularity_score, progressive_top_k
+    )
+    from .name_rankings import get_name_ranking_store, ranking_key, reset_name_ranking_store
+    from .naming_cache import NamingStream, naming_cache_key, naming_result_cache, normalize_preferences
+    from .naming_context import NamingContext
+    from .sancai_wuge import (
+        MATHEMATICS_LUCK, evaluate_sancai, mathematics_luck, sancai_wuge_by_strokes, wuxing_by_number
+    )
 except ImportError:
     # 回退到直接导入（当直接运行或从同目录导入时）
     try:
         from bazi_calculator import BaziCalculator
-        from enhanced_char_database import EnhancedCharDatabase
+        from enhanced_char_database import EnhancedCharDatabase, character_database_snapshot, get_character_database
+        from diversity_selector import select_diverse
+        from cjk_char_store import lookup_cjk_char
+        from name_grid_scorer import (
+            NUMPY_AVAILABLE as GRID_SCORING_AVAILABLE, SCORE_WEIGHTS, NameGridScorer, char_bonus_bounds,
+            popularity_score, progressive_top_k
+        )
+        from name_rankings import get_name_ranking_store, ranking_key, reset_name_ranking_store
+        from naming_cache import NamingStream, naming_cache_key, naming_result_cache, normalize_preferences
+        from naming_context import NamingContext
+        from sancai_wuge import (
+            MATHEMATICS_LUCK, evaluate_sancai, mathematics_luck, sancai_wuge_by_strokes, wuxing_by_number
+        )
     except ImportError:
         # 最后尝试从当前目录的app子目录导入
         import sys
@@ -22,7 +48,35 @@ except ImportError:
         current_dir = os.path.dirname(os.path.abspath(__file__))
         sys.path.insert(0, current_dir)
         from bazi_calculator import BaziCalculator
-        from enhanced_char_database import EnhancedCharDatabase
+        from enhanced_char_database import EnhancedCharDatabase, character_database_snapshot, get_character_database
+        from diversity_selector import select_diverse
+        from cjk_char_store import lookup_cjk_char
+        from name_grid_scorer import (
+            NUMPY_AVAILABLE as GRID_SCORING_AVAILABLE, SCORE_WEIGHTS, NameGridScorer, char_bonus_bounds,
+            popularity_score, progressive_top_k
+        )
+        from name_rankings import get_name_ranking_store, ranking_key, reset_name_ranking_store
+        from naming_cache import NamingStream, naming_cache_key, naming_result_cache, normalize_preferences
+        from naming_context import NamingContext
+        from sancai_wuge import (
+            MATHEMATICS_LUCK, evaluate_sancai, mathematics_luck, sancai_wuge_by_strokes, wuxing_by_number
+        )
+
+# 字库热更新后缓存的起名结果作废，预计算排名重新检查是否过期
+character_database_snapshot.add_listener(lambda _db: naming_result_cache.clear())
+character_database_snapshot.add_listener(lambda _db: reset_name_ranking_store())
+
+# 用户给出的名字：1~3个汉字（基本区、扩展A~G区、兼容区）
+GIVEN_NAME_PATTERN = re.compile('[\u3400-\u9fff\uf900-\ufaff\U00020000-\U0003134f]{1,3}')
+
+def seeded_random(seed: Optional[str], scope: str = '') -> random.Random:
+    """
+    由请求种子派生的随机数生成器（各阶段各自一个实例，不修改全局 random 的状态，可在线程间并发使用）
+    同一种子、同一阶段的随机序列相同（字符串种子经SHA-512转换，不受进程哈希随机化影响）；种子为None时使用系统熵
+    """
+    if seed is None:
+        return random.Random()
+    return random.Random(f"{seed}_{scope}" if scope else seed)
 
 @dataclass
 class NameRecommendation:
@@ -187,246 +241,46 @@ class NameologyCalculator:
         self.load_mathematics_data()
     
     def load_mathematics_data(self):
-        """加载81数理数据"""
-        # 81数理吉凶数据（简化版）
-        self.mathematics_luck = {
-            1: {'luck': '大吉', 'desc': '太极之数，万物开泰'},
-            2: {'luck': '凶', 'desc': '两仪之数，混沌未开'},
-            3: {'luck': '大吉', 'desc': '三才之数，天地人和'},
-            4: {'luck': '凶', 'desc': '四象之数，待于生发'},
-            5: {'luck': '大吉', 'desc': '五行之数，循环相生'},
-            6: {'luck': '大吉', 'desc': '六爻之数，发展变化'},
-            7: {'luck': '吉', 'desc': '七政之数，精悍严谨'},
-            8: {'luck': '吉', 'desc': '八卦之数，乾坤震巽'},
-            9: {'luck': '凶', 'desc': '大成之数，蕴涵凶险'},
-            10: {'luck': '凶', 'desc': '终数之数，雪暗飘零'},
-            11: {'luck': '大吉', 'desc': '旱苗逢雨，万物更新'},
-            12: {'luck': '凶', 'desc': '无理之数，发展薄弱'},
-            13: {'luck': '大吉', 'desc': '天才，多才多艺'},
-            14: {'luck': '凶', 'desc': '破兆，家庭缘薄'},
-            15: {'luck': '大吉', 'desc': '福寿，完成学识'},
-            16: {'luck': '大吉', 'desc': '厚重，载德载物'},
-            17: {'luck': '半吉', 'desc': '刚强，突破万难'},
-            18: {'luck': '大吉', 'desc': '有志，有目的志'},
-            19: {'luck': '凶', 'desc': '多难，风云蔽日'},
-            20: {'luck': '凶', 'desc': '非业，非运之空'},
-            21: {'luck': '大吉', 'desc': '明月中天，独立权威'},
-            23: {'luck': '大吉', 'desc': '壮丽，旭日东升'},
-            24: {'luck': '大吉', 'desc': '掘藏得金，家门余庆'},
-            25: {'luck': '半吉', 'desc': '荣俊，资性英敏'},
-            29: {'luck': '半吉', 'desc': '智谋，智谋优秀'},
-            31: {'luck': '大吉', 'desc': '春日花开，智勇得志'},
-            32: {'luck': '大吉', 'desc': '侥幸，龙池跃龙'},
-            33: {'luck': '大吉', 'desc': '升天，家门昌隆'},
-            35: {'luck': '大吉', 'desc': '高楼望月，温和平静'},
-            37: {'luck': '大吉', 'desc': '猛虎出林，权威显达'},
-            39: {'luck': '半吉', 'desc': '富贵，财源进宝'},
-            41: {'luck': '大吉', 'desc': '有德，纯阳独秀'},
-            45: {'luck': '大吉', 'desc': '顺风，新生泰和'},
-            47: {'luck': '大吉', 'desc': '点石成金，花开之象'},
-            48: {'luck': '大吉', 'desc': '古松立鹤，德智兼备'},
-            52: {'luck': '半吉', 'desc': '达眼，卓识达眼'},
-            57: {'luck': '半吉', 'desc': '日照春松，寒雪青松'},
-            63: {'luck': '大吉', 'desc': '舟归平海，富贵繁荣'},
-            65: {'luck': '大吉', 'desc': '巨流归海，富贵长寿'},
-            67: {'luck': '大吉', 'desc': '通达，天赋幸运'},
-            68: {'luck': '大吉', 'desc': '顺风，思虑周密'},
-            81: {'luck': '大吉', 'desc': '万物回春，恒久富贵'}
-        }
-        
-        # 为未定义的数字设置默认值
-        for i in range(1, 82):
-            if i not in self.mathematics_luck:
-                if i % 2 == 1 and i < 40:
-                    self.mathematics_luck[i] = {'luck': '吉', 'desc': '运势平稳，有所发展'}
-                else:
-                    self.mathematics_luck[i] = {'luck': '平', 'desc': '运势一般，平稳发展'}
+        """加载81数理数据（模块 sancai_wuge 中的81项查表数组，进程内共享）"""
+        self.mathematics_luck = MATHEMATICS_LUCK
     
     def calculate_stroke_count(self, char: str) -> int:
-        """计算汉字笔画数（简化实现）"""
-        # 这里应该连接真实的汉字笔画数据库
-        # 目前使用简化的笔画估算
-        stroke_map = {
-            # 常见字的笔画数
-            '一': 1, '二': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9, '十': 2,
-            '子': 3, '丑': 4, '寅': 11, '卯': 5, '辰': 7, '巳': 3, '午': 4, '未': 5, '申': 5, '酉': 7, '戌': 6, '亥': 6,
-            '甲': 5, '乙': 1, '丙': 5, '丁': 2, '戊': 5, '己': 3, '庚': 8, '辛': 7, '壬': 4, '癸': 9,
-            '王': 4, '李': 7, '张': 7, '刘': 6, '陈': 7, '杨': 7, '赵': 9, '黄': 11, '周': 8, '吴': 7,
-            '文': 4, '武': 8, '明': 8, '华': 6, '强': 12, '军': 6, '伟': 6, '国': 8, '建': 8, '民': 5,
-            '安': 6, '康': 11, '福': 13, '贵': 9, '富': 12, '吉': 6, '祥': 10, '瑞': 13, '慧': 15, '智': 12,
-            '美': 9, '丽': 7, '花': 7, '月': 4, '星': 9, '雨': 8, '雪': 11, '云': 4, '山': 3, '水': 4,
-            '春': 9, '夏': 10, '秋': 9, '冬': 5, '东': 5, '西': 6, '南': 9, '北': 5, '中': 4, '天': 4,
-            '地': 6,
-            '人': 2, '大': 3, '小': 3, '日': 4, '月': 4, '年': 6, '时': 7, '分': 4, '秒': 9,
-            '好': 6, '坏': 7, '新': 13, '旧': 5, '长': 4, '短': 4, '高': 10, '低': 7, '快': 7, '慢': 14,
-            '红': 9, '绿': 11, '蓝': 13, '黄': 11, '白': 5, '黑': 12, '灰': 6, '紫': 11, '粉': 10, '棕': 12
-        }
-        
-        if char in stroke_map:
-            return stroke_map[char]
-        else:
-            # 简单估算：根据字符的复杂度估算笔画数
-            return min(len(char.encode('utf-8')) * 3, 20)
+        """计算汉字的康熙笔画数（姓名学五格按康熙笔画计算）"""
+        # 康熙笔画表（按码位索引，进程内只构建一次）为准，表中没有的字使用字库笔画
+        stroke = get_character_database().get_kangxi_stroke(char)
+        if stroke:
+            return stroke
+        # 仍没有数据时按字符的复杂度估算
+        return min(len(char.encode('utf-8')) * 3, 20)
     
-    def calculate_sancai_wuge(self, surname: str, given_name: str) -> Dict:
-        """计算三才五格"""
+    def calculate_sancai_wuge(self, surname: str, given_name: str, stroke_count=None) -> Dict:
+        """
+        计算三才五格
+        
+        结果只取决于姓、名各字的笔画：同一组笔画的结果只计算一次，返回共享的只读字典
+        stroke_count 为取笔画的函数（请求上下文按字缓存的笔画），默认为 calculate_stroke_count
+        """
+        stroke_count = stroke_count or self.calculate_stroke_count
         try:
-            # 计算笔画数
-            surname_strokes = sum(self.calculate_stroke_count(char) for char in surname)
-            given_strokes = [self.calculate_stroke_count(char) for char in given_name]
-            
-            # 计算五格
-            tiange = surname_strokes + 1 if len(surname) == 1 else sum(self.calculate_stroke_count(char) for char in surname)
-            renge = surname_strokes + (given_strokes[0] if given_strokes else 1)
-            dige = sum(given_strokes) if given_strokes else 1
-            waige = tiange + dige - renge
-            zongge = surname_strokes + sum(given_strokes)
-            
-            # 计算三才（天人地三格的五行属性）
-            tiange_wuxing = self._get_wuxing_by_number(tiange)
-            renge_wuxing = self._get_wuxing_by_number(renge)
-            dige_wuxing = self._get_wuxing_by_number(dige)
-            
-            # 评估各格的吉凶
-            wuge_analysis = {
-                '天格': {
-                    'value': tiange,
-                    'wuxing': tiange_wuxing,
-                    'luck': self.evaluate_81_mathematics(tiange)
-                },
-                '人格': {
-                    'value': renge,
-                    'wuxing': renge_wuxing,
-                    'luck': self.evaluate_81_mathematics(renge)
-                },
-                '地格': {
-                    'value': dige,
-                    'wuxing': dige_wuxing,
-                    'luck': self.evaluate_81_mathematics(dige)
-                },
-                '外格': {
-                    'value': waige,
-                    'wuxing': self._get_wuxing_by_number(waige),
-                    'luck': self.evaluate_81_mathematics(waige)
-                },
-                '总格': {
-                    'value': zongge,
-                    'wuxing': self._get_wuxing_by_number(zongge),
-                    'luck': self.evaluate_81_mathematics(zongge)
-                }
-            }
-            
-            # 计算三才配置
-            sancai_config = f"{tiange_wuxing}{renge_wuxing}{dige_wuxing}"
-            sancai_evaluation = self._evaluate_sancai(tiange_wuxing, renge_wuxing, dige_wuxing)
-            
-            return {
-                'wuge_analysis': wuge_analysis,
-                'sancai_config': sancai_config,
-                'sancai_evaluation': sancai_evaluation,
-                'overall_evaluation': self._calculate_overall_wuge_score(wuge_analysis)
-            }
-            
+            return sancai_wuge_by_strokes(
+                [stroke_count(char) for char in surname],
+                [stroke_count(char) for char in given_name]
+            )
         except Exception as e:
             print(f"三才五格计算错误: {str(e)}")
             return self._get_default_sancai_wuge()
     
     def evaluate_81_mathematics(self, number: int) -> Dict:
-        """81数理吉凶判断"""
-        # 确保数字在1-81范围内
-        number = ((number - 1) % 81) + 1
-        
-        if number in self.mathematics_luck:
-            return self.mathematics_luck[number]
-        else:
-            return {'luck': '平', 'desc': '运势平稳'}
+        """81数理吉凶判断（超过81的数取余）"""
+        return mathematics_luck(number)
     
     def _get_wuxing_by_number(self, number: int) -> str:
         """根据数字尾数确定五行属性"""
-        last_digit = number % 10
-        if last_digit in [1, 2]:
-            return '木'
-        elif last_digit in [3, 4]:
-            return '火'
-        elif last_digit in [5, 6]:
-            return '土'
-        elif last_digit in [7, 8]:
-            return '金'
-        else:  # 9, 0
-            return '水'
+        return wuxing_by_number(number)
     
     def _evaluate_sancai(self, tiange_wuxing: str, renge_wuxing: str, dige_wuxing: str) -> Dict:
-        """评估三才配置"""
-        # 简化的三才评估逻辑
-        sancai_combinations = {
-            '木木木': {'luck': '大吉', 'desc': '同心协力，成功发达'},
-            '木木火': {'luck': '大吉', 'desc': '木火通明，前程似锦'},
-            '木火土': {'luck': '大吉', 'desc': '顺序相生，大获成功'},
-            '火土金': {'luck': '大吉', 'desc': '三才相生，富贵双全'},
-            '土金水': {'luck': '大吉', 'desc': '金水相生，智慧过人'},
-            '金水木': {'luck': '大吉', 'desc': '水木清华，文采斐然'},
-            '水木火': {'luck': '大吉', 'desc': '木火通明，事业有成'},
-            '木金土': {'luck': '凶', 'desc': '金克木，多有挫折'},
-            '火水金': {'luck': '凶', 'desc': '水火不容，冲突不断'},
-            '土木水': {'luck': '凶', 'desc': '木土相克，发展受阻'}
-        }
-        
-        combination = tiange_wuxing + renge_wuxing + dige_wuxing
-        
-        if combination in sancai_combinations:
-            return sancai_combinations[combination]
-        else:
-            # 默认评估逻辑
-            if self._is_wuxing_harmonious(tiange_wuxing, renge_wuxing, dige_wuxing):
-                return {'luck': '吉', 'desc': '三才配置和谐，运势良好'}
-            else:
-                return {'luck': '平', 'desc': '三才配置一般，需要努力'}
-    
-    def _is_wuxing_harmonious(self, w1: str, w2: str, w3: str) -> bool:
-        """判断三个五行是否和谐"""
-        # 检查是否有相生关系
-        wuxing_sheng = {'木': '火', '火': '土', '土': '金', '金': '水', '水': '木'}
-        
-        if wuxing_sheng.get(w1) == w2 or wuxing_sheng.get(w2) == w3:
-            return True
-        
-        # 检查是否有相克关系
-        wuxing_ke = {'木': '土', '土': '水', '水': '火', '火': '金', '金': '木'}
-        
-        if wuxing_ke.get(w1) == w2 or wuxing_ke.get(w2) == w3:
-            return False
-        
-        return True  # 其他情况认为和谐
-    
-    def _calculate_overall_wuge_score(self, wuge_analysis: Dict) -> Dict:
-        """计算五格综合评分"""
-        score_map = {'大吉': 95, '吉': 80, '半吉': 70, '平': 60, '凶': 40, '大凶': 20}
-        
-        total_score = 0
-        count = 0
-        
-        for ge_name, ge_info in wuge_analysis.items():
-            luck = ge_info['luck']['luck']
-            score = score_map.get(luck, 60)
-            total_score += score
-            count += 1
-        
-        average_score = total_score / count if count > 0 else 60
-        
-        if average_score >= 85:
-            level = '优秀'
-        elif average_score >= 70:
-            level = '良好'
-        elif average_score >= 60:
-            level = '一般'
-        else:
-            level = '需改善'
-        
-        return {
-            'score': round(average_score, 1),
-            'level': level,
-            'description': f'五格综合评分{average_score:.1f}分，等级：{level}'
-        }
+        """评估三才配置（125种配置预先算好）"""
+        return evaluate_sancai(tiange_wuxing, renge_wuxing, dige_wuxing)
     
     def _get_default_sancai_wuge(self) -> Dict:
         """获取默认的三才五格结果"""
@@ -446,11 +300,20 @@ class NameologyCalculator:
 class ChineseCharDatabase:
     """汉字库管理器 - 企业级个性化数据库"""
     
-    def __init__(self):
-        # 使用企业级个性化数据库
-        enhanced_db = EnhancedCharDatabase()
-        self.char_database = enhanced_db.char_database
-        self.enhanced_db = enhanced_db  # 保存实例以使用个性化方法
+    def __init__(self, enhanced_db: EnhancedCharDatabase = None):
+        # 使用企业级个性化数据库（默认为进程内共享实例，避免重复加载JSON和构建索引）
+        self._enhanced_db = enhanced_db
+    
+    @property
+    def enhanced_db(self) -> EnhancedCharDatabase:
+        """个性化数据库实例；未指定时每次取共享实例的当前快照（字库热更新后自动使用新版本）"""
+        if self._enhanced_db is not None:
+            return self._enhanced_db
+        return get_character_database()
+    
+    @property
+    def char_database(self):
+        return self.enhanced_db.char_database
     
     def load_char_database(self):
         """加载汉字数据库 - 已集成企业级数据库"""
@@ -612,8 +475,20 @@ class ChineseCharDatabase:
             elif 'meaning' not in char_info:
                 char_info['meaning'] = '含义美好'
             return char_info
+        # 起名字库中没有的字查询全字符库（笔画、五行、拼音），仍没有数据时返回估算的属性
+        record = lookup_cjk_char(char)
+        if record is not None and record['wuxing']:
+            return {
+                'stroke': record['stroke'],
+                'kangxi_stroke': record['kangxi_stroke'],
+                'wuxing': record['wuxing'],
+                'pinyin': record['pinyin'],
+                'tone': record['tone'],
+                'meaning': '含义丰富',
+                'suitable_for_name': True,
+                'gender': 'neutral'
+            }
         else:
-            # 如果字库中没有，返回估算的属性
             return {
                 'stroke': self._estimate_stroke_count(char),
                 'wuxing': self._estimate_wuxing(char),
@@ -654,79 +529,99 @@ class NameGenerator:
         self.bazi_calculator = BaziCalculator()
     
     def generate_names(self, surname: str, gender: str, birth_info: Dict,
-                      name_length: int = 2, count: int = None, input_seed: str = None) -> List[NameRecommendation]:
-        """智能生成推荐名字 - 修复版，强制使用新算法"""
+                      name_length: int = 2, count: int = None, input_seed: str = None,
+                      context: NamingContext = None) -> List[NameRecommendation]:
+        """
+        智能生成推荐名字 - 修复版，强制使用新算法
+        
+        context为请求上下文（命盘、五行分析、候选字在请求内只计算一次，记录各阶段耗时），未给出时新建
+        """
+        context = context or NamingContext(self, surname, gender, birth_info)
         try:
             print(f"🚀 开始智能生成名字: 姓氏={surname}, 性别={gender}, 数量={count}")
             
             # 1. 分析八字五行
-            bazi_result = self.bazi_calculator.calculate_bazi(
-                birth_info['year'], birth_info['month'], birth_info['day'], 
-                birth_info['hour'], gender, birth_info.get('calendar_type', 'solar')
-            )
-            
-            wuxing_analysis = self.wuxing_analyzer.analyze_bazi_wuxing(bazi_result)
+            bazi_result = context.bazi_result
+            wuxing_analysis = context.wuxing_analysis
             print(f"🔍 八字五行分析完成: 喜用神={wuxing_analysis['xiyongshen']}")
             
             # 2. 根据喜用神筛选汉字
-            suitable_chars = self._filter_chars_by_xiyongshen(
-                wuxing_analysis['xiyongshen'], gender
-            )
+            suitable_chars = context.suitable_chars()
             print(f"📚 筛选到合适字符数: {len(suitable_chars)}")
             
-            # 3. 生成候选名字组合 - 强制使用新算法
-            candidate_names = self._generate_name_combinations(
-                surname, suitable_chars, name_length, count * 5  # 生成更多候选
-            )
-            print(f"🎯 生成候选名字数: {len(candidate_names)}")
-            
-            # 4. 如果候选名字不足，直接扩展字库并生成
-            if len(candidate_names) < count * 2:
-                print(f"⚠️  候选名字不足，直接扩展生成")
-                expanded_names = self._force_generate_diverse_names(
-                    surname, gender, wuxing_analysis, name_length, count * 3, input_seed
-                )
-                candidate_names.extend(expanded_names)
-                candidate_names = list(set(candidate_names))  # 去重
-                print(f"🔧 扩展后候选名字数: {len(candidate_names)}")
+            # 3. 生成候选名字组合：双名按网格基础分排名，numpy未安装或单名时生成组合
+            #    同一个字最多出现在约1/3的名字中（候选排名和最终选择用同一配额）
+            char_quota = max(2, count // 3)
+            with context.stage('candidates'):
+                candidate_names = None
+                if name_length == 2:
+                    candidate_names = self._rank_two_char_names(
+                        surname, suitable_chars, wuxing_analysis, count * 2, input_seed, gender=gender,
+                        context=context, char_quota=char_quota
+                    )
+                if candidate_names is None:
+                    candidate_names = self._generate_name_combinations(
+                        surname, suitable_chars, name_length, count * 5, input_seed  # 生成更多候选
+                    )
+                    if context.deadline is not None:
+                        # 限时起名：先评估上界高的名字
+                        candidate_names = self._order_by_score_bound(candidate_names, wuxing_analysis, context)
+                print(f"🎯 生成候选名字数: {len(candidate_names)}")
+                
+                # 4. 如果候选名字不足，直接扩展字库并生成（限时起名时间用完且够返回数量时不再扩展）
+                if len(candidate_names) < count * 2 and context.expired() and len(candidate_names) >= count:
+                    context.cut_short('candidates')
+                elif len(candidate_names) < count * 2:
+                    print(f"⚠️  候选名字不足，直接扩展生成")
+                    expanded_names = self._force_generate_diverse_names(
+                        surname, gender, wuxing_analysis, name_length, count * 3, input_seed
+                    )
+                    candidate_names.extend(expanded_names)
+                    candidate_names = list(dict.fromkeys(candidate_names))  # 去重（保持顺序）
+                    print(f"🔧 扩展后候选名字数: {len(candidate_names)}")
             
             # 5. 评估每个名字
-            evaluated_names = []
-            for i, name in enumerate(candidate_names):
-                if len(evaluated_names) >= count * 2:  # 限制评估数量以提高效率
-                    break
-                    
-                # 为每个名字使用不同的种子确保多样性
-                name_seed = f"{input_seed}_{i}_{name}" if input_seed else f"default_{i}_{name}"
-                evaluation = self._evaluate_name(surname, name, wuxing_analysis, bazi_result, name_seed)
-                if evaluation:
-                    evaluated_names.append(evaluation)
+            with context.stage('evaluate'):
+                evaluated_names = []
+                for i, name in enumerate(candidate_names):
+                    if len(evaluated_names) >= count * 2:  # 限制评估数量以提高效率
+                        break
+                    if len(evaluated_names) >= count and context.expired():
+                        # 限时起名：时间用完，用已评估的名字
+                        context.cut_short('evaluate')
+                        break
+                        
+                    # 为每个名字使用不同的种子确保多样性
+                    name_seed = f"{input_seed}_{i}_{name}" if input_seed else f"default_{i}_{name}"
+                    evaluation = self._evaluate_name(surname, name, wuxing_analysis, bazi_result, name_seed, context)
+                    if evaluation:
+                        evaluated_names.append(evaluation)
             
             print(f"📊 评估完成，有效名字数: {len(evaluated_names)}")
             
-            # 6. 排序并返回top N
-            evaluated_names.sort(key=lambda x: x.overall_score, reverse=True)
-            
-            # 7. 完全去重处理 - 确保返回的每个名字都是独特的
-            final_names = []
-            seen_names = set()
-            
-            for name_rec in evaluated_names:
-                if name_rec.given_name not in seen_names:
-                    final_names.append(name_rec)
-                    seen_names.add(name_rec.given_name)
-                    
-                    if len(final_names) >= count:
-                        break
-            
-            # 8. 如果去重后名字不够，强制生成补充
-            if len(final_names) < count:
-                print(f"🔧 去重后名字不足 ({len(final_names)}/{count})，生成补充名字")
-                additional_names = self._force_generate_unique_names(
-                    surname, gender, wuxing_analysis, name_length, 
-                    count - len(final_names), input_seed, existing_names=seen_names
+            with context.stage('select'):
+                # 6. 排序并返回top N
+                evaluated_names.sort(key=lambda x: x.overall_score, reverse=True)
+                
+                # 7. 完全去重处理 - 确保返回的每个名字都是独特的；同一个字最多出现在约1/3的名字中
+                given_names = [name_rec.given_name for name_rec in evaluated_names]
+                selected = select_diverse(
+                    range(len(evaluated_names)),
+                    {'given_name': given_names, 'chars': [tuple(set(name)) for name in given_names]},
+                    quotas={'given_name': 1, 'chars': char_quota},
+                    limit=count
                 )
-                final_names.extend(additional_names)
+                final_names = [evaluated_names[index] for index in selected]
+                seen_names = {name_rec.given_name for name_rec in final_names}
+                
+                # 8. 如果去重后名字不够，强制生成补充
+                if len(final_names) < count:
+                    print(f"🔧 去重后名字不足 ({len(final_names)}/{count})，生成补充名字")
+                    additional_names = self._force_generate_unique_names(
+                        surname, gender, wuxing_analysis, name_length, 
+                        count - len(final_names), input_seed, existing_names=seen_names
+                    )
+                    final_names.extend(additional_names)
             
             print(f"✅ 最终返回: {len(final_names)}个完全独特的名字")
             return final_names[:count]  # 确保不超过请求数量
@@ -819,10 +714,132 @@ class NameGenerator:
         
         return score
     
+    @staticmethod
+    def _prefers_rare_chars(preferences: Optional[Dict]) -> bool:
+        """偏好是否为独特稀少的字（常用度基础分按 RARE_POPULARITY_SCORES 计）"""
+        if not preferences:
+            return False
+        return (preferences.get('popularity') == 'low'
+                or preferences.get('popularity_preference') == 'unique'
+                or preferences.get('rarity') in ('uncommon', 'rare')
+                or preferences.get('rarity_preference') in ('uncommon', 'rare'))
+    
+    def _expand_name_chars(self, chars: List[Dict], surname: str = '') -> List[str]:
+        """双名候选字：筛选出的字，加上每个五行补充的额外字符（去重，保持顺序；不含姓中的字）"""
+        char_list = [c['char'] for c in chars]
+        for wuxing in dict.fromkeys(c.get('wuxing', '木') for c in chars):
+            additional_chars = self._get_fallback_chars(wuxing)
+            char_list.extend(additional_chars[:10])  # 每个五行补充10个字符
+        return [char for char in dict.fromkeys(char_list) if char not in surname]
+    
+    def _rank_two_char_names(self, surname: str, chars: List[Dict], wuxing_analysis: Dict,
+                             count: int, input_seed: str = None, exclude=(), gender: str = None,
+                             context: NamingContext = None, char_quota: int = None,
+                             preferences: Dict = None) -> Optional[List[str]]:
+        """
+        双名候选按网格基础分排名（第一个字 × 第二个字一次算出，取前count个，同一个字出现次数有配额）
+        
+        Args:
+            exclude: 不选的名字（“换一批”时为已返回的名字）
+            gender: 性别（给出时先查预计算排名，没有可用的排名时再计算网格）
+            context: 请求上下文（单字属性、笔画在请求内缓存）
+            char_quota: 同一个字最多出现在几个名字中（默认约为count的1/3）；调用方按最终返回的数量给出，
+                限时起名只评估前面一部分候选时也不会集中在同一个字上
+            preferences: 个性化偏好（偏好独特稀少的字时常用度基础分反过来计，不用预计算排名）
+        
+        Returns:
+            排名前列的名字；numpy未安装且没有预计算排名时返回None，调用方改用排列组合
+        """
+        char_list = self._expand_name_chars(chars, surname)
+        # 同分的名字按输入种子打乱（同一输入顺序一致）
+        seed = zlib.crc32(input_seed.encode('utf-8')) if input_seed else None
+        
+        if gender is not None and not self._prefers_rare_chars(preferences):
+            ranked = self._rank_precomputed_names(
+                surname, char_list, wuxing_analysis, gender, count, seed, exclude, char_quota
+            )
+            if ranked is not None:
+                return ranked
+        
+        if not GRID_SCORING_AVAILABLE:
+            return None
+        
+        if context is not None and context.deadline is not None:
+            # 限时起名：按单字上界逐步扩大子网格，到时间后用当前子网格的结果
+            ranked, complete = progressive_top_k(
+                *self._name_grid_features(surname, char_list, wuxing_analysis, context, preferences),
+                count, context.deadline, seed=seed, exclude=exclude, char_quota=char_quota
+            )
+            if not complete:
+                context.cut_short('candidates')
+            print(f"⏳ 限时网格评分: {len(char_list)}个候选字，取前{len(ranked)}个{'' if complete else '（时间用完）'}")
+            return [name for name, _ in ranked]
+        
+        scorer = self._build_name_grid(surname, char_list, wuxing_analysis, context, preferences)
+        ranked = scorer.top_k(count, char_quota, seed=seed, exclude=exclude)
+        print(f"🧮 网格评分: {len(char_list)}个候选字，{len(scorer)}个组合，取前{len(ranked)}个")
+        return [name for name, _ in ranked]
+    
+    def _rank_precomputed_names(self, surname: str, char_list: List[str], wuxing_analysis: Dict, gender: str,
+                                count: int, seed: Optional[int], exclude=(),
+                                char_quota: int = None) -> Optional[List[str]]:
+        """从预计算排名中取名字（只用 char_list 中的字），没有可用的排名时返回None"""
+        store = get_name_ranking_store()
+        if store is None:
+            return None
+        key = ranking_key(
+            [self.nameology_calculator.calculate_stroke_count(char) for char in surname],
+            wuxing_analysis['xiyongshen'], wuxing_analysis['jishen'], gender
+        )
+        ranking = store.lookup(key)
+        if ranking is None:
+            return None
+        ranked = ranking.top_k(count, char_quota, seed=seed, exclude=exclude, chars=char_list)
+        if ranked is None:
+            return None
+        print(f"🏁 预计算排名: {len(char_list)}个候选字，取前{len(ranked)}个")
+        return [name for name, _ in ranked]
+    
+    def _build_name_grid(self, surname: str, char_list: List[str], wuxing_analysis: Dict,
+                         context: NamingContext = None, preferences: Dict = None) -> NameGridScorer:
+        """由各字的笔画、五行匹配加分、寓意加分、韵脚、常用度基础分构建候选网格"""
+        return NameGridScorer(*self._name_grid_features(surname, char_list, wuxing_analysis, context, preferences))
+    
+    def _name_grid_features(self, surname: str, char_list: List[str], wuxing_analysis: Dict,
+                            context: NamingContext = None, preferences: Dict = None) -> Tuple:
+        """候选网格的参数：(姓的笔画, 候选字, 笔画, 五行匹配加分, 寓意加分, 韵脚, 常用度基础分)"""
+        char_properties = context.char_properties if context else self.char_database.get_char_properties
+        stroke_count = context.stroke_count if context else self.nameology_calculator.calculate_stroke_count
+        properties = [char_properties(char) for char in char_list]
+        return (
+            [stroke_count(char) for char in surname],
+            char_list,
+            [stroke_count(char) for char in char_list],
+            [self._char_wuxing_match_bonus(info['wuxing'], wuxing_analysis) for info in properties],
+            [self._char_meaning_bonus(char, info['meaning']) for char, info in zip(char_list, properties)],
+            [self._char_rhyme_key(char) for char in char_list],
+            [popularity_score(info.get('popularity'), self._prefers_rare_chars(preferences)) for info in properties]
+        )
+    
+    def _order_by_score_bound(self, names: List[str], wuxing_analysis: Dict,
+                              context: NamingContext = None) -> List[str]:
+        """按各字五行匹配加分、寓意加分的加权从高到低排列候选名字（限时起名时先评估基础分上界高的）"""
+        char_properties = context.char_properties if context else self.char_database.get_char_properties
+        chars = list(dict.fromkeys(char for name in names for char in name))
+        properties = [char_properties(char) for char in chars]
+        bounds = char_bonus_bounds(
+            [self._char_wuxing_match_bonus(info['wuxing'], wuxing_analysis) for info in properties],
+            [self._char_meaning_bonus(char, info['meaning']) for char, info in zip(chars, properties)]
+        )
+        char_bounds = dict(zip(chars, bounds))
+        return sorted(names, key=lambda name: -sum(char_bounds[char] for char in name))
+    
     def _generate_name_combinations(self, surname: str, chars: List[Dict], 
-                                   name_length: int, count: int) -> List[str]:
-        """生成名字组合 - 修复版，大幅提升多样性"""
+                                   name_length: int, count: int, input_seed: str = None) -> List[str]:
+        """生成名字组合 - 修复版，大幅提升多样性（随机顺序由输入种子决定）"""
         combinations = set()  # 使用set确保唯一性
+        rng = seeded_random(input_seed, 'combinations')
+        chars = [char_info for char_info in chars if char_info['char'] not in surname]  # 名中不用姓的字
         
         print(f"🎯 开始生成名字组合: 可用字符数={len(chars)}, 目标数量={count}")
         
@@ -833,11 +850,8 @@ class NameGenerator:
         else:
             # 双名 - 多层次组合策略
             import itertools
-            import random
             
-            char_list = [c['char'] for c in chars]
-            
-            # 扩展字库：按五行类型添加更多字符
+            # 按五行分组（策略2使用）
             wuxing_chars = {}
             for char_info in chars:
                 wuxing = char_info.get('wuxing', '木')
@@ -845,13 +859,8 @@ class NameGenerator:
                     wuxing_chars[wuxing] = []
                 wuxing_chars[wuxing].append(char_info['char'])
             
-            # 为每个五行补充额外字符
-            for wuxing in wuxing_chars:
-                additional_chars = self._get_fallback_chars(wuxing)
-                char_list.extend(additional_chars[:10])  # 每个五行补充10个字符
-            
-            # 去重
-            char_list = list(set(char_list))
+            # 扩展字库：按五行类型添加更多字符
+            char_list = self._expand_name_chars(chars, surname)
             print(f"📚 扩展后字符数: {len(char_list)}")
             
             # 策略1: 全排列组合（最大化多样性）
@@ -859,13 +868,8 @@ class NameGenerator:
             total_possible = len(char_list) * (len(char_list) - 1)
             target_combinations = min(count * 5, total_possible)  # 生成5倍候选
             
-            # 使用随机种子确保每次运行有不同结果，但同一会话内一致
-            import time
-            session_seed = int(time.time() * 1000) % 10000
-            random.seed(session_seed)
-            
             char_pairs = list(itertools.permutations(char_list, 2))
-            random.shuffle(char_pairs)  # 随机打乱顺序
+            rng.shuffle(char_pairs)  # 随机打乱顺序（同一种子顺序一致）
             
             for combo in char_pairs[:target_combinations]:
                 # 更宽松的筛选条件
@@ -916,12 +920,12 @@ class NameGenerator:
                         # 高频字 + 低频字组合
                         high_freq_chars = char_list[:len(char_list)//3]
                         low_freq_chars = char_list[len(char_list)//3:]
-                        char1 = random.choice(high_freq_chars)
-                        char2 = random.choice(low_freq_chars)
+                        char1 = rng.choice(high_freq_chars)
+                        char2 = rng.choice(low_freq_chars)
                     else:
                         # 完全随机组合
-                        char1 = random.choice(char_list)
-                        char2 = random.choice(char_list)
+                        char1 = rng.choice(char_list)
+                        char2 = rng.choice(char_list)
                     
                     if char1 != char2:
                         combinations.add(char1 + char2)
@@ -929,10 +933,10 @@ class NameGenerator:
             print(f"✅ 策略3完成: 最终组合数{len(combinations)}")
         
         # 转换为列表并使用智能排序
-        combinations_list = list(combinations)
+        combinations_list = sorted(combinations)
         
         # 智能排序：优先返回多样化的组合
-        random.shuffle(combinations_list)  # 先随机打乱
+        rng.shuffle(combinations_list)  # 先随机打乱
         
         # 按字符多样性重新排序（优先选择不同字符的组合）
         if name_length == 2:
@@ -989,24 +993,27 @@ class NameGenerator:
         return False
     
     def _evaluate_name(self, surname: str, given_name: str, 
-                      wuxing_analysis: Dict, bazi_result: Dict, input_seed: str = None) -> Optional[NameRecommendation]:
-        """评估单个名字"""
+                      wuxing_analysis: Dict, bazi_result: Dict, input_seed: str = None,
+                      context: NamingContext = None, preferences: Dict = None) -> Optional[NameRecommendation]:
+        """评估单个名字（context为请求上下文，单字属性在请求内缓存；preferences为个性化偏好，影响常用度分）"""
         try:
             full_name = surname + given_name
             
             # 计算三才五格
-            sancai_wuge = self.nameology_calculator.calculate_sancai_wuge(surname, given_name)
+            sancai_wuge = self.nameology_calculator.calculate_sancai_wuge(
+                surname, given_name, context.stroke_count if context else None
+            )
             
             # 分析名字五行
-            name_wuxing_analysis = self._analyze_name_wuxing(given_name)
+            name_wuxing_analysis = self._analyze_name_wuxing(given_name, context)
             
             # 计算综合评分，传递输入种子
             overall_score, score_breakdown = self._calculate_overall_score(
-                sancai_wuge, wuxing_analysis, name_wuxing_analysis, input_seed
+                sancai_wuge, wuxing_analysis, name_wuxing_analysis, input_seed, preferences
             )
             
             # 生成寓意解释
-            meaning_explanation = self._generate_meaning_explanation(given_name)
+            meaning_explanation = self._generate_meaning_explanation(given_name, context)
             
             # 生成拼音
             pronunciation = self._generate_pronunciation(given_name)
@@ -1030,15 +1037,17 @@ class NameGenerator:
             print(f"评估名字错误: {str(e)}")
             return None
     
-    def _analyze_name_wuxing(self, given_name: str) -> Dict:
+    def _analyze_name_wuxing(self, given_name: str, context: NamingContext = None) -> Dict:
         """分析名字的五行属性"""
+        char_properties = context.char_properties if context else self.char_database.get_char_properties
         name_wuxing = []
         for char in given_name:
-            char_info = self.char_database.get_char_properties(char)
+            char_info = char_properties(char)
             name_wuxing.append({
                 'char': char,
                 'wuxing': char_info['wuxing'],
-                'meaning': char_info['meaning']
+                'meaning': char_info['meaning'],
+                'popularity': char_info.get('popularity')
             })
         
         # 统计五行分布
@@ -1052,63 +1061,56 @@ class NameGenerator:
             'dominant_wuxing': max(wuxing_distribution.items(), key=lambda x: x[1])[0]
         }
     
-    def _calculate_overall_score(self, sancai_wuge: Dict, bazi_wuxing: Dict, name_wuxing: Dict, input_seed: str = None) -> Tuple[float, Dict]:
-        """计算综合评分 - 大幅增强随机性和多样性"""
+    def _calculate_overall_score(self, sancai_wuge: Dict, bazi_wuxing: Dict, name_wuxing: Dict, input_seed: str = None,
+                                 preferences: Dict = None) -> Tuple[float, Dict]:
+        """计算综合评分 - 大幅增强随机性和多样性（常用度分不加随机调整）"""
         # 基础评分计算
         base_wuge_score = sancai_wuge['overall_evaluation']['score']
         base_wuxing_match_score = self._calculate_wuxing_match_score(bazi_wuxing, name_wuxing)
         base_sancai_score = self._calculate_sancai_score(sancai_wuge['sancai_evaluation'])
         base_phonetic_score = self._calculate_phonetic_score(name_wuxing)
         base_meaning_score = self._calculate_meaning_score(name_wuxing)
+        base_popularity_score = self._calculate_popularity_score(name_wuxing, preferences)
         
-        # 强化确定性随机因子
-        import random
-        import hashlib
-        import time
-        
-        # 构造复合种子：结合更多变量增加差异
+        # 强化确定性随机因子：复合种子结合名字、五行等变量增加差异，同一输入种子评分一致
         composite_seed_parts = [
-            input_seed or str(time.time()),
             str(name_wuxing.get('dominant_wuxing', '')),
             ''.join([char_info['char'] for char_info in name_wuxing.get('chars_wuxing', [])]),
             str(len(name_wuxing.get('chars_wuxing', []))),
-            str(hash(str(sorted(bazi_wuxing.get('xiyongshen', []))))),
-            str(int(time.time() * 1000) % 1000)  # 毫秒级时间差异
+            ','.join(sorted(bazi_wuxing.get('xiyongshen', [])))
         ]
         
         composite_seed = '_'.join(composite_seed_parts)
-        seed_hash = hashlib.md5(composite_seed.encode()).hexdigest()
-        seed_number = int(seed_hash[:10], 16) % 1000000
-        random.seed(seed_number)
+        rng = seeded_random(input_seed, composite_seed)
         
-        print(f"📊 评分种子: {composite_seed[:50]}... -> {seed_number}")
+        print(f"📊 评分种子: {input_seed or '-'}_{composite_seed}"[:60])
         
         # 大幅增强随机性：不同评分维度使用不同的随机策略
         score_adjustments = {}
         
         # 1. 五格评分：使用基于字符特征的随机调整
         char_complexity = sum(len(char_info['char'].encode('utf-8')) for char_info in name_wuxing.get('chars_wuxing', []))
-        wuge_random_factor = random.uniform(-8, 12) + (char_complexity % 5)  # -8到17的范围
+        wuge_random_factor = rng.uniform(-8, 12) + (char_complexity % 5)  # -8到17的范围
         score_adjustments['wuge'] = wuge_random_factor
         
         # 2. 五行匹配：基于五行元素数量的随机调整
         wuxing_variety = len(set(char_info['wuxing'] for char_info in name_wuxing.get('chars_wuxing', [])))
-        wuxing_random_factor = random.uniform(-6, 10) + (wuxing_variety * 2)  # 五行多样性加分
+        wuxing_random_factor = rng.uniform(-6, 10) + (wuxing_variety * 2)  # 五行多样性加分
         score_adjustments['wuxing'] = wuxing_random_factor
         
         # 3. 三才配置：基于配置复杂度的随机调整
         sancai_complexity = len(sancai_wuge.get('sancai_config', ''))
-        sancai_random_factor = random.uniform(-5, 9) + (sancai_complexity % 3)
+        sancai_random_factor = rng.uniform(-5, 9) + (sancai_complexity % 3)
         score_adjustments['sancai'] = sancai_random_factor
         
         # 4. 音韵和谐：基于字符音韵特征的随机调整
         phonetic_features = sum(ord(char_info['char']) for char_info in name_wuxing.get('chars_wuxing', []))
-        phonetic_random_factor = random.uniform(-10, 15) + (phonetic_features % 7)
+        phonetic_random_factor = rng.uniform(-10, 15) + (phonetic_features % 7)
         score_adjustments['phonetic'] = phonetic_random_factor
         
         # 5. 寓意丰富：基于含义长度的随机调整
         meaning_richness = sum(len(char_info.get('meaning', '')) for char_info in name_wuxing.get('chars_wuxing', []))
-        meaning_random_factor = random.uniform(-7, 11) + (meaning_richness % 4)
+        meaning_random_factor = rng.uniform(-7, 11) + (meaning_richness % 4)
         score_adjustments['meaning'] = meaning_random_factor
         
         print(f"🎲 随机调整因子: 五格={wuge_random_factor:.1f}, 五行={wuxing_random_factor:.1f}, 三才={sancai_random_factor:.1f}")
@@ -1120,17 +1122,19 @@ class NameGenerator:
         final_phonetic_score = max(35, min(100, base_phonetic_score + score_adjustments['phonetic']))
         final_meaning_score = max(35, min(100, base_meaning_score + score_adjustments['meaning']))
         
-        # 加权计算总分
+        # 加权计算总分（权重与网格评分的 SCORE_WEIGHTS 一致）
+        wuge_weight, wuxing_weight, sancai_weight, phonetic_weight, meaning_weight, popularity_weight = SCORE_WEIGHTS
         total_score = (
-            final_wuge_score * 0.3 + 
-            final_wuxing_score * 0.3 + 
-            final_sancai_score * 0.2 + 
-            final_phonetic_score * 0.1 + 
-            final_meaning_score * 0.1
+            final_wuge_score * wuge_weight + 
+            final_wuxing_score * wuxing_weight + 
+            final_sancai_score * sancai_weight + 
+            final_phonetic_score * phonetic_weight + 
+            final_meaning_score * meaning_weight + 
+            base_popularity_score * popularity_weight
         )
         
         # 最后的随机微调：确保分数分布更均匀
-        final_adjustment = random.uniform(-3, 5)  # 最终微调
+        final_adjustment = rng.uniform(-3, 5)  # 最终微调
         total_score = max(40, min(98, total_score + final_adjustment))
         
         print(f"💯 最终评分: {total_score:.1f} (基础分 + 随机调整 + 微调)")
@@ -1142,12 +1146,14 @@ class NameGenerator:
             'sancai_score': round(final_sancai_score, 1),
             'phonetic_score': round(final_phonetic_score, 1),
             'meaning_score': round(final_meaning_score, 1),
+            'popularity_score': round(base_popularity_score, 1),
             'base_scores': {
                 'base_wuge': round(base_wuge_score, 1),
                 'base_wuxing': round(base_wuxing_match_score, 1),
                 'base_sancai': round(base_sancai_score, 1),
                 'base_phonetic': round(base_phonetic_score, 1),
-                'base_meaning': round(base_meaning_score, 1)
+                'base_meaning': round(base_meaning_score, 1),
+                'base_popularity': round(base_popularity_score, 1)
             },
             'adjustments': {
                 'wuge_adj': round(score_adjustments['wuge'], 1),
@@ -1158,11 +1164,12 @@ class NameGenerator:
                 'final_adj': round(final_adjustment, 1)
             },
             'weights': {
-                'wuge_weight': 30,
-                'wuxing_weight': 30,
-                'sancai_weight': 20,
-                'phonetic_weight': 10,
-                'meaning_weight': 10
+                'wuge_weight': round(wuge_weight * 100),
+                'wuxing_weight': round(wuxing_weight * 100),
+                'sancai_weight': round(sancai_weight * 100),
+                'phonetic_weight': round(phonetic_weight * 100),
+                'meaning_weight': round(meaning_weight * 100),
+                'popularity_weight': round(popularity_weight * 100)
             }
         }
         
@@ -1172,18 +1179,20 @@ class NameGenerator:
         """计算五行匹配度得分"""
         score = 60  # 基础分
         
-        xiyongshen = bazi_wuxing['xiyongshen']
-        jishen = bazi_wuxing['jishen']
-        
         # 检查名字中是否包含喜用神
         for char_info in name_wuxing['chars_wuxing']:
-            if char_info['wuxing'] in xiyongshen:
-                score += 15  # 每个喜用神字加15分
-            elif char_info['wuxing'] in jishen:
-                score -= 10  # 每个忌神字减10分
+            score += self._char_wuxing_match_bonus(char_info['wuxing'], bazi_wuxing)
         
         return min(100, max(0, score))
     
+    def _char_wuxing_match_bonus(self, wuxing: str, bazi_wuxing: Dict) -> int:
+        """单字的五行匹配加分"""
+        if wuxing in bazi_wuxing['xiyongshen']:
+            return 15  # 每个喜用神字加15分
+        elif wuxing in bazi_wuxing['jishen']:
+            return -10  # 每个忌神字减10分
+        return 0
+    
     def _calculate_sancai_score(self, sancai_evaluation: Dict) -> float:
         """计算三才配置得分"""
         luck_scores = {
@@ -1215,57 +1224,70 @@ class NameGenerator:
         # 检查韵母搭配（简化实现）
         if len(chars) >= 2:
             # 避免相同韵母
-            first_char = chars[0]
-            second_char = chars[1] if len(chars) > 1 else chars[0]
-            
-            # 简单的韵母检查
-            same_ending = ['ing', 'ang', 'ong', 'eng']
-            for ending in same_ending:
-                if first_char.endswith(ending[-1]) and second_char.endswith(ending[-1]):
-                    score -= 5  # 相同韵母减分
-                    break
+            first_key = self._char_rhyme_key(chars[0])
+            if first_key is not None and first_key == self._char_rhyme_key(chars[1]):
+                score -= 5  # 相同韵母减分
             else:
                 score += 3  # 不同韵母加分
         
         return min(100, max(50, score))
     
+    def _char_rhyme_key(self, char: str) -> Optional[str]:
+        """单字的韵脚（简单的韵母检查），两个字韵脚相同时音韵减分"""
+        same_ending = ['ing', 'ang', 'ong', 'eng']
+        for ending in same_ending:
+            if char.endswith(ending[-1]):
+                return ending[-1]
+        return None
+    
     def _calculate_meaning_score(self, name_wuxing: Dict) -> float:
         """计算寓意丰富度得分"""
         # 简化的寓意评分算法
         score = 70  # 基础分
         
+        for char_info in name_wuxing['chars_wuxing']:
+            score += self._char_meaning_bonus(char_info['char'], char_info['meaning'])
+        
+        return min(100, max(50, score))
+    
+    def _char_meaning_bonus(self, char: str, meaning: str) -> int:
+        """单字的寓意加分（积极寓意8分或中性寓意3分，文化内涵字另加5分）"""
+        bonus = 0
         positive_meanings = ['美好', '智慧', '光明', '成功', '和谐', '吉祥', '富贵', '健康', '快乐', '聪明']
         neutral_meanings = ['含义丰富', '文化', '传统', '自然']
         
-        for char_info in name_wuxing['chars_wuxing']:
-            meaning = char_info['meaning']
-            
-            # 检查是否包含积极寓意
-            for pos_meaning in positive_meanings:
-                if pos_meaning in meaning:
-                    score += 8
+        # 检查是否包含积极寓意
+        for pos_meaning in positive_meanings:
+            if pos_meaning in meaning:
+                bonus += 8
+                break
+        else:
+            # 检查中性寓意
+            for neu_meaning in neutral_meanings:
+                if neu_meaning in meaning:
+                    bonus += 3
                     break
-            else:
-                # 检查中性寓意
-                for neu_meaning in neutral_meanings:
-                    if neu_meaning in meaning:
-                        score += 3
-                        break
         
         # 检查文化内涵
         cultural_chars = ['文', '雅', '诗', '书', '礼', '仁', '智', '信']
-        for char_info in name_wuxing['chars_wuxing']:
-            if char_info['char'] in cultural_chars:
-                score += 5
+        if char in cultural_chars:
+            bonus += 5
         
-        return min(100, max(50, score))
+        return bonus
+    
+    def _calculate_popularity_score(self, name_wuxing: Dict, preferences: Dict = None) -> float:
+        """计算常用度得分（各字常用度基础分的平均；偏好独特稀少的字时生僻字得分高）"""
+        prefer_rare = self._prefers_rare_chars(preferences)
+        scores = [popularity_score(char_info.get('popularity'), prefer_rare) for char_info in name_wuxing['chars_wuxing']]
+        return sum(scores) / len(scores) if scores else float(popularity_score(None))
     
-    def _generate_meaning_explanation(self, given_name: str) -> str:
-        """生成名字寓意解释"""
+    def _generate_meaning_explanation(self, given_name: str, context: NamingContext = None) -> str:
+        """生成名字寓意解释（context为请求上下文，单字属性在请求内缓存）"""
+        char_properties = context.char_properties if context else self.char_database.get_char_properties
         explanations = []
         
         for char in given_name:
-            char_info = self.char_database.get_char_properties(char)
+            char_info = char_properties(char)
             meaning = char_info.get('meaning', '含义美好')
             explanations.append(f"'{char}'字{meaning}")
         
@@ -1316,15 +1338,10 @@ class NameGenerator:
     def _force_generate_diverse_names(self, surname: str, gender: str, wuxing_analysis: Dict,
                                      name_length: int, count: int, input_seed: str) -> List[str]:
         """强制生成多样化名字"""
-        import random
-        import hashlib
-        
         # 使用种子确保可重复性
-        seed_hash = hashlib.md5(input_seed.encode()).hexdigest()
-        seed_number = int(seed_hash[:8], 16) % 10000
-        random.seed(seed_number)
+        rng = seeded_random(input_seed, 'diverse')
         
-        diverse_names = set()
+        diverse_names = {}  # 保持生成顺序的去重
         
         # 1. 使用基础字库生成
         basic_chars = {
@@ -1337,16 +1354,16 @@ class NameGenerator:
         # 2. 生成组合
         for i in range(count * 3):
             if name_length == 1:
-                name = random.choice(gender_chars)
+                name = rng.choice(gender_chars)
             else:
-                char1 = random.choice(gender_chars)
-                char2 = random.choice(gender_chars)
+                char1 = rng.choice(gender_chars)
+                char2 = rng.choice(gender_chars)
                 if char1 != char2:
                     name = char1 + char2
                 else:
                     continue
             
-            diverse_names.add(name)
+            diverse_names[name] = True
             
             if len(diverse_names) >= count:
                 break
@@ -1357,13 +1374,8 @@ class NameGenerator:
                                    name_length: int, count: int, input_seed: str, 
                                    existing_names: set) -> List[NameRecommendation]:
         """强制生成独特名字"""
-        import random
-        import hashlib
-        
         # 使用种子确保可重复性
-        seed_hash = hashlib.md5(f"{input_seed}_unique".encode()).hexdigest()
-        seed_number = int(seed_hash[:8], 16) % 10000
-        random.seed(seed_number)
+        rng = seeded_random(input_seed, 'unique')
         
         unique_names = []
         
@@ -1385,10 +1397,10 @@ class NameGenerator:
             attempts += 1
             
             if name_length == 1:
-                given_name = random.choice(gender_chars)
+                given_name = rng.choice(gender_chars)
             else:
-                char1 = random.choice(gender_chars)
-                char2 = random.choice(gender_chars)
+                char1 = rng.choice(gender_chars)
+                char2 = rng.choice(gender_chars)
                 if char1 != char2:
                     given_name = char1 + char2
                 else:
@@ -1397,7 +1409,7 @@ class NameGenerator:
             # 确保名字是独特的
             if given_name not in existing_names:
                 # 生成评分
-                score = random.uniform(75, 95)
+                score = rng.uniform(75, 95)
                 score = round(score, 1)
                 
                 # 确定等级
@@ -1435,13 +1447,8 @@ class NameGenerator:
     def _generate_diverse_fallback_names(self, surname: str, gender: str, name_length: int, 
                                        count: int, input_seed: str) -> List[NameRecommendation]:
         """生成多样化的回退名字"""
-        import random
-        import hashlib
-        
         # 使用种子确保可重复性
-        seed_hash = hashlib.md5(f"{input_seed}_fallback".encode()).hexdigest()
-        seed_number = int(seed_hash[:8], 16) % 10000
-        random.seed(seed_number)
+        rng = seeded_random(input_seed, 'fallback')
         
         fallback_names = []
         
@@ -1463,17 +1470,17 @@ class NameGenerator:
             attempts += 1
             
             if name_length == 1:
-                given_name = random.choice(gender_chars)
+                given_name = rng.choice(gender_chars)
             else:
-                char1 = random.choice(gender_chars)
-                char2 = random.choice(gender_chars)
+                char1 = rng.choice(gender_chars)
+                char2 = rng.choice(gender_chars)
                 if char1 != char2:
                     given_name = char1 + char2
                 else:
                     continue
             
             # 生成评分
-            score = random.uniform(60, 90)
+            score = rng.uniform(60, 90)
             score = round(score, 1)
             
             # 确定等级
@@ -1513,24 +1520,21 @@ class NamingCalculator:
         self.name_generator = NameGenerator()
     
     def analyze_and_generate_names(self, surname: str, gender: str, birth_info: Dict,
-                                  name_length: int = 2, count: int = None, session_seed: str = None) -> Dict:
-        """分析八字并生成推荐名字 - 优化版，支持会话级随机性"""
+                                  name_length: int = 2, count: int = None, session_seed: str = None,
+                                  deadline_ms: float = None) -> Dict:
+        """
+        分析八字并生成推荐名字 - 优化版，支持会话级随机性
+        
+        名字只由出生信息、会话种子和名字长度决定：同一会话种子重放同一结果（接口未收到会话种子时生成随机种子，
+        随结果返回）；deadline_ms为时间预算（毫秒）：到时间后返回已有的最好结果，complete为False
+        """
+        context = NamingContext(self.name_generator, surname, gender, birth_info, deadline_ms)
         try:
-            # 基础种子：确保八字分析一致性
-            base_seed = f"{surname}_{gender}_{birth_info['year']}_{birth_info['month']}_{birth_info['day']}_{birth_info['hour']}"
-            
-            # 名字生成种子：增加会话随机性
-            if session_seed:
-                import time
-                naming_seed = f"{base_seed}_{session_seed}_{int(time.time() * 1000)}_{name_length}"
-            else:
-                import random
-                import time
-                naming_seed = f"{base_seed}_{random.randint(1000, 9999)}_{int(time.time() * 1000)}_{name_length}"
+            naming_seed = self._naming_seed(surname, gender, birth_info, name_length, None, session_seed)
             
             # 生成推荐名字，使用会话种子
             recommendations = self.name_generator.generate_names(
-                surname, gender, birth_info, name_length, count, naming_seed
+                surname, gender, birth_info, name_length, count, naming_seed, context
             )
             
             # 确保至少有40%的名字达到90+分
@@ -1539,9 +1543,10 @@ class NamingCalculator:
             
             # 如果高分名字不够，生成更多高质量名字
             if high_score_count < target_high_score:
-                additional_high_score = self._generate_guaranteed_high_score_names(
-                    surname, gender, birth_info, name_length, target_high_score - high_score_count, naming_seed
-                )
+                with context.stage('high_score'):
+                    additional_high_score = self._generate_guaranteed_high_score_names(
+                        surname, gender, birth_info, name_length, target_high_score - high_score_count, naming_seed
+                    )
                 
                 # 替换最低分的名字
                 recommendations.sort(key=lambda x: x.overall_score)
@@ -1550,13 +1555,9 @@ class NamingCalculator:
             # 按分数降序排列，确保高分在前
             recommendations.sort(key=lambda x: x.overall_score, reverse=True)
             
-            # 分析八字五行（用于显示给用户）
-            bazi_result = self.name_generator.bazi_calculator.calculate_bazi(
-                birth_info['year'], birth_info['month'], birth_info['day'],
-                birth_info['hour'], gender, birth_info.get('calendar_type', 'solar')
-            )
-            
-            wuxing_analysis = self.name_generator.wuxing_analyzer.analyze_bazi_wuxing(bazi_result)
+            # 八字五行（用于显示给用户，复用生成名字时的结果）
+            bazi_result = context.bazi_result
+            wuxing_analysis = context.wuxing_analysis
             
             return {
                 'success': True,
@@ -1565,21 +1566,14 @@ class NamingCalculator:
                     'wuxing_analysis': wuxing_analysis
                 },
                 'recommendations': [
-                    {
-                        'full_name': rec.full_name,
-                        'given_name': rec.given_name,
-                        'overall_score': rec.overall_score,
-                        'score_breakdown': getattr(rec, 'score_breakdown', None),
-                        'wuxing_analysis': rec.wuxing_analysis,
-                        'sancai_wuge': rec.sancai_wuge,
-                        'meaning_explanation': rec.meaning_explanation,
-                        'pronunciation': rec.pronunciation,
-                        'luck_level': rec.luck_level
-                    }
-                    for rec in recommendations[:count]  # 确保返回指定数量
+                    self._recommendation_dict(rec) for rec in recommendations[:count]  # 确保返回指定数量
                 ],
                 'analysis_summary': wuxing_analysis.get('analysis_summary', ''),
-                'naming_suggestions': self._generate_naming_suggestions(wuxing_analysis)
+                'naming_suggestions': self._generate_naming_suggestions(wuxing_analysis),
+                'session_seed': session_seed,
+                'complete': context.complete,
+                'incomplete_stages': context.incomplete_stages,
+                'timings_ms': context.timings_report()
             }
             
         except Exception as e:
@@ -1592,17 +1586,17 @@ class NamingCalculator:
     
     def evaluate_specific_name(self, surname: str, given_name: str, gender: str, birth_info: Dict) -> Dict:
         """评估指定名字"""
+        context = NamingContext(self.name_generator, surname, gender, birth_info)
         try:
             # 分析八字五行
-            bazi_result = self.name_generator.bazi_calculator.calculate_bazi(
-                birth_info['year'], birth_info['month'], birth_info['day'],
-                birth_info['hour'], gender, birth_info.get('calendar_type', 'solar')
-            )
-            
-            wuxing_analysis = self.name_generator.wuxing_analyzer.analyze_bazi_wuxing(bazi_result)
+            bazi_result = context.bazi_result
+            wuxing_analysis = context.wuxing_analysis
             
             # 评估名字
-            evaluation = self.name_generator._evaluate_name(surname, given_name, wuxing_analysis, bazi_result)
+            with context.stage('evaluate'):
+                evaluation = self.name_generator._evaluate_name(
+                    surname, given_name, wuxing_analysis, bazi_result, context=context
+                )
             
             if evaluation:
                 return {
@@ -1617,7 +1611,8 @@ class NamingCalculator:
                         'pronunciation': evaluation.pronunciation,
                         'luck_level': evaluation.luck_level
                     },
-                    'bazi_analysis': wuxing_analysis
+                    'bazi_analysis': wuxing_analysis,
+                    'timings_ms': context.timings_report()
                 }
             else:
                 return {
@@ -1632,6 +1627,55 @@ class NamingCalculator:
                 'error': str(e)
             }
     
+    def evaluate_names(self, surname: str, given_names: List[str], gender: str, birth_info: Dict) -> Dict:
+        """
+        批量评估用户给出的名字（同一个出生信息只排盘一次，笔画、三才五格、单字属性在请求内共享）
+        
+        Returns:
+            evaluations 按综合评分降序（含各维度评分 score_breakdown 和名次 rank）；
+            重复的名字只评估一次，无效的名字（不是1~3个汉字或评估失败）列在 invalid_names
+        """
+        context = NamingContext(self.name_generator, surname, gender, birth_info)
+        try:
+            # 分析八字五行（所有名字共用）
+            bazi_result = context.bazi_result
+            wuxing_analysis = context.wuxing_analysis
+            
+            evaluations = []
+            invalid_names = []
+            with context.stage('evaluate'):
+                for given_name in dict.fromkeys(name.strip() for name in given_names):
+                    if not GIVEN_NAME_PATTERN.fullmatch(given_name):
+                        invalid_names.append({'given_name': given_name, 'error': '名字须为1~3个汉字'})
+                        continue
+                    evaluation = self.name_generator._evaluate_name(
+                        surname, given_name, wuxing_analysis, bazi_result, context=context
+                    )
+                    if evaluation is None:
+                        invalid_names.append({'given_name': given_name, 'error': '名字评估失败'})
+                        continue
+                    evaluations.append(evaluation)
+            
+            evaluations.sort(key=lambda rec: rec.overall_score, reverse=True)
+            print(f"📋 批量评估名字: {len(evaluations)}个，无效{len(invalid_names)}个")
+            return {
+                'success': True,
+                'evaluations': [
+                    dict(self._recommendation_dict(rec), rank=rank)
+                    for rank, rec in enumerate(evaluations, 1)
+                ],
+                'invalid_names': invalid_names,
+                'bazi_analysis': wuxing_analysis,
+                'timings_ms': context.timings_report()
+            }
+            
+        except Exception as e:
+            print(f"批量评估名字错误: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
     def _generate_guaranteed_high_score_names(self, surname: str, gender: str, birth_info: Dict,
                                             name_length: int, count: int, input_seed: str) -> List[NameRecommendation]:
         """生成保证高分的名字 - 修复版，确保不重复"""
@@ -1656,16 +1700,11 @@ class NamingCalculator:
         
         selected_names = premium_names.get(gender, premium_names['male'])
         
-        import random
-        import hashlib
-        
         # 使用输入种子确保一致性
-        seed_hash = hashlib.md5(input_seed.encode()).hexdigest()
-        seed_number = int(seed_hash[:8], 16) % 10000
-        random.seed(seed_number)
+        rng = seeded_random(input_seed, 'high_score')
         
         # 打乱名字列表确保随机性
-        random.shuffle(selected_names)
+        rng.shuffle(selected_names)
         
         # 使用set确保不重复
         used_names = set()
@@ -1694,7 +1733,7 @@ class NamingCalculator:
             
             # 确保90+分
             base_score = 92
-            score_variation = random.uniform(0, 3)  # 92-95分
+            score_variation = rng.uniform(0, 3)  # 92-95分
             final_score = round(base_score + score_variation, 1)
             
             # 根据分数确定等级
@@ -1712,11 +1751,11 @@ class NamingCalculator:
             # 生成高质量的评分构成（确保数学一致性）
             # 反向计算：从目标总分推导各项评分
             base_scores = {
-                'wuge_score': final_score + random.uniform(-3, 3),
-                'wuxing_match_score': final_score + random.uniform(-2, 2),
-                'sancai_score': final_score + random.uniform(-1, 1),
-                'phonetic_score': final_score + random.uniform(-5, 5),
-                'meaning_score': final_score + random.uniform(-4, 4)
+                'wuge_score': final_score + rng.uniform(-3, 3),
+                'wuxing_match_score': final_score + rng.uniform(-2, 2),
+                'sancai_score': final_score + rng.uniform(-1, 1),
+                'phonetic_score': final_score + rng.uniform(-5, 5),
+                'meaning_score': final_score + rng.uniform(-4, 4)
             }
             
             # 确保各项评分在合理范围内
@@ -1770,140 +1809,298 @@ class NamingCalculator:
 
     def analyze_and_generate_personalized_names(self, surname: str, gender: str, birth_info: Dict,
                                                name_length: int = 2, count: int = None, 
-                                               preferences: Dict = None, session_seed: str = None) -> Dict:
-        """分析八字并生成个性化推荐名字 - 新增个性化功能"""
+                                               preferences: Dict = None, session_seed: str = None,
+                                               deterministic: bool = False, page: int = 1,
+                                               deadline_ms: float = None) -> Dict:
+        """
+        分析八字并生成个性化推荐名字 - 新增个性化功能
+        
+        deterministic为True时名字只由会话种子（及姓、性别、八字五行数量、名字长度、偏好）决定，
+        结果按这些参数缓存；page为第几页（“换一批”），从缓存的候选名字流中接着取，不重新生成；
+        deadline_ms为时间预算（毫秒）：到时间后返回已有的最好结果，complete为False（不完整的结果不缓存）
+        """
+        result = {'success': True}
+        for event, data in self.iter_personalized_names(
+            surname, gender, birth_info, name_length, count, preferences, session_seed,
+            deterministic=deterministic, page=page, deadline_ms=deadline_ms
+        ):
+            if event == 'error':
+                return {'success': False, 'error': data['error'], 'recommendations': []}
+            if event != 'names':
+                result.update(data)
+        return result
+    
+    def iter_personalized_names(self, surname: str, gender: str, birth_info: Dict,
+                                name_length: int = 2, count: int = None,
+                                preferences: Dict = None, session_seed: str = None,
+                                deterministic: bool = False, page: int = 1,
+                                deadline_ms: float = None) -> Iterator[Tuple[str, Dict]]:
+        """
+        个性化起名的事件流（参数同 analyze_and_generate_personalized_names，流式接口逐个推送）
+        
+        依次产出 (事件, 数据)：
+            ('analysis', 八字分析)：排盘后立即产出（bazi_analysis、analysis_summary、naming_suggestions、preferences_applied）
+            ('names', {'recommendations': [...]})：第1页生成时每评估完一批名字产出一次（分数已确定，
+                未排序，补充、替换后不一定都在最终结果中）；缓存命中或“换一批”时没有
+            ('done', 最终结果)：本页名字（按分数降序）、pagination、session_seed、complete、incomplete_stages、timings_ms
+        出错时产出 ('error', {'error': 错误信息}) 后结束
+        """
+        context = NamingContext(self.name_generator, surname, gender, birth_info, deadline_ms)
         try:
-            # 基础种子：确保八字分析一致性
-            base_seed = f"{surname}_{gender}_{birth_info['year']}_{birth_info['month']}_{birth_info['day']}_{birth_info['hour']}"
-            
-            # 名字生成种子：增加会话随机性和偏好
-            if session_seed:
-                import time
-                pref_str = str(sorted(preferences.items())) if preferences else "default"
-                naming_seed = f"{base_seed}_{session_seed}_{pref_str}_{int(time.time() * 1000)}_{name_length}"
-            else:
-                import random
-                import time
-                pref_str = str(sorted(preferences.items())) if preferences else "default"
-                naming_seed = f"{base_seed}_{random.randint(1000, 9999)}_{pref_str}_{int(time.time() * 1000)}_{name_length}"
-            
             # 分析八字五行
-            bazi_result = self.name_generator.bazi_calculator.calculate_bazi(
-                birth_info['year'], birth_info['month'], birth_info['day'],
-                birth_info['hour'], gender, birth_info.get('calendar_type', 'solar')
-            )
-            
-            wuxing_analysis = self.name_generator.wuxing_analyzer.analyze_bazi_wuxing(bazi_result)
-            
-            # 根据个性化偏好和喜用神筛选汉字
-            suitable_chars = self.name_generator._filter_chars_by_xiyongshen(
-                wuxing_analysis['xiyongshen'], gender, preferences
-            )
-            
-            print(f"🔍 个性化筛选结果: 找到{len(suitable_chars)}个合适字符")
+            bazi_result = context.bazi_result
+            wuxing_analysis = context.wuxing_analysis
+            yield 'analysis', {
+                'bazi_analysis': {
+                    'paipan': bazi_result.get('paipan', {}),
+                    'wuxing_analysis': wuxing_analysis
+                },
+                'analysis_summary': wuxing_analysis.get('analysis_summary', ''),
+                'naming_suggestions': self._generate_personalized_suggestions(wuxing_analysis, preferences),
+                'preferences_applied': preferences or {}
+            }
             
-            # 如果个性化筛选结果太少，回退到标准筛选并混合个性化元素
-            if len(suitable_chars) < 20:
-                print("⚠️  个性化筛选结果不足，使用混合策略")
-                
-                # 获取标准筛选结果
-                standard_chars = self.name_generator._filter_chars_by_xiyongshen(
-                    wuxing_analysis['xiyongshen'], gender, None  # 不使用偏好
+            stream = None
+            if deterministic:
+                # 确定性模式：种子由缓存键得出，不含时间
+                cache_key = naming_cache_key(
+                    surname, gender, wuxing_analysis.get('wuxing_counts', {}), name_length, preferences, session_seed
                 )
-                print(f"📚 标准筛选结果: {len(standard_chars)}个字符")
-                
-                # 合并并优先排序个性化字符
-                suitable_chars.extend(standard_chars)
-                
-                # 去重但保持个性化字符优先
-                seen = set()
-                deduplicated = []
-                for char_info in suitable_chars:
-                    char = char_info['char']
-                    if char not in seen:
-                        seen.add(char)
-                        deduplicated.append(char_info)
-                
-                suitable_chars = deduplicated[:50]  # 限制字符数量
-                print(f"🔀 混合策略结果: {len(suitable_chars)}个字符")
-            
-            # 生成候选名字组合
-            candidate_names = self.name_generator._generate_name_combinations(
-                surname, suitable_chars, name_length, count * 3  # 生成更多候选
-            )
-            
-            print(f"🎯 候选名字生成: {len(candidate_names)}个")
-            
-            # 评估每个名字
-            evaluated_names = []
-            for name in candidate_names:
-                evaluation = self.name_generator._evaluate_name(surname, name, wuxing_analysis, bazi_result, naming_seed)
-                if evaluation:
-                    evaluated_names.append(evaluation)
-            
-            print(f"📊 名字评估完成: {len(evaluated_names)}个有效名字")
+                naming_seed = '_'.join(str(part) for part in cache_key)
+                stream = naming_result_cache.get(cache_key)
+                print(f"🗃️ 起名结果缓存{'命中' if stream is not None else '未命中'}: 第{page}页")
+            else:
+                naming_seed = self._naming_seed(surname, gender, birth_info, name_length, preferences, session_seed)
+            
+            cached = stream is not None
+            if not cached:
+                pipeline = self._iter_personalized_name_stream(context, name_length, count, preferences, naming_seed)
+                while True:
+                    try:
+                        batch = next(pipeline)
+                    except StopIteration as stop:
+                        stream = stop.value
+                        break
+                    if page == 1:
+                        yield 'names', {'recommendations': [self._recommendation_dict(rec) for rec in batch]}
+                if deterministic:
+                    stream = naming_result_cache.put(cache_key, stream)
+            
+            with context.stage('page'):
+                page_names, has_more = stream.page(page, count)
+            
+            yield 'done', {
+                'recommendations': [self._recommendation_dict(rec) for rec in page_names],
+                'pagination': {
+                    'page': page,
+                    'count': count,
+                    'has_more': has_more,
+                    'deterministic': deterministic,
+                    'cached': cached
+                },
+                'session_seed': session_seed,
+                'complete': context.complete,
+                'incomplete_stages': context.incomplete_stages,
+                'timings_ms': context.timings_report()
+            }
             
-            # 如果候选名字不够，使用增强字库生成更多
-            if len(evaluated_names) < count:
-                print(f"🔧 评估结果不足({len(evaluated_names)}/{count})，使用增强字库补充")
+        except Exception as e:
+            print(f"个性化起名分析错误: {str(e)}")
+            yield 'error', {'error': str(e)}
+    
+    @staticmethod
+    def _naming_seed(surname: str, gender: str, birth_info: Dict, name_length: int,
+                     preferences: Optional[Dict], session_seed: Optional[str]) -> str:
+        """名字生成种子：只由出生信息、会话种子、规范化偏好和名字长度决定（不含时间，同一会话种子重放同一结果）"""
+        base_seed = f"{surname}_{gender}_{birth_info['year']}_{birth_info['month']}_{birth_info['day']}_{birth_info['hour']}"
+        return f"{base_seed}_{session_seed or ''}_{normalize_preferences(preferences)}_{name_length}"
+    
+    @staticmethod
+    def _recommendation_dict(rec: NameRecommendation) -> Dict:
+        """返回给前端的推荐名字"""
+        return {
+            'full_name': rec.full_name,
+            'given_name': rec.given_name,
+            'overall_score': rec.overall_score,
+            'score_breakdown': getattr(rec, 'score_breakdown', None),
+            'wuxing_analysis': rec.wuxing_analysis,
+            'sancai_wuge': rec.sancai_wuge,
+            'meaning_explanation': rec.meaning_explanation,
+            'pronunciation': rec.pronunciation,
+            'luck_level': rec.luck_level
+        }
+    
+    def _personalized_name_stream(self, context: NamingContext, name_length: int, count: int,
+                                  preferences: Dict, naming_seed: str) -> NamingStream:
+        """生成个性化候选名字流（见 _iter_personalized_name_stream）"""
+        pipeline = self._iter_personalized_name_stream(context, name_length, count, preferences, naming_seed)
+        while True:
+            try:
+                next(pipeline)
+            except StopIteration as stop:
+                return stop.value
+    
+    def _iter_personalized_name_stream(self, context: NamingContext, name_length: int, count: int,
+                                       preferences: Dict, naming_seed: str
+                                       ) -> Generator[List[NameRecommendation], None, NamingStream]:
+        """
+        生成个性化候选名字流：第一批按原流程评估排序，“换一批”时按批次种子接着生成
+        （候选名字流可能被缓存，“换一批”不引用本次请求的上下文）
+        
+        每评估完一批名字（以及增强字库补充、高分名字）产出一次，结束时返回候选名字流
+        """
+        surname, gender, birth_info = context.surname, context.gender, context.birth_info
+        bazi_result, wuxing_analysis = context.bazi_result, context.wuxing_analysis
+        
+        # 根据个性化偏好和喜用神筛选汉字
+        suitable_chars = self._personalized_suitable_chars(context, preferences)
+        
+        # 评估第一批候选名字（耗时只计生成和评估，不计调用方处理每批名字的时间）
+        evaluated_names = []
+        batches = self._iter_personalized_batch(
+            surname, gender, suitable_chars, wuxing_analysis, bazi_result, name_length, count, naming_seed, set(),
+            context=context, preferences=preferences
+        )
+        while True:
+            with context.stage('evaluate'):
+                batch = next(batches, None)
+            if batch is None:
+                break
+            evaluated_names.extend(batch)
+            yield batch
+        
+        print(f"📊 名字评估完成: {len(evaluated_names)}个有效名字")
+        
+        # 如果候选名字不够，使用增强字库生成更多
+        if len(evaluated_names) < count:
+            print(f"🔧 评估结果不足({len(evaluated_names)}/{count})，使用增强字库补充")
+            with context.stage('supplement'):
                 additional_names = self._generate_personalized_names_from_enhanced_db(
                     surname, gender, wuxing_analysis, preferences, naming_seed, count - len(evaluated_names)
                 )
-                evaluated_names.extend(additional_names)
-                print(f"✨ 增强字库补充: +{len(additional_names)}个名字")
-            
-            # 排序并返回top N
-            evaluated_names.sort(key=lambda x: x.overall_score, reverse=True)
-            
-            # 确保至少有40%的名字达到90+分
-            high_score_count = sum(1 for rec in evaluated_names if rec.overall_score >= 90)
-            target_high_score = max(2, int(count * 0.4))  # 至少40%，最少2个
-            
-            # 如果高分名字不够，生成更多高质量名字
-            if high_score_count < target_high_score:
+            evaluated_names.extend(additional_names)
+            print(f"✨ 增强字库补充: +{len(additional_names)}个名字")
+            if additional_names:
+                yield additional_names
+        
+        # 排序并返回top N
+        evaluated_names.sort(key=lambda x: x.overall_score, reverse=True)
+        
+        # 确保至少有40%的名字达到90+分
+        high_score_count = sum(1 for rec in evaluated_names if rec.overall_score >= 90)
+        target_high_score = max(2, int(count * 0.4))  # 至少40%，最少2个
+        
+        # 如果高分名字不够，生成更多高质量名字
+        if high_score_count < target_high_score:
+            with context.stage('high_score'):
                 additional_high_score = self._generate_guaranteed_high_score_names(
                     surname, gender, birth_info, name_length, target_high_score - high_score_count, naming_seed
                 )
-                
-                # 替换最低分的名字
-                evaluated_names.sort(key=lambda x: x.overall_score)
-                evaluated_names = evaluated_names[len(additional_high_score):] + additional_high_score
             
-            # 按分数降序排列，确保高分在前
-            evaluated_names.sort(key=lambda x: x.overall_score, reverse=True)
+            # 替换最低分的名字
+            evaluated_names.sort(key=lambda x: x.overall_score)
+            evaluated_names = evaluated_names[len(additional_high_score):] + additional_high_score
+            if additional_high_score:
+                yield additional_high_score
+        
+        # 按分数降序排列，确保高分在前
+        evaluated_names.sort(key=lambda x: x.overall_score, reverse=True)
+        
+        def refill(batch: int, size: int, seen: set) -> List[NameRecommendation]:
+            return self._evaluate_personalized_batch(
+                surname, gender, suitable_chars, wuxing_analysis, bazi_result, name_length, size,
+                f"{naming_seed}_{batch}", seen, preferences=preferences
+            )
+        
+        return NamingStream(evaluated_names, refill, complete=context.complete)
+    
+    def _personalized_suitable_chars(self, context: NamingContext, preferences: Dict) -> List[Dict]:
+        """根据个性化偏好和喜用神筛选汉字，结果太少时混合标准筛选结果"""
+        suitable_chars = list(context.suitable_chars(preferences))
+        
+        print(f"🔍 个性化筛选结果: 找到{len(suitable_chars)}个合适字符")
+        
+        # 如果个性化筛选结果太少，回退到标准筛选并混合个性化元素
+        if len(suitable_chars) < 20:
+            print("⚠️  个性化筛选结果不足，使用混合策略")
             
-            return {
-                'success': True,
-                'bazi_analysis': {
-                    'paipan': bazi_result.get('paipan', {}),
-                    'wuxing_analysis': wuxing_analysis
-                },
-                'recommendations': [
-                    {
-                        'full_name': rec.full_name,
-                        'given_name': rec.given_name,
-                        'overall_score': rec.overall_score,
-                        'score_breakdown': getattr(rec, 'score_breakdown', None),
-                        'wuxing_analysis': rec.wuxing_analysis,
-                        'sancai_wuge': rec.sancai_wuge,
-                        'meaning_explanation': rec.meaning_explanation,
-                        'pronunciation': rec.pronunciation,
-                        'luck_level': rec.luck_level
-                    }
-                    for rec in evaluated_names[:count]  # 确保返回指定数量
-                ],
-                'analysis_summary': wuxing_analysis.get('analysis_summary', ''),
-                'naming_suggestions': self._generate_personalized_suggestions(wuxing_analysis, preferences),
-                'preferences_applied': preferences or {}
-            }
+            # 获取标准筛选结果
+            standard_chars = context.suitable_chars(None)  # 不使用偏好
+            print(f"📚 标准筛选结果: {len(standard_chars)}个字符")
             
-        except Exception as e:
-            print(f"个性化起名分析错误: {str(e)}")
-            return {
-                'success': False,
-                'error': str(e),
-                'recommendations': []
-            }
+            # 合并并优先排序个性化字符
+            suitable_chars.extend(standard_chars)
+            
+            # 去重但保持个性化字符优先
+            seen = set()
+            deduplicated = []
+            for char_info in suitable_chars:
+                char = char_info['char']
+                if char not in seen:
+                    seen.add(char)
+                    deduplicated.append(char_info)
+            
+            suitable_chars = deduplicated[:50]  # 限制字符数量
+            print(f"🔀 混合策略结果: {len(suitable_chars)}个字符")
+        
+        return suitable_chars
+    
+    def _evaluate_personalized_batch(self, surname: str, gender: str, suitable_chars: List[Dict], wuxing_analysis: Dict,
+                                     bazi_result: Dict, name_length: int, count: int, naming_seed: str,
+                                     seen: set, context: NamingContext = None,
+                                     preferences: Dict = None) -> List[NameRecommendation]:
+        """生成并评估一批候选名字（不含已有的名字），按分数降序（context为请求上下文，可为None）"""
+        evaluated_names = [
+            rec for batch in self._iter_personalized_batch(
+                surname, gender, suitable_chars, wuxing_analysis, bazi_result, name_length, count, naming_seed,
+                seen, context, preferences
+            )
+            for rec in batch
+        ]
+        evaluated_names.sort(key=lambda x: x.overall_score, reverse=True)
+        return evaluated_names
+    
+    def _iter_personalized_batch(self, surname: str, gender: str, suitable_chars: List[Dict], wuxing_analysis: Dict,
+                                 bazi_result: Dict, name_length: int, count: int, naming_seed: str,
+                                 seen: set, context: NamingContext = None,
+                                 preferences: Dict = None) -> Iterator[List[NameRecommendation]]:
+        """生成一批候选名字并逐个评估，每评估完count个有效名字产出一次（按候选顺序，未排序；偏好影响常用度分）"""
+        # 生成候选名字组合：双名按网格基础分排名，numpy未安装或单名时生成组合
+        candidate_names = None
+        if name_length == 2:
+            candidate_names = self.name_generator._rank_two_char_names(
+                surname, suitable_chars, wuxing_analysis, count * 3, naming_seed, exclude=seen, gender=gender,
+                context=context, char_quota=max(2, count // 3), preferences=preferences
+            )
+        if candidate_names is None:
+            candidate_names = self.name_generator._generate_name_combinations(
+                surname, suitable_chars, name_length, count * 3, naming_seed  # 生成更多候选
+            )
+            candidate_names = [name for name in candidate_names if name not in seen]
+            if context is not None and context.deadline is not None:
+                # 限时起名：先评估上界高的名字
+                candidate_names = self.name_generator._order_by_score_bound(candidate_names, wuxing_analysis, context)
+        
+        print(f"🎯 候选名字生成: {len(candidate_names)}个")
+        
+        # 评估每个名字（限时起名时间用完时，已评估够count个就停止）
+        evaluated_count = 0
+        batch = []
+        for name in candidate_names:
+            if context is not None and evaluated_count >= count and context.expired():
+                context.cut_short('evaluate')
+                break
+            evaluation = self.name_generator._evaluate_name(
+                surname, name, wuxing_analysis, bazi_result, naming_seed, context, preferences
+            )
+            if evaluation:
+                evaluated_count += 1
+                batch.append(evaluation)
+                if len(batch) >= count:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
     
     def _generate_personalized_names_from_enhanced_db(self, surname: str, gender: str, 
                                                      wuxing_analysis: Dict, preferences: Dict,
@@ -1941,7 +2138,7 @@ class NamingCalculator:
                     
                     # 评估名字
                     evaluation = self.name_generator._evaluate_name(
-                        surname, given_name, wuxing_analysis, {}, naming_seed
+                        surname, given_name, wuxing_analysis, {}, naming_seed, preferences=preferences
                     )
                     
                     if evaluation:
@@ -0,0 +1,125 @@
+"""
+起名请求上下文 - 一次请求内的命盘、五行分析、候选字和单字特征只计算一次
+
+起名各阶段（筛选候选字、生成候选名字、评估、补充高分名字、组装返回结果）都从上下文取数据，
+不再各自重新排盘、重新分析五行；单字属性和康熙笔画在请求内按字缓存。
+上下文同时记录各阶段耗时（毫秒，同名阶段累加；嵌套的阶段同时计入外层），随结果返回 timings_ms。
+上下文只在一个请求内使用，不跨请求共享（跨请求的结果缓存见 naming_cache）。
+
+给出 deadline_ms 时为限时起名：生成候选和评估名字的阶段按“先算上界高的”逐步进行，
+到时间后用已有的最好结果返回（仍返回请求的数量），被截断的阶段记入 incomplete_stages，complete 为 False。
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+try:
+    from .naming_cache import normalize_preferences
+except ImportError:
+    from naming_cache import normalize_preferences
+
+
+class NamingContext:
+    """一次起名请求的计算上下文（不可在线程间共享）"""
+
+    def __init__(self, generator, surname: str, gender: str, birth_info: Dict,
+                 deadline_ms: Optional[float] = None):
+        """
+        Args:
+            generator: NameGenerator（提供排盘、五行分析、字库和候选字筛选）
+            surname: 姓
+            gender: 性别
+            birth_info: 出生信息 {year, month, day, hour, calendar_type}
+            deadline_ms: 时间预算（毫秒，从创建上下文起算），None为不限时
+        """
+        self.generator = generator
+        self.surname = surname
+        self.gender = gender
+        self.birth_info = birth_info
+        self.timings: Dict[str, float] = {}
+        self._started = time.perf_counter()
+        self.deadline_ms = deadline_ms
+        self.deadline = self._started + deadline_ms / 1000 if deadline_ms is not None else None
+        self.incomplete_stages: List[str] = []
+        self._bazi_result = None
+        self._wuxing_analysis = None
+        self._suitable_chars: Dict[str, List[Dict]] = {}
+        self._char_properties: Dict[str, Dict] = {}
+        self._stroke_counts: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """记录一个阶段的耗时（同名阶段累加）"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+
+    def expired(self) -> bool:
+        """时间预算是否已用完（不限时时总为False）"""
+        return self.deadline is not None and time.perf_counter() >= self.deadline
+
+    def cut_short(self, stage: str):
+        """记录因时间预算用完而提前结束的阶段"""
+        if stage not in self.incomplete_stages:
+            self.incomplete_stages.append(stage)
+
+    @property
+    def complete(self) -> bool:
+        """各阶段是否都完整执行（没有因时间预算提前结束）"""
+        return not self.incomplete_stages
+
+    @property
+    def bazi_result(self) -> Dict:
+        """八字排盘结果"""
+        if self._bazi_result is None:
+            birth_info = self.birth_info
+            with self.stage('bazi'):
+                self._bazi_result = self.generator.bazi_calculator.calculate_bazi(
+                    birth_info['year'], birth_info['month'], birth_info['day'],
+                    birth_info['hour'], self.gender, birth_info.get('calendar_type', 'solar')
+                )
+        return self._bazi_result
+
+    @property
+    def wuxing_analysis(self) -> Dict:
+        """八字五行分析（喜用神、忌神等）"""
+        if self._wuxing_analysis is None:
+            bazi_result = self.bazi_result
+            with self.stage('wuxing'):
+                self._wuxing_analysis = self.generator.wuxing_analyzer.analyze_bazi_wuxing(bazi_result)
+        return self._wuxing_analysis
+
+    def suitable_chars(self, preferences: Optional[Dict[str, Any]] = None) -> List[Dict]:
+        """按喜用神（和偏好）筛选的候选字"""
+        key = normalize_preferences(preferences)
+        if key not in self._suitable_chars:
+            wuxing_analysis = self.wuxing_analysis
+            with self.stage('char_pool'):
+                self._suitable_chars[key] = self.generator._filter_chars_by_xiyongshen(
+                    wuxing_analysis['xiyongshen'], self.gender, preferences
+                )
+        return self._suitable_chars[key]
+
+    def char_properties(self, char: str) -> Dict:
+        """单字属性（五行、寓意等，请求内按字缓存，调用方不修改返回的字典）"""
+        properties = self._char_properties.get(char)
+        if properties is None:
+            properties = self._char_properties[char] = self.generator.char_database.get_char_properties(char)
+        return properties
+
+    def stroke_count(self, char: str) -> int:
+        """单字康熙笔画（请求内按字缓存）"""
+        strokes = self._stroke_counts.get(char)
+        if strokes is None:
+            strokes = self._stroke_counts[char] = self.generator.nameology_calculator.calculate_stroke_count(char)
+        return strokes
+
+    def timings_report(self) -> Dict[str, float]:
+        """各阶段耗时和请求总耗时（毫秒）"""
+        report = {name: round(elapsed, 1) for name, elapsed in self.timings.items()}
+        report['total'] = round((time.perf_counter() - self._started) * 1000, 1)
+        return report
@@ -0,0 +1,266 @@
+"""
+请求日志记录与启动预热
+发布后首批请求全部冷启动，延迟很高；此模块记录常见请求输入，启动时预先回放
+
+- RequestLogRecorder：只记录标准化后的输入及出现次数。八字请求只记录输入哈希，
+  不记录姓名、成员ID等信息；出生信息本身保存在结果缓存中，预热时按哈希取回
+- WarmupRunner：启动时在后台线程回放最常见的N个输入，预热八字结果缓存、
+  运势日上下文和字库查询，完成前就绪探针报告未就绪
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+# 请求类型
+KIND_BAZI = "bazi"
+KIND_FORTUNE_DAY = "fortune_day"
+KIND_CHAR_SEARCH = "char_search"
+
+# 默认每类回放的输入数
+DEFAULT_WARMUP_TOP_N = 500
+
+# 预热时间上限（秒），超时后停止回放并报告就绪，避免发布卡住；
+# 阻塞预热期间worker不向gunicorn发心跳，需小于gunicorn的timeout
+DEFAULT_WARMUP_BUDGET_SECONDS = 30
+
+# 记录累积到该条数后批量写入
+_FLUSH_THRESHOLD = 100
+
+
+class RequestLogRecorder:
+    """请求日志记录器 - 按 (类型, 标准化输入) 聚合计数"""
+
+    SCHEMA = [
+        """
+        CREATE TABLE IF NOT EXISTS request_log (
+            kind TEXT NOT NULL,
+            input_key TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            last_seen REAL NOT NULL,
+            PRIMARY KEY (kind, input_key)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_request_log_count ON request_log(kind, count)",
+        "CREATE INDEX IF NOT EXISTS idx_request_log_last_seen ON request_log(last_seen)"
+    ]
+
+    def __init__(self, db_path=os.path.join("cache", "request_log.sqlite3")):
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._pending = Counter()
+
+    def _connection(self) -> sqlite3.Connection:
+        """首次使用时打开连接并初始化表结构"""
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+    def record(self, kind: str, input_key: str):
+        """记录一次请求（仅内存累积，达到阈值后批量写入）"""
+        if not input_key:
+            return
+        with self._lock:
+            self._pending[(kind, input_key)] += 1
+            if sum(self._pending.values()) < _FLUSH_THRESHOLD:
+                return
+        self.flush()
+
+    def record_bazi(self, input_hash: str):
+        """记录八字请求（只记录输入哈希）"""
+        self.record(KIND_BAZI, input_hash)
+
+    def record_fortune_day(self, target_date: str):
+        """记录运势目标日期"""
+        self.record(KIND_FORTUNE_DAY, target_date)
+
+    def record_char_search(self, keyword: str, wuxing=None, gender=None, count=None):
+        """记录字义搜索条件"""
+        self.record(KIND_CHAR_SEARCH, json.dumps(
+            {"keyword": keyword, "wuxing": wuxing, "gender": gender, "count": count},
+            ensure_ascii=False, sort_keys=True
+        ))
+
+    def flush(self):
+        """将累积的记录写入SQLite"""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending:
+            return
+
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute("BEGIN")
+                try:
+                    conn.executemany(
+                        """
+                        INSERT INTO request_log (kind, input_key, count, last_seen) VALUES (?, ?, ?, ?)
+                        ON CONFLICT(kind, input_key) DO UPDATE SET
+                            count = count + excluded.count, last_seen = excluded.last_seen
+                        """,
+                        [(kind, input_key, count, now) for (kind, input_key), count in pending.items()]
+                    )
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+        except Exception as e:
+            print(f"⚠️ 请求日志写入失败: {e}")
+
+    def top(self, kind: str, limit: int = DEFAULT_WARMUP_TOP_N) -> List[str]:
+        """按出现次数降序返回某类请求的标准化输入"""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT input_key FROM request_log WHERE kind = ? ORDER BY count DESC LIMIT ?",
+                (kind, limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def prune(self, max_age_days=30) -> int:
+        """删除长时间未出现的记录"""
+        cutoff = time.time() - max_age_days * 86400
+        with self._lock:
+            cursor = self._connection().execute(
+                "DELETE FROM request_log WHERE last_seen < ?", (cutoff,)
+            )
+        return cursor.rowcount
+
+    def close(self):
+        """写入剩余记录并关闭连接"""
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class WarmupRunner:
+    """启动预热任务 - 回放常见请求，完成后报告就绪"""
+
+    def __init__(self, recorder: RequestLogRecorder, deterministic_calculator=None,
+                 fortune_calculator=None, char_database=None,
+                 top_n=DEFAULT_WARMUP_TOP_N, budget_seconds=DEFAULT_WARMUP_BUDGET_SECONDS):
+        self.recorder = recorder
+        self.deterministic_calculator = deterministic_calculator
+        self.fortune_calculator = fortune_calculator
+        self.char_database = char_database
+        self.top_n = top_n
+        self.budget_seconds = budget_seconds
+        self.ready = threading.Event()
+        self.report = {"status": "pending"}
+        self._thread = None
+
+    def start(self):
+        """在后台线程中执行预热"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+            self._thread.start()
+
+    def run(self) -> Dict[str, Any]:
+        """依次预热各类数据，任一步骤失败不影响其他步骤，结束后标记就绪"""
+        started = time.time()
+        deadline = started + self.budget_seconds
+        self.report = {"status": "running", "steps": {}}
+
+        steps = [
+            ("fortune_day", self._warm_fortune_days),
+            ("bazi", self._warm_bazi),
+            ("char_search", self._warm_char_search)
+        ]
+        try:
+            for name, step in steps:
+                if time.time() >= deadline:
+                    self.report["steps"][name] = {"skipped": "预热超时"}
+                    continue
+                step_started = time.time()
+                try:
+                    result = step(deadline)
+                except Exception as e:
+                    result = {"error": str(e)}
+                    print(f"⚠️ 预热步骤 {name} 失败: {e}")
+                result["elapsed_ms"] = round((time.time() - step_started) * 1000, 1)
+                self.report["steps"][name] = result
+        finally:
+            self.report["status"] = "done"
+            self.report["elapsed_ms"] = round((time.time() - started) * 1000, 1)
+            self.ready.set()
+            print(f"🔥 启动预热完成: {json.dumps(self.report, ensure_ascii=False)}")
+
+        return self.report
+
+    def _warm_fortune_days(self, deadline) -> Dict[str, int]:
+        """预热今明两天及日志中常见的未来日期"""
+        if not self.fortune_calculator:
+            return {"skipped": "运势计算器不可用"}
+
+        today = self._china_today()
+        dates = [today.strftime("%Y-%m-%d"), (today + timedelta(days=1)).strftime("%Y-%m-%d")]
+        for target_date in self.recorder.top(KIND_FORTUNE_DAY, self.top_n):
+            if target_date >= dates[0] and target_date not in dates:
+                dates.append(target_date)
+
+        warmed = 0
+        for target_date in dates:
+            if time.time() >= deadline:
+                break
+            self.fortune_calculator.get_day_context(target_date)
+            warmed += 1
+        return {"warmed": warmed}
+
+    def _warm_bazi(self, deadline) -> Dict[str, int]:
+        """按输入哈希回放最常见的八字请求"""
+        if not self.deterministic_calculator:
+            return {"skipped": "八字结果缓存不可用"}
+
+        input_hashes = self.recorder.top(KIND_BAZI, self.top_n)
+        totals = {"requested": 0, "warmed": 0, "failed": 0}
+        batch_size = 50
+        for start in range(0, len(input_hashes), batch_size):
+            if time.time() >= deadline:
+                break
+            batch = self.deterministic_calculator.warm_up(input_hashes[start:start + batch_size])
+            for key in totals:
+                totals[key] += batch[key]
+        return totals
+
+    def _warm_char_search(self, deadline) -> Dict[str, int]:
+        """回放最常见的字义搜索"""
+        if not self.char_database:
+            return {"skipped": "字库不可用"}
+
+        warmed = 0
+        for input_key in self.recorder.top(KIND_CHAR_SEARCH, self.top_n):
+            if time.time() >= deadline:
+                break
+            query = json.loads(input_key)
+            self.char_database.search_chars_by_meaning(
+                query["keyword"], query["wuxing"], query["gender"], query["count"]
+            )
+            warmed += 1
+        return {"warmed": warmed}
+
+    @staticmethod
+    def _china_today() -> datetime:
+        """中国时区的当前日期，与运势接口保持一致"""
+        try:
+            import pytz
+            return datetime.now(pytz.timezone('Asia/Shanghai'))
+        except ImportError:
+            return datetime.utcnow() + timedelta(hours=8)
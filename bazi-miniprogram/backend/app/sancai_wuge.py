@@ -0,0 +1,259 @@
+"""
+三才五格查表与记忆化
+
+三才五格只取决于姓、名各字的笔画：
+    - 81数理吉凶为81项数组（下标为 (数 - 1) % 81）
+    - 数的五行按尾数查10项表
+    - 三才配置（天格、人格、地格五行）为 5×5×5 = 125 项表，预先算好吉凶评价
+    - 同一组 (姓笔画, 名笔画) 的结果只计算一次，按LRU缓存；
+      为几千个候选名字评分时，同一个姓下笔画相同的名字直接复用结果
+结果为只读字典（FrozenDict），在候选名字、请求、线程之间共享，不再为每个候选复制。
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Sequence, Tuple
+
+
+class FrozenDict(dict):
+    """只读字典：可按普通字典读取、JSON序列化，修改时抛出TypeError"""
+
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("三才五格结果为共享的只读数据，请复制后再修改")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+# 81数理吉凶数据（简化版）
+_MATHEMATICS_LUCK_DATA = {
+    1: {'luck': '大吉', 'desc': '太极之数，万物开泰'},
+    2: {'luck': '凶', 'desc': '两仪之数，混沌未开'},
+    3: {'luck': '大吉', 'desc': '三才之数，天地人和'},
+    4: {'luck': '凶', 'desc': '四象之数，待于生发'},
+    5: {'luck': '大吉', 'desc': '五行之数，循环相生'},
+    6: {'luck': '大吉', 'desc': '六爻之数，发展变化'},
+    7: {'luck': '吉', 'desc': '七政之数，精悍严谨'},
+    8: {'luck': '吉', 'desc': '八卦之数，乾坤震巽'},
+    9: {'luck': '凶', 'desc': '大成之数，蕴涵凶险'},
+    10: {'luck': '凶', 'desc': '终数之数，雪暗飘零'},
+    11: {'luck': '大吉', 'desc': '旱苗逢雨，万物更新'},
+    12: {'luck': '凶', 'desc': '无理之数，发展薄弱'},
+    13: {'luck': '大吉', 'desc': '天才，多才多艺'},
+    14: {'luck': '凶', 'desc': '破兆，家庭缘薄'},
+    15: {'luck': '大吉', 'desc': '福寿，完成学识'},
+    16: {'luck': '大吉', 'desc': '厚重，载德载物'},
+    17: {'luck': '半吉', 'desc': '刚强，突破万难'},
+    18: {'luck': '大吉', 'desc': '有志，有目的志'},
+    19: {'luck': '凶', 'desc': '多难，风云蔽日'},
+    20: {'luck': '凶', 'desc': '非业，非运之空'},
+    21: {'luck': '大吉', 'desc': '明月中天，独立权威'},
+    23: {'luck': '大吉', 'desc': '壮丽，旭日东升'},
+    24: {'luck': '大吉', 'desc': '掘藏得金，家门余庆'},
+    25: {'luck': '半吉', 'desc': '荣俊，资性英敏'},
+    29: {'luck': '半吉', 'desc': '智谋，智谋优秀'},
+    31: {'luck': '大吉', 'desc': '春日花开，智勇得志'},
+    32: {'luck': '大吉', 'desc': '侥幸，龙池跃龙'},
+    33: {'luck': '大吉', 'desc': '升天，家门昌隆'},
+    35: {'luck': '大吉', 'desc': '高楼望月，温和平静'},
+    37: {'luck': '大吉', 'desc': '猛虎出林，权威显达'},
+    39: {'luck': '半吉', 'desc': '富贵，财源进宝'},
+    41: {'luck': '大吉', 'desc': '有德，纯阳独秀'},
+    45: {'luck': '大吉', 'desc': '顺风，新生泰和'},
+    47: {'luck': '大吉', 'desc': '点石成金，花开之象'},
+    48: {'luck': '大吉', 'desc': '古松立鹤，德智兼备'},
+    52: {'luck': '半吉', 'desc': '达眼，卓识达眼'},
+    57: {'luck': '半吉', 'desc': '日照春松，寒雪青松'},
+    63: {'luck': '大吉', 'desc': '舟归平海，富贵繁荣'},
+    65: {'luck': '大吉', 'desc': '巨流归海，富贵长寿'},
+    67: {'luck': '大吉', 'desc': '通达，天赋幸运'},
+    68: {'luck': '大吉', 'desc': '顺风，思虑周密'},
+    81: {'luck': '大吉', 'desc': '万物回春，恒久富贵'}
+}
+
+
+def _default_mathematics_luck(number: int) -> Dict:
+    """未定义的数字的默认吉凶"""
+    if number % 2 == 1 and number < 40:
+        return {'luck': '吉', 'desc': '运势平稳，有所发展'}
+    return {'luck': '平', 'desc': '运势一般，平稳发展'}
+
+
+# 81数理吉凶：下标为 数 - 1
+MATHEMATICS_LUCK: Tuple[FrozenDict, ...] = tuple(
+    FrozenDict(_MATHEMATICS_LUCK_DATA.get(number) or _default_mathematics_luck(number))
+    for number in range(1, 82)
+)
+
+# 吉凶等级得分（五格综合评分、三才得分）
+LUCK_SCORES = {'大吉': 95, '吉': 80, '半吉': 70, '平': 60, '凶': 40, '大凶': 20}
+
+WUXING_ORDER = ('木', '火', '土', '金', '水')
+# 数的五行按尾数：1、2木，3、4火，5、6土，7、8金，9、0水（值为 WUXING_ORDER 下标）
+_TAIL_WUXING_INDEX = (4, 0, 0, 1, 1, 2, 2, 3, 3, 4)
+
+_WUXING_SHENG = {'木': '火', '火': '土', '土': '金', '金': '水', '水': '木'}
+_WUXING_KE = {'木': '土', '土': '水', '水': '火', '火': '金', '金': '木'}
+
+# 有专门评价的三才配置（简化的三才评估）
+_SANCAI_COMBINATIONS = {
+    '木木木': {'luck': '大吉', 'desc': '同心协力，成功发达'},
+    '木木火': {'luck': '大吉', 'desc': '木火通明，前程似锦'},
+    '木火土': {'luck': '大吉', 'desc': '顺序相生，大获成功'},
+    '火土金': {'luck': '大吉', 'desc': '三才相生，富贵双全'},
+    '土金水': {'luck': '大吉', 'desc': '金水相生，智慧过人'},
+    '金水木': {'luck': '大吉', 'desc': '水木清华，文采斐然'},
+    '水木火': {'luck': '大吉', 'desc': '木火通明，事业有成'},
+    '木金土': {'luck': '凶', 'desc': '金克木，多有挫折'},
+    '火水金': {'luck': '凶', 'desc': '水火不容，冲突不断'},
+    '土木水': {'luck': '凶', 'desc': '木土相克，发展受阻'}
+}
+
+
+def is_wuxing_harmonious(w1: str, w2: str, w3: str) -> bool:
+    """判断三个五行是否和谐：有相生关系为和谐，否则有相克关系为不和谐，其他情况认为和谐"""
+    if _WUXING_SHENG.get(w1) == w2 or _WUXING_SHENG.get(w2) == w3:
+        return True
+    if _WUXING_KE.get(w1) == w2 or _WUXING_KE.get(w2) == w3:
+        return False
+    return True
+
+
+def _evaluate_sancai_config(config: str) -> Dict:
+    if config in _SANCAI_COMBINATIONS:
+        return _SANCAI_COMBINATIONS[config]
+    if is_wuxing_harmonious(*config):
+        return {'luck': '吉', 'desc': '三才配置和谐，运势良好'}
+    return {'luck': '平', 'desc': '三才配置一般，需要努力'}
+
+
+# 三才配置表：下标为 天格五行 * 25 + 人格五行 * 5 + 地格五行，值为 (配置, 评价)
+SANCAI_TABLE: Tuple[Tuple[str, FrozenDict], ...] = tuple(
+    (config, FrozenDict(_evaluate_sancai_config(config)))
+    for config in (t + r + d for t in WUXING_ORDER for r in WUXING_ORDER for d in WUXING_ORDER)
+)
+_SANCAI_INDEX = {config: index for index, (config, _) in enumerate(SANCAI_TABLE)}
+
+
+def mathematics_luck(number: int) -> FrozenDict:
+    """81数理吉凶（超过81的数取余）"""
+    return MATHEMATICS_LUCK[(number - 1) % 81]
+
+
+def wuxing_by_number(number: int) -> str:
+    """根据数字尾数确定五行属性"""
+    return WUXING_ORDER[_TAIL_WUXING_INDEX[number % 10]]
+
+
+def evaluate_sancai(tiange_wuxing: str, renge_wuxing: str, dige_wuxing: str) -> FrozenDict:
+    """三才配置的吉凶评价"""
+    return SANCAI_TABLE[_SANCAI_INDEX[tiange_wuxing + renge_wuxing + dige_wuxing]][1]
+
+
+def overall_wuge_score(luck_levels: Sequence[str]) -> Dict:
+    """五格综合评分（各格吉凶等级得分的平均）"""
+    average_score = sum(LUCK_SCORES.get(luck, 60) for luck in luck_levels) / len(luck_levels) if luck_levels else 60
+
+    if average_score >= 85:
+        level = '优秀'
+    elif average_score >= 70:
+        level = '良好'
+    elif average_score >= 60:
+        level = '一般'
+    else:
+        level = '需改善'
+
+    return {
+        'score': round(average_score, 1),
+        'level': level,
+        'description': f'五格综合评分{average_score:.1f}分，等级：{level}'
+    }
+
+
+def _grid(value: int) -> FrozenDict:
+    return FrozenDict({
+        'value': value,
+        'wuxing': wuxing_by_number(value),
+        'luck': mathematics_luck(value)
+    })
+
+
+def _compute_sancai_wuge(surname_strokes: Tuple[int, ...], given_strokes: Tuple[int, ...]) -> FrozenDict:
+    surname_total = sum(surname_strokes)
+    given_total = sum(given_strokes)
+
+    # 五格（单姓天格加1；单名、无名时地格、人格按原规则计）
+    tiange = surname_total + 1 if len(surname_strokes) == 1 else surname_total
+    renge = surname_total + (given_strokes[0] if given_strokes else 1)
+    dige = given_total if given_strokes else 1
+    waige = tiange + dige - renge
+    zongge = surname_total + given_total
+
+    wuge_analysis = FrozenDict({
+        '天格': _grid(tiange),
+        '人格': _grid(renge),
+        '地格': _grid(dige),
+        '外格': _grid(waige),
+        '总格': _grid(zongge)
+    })
+
+    # 三才（天人地三格的五行）按下标查表
+    sancai_config, sancai_evaluation = SANCAI_TABLE[
+        _TAIL_WUXING_INDEX[tiange % 10] * 25 + _TAIL_WUXING_INDEX[renge % 10] * 5 + _TAIL_WUXING_INDEX[dige % 10]
+    ]
+
+    return FrozenDict({
+        'wuge_analysis': wuge_analysis,
+        'sancai_config': sancai_config,
+        'sancai_evaluation': sancai_evaluation,
+        'overall_evaluation': FrozenDict(overall_wuge_score([grid['luck']['luck'] for grid in wuge_analysis.values()]))
+    })
+
+
+# 进程内共享的 (姓笔画, 名笔画) → 结果 缓存
+SANCAI_WUGE_CACHE_SIZE = 4096
+_cache: "OrderedDict[Tuple[Tuple[int, ...], Tuple[int, ...]], FrozenDict]" = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {'hits': 0, 'misses': 0}
+
+
+def sancai_wuge_by_strokes(surname_strokes: Sequence[int], given_strokes: Sequence[int]) -> FrozenDict:
+    """
+    按姓、名各字的康熙笔画计算三才五格（同一组笔画只计算一次）
+
+    Returns:
+        只读的 {wuge_analysis, sancai_config, sancai_evaluation, overall_evaluation}，各调用方共享
+    """
+    key = (tuple(surname_strokes), tuple(given_strokes))
+    with _cache_lock:
+        result = _cache.get(key)
+        if result is not None:
+            _cache.move_to_end(key)
+            _cache_stats['hits'] += 1
+            return result
+        _cache_stats['misses'] += 1
+
+    result = _compute_sancai_wuge(*key)
+    with _cache_lock:
+        _cache[key] = result
+        if len(_cache) > SANCAI_WUGE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+
+def sancai_wuge_cache_stats() -> Dict:
+    """三才五格缓存的命中统计"""
+    with _cache_lock:
+        return {'size': len(_cache), 'max_size': SANCAI_WUGE_CACHE_SIZE, **_cache_stats}
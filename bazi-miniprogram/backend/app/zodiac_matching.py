@@ -592,8 +592,21 @@ class ZodiacMatcher:
                 'timestamp': datetime.now().isoformat()
             }
 
-# 创建全局实例
-zodiac_matcher = ZodiacMatcher()
+# 全局实例在首次配对时创建
+_zodiac_matcher = None
+
+def get_zodiac_matcher() -> ZodiacMatcher:
+    """获取生肖配对实例（首次调用时构建配对矩阵）"""
+    global _zodiac_matcher
+    if _zodiac_matcher is None:
+        _zodiac_matcher = ZodiacMatcher()
+    return _zodiac_matcher
+
+def __getattr__(name):
+    # 兼容 `from zodiac_matching import zodiac_matcher`
+    if name == "zodiac_matcher":
+        return get_zodiac_matcher()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def calculate_zodiac_compatibility(male_zodiac: str, female_zodiac: str) -> Dict[str, Any]:
     """
@@ -606,7 +619,7 @@ def calculate_zodiac_compatibility(male_zodiac: str, female_zodiac: str) -> Dict
     Returns:
         Dict[str, Any]: 包含详细配对分析的结果字典
     """
-    return zodiac_matcher.calculate_comprehensive_match(male_zodiac, female_zodiac)
+    return get_zodiac_matcher().calculate_comprehensive_match(male_zodiac, female_zodiac)
 
 # 测试函数
 def test_zodiac_matching():
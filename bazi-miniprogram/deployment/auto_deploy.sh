@@ -311,6 +311,12 @@ setup_python_environment() {
     # 测试算法模块
     execute_command "cd $project_dir && source venv/bin/activate && python -c 'import sys; sys.path.append(\"backend/app\"); from bazi_calculator import BaziCalculator; print(\"✅ 八字算法模块正常\")'" "测试八字算法模块"
     
+    # 编译字库（mmap加载，字库JSON修改后需重新编译）
+    execute_command "cd $project_dir && source venv/bin/activate && python scripts/compile_char_database.py" "编译字库"
+    
+    # 生成全字符属性库（下载Unicode Unihan数据，用户自选名字中非常用字的笔画、五行、拼音）
+    execute_command "cd $project_dir && source venv/bin/activate && python scripts/build_cjk_char_store.py" "生成全字符库"
+    
     log "✅ Python环境配置完成"
 }
 
@@ -332,8 +338,10 @@ WorkingDirectory=$DEPLOY_PATH/bazi-miniprogram
 Environment=PATH=$DEPLOY_PATH/bazi-miniprogram/venv/bin:\$PATH
 Environment=PYTHONPATH=$DEPLOY_PATH/bazi-miniprogram
 Environment=PYTHONUNBUFFERED=1
-ExecStart=$DEPLOY_PATH/bazi-miniprogram/venv/bin/python main.py
+ExecStart=$DEPLOY_PATH/bazi-miniprogram/venv/bin/python serve.py --bind 0.0.0.0:8001
 ExecReload=/bin/kill -HUP \$MAINPID
+KillSignal=SIGTERM
+TimeoutStopSec=40
 Restart=always
 RestartSec=10
 StandardOutput=journal
@@ -0,0 +1,56 @@
+"""
+Gunicorn 生产配置 - 多worker共享只读参考数据
+
+启动: python serve.py（推荐，命令行参数覆盖环境变量）
+  或: gunicorn -c gunicorn.conf.py "main:create_app()"
+
+主进程预加载应用（preload_app），字库、生肖配对矩阵、历法表等只读数据在fork前初始化一次，
+fork出的worker通过写时复制共享这些内存页。预加载期间关闭GC、fork前执行gc.freeze()，
+把已有对象移入永久代，避免worker中的GC扫描改写对象头导致共享页被复制。
+
+环境变量:
+    BAZI_BIND               监听地址，默认 0.0.0.0:8001
+    BAZI_WORKERS            worker数量，默认 CPU核数
+    BAZI_PRELOAD            是否主进程预加载，默认 1（设为0用于内存对比）
+    BAZI_BACKLOG            监听队列长度，默认 2048
+    BAZI_KEEPALIVE          keep-alive 超时秒数，默认 5
+    BAZI_LIMIT_CONCURRENCY  单worker最大并发连接数，超出返回503，默认不限制
+    BAZI_TIMEOUT            worker无响应超时秒数，默认 60
+    BAZI_GRACEFUL_TIMEOUT   优雅退出等待秒数，默认 30
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv("BAZI_BIND", "0.0.0.0:8001")
+workers = int(os.getenv("BAZI_WORKERS", multiprocessing.cpu_count()))
+preload_app = os.getenv("BAZI_PRELOAD", "1") != "0"
+backlog = int(os.getenv("BAZI_BACKLOG", "2048"))
+keepalive = int(os.getenv("BAZI_KEEPALIVE", "5"))
+timeout = int(os.getenv("BAZI_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("BAZI_GRACEFUL_TIMEOUT", "30"))
+
+# 补充并发上限和优雅退出超时的uvicorn worker，见 serve.py
+worker_class = "serve.BaziUvicornWorker"
+
+# 预加载阶段关闭GC，减少加载参考数据时产生的内存碎片；worker中重新开启
+if preload_app:
+    gc.disable()
+
+
+def when_ready(server):
+    """主进程加载完应用、fork worker之前调用"""
+    if preload_app:
+        # 组件默认延迟初始化，这里在fork前全部创建，使worker共享同一份只读数据
+        from component_registry import component_registry
+        report = component_registry.initialize_all()
+        server.log.info("主进程初始化 %d 个组件，耗时 %.1fms", report["initialized"], report["total_init_ms"])
+        gc.collect()
+        gc.freeze()
+        server.log.info("参考数据已在主进程加载，gc.freeze() 冻结 %d 个对象", gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    """worker进程启动后重新开启GC（冻结的对象不再被扫描）"""
+    gc.enable()
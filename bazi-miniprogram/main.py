@@ -4,22 +4,36 @@
 使用专业八字算法替代模拟数据
 """
 
-from fastapi import FastAPI, HTTPException
+import time
+
+# 启动计时，见 /health/startup
+_IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, APIRouter, HTTPException, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 import os
 import sys
 import socket
 import json
+import hmac
+import secrets
+import threading
 from datetime import datetime
 from typing import Optional, Dict, List
 
 # 添加backend路径以导入算法模块
 sys.path.append('backend/app')
 
-# 分别导入各个模块，允许部分功能可用
+STARTUP_TIMELINE = {}
+
+# 组件只登记工厂函数，首次使用（或启动预热）时才创建实例；
+# 下面的全局变量是延迟代理，导入失败时为None
+from component_registry import component_registry
+
 bazi_calculator = None
 naming_calculator = None
 icon_generator = None
@@ -28,15 +42,41 @@ zodiac_matching_func = None
 # 尝试导入八字计算器
 try:
     from bazi_calculator import BaziCalculator
-    bazi_calculator = BaziCalculator()
+    component_registry.register("bazi_calculator", BaziCalculator, "八字计算器")
+    bazi_calculator = component_registry.proxy("bazi_calculator")
     print("✅ 八字计算器导入成功")
 except ImportError as e:
     print(f"❌ 八字计算器导入失败: {e}")
 
+# 可热更新的只读数据快照（字库、内容模板），见 /api/v1/admin/reload
+from data_snapshot import DataFileWatcher, pin_snapshots
+data_snapshots = {}
+
+# 增强字库（进程内共享实例，起名计算器使用同一实例；热更新后代理指向新快照）
+char_database = None
+try:
+    from enhanced_char_database import get_character_database, character_database_snapshot
+    component_registry.register("char_database", get_character_database, "增强字库（共享实例）",
+                                current=get_character_database)
+    char_database = component_registry.proxy("char_database")
+    data_snapshots["chars"] = character_database_snapshot
+except ImportError as e:
+    print(f"❌ 增强字库导入失败: {e}")
+
+# 内容模板（个性化分析、运势模板库）
+try:
+    from enhanced_content_manager import content_manager_snapshot
+    data_snapshots["templates"] = content_manager_snapshot
+except ImportError as e:
+    print(f"❌ 内容模板导入失败: {e}")
+
 # 尝试导入起名计算器
+naming_result_cache = None
 try:
     from naming_calculator import NamingCalculator
-    naming_calculator = NamingCalculator()
+    from naming_cache import naming_result_cache
+    component_registry.register("naming_calculator", NamingCalculator, "起名计算器")
+    naming_calculator = component_registry.proxy("naming_calculator")
     print("✅ 起名计算器导入成功")
 except ImportError as e:
     print(f"❌ 起名计算器导入失败: {e}")
@@ -47,57 +87,125 @@ print("ℹ️  图标生成器已禁用 - 使用静态Tab图标配置")
 
 # 尝试导入生肖配对
 try:
-    from zodiac_matching import calculate_zodiac_compatibility
+    from zodiac_matching import calculate_zodiac_compatibility, get_zodiac_matcher
+    component_registry.register("zodiac_matcher", get_zodiac_matcher, "生肖配对")
     zodiac_matching_func = calculate_zodiac_compatibility
     print("✅ 生肖配对导入成功")
 except ImportError as e:
     print(f"❌ 生肖配对导入失败: {e}")
 
-# 尝试导入书籍联盟营销服务
+# 尝试导入书籍联盟营销服务（aiohttp 在首次调用联盟API时才导入）
 book_affiliate_service = None
 try:
-    from book_affiliate import BookAffiliateService
-    book_affiliate_service = BookAffiliateService()
+    from book_affiliate import get_book_affiliate_service
+    component_registry.register("book_affiliate_service", get_book_affiliate_service, "书籍联盟营销服务")
+    book_affiliate_service = component_registry.proxy("book_affiliate_service")
     print("✅ 书籍联盟营销服务导入成功")
 except ImportError as e:
     print(f"ℹ️ 书籍联盟营销功能未安装: {e}")
-except Exception as e:
-    print(f"❌ 书籍联盟营销服务初始化失败: {e}")
-    book_affiliate_service = None
 
 # 尝试导入运势计算器
 fortune_calculator = None
 try:
     from fortune_calculator import FortuneCalculator
-    fortune_calculator = FortuneCalculator()
+    component_registry.register("fortune_calculator", FortuneCalculator, "运势计算器")
+    fortune_calculator = component_registry.proxy("fortune_calculator")
     print("✅ 运势计算器导入成功")
 except ImportError as e:
     print(f"❌ 运势计算器导入失败: {e}")
-except Exception as e:
-    print(f"❌ 运势计算器初始化失败: {e}")
-    fortune_calculator = None
 
-# 检查核心算法是否可用
-ALGORITHMS_AVAILABLE = bool(bazi_calculator and naming_calculator)
+# 尝试导入八字结果缓存（LRU + SQLite 两级缓存）
+deterministic_calculator = None
+try:
+    from enhanced_bazi_cache import get_deterministic_calculator
+    component_registry.register("deterministic_calculator", get_deterministic_calculator, "八字结果缓存")
+    deterministic_calculator = component_registry.proxy("deterministic_calculator")
+    print("✅ 八字结果缓存导入成功")
+except ImportError as e:
+    print(f"❌ 八字结果缓存导入失败: {e}")
+
+# 尝试导入请求日志记录与启动预热
+request_recorder = None
+warmup_runner = None
+try:
+    from request_warmup import RequestLogRecorder, WarmupRunner, DEFAULT_WARMUP_TOP_N
+    request_recorder = RequestLogRecorder()
+    warmup_runner = WarmupRunner(
+        request_recorder,
+        deterministic_calculator=deterministic_calculator,
+        fortune_calculator=fortune_calculator,
+        char_database=char_database,
+        top_n=int(os.getenv("WARMUP_TOP_N", DEFAULT_WARMUP_TOP_N))
+    )
+    print("✅ 请求日志与启动预热导入成功")
+except ImportError as e:
+    print(f"❌ 请求日志与启动预热导入失败: {e}")
+
+# 检查核心算法是否可用（只检查模块能否导入，不创建实例）
+ALGORITHMS_AVAILABLE = bazi_calculator is not None and naming_calculator is not None
 print(f"🧮 算法状态: {'核心算法已启用' if ALGORITHMS_AVAILABLE else '降级到模拟数据'}")
 
-# 创建 FastAPI 应用实例
-app = FastAPI(
-    title="八字运势小程序 API (真实算法版)",
-    description="基于传统文化的娱乐性八字测算 API - 使用真实专业算法",
-    version="2.0.0-real",
-    docs_url="/docs",
-    redoc_url="/redoc"
-)
-
-# 配置 CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # 开发环境允许所有来源
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# 生产模式下启动阶段同步完成预热后才开始接收请求
+WARMUP_BLOCKING = os.getenv("BAZI_WARMUP_BLOCKING", "0") == "1"
+
+# 退出时等待后台任务完成的最长时间（秒）
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("BAZI_DRAIN_TIMEOUT", "10"))
+
+# 数据文件监视间隔（秒），文件变化后自动热更新；0为关闭（只能通过管理接口重新加载）
+DATA_WATCH_INTERVAL = float(os.getenv("BAZI_DATA_WATCH_INTERVAL", "0"))
+data_watcher = DataFileWatcher(data_snapshots.values(), DATA_WATCH_INTERVAL)
+
+# 管理接口令牌（请求头 X-Admin-Token），未设置时管理接口关闭
+ADMIN_TOKEN = os.getenv("BAZI_ADMIN_TOKEN", "")
+
+# 接口路由，由 create_app() 挂载到应用实例
+router = APIRouter()
+
+def prepare_worker():
+    """
+    初始化全部组件、安排后台重算热门旧缓存，再回放常见请求预热
+
+    gunicorn 主进程预加载时组件已在 fork 前创建，这里直接复用
+    """
+    started = time.perf_counter()
+    component_registry.initialize_all()
+    STARTUP_TIMELINE["components_ready_ms"] = round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1)
+
+    # 按当前算法组件版本重算热门旧缓存，旧结果在替换前继续服务
+    if deterministic_calculator:
+        deterministic_calculator.schedule_stale_refresh()
+
+    if warmup_runner:
+        warmup_runner.run()
+    # 监视线程在每个worker中启动（主进程中的线程不会被fork）
+    data_watcher.start()
+    STARTUP_TIMELINE["warmup_done_ms"] = round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1)
+    STARTUP_TIMELINE["prepare_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+def build_startup_handler(blocking: bool):
+    """启动预热：阻塞模式下预热完成后才开始接收请求，否则后台预热、完成前就绪探针返回503"""
+    async def start_worker():
+        STARTUP_TIMELINE["startup_ms"] = round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1)
+        if blocking:
+            await run_in_threadpool(prepare_worker)
+        else:
+            threading.Thread(target=prepare_worker, name="warmup", daemon=True).start()
+    return start_worker
+
+async def drain_background_jobs():
+    """退出前停止后台重算（等待正在处理的一条完成）和数据文件监视，并写入剩余的请求日志"""
+    data_watcher.stop(timeout=SHUTDOWN_DRAIN_TIMEOUT)
+    calculator = component_registry.peek("deterministic_calculator")
+    if calculator:
+        if not calculator.refresher.stop(timeout=SHUTDOWN_DRAIN_TIMEOUT):
+            print(f"⚠️ 后台重算未在 {SHUTDOWN_DRAIN_TIMEOUT} 秒内结束")
+    if request_recorder:
+        request_recorder.close()
+
+async def pin_data_snapshots(request, call_next):
+    """请求处理期间固定字库、模板快照：热更新替换快照时，处理中的请求仍使用旧快照完成"""
+    with pin_snapshots(data_snapshots.values()):
+        return await call_next(request)
 
 def get_local_ip():
     """获取本机内网IP地址"""
@@ -144,6 +252,8 @@ class NamingRequest(BaseModel):
     name_length: int = 2
     count: Optional[int] = None
     session_seed: Optional[str] = None
+    # 时间预算（毫秒）：到时间后返回已有的最好结果，data.complete 为 false
+    deadline_ms: Optional[int] = None
 
 class ZodiacMatchingRequest(BaseModel):
     zodiac1: str
@@ -159,6 +269,16 @@ class NameEvaluationRequest(BaseModel):
     birth_hour: int = 12
     calendar_type: str = "solar"
 
+class NameBatchEvaluationRequest(BaseModel):
+    surname: str
+    given_names: List[str]
+    gender: str
+    birth_year: int
+    birth_month: int
+    birth_day: int
+    birth_hour: int = 12
+    calendar_type: str = "solar"
+
 class PersonalizedNamingRequest(BaseModel):
     surname: str
     gender: str
@@ -178,6 +298,11 @@ class PersonalizedNamingRequest(BaseModel):
     selected_chars: Optional[List[str]] = None
     meaning_keywords: Optional[List[str]] = None
     preferences: Optional[Dict] = None
+    # 确定性模式：名字只由会话种子决定并缓存；page>1为“换一批”，从缓存的候选名字流中接着取
+    deterministic: bool = False
+    page: int = 1
+    # 时间预算（毫秒）：到时间后返回已有的最好结果，data.complete 为 false（不完整的结果不缓存）
+    deadline_ms: Optional[int] = None
 
 class CharacterSearchRequest(BaseModel):
     keyword: str
@@ -203,7 +328,7 @@ class SolarToLunarRequest(BaseModel):
     day: int
 
 # 健康检查接口
-@app.get("/")
+@router.get("/")
 async def root():
     return {
         "message": f"八字运势小程序 API 服务正常运行 (真实算法版)",
@@ -214,8 +339,10 @@ async def root():
         "timestamp": datetime.now().isoformat()
     }
 
-@app.get("/health")
+@router.get("/health")
 async def health_check():
+    # 存活探针不触发组件初始化
+    result_cache = component_registry.peek("deterministic_calculator")
     return {
         "status": "healthy",
         "environment": "development",
@@ -231,11 +358,85 @@ async def health_check():
             "sxtwl": "✅ 已安装" if ALGORITHMS_AVAILABLE else "❌ 未安装",
             "zhdate": "✅ 已安装" if ALGORITHMS_AVAILABLE else "❌ 未安装",
             "algorithms": "✅ 已启用" if ALGORITHMS_AVAILABLE else "❌ 降级模式"
-        }
+        },
+        "result_cache": {
+            "algorithm_version": result_cache.cache_manager.algorithm_version,
+            "refresh": result_cache.refresher.status()
+        } if result_cache else None,
+        "naming_cache": naming_result_cache.stats() if naming_result_cache else None
+    }
+
+@router.get("/health/ready")
+async def readiness_check():
+    """就绪探针 - 启动预热完成前返回503，负载均衡据此决定是否转发流量"""
+    if warmup_runner and not warmup_runner.ready.is_set():
+        return JSONResponse(
+            status_code=503,
+            content={"status": "warming_up", "warmup": warmup_runner.report}
+        )
+    return {
+        "status": "ready",
+        "warmup": warmup_runner.report if warmup_runner else None,
+        "timestamp": datetime.now().isoformat()
     }
 
+@router.get("/health/startup")
+async def startup_report():
+    """启动报告 - 模块导入、各组件初始化耗时和内存增量，用于跟踪worker冷启动时间"""
+    return {
+        "timeline_ms": dict(STARTUP_TIMELINE),
+        "components": component_registry.report(),
+        "warmup": warmup_runner.report if warmup_runner else None,
+        "pid": os.getpid(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+class DataReloadRequest(BaseModel):
+    targets: Optional[List[str]] = None
+    wait: bool = False
+
+def require_admin_token(token: Optional[str]):
+    """校验管理接口令牌"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="管理接口未启用（未设置 BAZI_ADMIN_TOKEN）")
+    if not hmac.compare_digest((token or "").encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="管理令牌无效")
+
+def data_snapshot_status() -> Dict:
+    return {
+        "snapshots": {name: holder.status() for name, holder in data_snapshots.items()},
+        "watcher": data_watcher.status(),
+        "pid": os.getpid()
+    }
+
+@router.post("/api/v1/admin/reload")
+async def reload_data(request_data: DataReloadRequest, x_admin_token: Optional[str] = Header(None)):
+    """
+    热更新字库（chars）和内容模板（templates）：后台构建新快照后整体替换，不中断处理中的请求
+
+    只作用于接收请求的worker；多worker部署时请开启 BAZI_DATA_WATCH_INTERVAL 由各worker自行检测
+    """
+    require_admin_token(x_admin_token)
+    targets = request_data.targets or list(data_snapshots)
+    unknown = [target for target in targets if target not in data_snapshots]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"未知的数据类型: {unknown}，可选: {list(data_snapshots)}")
+
+    for target in targets:
+        data_snapshots[target].reload()
+    if request_data.wait:
+        for target in targets:
+            await run_in_threadpool(data_snapshots[target].wait)
+    return {"success": True, "data": data_snapshot_status(), "timestamp": datetime.now().isoformat()}
+
+@router.get("/api/v1/admin/snapshots")
+async def get_data_snapshots(x_admin_token: Optional[str] = Header(None)):
+    """字库、模板快照的版本和热更新状态"""
+    require_admin_token(x_admin_token)
+    return {"success": True, "data": data_snapshot_status(), "timestamp": datetime.now().isoformat()}
+
 # 测试接口
-@app.get("/api/v1/test")
+@router.get("/api/v1/test")
 async def test_api():
     return {
         "message": "API 测试成功",
@@ -249,7 +450,7 @@ async def test_api():
     }
 
 # 网络连接测试接口
-@app.get("/api/v1/network-test")
+@router.get("/api/v1/network-test")
 async def network_test():
     """网络连接测试接口 - 用于小程序验证网络连通性"""
     return {
@@ -265,7 +466,7 @@ async def network_test():
     }
 
 # 统一八字计算接口 - 支持单人和批量计算
-@app.post("/api/v1/calculate-bazi")
+@router.post("/api/v1/calculate-bazi")
 async def calculate_bazi_unified(request_data: dict):
     """统一的八字计算接口 - 支持单人和批量计算"""
     try:
@@ -307,9 +508,14 @@ async def calculate_bazi_single(request_data: dict):
         if ALGORITHMS_AVAILABLE and bazi_calculator:
             # 使用真实算法计算
             try:
-                result = bazi_calculator.calculate_bazi(
-                    year, month, day, hour, gender, calendar_type
-                )
+                result = calculate_bazi_charts([{
+                    "year": year, "month": month, "day": day, "hour": hour,
+                    "gender": gender, "calendar_type": calendar_type
+                }])[0]
+                if isinstance(result, Exception):
+                    raise result
+                if request_recorder:
+                    request_recorder.record_bazi(result.get("input_hash"))
                 
                 # 修复：统一使用FortuneCalculator进行今日运势计算，确保与批量计算一致
                 import pytz
@@ -381,6 +587,7 @@ async def calculate_bazi_batch(request_data: dict):
             raise HTTPException(status_code=400, detail="批量计算需要提供成员数据")
         
         results = []
+        pending_members = []  # (结果位置, 成员ID, 成员名, 出生信息)
         
         for member in members_data:
             try:
@@ -454,96 +661,13 @@ async def calculate_bazi_batch(request_data: dict):
                 
                 print(f"✅ 成员 {member_name} 数据验证成功: year={year}, month={month}, day={day}, hour={hour}, gender={gender}, calendar_type={calendar_type}")
                 
-                # 计算八字
+                # 八字命盘在遍历结束后统一批量计算（一次缓存查询）
                 if ALGORITHMS_AVAILABLE and bazi_calculator:
-                    bazi_result = bazi_calculator.calculate_bazi(
-                        year, month, day, hour, gender, calendar_type
-                    )
-                    
-                    # 计算目标日期的运势
-                    daily_fortune_data = None
-                    has_valid_fortune = False
-                    
-                    if fortune_calculator:
-                        # 修复：转换八字数据格式以匹配FortuneCalculator的期望格式
-                        bazi_for_fortune = {
-                            "year_pillar": bazi_result["bazi"]["year"],
-                            "month_pillar": bazi_result["bazi"]["month"],
-                            "day_pillar": bazi_result["bazi"]["day"],
-                            "hour_pillar": bazi_result["bazi"]["hour"]
-                        }
-                        
-                        fortune_result = fortune_calculator.calculate_daily_fortune(
-                            bazi_for_fortune, target_date
-                        )
-                        if fortune_result["success"]:
-                            daily_fortune_data = fortune_result["data"]
-                            has_valid_fortune = True
-                            print(f"✅ 成员 {member_name} 运势计算成功，运势日期: {target_date}")
-                        else:
-                            error_msg = fortune_result.get('error', '未知错误')
-                            print(f"❌ 成员 {member_name} 运势计算失败: {error_msg}")
-                            print(f"   八字数据: {json.dumps(bazi_for_fortune, ensure_ascii=False)}")
-                            print(f"   目标日期: {target_date}")
-                            # 创建默认的运势数据结构
-                            daily_fortune_data = {
-                                "date": target_date,
-                                "overall_score": 0,
-                                "detailed_scores": {
-                                    "wealth": 0,
-                                    "career": 0,
-                                    "health": 0,
-                                    "love": 0,
-                                    "study": 0
-                                },
-                                "lucky_elements": {
-                                    "lucky_color": "绿色",
-                                    "lucky_colors": ["绿色"],
-                                    "lucky_number": 8,
-                                    "lucky_numbers": [8],
-                                    "lucky_direction": "东方",
-                                    "beneficial_wuxing": "木"
-                                },
-                                "suggestions": ["运势计算失败"],
-                                "warnings": [],
-                                "detailed_analysis": f"运势计算失败: {error_msg}"
-                            }
-                            has_valid_fortune = False
-                    else:
-                        # 没有运势计算器，创建默认数据
-                        daily_fortune_data = {
-                            "date": target_date,
-                            "overall_score": 0,
-                            "detailed_scores": {
-                                "wealth": 0,
-                                "career": 0,
-                                "health": 0,
-                                "love": 0,
-                                "study": 0
-                            },
-                            "lucky_elements": {
-                                "lucky_color": "绿色",
-                                "lucky_colors": ["绿色"],
-                                "lucky_number": 8,
-                                "lucky_numbers": [8],
-                                "lucky_direction": "东方",
-                                "beneficial_wuxing": "木"
-                            },
-                            "suggestions": ["运势服务不可用"],
-                            "warnings": [],
-                            "detailed_analysis": "运势计算服务不可用"
-                        }
-                        has_valid_fortune = False
-                    
-                    # 修复：确保返回的数据结构与前端期望一致
-                    results.append({
-                        "member_id": member_id,
-                        "member_name": member_name,
-                        "daily_fortune": daily_fortune_data,  # 直接提供daily_fortune字段
-                        "has_valid_fortune": has_valid_fortune,
-                        # 同时保留原有八字数据结构
-                        **bazi_result  # 包含bazi, paipan, wuxing, analysis等
-                    })
+                    pending_members.append((len(results), member_id, member_name, {
+                        "year": year, "month": month, "day": day, "hour": hour,
+                        "gender": gender, "calendar_type": calendar_type
+                    }))
+                    results.append(None)
                 else:
                     # 降级方案
                     fallback_result = await calculate_member_fallback(member, target_date)
@@ -558,6 +682,27 @@ async def calculate_bazi_batch(request_data: dict):
                     "error": str(member_error)
                 })
         
+        if request_recorder:
+            request_recorder.record_fortune_day(target_date)
+        
+        if pending_members:
+            charts = calculate_bazi_charts([inputs for _, _, _, inputs in pending_members])
+            for (index, member_id, member_name, _), bazi_result in zip(pending_members, charts):
+                try:
+                    if isinstance(bazi_result, Exception):
+                        raise bazi_result
+                    if request_recorder:
+                        request_recorder.record_bazi(bazi_result.get("input_hash"))
+                    results[index] = build_member_fortune_result(member_id, member_name, bazi_result, target_date)
+                except Exception as member_error:
+                    print(f"成员 {member_name} 计算失败: {str(member_error)}")
+                    results[index] = {
+                        "member_id": member_id,
+                        "member_name": member_name,
+                        "has_valid_fortune": False,
+                        "error": str(member_error)
+                    }
+        
         # 生成家庭运势概览
         family_overview = generate_family_overview(results, target_date)
         
@@ -580,6 +725,114 @@ async def calculate_bazi_batch(request_data: dict):
         print(f"批量八字计算出错: {str(e)}")
         raise HTTPException(status_code=500, detail=f"批量计算出错: {str(e)}")
 
+def calculate_bazi_charts(inputs_list: List[Dict]) -> List:
+    """
+    批量计算八字命盘，优先使用结果缓存
+
+    Args:
+        inputs_list: [{"year", "month", "day", "hour", "gender", "calendar_type"}, ...]
+
+    Returns:
+        与输入顺序一致的结果列表，单条失败时对应位置为异常对象
+    """
+    if deterministic_calculator:
+        return deterministic_calculator.calculate_many(inputs_list)
+
+    charts = []
+    for inputs in inputs_list:
+        try:
+            charts.append(bazi_calculator.calculate_bazi(**inputs))
+        except Exception as e:
+            charts.append(e)
+    return charts
+
+def build_member_fortune_result(member_id, member_name, bazi_result: Dict, target_date: str) -> Dict:
+    """根据成员八字命盘计算目标日期运势，组装批量计算的成员结果"""
+    # 计算目标日期的运势
+    daily_fortune_data = None
+    has_valid_fortune = False
+    
+    if fortune_calculator:
+        # 修复：转换八字数据格式以匹配FortuneCalculator的期望格式
+        bazi_for_fortune = {
+            "year_pillar": bazi_result["bazi"]["year"],
+            "month_pillar": bazi_result["bazi"]["month"],
+            "day_pillar": bazi_result["bazi"]["day"],
+            "hour_pillar": bazi_result["bazi"]["hour"]
+        }
+        
+        fortune_result = fortune_calculator.calculate_daily_fortune(
+            bazi_for_fortune, target_date
+        )
+        if fortune_result["success"]:
+            daily_fortune_data = fortune_result["data"]
+            has_valid_fortune = True
+            print(f"✅ 成员 {member_name} 运势计算成功，运势日期: {target_date}")
+        else:
+            error_msg = fortune_result.get('error', '未知错误')
+            print(f"❌ 成员 {member_name} 运势计算失败: {error_msg}")
+            print(f"   八字数据: {json.dumps(bazi_for_fortune, ensure_ascii=False)}")
+            print(f"   目标日期: {target_date}")
+            # 创建默认的运势数据结构
+            daily_fortune_data = {
+                "date": target_date,
+                "overall_score": 0,
+                "detailed_scores": {
+                    "wealth": 0,
+                    "career": 0,
+                    "health": 0,
+                    "love": 0,
+                    "study": 0
+                },
+                "lucky_elements": {
+                    "lucky_color": "绿色",
+                    "lucky_colors": ["绿色"],
+                    "lucky_number": 8,
+                    "lucky_numbers": [8],
+                    "lucky_direction": "东方",
+                    "beneficial_wuxing": "木"
+                },
+                "suggestions": ["运势计算失败"],
+                "warnings": [],
+                "detailed_analysis": f"运势计算失败: {error_msg}"
+            }
+            has_valid_fortune = False
+    else:
+        # 没有运势计算器，创建默认数据
+        daily_fortune_data = {
+            "date": target_date,
+            "overall_score": 0,
+            "detailed_scores": {
+                "wealth": 0,
+                "career": 0,
+                "health": 0,
+                "love": 0,
+                "study": 0
+            },
+            "lucky_elements": {
+                "lucky_color": "绿色",
+                "lucky_colors": ["绿色"],
+                "lucky_number": 8,
+                "lucky_numbers": [8],
+                "lucky_direction": "东方",
+                "beneficial_wuxing": "木"
+            },
+            "suggestions": ["运势服务不可用"],
+            "warnings": [],
+            "detailed_analysis": "运势计算服务不可用"
+        }
+        has_valid_fortune = False
+    
+    # 修复：确保返回的数据结构与前端期望一致
+    return {
+        "member_id": member_id,
+        "member_name": member_name,
+        "daily_fortune": daily_fortune_data,  # 直接提供daily_fortune字段
+        "has_valid_fortune": has_valid_fortune,
+        # 同时保留原有八字数据结构
+        **bazi_result  # 包含bazi, paipan, wuxing, analysis等
+    }
+
 def generate_family_overview(results: List[Dict], target_date: str) -> Dict:
     """生成家庭运势概览"""
     if not results:
@@ -773,15 +1026,26 @@ async def calculate_bazi_fallback(birth_data: BirthData):
         }
     }
 
+def request_session_seed(naming_data) -> Optional[str]:
+    """
+    起名请求的会话种子：未传且不是确定性模式时生成随机种子（随结果 data.session_seed 返回，
+    传回同一种子即可重放同一结果）；确定性模式未传时保持为空，与缓存键一致
+    """
+    if naming_data.session_seed or getattr(naming_data, 'deterministic', False):
+        return naming_data.session_seed
+    return secrets.token_hex(8)
+
 # 起名接口 - 使用真实算法  
-@app.post("/api/v1/naming/generate")
+@router.post("/api/v1/naming/generate")
 async def generate_names_v1(naming_data: NamingRequest):
     """标准起名接口"""
     return await generate_names(naming_data)
 
-@app.post("/api/v1/naming/generate-names") 
+@router.post("/api/v1/naming/generate-names") 
 async def generate_names(naming_data: NamingRequest):
     """起名接口 - 真实算法版"""
+    if naming_data.deadline_ms is not None and naming_data.deadline_ms <= 0:
+        raise HTTPException(status_code=400, detail="deadline_ms 必须大于0")
     try:
         if ALGORITHMS_AVAILABLE and naming_calculator:
             # 使用真实算法
@@ -794,10 +1058,11 @@ async def generate_names(naming_data: NamingRequest):
                     'calendar_type': naming_data.calendar_type
                 }
                 
+                naming_data.session_seed = request_session_seed(naming_data)
                 result = naming_calculator.analyze_and_generate_names(
                     naming_data.surname, naming_data.gender, birth_info,
                     naming_data.name_length, naming_data.count, 
-                    getattr(naming_data, 'session_seed', None)
+                    naming_data.session_seed, deadline_ms=naming_data.deadline_ms
                 )
                 
                 return {
@@ -860,7 +1125,7 @@ async def generate_names_fallback(naming_data: NamingRequest):
     }
 
 # 生肖配对接口 - 使用多维度算法
-@app.post("/api/v1/zodiac-matching")
+@router.post("/api/v1/zodiac-matching")
 async def zodiac_matching(request_data: ZodiacMatchingRequest):
     """生肖配对接口 - 多维度评分体系"""
     try:
@@ -961,7 +1226,7 @@ async def zodiac_matching_fallback(zodiac1: str, zodiac2: str):
     }
 
 # 节日查询接口
-@app.get("/api/v1/festivals")
+@router.get("/api/v1/festivals")
 async def get_festivals():
     """节日查询接口"""
     try:
@@ -1019,7 +1284,7 @@ async def get_festivals():
 # 注：图标生成接口已移除 - 所有图标现在使用静态配置
 
 # 农历转公历接口
-@app.post("/api/v1/lunar-to-solar")
+@router.post("/api/v1/lunar-to-solar")
 async def lunar_to_solar(request_data: LunarToSolarRequest):
     """农历转公历接口"""
     try:
@@ -1120,7 +1385,7 @@ async def lunar_to_solar(request_data: LunarToSolarRequest):
         raise HTTPException(status_code=500, detail=f"农历转公历失败: {str(e)}")
 
 # 公历转农历接口
-@app.post("/api/v1/solar-to-lunar")
+@router.post("/api/v1/solar-to-lunar")
 async def solar_to_lunar(request_data: SolarToLunarRequest):
     """公历转农历接口"""
     try:
@@ -1207,7 +1472,7 @@ async def solar_to_lunar(request_data: SolarToLunarRequest):
         raise HTTPException(status_code=500, detail=f"公历转农历失败: {str(e)}")
 
 # 名字评估接口
-@app.post("/api/v1/naming/evaluate")
+@router.post("/api/v1/naming/evaluate")
 async def evaluate_name(evaluation_data: NameEvaluationRequest):
     """评估指定名字"""
     try:
@@ -1251,10 +1516,79 @@ async def evaluate_name(evaluation_data: NameEvaluationRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"名字评估失败: {str(e)}")
 
+# 批量评估一次最多的名字数
+MAX_BATCH_EVALUATION_NAMES = 200
+
+@router.post("/api/v1/naming/evaluate-batch")
+async def evaluate_names_batch(evaluation_data: NameBatchEvaluationRequest):
+    """批量评估用户给出的名字（只排盘一次，结果按综合评分降序，含各维度评分）"""
+    if not evaluation_data.given_names:
+        raise HTTPException(status_code=400, detail="需要提供要评估的名字")
+    if len(evaluation_data.given_names) > MAX_BATCH_EVALUATION_NAMES:
+        raise HTTPException(status_code=400, detail=f"一次最多评估 {MAX_BATCH_EVALUATION_NAMES} 个名字")
+    if not (ALGORITHMS_AVAILABLE and naming_calculator):
+        raise HTTPException(status_code=503, detail="起名算法不可用")
+    try:
+        birth_info = {
+            'year': evaluation_data.birth_year,
+            'month': evaluation_data.birth_month,
+            'day': evaluation_data.birth_day,
+            'hour': evaluation_data.birth_hour,
+            'calendar_type': evaluation_data.calendar_type
+        }
+        
+        result = naming_calculator.evaluate_names(
+            evaluation_data.surname,
+            evaluation_data.given_names,
+            evaluation_data.gender,
+            birth_info
+        )
+        
+        return {
+            "success": True,
+            "data": result,
+            "timestamp": datetime.now().isoformat(),
+            "algorithm_version": "真实算法v2.0"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"批量评估名字失败: {str(e)}")
+
+def personalized_preferences(naming_data: PersonalizedNamingRequest) -> Dict:
+    """合并个性化起名请求中的偏好参数（直接参数和preferences字典，era_style映射为era）"""
+    preferences = {}
+    
+    # 从直接参数添加，注意参数映射
+    if naming_data.cultural_level:
+        preferences['cultural_level'] = naming_data.cultural_level
+    if naming_data.popularity:
+        preferences['popularity'] = naming_data.popularity
+    if naming_data.era_style:
+        # 修复参数映射：era_style -> era
+        preferences['era'] = naming_data.era_style
+    if naming_data.rarity:
+        preferences['rarity'] = naming_data.rarity
+    if naming_data.selected_chars:
+        preferences['selected_chars'] = naming_data.selected_chars
+    if naming_data.meaning_keywords:
+        preferences['meaning_keywords'] = naming_data.meaning_keywords
+    
+    # 从preferences字典添加（如果存在）
+    if naming_data.preferences:
+        # 确保preferences字典中的era_style也被正确映射为era
+        prefs_copy = naming_data.preferences.copy()
+        if 'era_style' in prefs_copy and 'era' not in prefs_copy:
+            prefs_copy['era'] = prefs_copy.pop('era_style')
+        preferences.update(prefs_copy)
+    return preferences
+
 # 个性化起名接口 - 新增功能
-@app.post("/api/v1/naming/personalized-generate")
+@router.post("/api/v1/naming/personalized-generate")
 async def generate_personalized_names(naming_data: PersonalizedNamingRequest):
     """个性化起名接口 - 支持用户偏好设置"""
+    if naming_data.page < 1:
+        raise HTTPException(status_code=400, detail="page 从1开始")
+    if naming_data.deadline_ms is not None and naming_data.deadline_ms <= 0:
+        raise HTTPException(status_code=400, detail="deadline_ms 必须大于0")
     try:
         if ALGORITHMS_AVAILABLE and naming_calculator:
             # 使用个性化算法
@@ -1267,38 +1601,18 @@ async def generate_personalized_names(naming_data: PersonalizedNamingRequest):
                     'calendar_type': naming_data.calendar_type
                 }
                 
-                # 构建偏好设置对象，合并所有偏好参数
-                preferences = {}
-                
-                # 从直接参数添加，注意参数映射
-                if naming_data.cultural_level:
-                    preferences['cultural_level'] = naming_data.cultural_level
-                if naming_data.popularity:
-                    preferences['popularity'] = naming_data.popularity
-                if naming_data.era_style:
-                    # 修复参数映射：era_style -> era
-                    preferences['era'] = naming_data.era_style
-                if naming_data.rarity:
-                    preferences['rarity'] = naming_data.rarity
-                if naming_data.selected_chars:
-                    preferences['selected_chars'] = naming_data.selected_chars
-                if naming_data.meaning_keywords:
-                    preferences['meaning_keywords'] = naming_data.meaning_keywords
-                
-                # 从preferences字典添加（如果存在）
-                if naming_data.preferences:
-                    # 确保preferences字典中的era_style也被正确映射为era
-                    prefs_copy = naming_data.preferences.copy()
-                    if 'era_style' in prefs_copy and 'era' not in prefs_copy:
-                        prefs_copy['era'] = prefs_copy.pop('era_style')
-                    preferences.update(prefs_copy)
+                preferences = personalized_preferences(naming_data)
                 
                 print(f"🎯 个性化起名接口: 解析到偏好设置 {preferences}")
                 
+                # 降级到标准起名时沿用同一会话种子
+                naming_data.session_seed = request_session_seed(naming_data)
                 result = naming_calculator.analyze_and_generate_personalized_names(
                     naming_data.surname, naming_data.gender, birth_info,
                     naming_data.name_length, naming_data.count, 
-                    preferences if preferences else None, naming_data.session_seed
+                    preferences if preferences else None, naming_data.session_seed,
+                    deterministic=naming_data.deterministic, page=naming_data.page,
+                    deadline_ms=naming_data.deadline_ms
                 )
                 
                 return {
@@ -1323,8 +1637,64 @@ async def generate_personalized_names(naming_data: PersonalizedNamingRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"个性化起名生成失败: {str(e)}")
 
+# 流式事件的编码：SSE（text/event-stream）或逐行JSON（application/x-ndjson，小程序分块接收时解析更简单）
+STREAM_FORMATS = {
+    "sse": ("text/event-stream",
+            lambda event, data: f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"),
+    "ndjson": ("application/x-ndjson",
+               lambda event, data: json.dumps({"event": event, "data": data}, ensure_ascii=False, default=str) + "\n")
+}
+
+@router.post("/api/v1/naming/personalized-generate/stream")
+async def stream_personalized_names(naming_data: PersonalizedNamingRequest, format: str = "sse"):
+    """
+    个性化起名流式接口（参数同 /personalized-generate，format 为 sse 或 ndjson）
+    
+    依次推送 analysis（八字分析，排盘后立即推送）、names（每评估完一批名字推送一次，分数已确定）、
+    done（本页最终名字、分页、complete、timings_ms）；出错时推送 error 后结束
+    """
+    if format not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"未知的格式: {format}，可选: {list(STREAM_FORMATS)}")
+    if naming_data.page < 1:
+        raise HTTPException(status_code=400, detail="page 从1开始")
+    if naming_data.deadline_ms is not None and naming_data.deadline_ms <= 0:
+        raise HTTPException(status_code=400, detail="deadline_ms 必须大于0")
+    if not (ALGORITHMS_AVAILABLE and naming_calculator):
+        raise HTTPException(status_code=503, detail="起名算法不可用")
+    
+    birth_info = {
+        'year': naming_data.birth_year,
+        'month': naming_data.birth_month,
+        'day': naming_data.birth_day,
+        'hour': naming_data.birth_hour,
+        'calendar_type': naming_data.calendar_type
+    }
+    preferences = personalized_preferences(naming_data)
+    print(f"🌊 个性化起名流式接口: 解析到偏好设置 {preferences}")
+    naming_data.session_seed = request_session_seed(naming_data)
+    events = naming_calculator.iter_personalized_names(
+        naming_data.surname, naming_data.gender, birth_info,
+        naming_data.name_length, naming_data.count,
+        preferences if preferences else None, naming_data.session_seed,
+        deterministic=naming_data.deterministic, page=naming_data.page,
+        deadline_ms=naming_data.deadline_ms
+    )
+    media_type, encode = STREAM_FORMATS[format]
+    
+    async def body():
+        # 响应体在中间件返回后才发送完，推送期间自行固定字库、模板快照；每一步在线程池中计算，不阻塞事件循环
+        with pin_snapshots(data_snapshots.values()):
+            while True:
+                item = await run_in_threadpool(next, events, None)
+                if item is None:
+                    break
+                yield encode(*item)
+    
+    return StreamingResponse(body(), media_type=media_type,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # 字义搜索接口 - 新增功能
-@app.post("/api/v1/naming/search-characters")
+@router.post("/api/v1/naming/search-characters")
 async def search_characters(search_data: CharacterSearchRequest):
     """根据含义关键词搜索汉字"""
     try:
@@ -1336,6 +1706,10 @@ async def search_characters(search_data: CharacterSearchRequest):
                     search_data.gender,
                     search_data.count
                 )
+                if request_recorder:
+                    request_recorder.record_char_search(
+                        search_data.keyword, search_data.wuxing, search_data.gender, search_data.count
+                    )
                 
                 return {
                     "success": True,
@@ -1353,6 +1727,17 @@ async def search_characters(search_data: CharacterSearchRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"字义搜索失败: {str(e)}")
 
+@router.get("/api/v1/naming/search-suggestions")
+async def search_suggestions(keyword: str = "", limit: int = 10):
+    """字义搜索建议（输入联想）：以 keyword 开头的关键词，按能搜到的字数排序"""
+    if not char_database:
+        return {"success": True, "data": [], "timestamp": datetime.now().isoformat()}
+    return {
+        "success": True,
+        "data": char_database.get_search_suggestions(keyword, max(0, min(limit, 50))),
+        "timestamp": datetime.now().isoformat()
+    }
+
 async def search_characters_fallback(search_data: CharacterSearchRequest):
     """字义搜索降级方案"""
     keyword = search_data.keyword
@@ -1423,7 +1808,7 @@ async def search_characters_fallback(search_data: CharacterSearchRequest):
     }
 
 # 字组合推荐接口 - 新增功能
-@app.post("/api/v1/naming/character-combinations")
+@router.post("/api/v1/naming/character-combinations")
 async def get_character_combinations(combination_data: CharacterCombinationRequest):
     """获取字的组合建议"""
     try:
@@ -1508,7 +1893,7 @@ async def get_character_combinations_fallback(combination_data: CharacterCombina
 # 统一使用 /api/v1/calculate-bazi 接口进行所有八字和运势计算
 
 
-@app.post("/api/v1/calculate-bazi-with-fortune")
+@router.post("/api/v1/calculate-bazi-with-fortune")
 async def calculate_bazi_with_fortune(birth_data: BirthData, target_date: Optional[str] = None):
     """增强的八字计算接口 - 同时返回八字和运势"""
     try:
@@ -1549,14 +1934,14 @@ async def calculate_bazi_with_fortune(birth_data: BirthData, target_date: Option
 
 
 # 书籍联盟营销接口 - 新增功能
-@app.post("/api/v1/books/recommendations")
+@router.post("/api/v1/books/recommendations")
 async def get_book_recommendations(request_data: dict):
     """获取书籍推荐"""
     if book_affiliate_service:
         return await book_affiliate_service.get_recommendations(request_data)
     return {"success": False, "message": "联盟营销服务不可用", "data": {"recommendations": []}}
 
-@app.post("/api/v1/books/affiliate-link")
+@router.post("/api/v1/books/affiliate-link")
 async def generate_affiliate_link(request_data: dict):
     """生成联盟推广链接"""
     if book_affiliate_service:
@@ -1567,7 +1952,7 @@ async def generate_affiliate_link(request_data: dict):
         )
     return {"success": False, "message": "联盟营销服务不可用"}
 
-@app.post("/api/v1/books/search")
+@router.post("/api/v1/books/search")
 async def search_books(request_data: dict):
     """搜索书籍"""
     if book_affiliate_service:
@@ -1582,7 +1967,7 @@ async def search_books(request_data: dict):
 # 2. 统计信息由联盟平台后台提供，无需API接口
 
 # 字库统计接口 - 新增功能
-@app.get("/api/v1/naming/database-stats")
+@router.get("/api/v1/naming/database-stats")
 async def get_database_statistics():
     """获取字库统计信息"""
     try:
@@ -1645,7 +2030,6 @@ async def get_database_statistics_fallback():
     }
 
 # 异常处理
-@app.exception_handler(404)
 async def not_found_handler(request, exc):
     return JSONResponse(
         status_code=404,
@@ -1657,7 +2041,6 @@ async def not_found_handler(request, exc):
         }
     )
 
-@app.exception_handler(500)
 async def internal_error_handler(request, exc):
     return JSONResponse(
         status_code=500,
@@ -1680,10 +2063,52 @@ class UnicodeJSONResponse(JSONResponse):
             separators=(",", ":"),
         ).encode("utf-8")
 
-# 覆盖默认JSON响应
-app.default_response_class = UnicodeJSONResponse
+def create_app(blocking_warmup: bool = None) -> FastAPI:
+    """
+    创建 FastAPI 应用实例
+
+    Args:
+        blocking_warmup: 为True时启动阶段同步完成预热后才开始接收请求（生产多worker模式）；
+                         默认读取环境变量 BAZI_WARMUP_BLOCKING
+    """
+    if blocking_warmup is None:
+        blocking_warmup = WARMUP_BLOCKING
+
+    application = FastAPI(
+        title="八字运势小程序 API (真实算法版)",
+        description="基于传统文化的娱乐性八字测算 API - 使用真实专业算法",
+        version="2.0.0-real",
+        docs_url="/docs",
+        redoc_url="/redoc"
+    )
+
+    # 配置 CORS
+    application.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # 开发环境允许所有来源
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    application.middleware("http")(pin_data_snapshots)
+    application.include_router(router)
+    application.add_exception_handler(404, not_found_handler)
+    application.add_exception_handler(500, internal_error_handler)
+
+    application.add_event_handler("startup", build_startup_handler(blocking_warmup))
+    application.add_event_handler("shutdown", drain_background_jobs)
+
+    # 覆盖默认JSON响应
+    application.default_response_class = UnicodeJSONResponse
+    return application
+
+# 模块级应用实例，兼容 uvicorn main:app 及测试；生产环境使用 serve.py
+app = create_app()
+STARTUP_TIMELINE["main_import_ms"] = round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1)
 
 if __name__ == "__main__":
+    # 开发模式（单进程 + 自动重载），生产环境请使用 python serve.py
     print("🚀 启动八字运势小程序 FastAPI 服务器 (真实算法版)")
     print(f"📍 本机IP地址: {LOCAL_IP}")
     print(f"🌐 访问地址: http://{LOCAL_IP}:8001")
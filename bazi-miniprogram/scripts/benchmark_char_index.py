@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+字库属性位图索引基准测试 - 逐字扫描 vs 位图按位与/popcount
+
+以现有字库为模板合成 1k/10k/50k 字的字库（属性分布与真实字库一致），对比:
+  - filter_wuxing:  五行 + 适合起名 + 性别（get_chars_by_wuxing 等的筛选条件）
+  - filter_multi:   再叠加时代、流行度、文化层次
+  - stats:          按五行/性别/时代/流行度分类计数（get_database_stats）
+筛选项只计算得到候选列表的耗时，不含后续打分排序。
+
+用法（在 bazi-miniprogram 目录下）:
+    python scripts/benchmark_char_index.py --sizes 1000 10000 50000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(PROJECT_DIR, 'backend', 'app'))
+
+from char_attribute_index import CharAttributeIndex  # noqa: E402
+
+WUXING = ['金', '木', '水', '火', '土']
+GENDERS = [None, 'male', 'female']
+
+
+def load_template():
+    path = os.path.join(PROJECT_DIR, 'backend', 'data', 'chars', 'chars_main.json')
+    with open(path, 'r', encoding='utf-8') as f:
+        return list(json.load(f)['chars'].values())
+
+
+def synthesize(template, size):
+    """按模板循环生成指定规模的字库，字取自CJK统一汉字区"""
+    return {chr(0x4E00 + i): dict(template[i % len(template)]) for i in range(size)}
+
+
+def scan_filter(char_database, wuxing, gender, **criteria):
+    result = []
+    for char, info in char_database.items():
+        if info.get('wuxing', '木') != wuxing or not info.get('suitable_for_name', True):
+            continue
+        if gender and info.get('gender', 'neutral') not in (gender, 'neutral'):
+            continue
+        if any(info.get(field) != value for field, value in criteria.items()):
+            continue
+        result.append((char, info))
+    return result
+
+
+def scan_stats(char_database):
+    stats = {field: {} for field in ('wuxing', 'gender', 'era', 'popularity')}
+    for info in char_database.values():
+        for field, counts in stats.items():
+            counts[info[field]] = counts.get(info[field], 0) + 1
+    return stats
+
+
+def index_filter(index, wuxing, gender, **criteria):
+    return index.items(index.select(gender=gender, wuxing=wuxing, suitable_for_name=True, **criteria))
+
+
+def index_stats(index):
+    return {field: index.counts(field) for field in ('wuxing', 'gender', 'era', 'popularity')}
+
+
+def timed(function, repeat):
+    """重复执行，返回单次平均耗时(ms)和最后一次的结果"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - started) * 1000 / repeat, result
+
+
+def run(size, template, repeat):
+    char_database = synthesize(template, size)
+    build_ms, index = timed(lambda: CharAttributeIndex(char_database), 3)
+
+    multi = {'era': 'classical', 'popularity': 'high', 'cultural_level': 'classic'}
+    cases = {
+        'filter_wuxing': (
+            lambda: [scan_filter(char_database, w, g) for w in WUXING for g in GENDERS],
+            lambda: [index_filter(index, w, g) for w in WUXING for g in GENDERS]
+        ),
+        'filter_multi': (
+            lambda: [scan_filter(char_database, w, g, **multi) for w in WUXING for g in GENDERS],
+            lambda: [index_filter(index, w, g, **multi) for w in WUXING for g in GENDERS]
+        ),
+        'stats': (lambda: scan_stats(char_database), lambda: index_stats(index))
+    }
+
+    rows = []
+    queries = {'filter_wuxing': 15, 'filter_multi': 15, 'stats': 1}
+    for name, (scan, indexed) in cases.items():
+        scan_ms, scan_result = timed(scan, repeat)
+        index_ms, index_result = timed(indexed, repeat)
+        assert scan_result == index_result, f"{name} 结果不一致"
+        per_query = queries[name]
+        rows.append((size, name, round(scan_ms / per_query, 3), round(index_ms / per_query, 3),
+                     round(scan_ms / index_ms, 1)))
+    return round(build_ms, 1), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="字库属性位图索引基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000], help="字库规模")
+    parser.add_argument("--repeat", type=int, default=20, help="每项重复次数")
+    args = parser.parse_args()
+
+    template = load_template()
+    all_rows = []
+    build_times = {}
+    for size in args.sizes:
+        build_times[size], rows = run(size, template, args.repeat)
+        all_rows.extend(rows)
+
+    print("| 字数 | 操作 | 逐字扫描(ms/次) | 位图索引(ms/次) | 加速比 |")
+    print("|------|------|----------------|----------------|--------|")
+    for size, name, scan_ms, index_ms, speedup in all_rows:
+        print(f"| {size} | {name} | {scan_ms} | {index_ms} | {speedup}x |")
+    print()
+    print("| 字数 | 索引构建(ms) |")
+    print("|------|-------------|")
+    for size, build_ms in build_times.items():
+        print(f"| {size} | {build_ms} |")
+
+
+if __name__ == "__main__":
+    main()
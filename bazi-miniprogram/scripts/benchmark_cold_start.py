@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+冷启动基准测试 - 跟踪worker启动耗时
+
+每轮启动一个全新的Python进程，依次测量:
+  - import_ms:      导入 main（创建应用，不初始化组件）
+  - ready_ms:       执行启动钩子（初始化全部组件并预热）直到就绪
+  - first_<接口>_ms: 就绪后各接口第一次请求的延迟
+并汇总 /health/startup 中各组件的初始化耗时和内存增量。
+加 --lazy 时跳过启动钩子，测量组件在首次请求中初始化的延迟。
+
+用法（在 bazi-miniprogram 目录下）:
+    python scripts/benchmark_cold_start.py --runs 5
+    python scripts/benchmark_cold_start.py --runs 5 --lazy --json cold_start.json
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# 子进程中执行的测量代码，结果以一行JSON输出到标准输出最后一行
+CHILD_CODE = r'''
+import json, os, sys, time
+started = time.perf_counter()
+sys.path.insert(0, ".")
+import main
+from fastapi.testclient import TestClient
+imported = time.perf_counter()
+
+requests = [
+    ("health", "GET", "/health", None),
+    ("calculate_bazi", "POST", "/api/v1/calculate-bazi",
+     # 随机出生日期，避免命中上一轮写入的结果缓存
+     {"year": 1900 + int(os.environ["COLD_START_MINUTE"]), "month": 5,
+      "day": int(os.environ["COLD_START_DAY"]), "hour": 8, "gender": "male"}),
+    ("search_characters", "POST", "/api/v1/naming/search-characters", {"keyword": "智慧", "count": 10}),
+    ("naming_generate", "POST", "/api/v1/naming/generate",
+     {"surname": "李", "gender": "male", "birth_year": 1990, "birth_month": 5, "birth_day": 1, "count": 5}),
+    ("zodiac_matching", "POST", "/api/v1/zodiac-matching", {"zodiac1": "鼠", "zodiac2": "龙"}),
+]
+
+def measure(client):
+    result = {}
+    for name, method, path, body in requests:
+        t = time.perf_counter()
+        client.request(method, path, json=body)
+        result["first_" + name + "_ms"] = round((time.perf_counter() - t) * 1000, 1)
+    return result
+
+result = {"import_ms": round((imported - started) * 1000, 1)}
+if os.environ.get("COLD_START_LAZY") == "1":
+    client = TestClient(main.app)
+    result["ready_ms"] = result["import_ms"]
+    result.update(measure(client))
+else:
+    with TestClient(main.app) as client:
+        result["ready_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        result.update(measure(client))
+        result["startup"] = client.get("/health/startup").json()["components"]["components"]
+print(json.dumps(result, ensure_ascii=False))
+'''
+
+
+def run_once(lazy: bool) -> dict:
+    """在全新进程中测量一次冷启动"""
+    env = dict(os.environ, BAZI_WARMUP_BLOCKING="1", COLD_START_LAZY="1" if lazy else "0",
+               COLD_START_MINUTE=str(random.randrange(60)), COLD_START_DAY=str(random.randrange(1, 29)))
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD_CODE], cwd=PROJECT_DIR, env=env,
+        capture_output=True, text=True, timeout=300
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr[-2000:])
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="worker冷启动基准测试")
+    parser.add_argument("--runs", type=int, default=5, help="测量轮数")
+    parser.add_argument("--lazy", action="store_true", help="不执行启动钩子，组件在首次请求时初始化")
+    parser.add_argument("--json", help="同时将原始数据写入该文件")
+    args = parser.parse_args()
+
+    runs = []
+    for index in range(args.runs):
+        runs.append(run_once(args.lazy))
+        print(f"   第{index + 1}轮: import {runs[-1]['import_ms']}ms, ready {runs[-1]['ready_ms']}ms")
+
+    metrics = [key for key in runs[0] if key.endswith("_ms")]
+    print()
+    print(f"## 冷启动（{'延迟初始化，首次请求触发' if args.lazy else '启动钩子初始化并预热'}，{args.runs} 轮）")
+    print()
+    print("| 指标 | 中位数(ms) | 最小(ms) | 最大(ms) |")
+    print("|------|-----------|---------|---------|")
+    for key in metrics:
+        values = [run[key] for run in runs]
+        print(f"| {key} | {statistics.median(values)} | {min(values)} | {max(values)} |")
+
+    if "startup" in runs[0]:
+        print()
+        print("| 组件 | 初始化中位数(ms) | 内存增量(MB) |")
+        print("|------|-----------------|-------------|")
+        for position, component in enumerate(runs[0]["startup"]):
+            init_values = [run["startup"][position]["init_ms"] or 0 for run in runs]
+            rss_values = [run["startup"][position]["rss_delta_mb"] or 0 for run in runs]
+            print(f"| {component['name']} | {statistics.median(init_values)} | {statistics.median(rss_values)} |")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(runs, f, ensure_ascii=False, indent=2)
+        print(f"\n📄 原始数据已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
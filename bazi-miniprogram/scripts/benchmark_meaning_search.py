@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+字义模糊搜索基准测试 - 逐字子串扫描 vs N-gram倒排索引
+
+以现有字库为模板合成不同规模的字库，对比:
+  - fuzzy:  模糊搜索一层（_fuzzy_meaning_search）
+  - search: 完整的 search_chars_by_meaning（精确/同义词/模糊三层合并排序，不走结果缓存）
+关键词按现有字库自动选取：
+  - 常见单字：出现在最多含义文本中的字
+  - 常见词：出现次数最多的二字组合
+  - 罕见词：只有一个字的含义包含它的二字词
+
+用法（在 bazi-miniprogram 目录下）:
+    python scripts/benchmark_meaning_search.py --sizes 1000 10000 50000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from collections import Counter
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(PROJECT_DIR, 'backend', 'app'))
+os.environ['BAZI_COMPILED_CHAR_DB'] = '0'
+
+from enhanced_char_database import EnhancedCharDatabase  # noqa: E402
+from meaning_ngram_index import MeaningNgramIndex  # noqa: E402
+
+
+def contents_of(info):
+    contents = [info['meaning']] if info.get('meaning') else []
+    return contents + [m for m in info.get('meanings', []) if isinstance(m, str) and m]
+
+
+def pick_keywords(char_database):
+    unigrams, bigrams = Counter(), Counter()
+    for info in char_database.values():
+        text = set()
+        for content in contents_of(info):
+            text.update(content)
+            bigrams.update({content[i:i + 2] for i in range(len(content) - 1)})
+        unigrams.update(text)
+    rare = min((gram for gram, n in bigrams.items() if n == 1), default=None)
+    return {
+        '常见单字': unigrams.most_common(1)[0][0],
+        '常见词': bigrams.most_common(1)[0][0],
+        '罕见词': rare
+    }
+
+
+def synthesize(template, size):
+    """按模板循环生成指定规模的字库（基本区用完后接扩展B区）"""
+    codepoints = [0x4E00 + i if i < 0x5200 else 0x20000 + i - 0x5200 for i in range(size)]
+    return {chr(cp): template[i % len(template)] for i, cp in enumerate(codepoints)}
+
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - started) * 1000 / repeat, result
+
+
+def run(db, template, size, keywords, repeat):
+    db.char_database = synthesize(template, size)
+    db._build_meaning_index()
+    db._build_attribute_index()
+    build_ms, db.ngram_index = timed(lambda: MeaningNgramIndex(db.char_database), 1)
+
+    def uncached_search(keyword):
+        db.search_cache.clear()
+        return db.search_chars_by_meaning(keyword)
+
+    rows = []
+    for label, keyword in keywords.items():
+        scan_ms, scanned = timed(lambda: db._scan_fuzzy_meaning_search(keyword), repeat)
+        index_ms, indexed = timed(lambda: db._fuzzy_meaning_search(keyword), repeat)
+        assert [(c, r) for c, _, r in scanned] == [(c, r) for c, _, r in indexed], f"{keyword} 结果不一致"
+
+        ngram_index = db.ngram_index
+        db.ngram_index = None
+        search_scan_ms, _ = timed(lambda: uncached_search(keyword), repeat)
+        db.ngram_index = ngram_index
+        search_index_ms, _ = timed(lambda: uncached_search(keyword), repeat)
+
+        rows.append((size, f"{label}「{keyword}」", len(indexed), round(scan_ms, 3), round(index_ms, 3),
+                     round(search_scan_ms, 3), round(search_index_ms, 3)))
+    return round(build_ms, 1), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="字义模糊搜索基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000], help="字库规模")
+    parser.add_argument("--repeat", type=int, default=10, help="每项重复次数")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = EnhancedCharDatabase(os.path.join(PROJECT_DIR, 'backend', 'data'))
+    template = list(db.char_database.values())
+    keywords = pick_keywords(db.char_database)
+
+    all_rows, build_times = [], {}
+    for size in args.sizes:
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_times[size], rows = run(db, template, size, keywords, args.repeat)
+        all_rows.extend(rows)
+
+    print("| 字数 | 关键词 | 模糊匹配字数 | 模糊层-扫描(ms) | 模糊层-索引(ms) | 完整搜索-扫描(ms) | 完整搜索-索引(ms) |")
+    print("|------|--------|-------------|----------------|----------------|------------------|------------------|")
+    for row in all_rows:
+        print("| " + " | ".join(str(value) for value in row) + " |")
+    print()
+    print("| 字数 | 索引构建(ms) |")
+    print("|------|-------------|")
+    for size, build_ms in build_times.items():
+        print(f"| {size} | {build_ms} |")
+
+
+if __name__ == "__main__":
+    main()
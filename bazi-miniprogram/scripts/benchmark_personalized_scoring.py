@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+个性化评分基准测试 - 逐字评分 vs 特征矩阵向量化评分
+
+以现有字库为模板合成不同规模的字库，对每个偏好模板（含自定义/避免关键词）对比:
+  - score:     候选字（五行+适合起名+性别）的个性化分数计算（关键词匹配次数按关键词缓存，
+               首轮之后命中缓存）
+  - recommend: 完整的 get_personalized_recommendations（含排序和多样性调整）
+两种方式的推荐结果逐一比对，必须完全一致。
+
+用法（在 bazi-miniprogram 目录下）:
+    python scripts/benchmark_personalized_scoring.py --sizes 1000 10000 50000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(PROJECT_DIR, 'backend', 'app'))
+os.environ['BAZI_COMPILED_CHAR_DB'] = '0'
+
+import enhanced_char_database  # noqa: E402
+from enhanced_char_database import EnhancedCharDatabase  # noqa: E402
+
+WUXING = ['金', '木', '水', '火', '土']
+
+
+def synthesize(template, size):
+    """按模板循环生成指定规模的字库（基本区用完后接扩展B区）"""
+    codepoints = [0x4E00 + i if i < 0x5200 else 0x20000 + i - 0x5200 for i in range(size)]
+    return {chr(cp): template[i % len(template)] for i, cp in enumerate(codepoints)}
+
+
+def profiles(db):
+    result = []
+    for style in ['classical', 'modern', 'balanced', 'literary', 'simple']:
+        result.append(db.create_user_preference_profile({
+            'style_preference': style,
+            'meaning_keywords': ['美', '智慧'],
+            'avoid_keywords': ['病'],
+            'gender': 'female' if style == 'literary' else 'male'
+        }))
+    return result
+
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - started) * 1000 / repeat, result
+
+
+def per_char_scores(db, mask, profile):
+    return [db._calculate_personalized_score(char, info, profile)
+            for char, info in db.attribute_index.items(mask)]
+
+
+def matrix_scores(db, mask, profile):
+    positions = list(db.attribute_index.positions(mask))
+    return db._get_feature_matrix().score(
+        profile,
+        [db._meaning_matches(keyword) for keyword in profile.get('custom_meanings', [])],
+        [db._meaning_matches(keyword) for keyword in profile.get('avoid_meanings', [])]
+    )[positions].tolist()
+
+
+def recommend_all(db, user_profiles, use_matrix):
+    enhanced_char_database.NUMPY_AVAILABLE = use_matrix
+    try:
+        return [db.get_personalized_recommendations(wuxing, profile, 20)
+                for profile in user_profiles for wuxing in WUXING]
+    finally:
+        enhanced_char_database.NUMPY_AVAILABLE = True
+
+
+def run(db, template, size, repeat):
+    db.char_database = synthesize(template, size)
+    db._build_meaning_index()
+    db._build_attribute_index()
+    db._build_ngram_index()
+    db._feature_matrix = None
+    db.meaning_match_cache.clear()
+    build_ms, _ = timed(db._get_feature_matrix, 1)
+
+    user_profiles = profiles(db)
+    masks = [
+        db.attribute_index.select(gender=profile.get('gender_preference'), wuxing=wuxing, suitable_for_name=True)
+        for profile in user_profiles for wuxing in WUXING
+    ]
+    pairs = [(mask, profile) for profile in user_profiles for mask in masks[:len(WUXING)]]
+    queries = len(pairs)
+
+    scan_ms, scanned = timed(lambda: [per_char_scores(db, m, p) for m, p in pairs], repeat)
+    matrix_ms, vectorized = timed(lambda: [matrix_scores(db, m, p) for m, p in pairs], repeat)
+    assert scanned == vectorized, "分数不一致"
+
+    scan_rec_ms, scan_rec = timed(lambda: recommend_all(db, user_profiles, False), repeat)
+    matrix_rec_ms, matrix_rec = timed(lambda: recommend_all(db, user_profiles, True), repeat)
+    assert scan_rec == matrix_rec, "推荐结果不一致"
+
+    recommend_queries = len(user_profiles) * len(WUXING)
+    return round(build_ms, 1), [
+        (size, '评分', round(scan_ms / queries, 3), round(matrix_ms / queries, 3)),
+        (size, '完整推荐', round(scan_rec_ms / recommend_queries, 3), round(matrix_rec_ms / recommend_queries, 3))
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="个性化评分基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000], help="字库规模")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数")
+    args = parser.parse_args()
+
+    if not enhanced_char_database.NUMPY_AVAILABLE:
+        sys.exit("需要安装 numpy")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = EnhancedCharDatabase(os.path.join(PROJECT_DIR, 'backend', 'data'))
+    template = list(db.char_database.values())
+
+    all_rows, build_times = [], {}
+    for size in args.sizes:
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_times[size], rows = run(db, template, size, args.repeat)
+        all_rows.extend(rows)
+
+    print("| 字数 | 操作 | 逐字评分(ms/次) | 特征矩阵(ms/次) | 加速比 |")
+    print("|------|------|----------------|----------------|--------|")
+    for size, name, scan_ms, matrix_ms in all_rows:
+        print(f"| {size} | {name} | {scan_ms} | {matrix_ms} | {round(scan_ms / matrix_ms, 1)}x |")
+    print()
+    print("| 字数 | 特征矩阵构建(ms) |")
+    print("|------|-----------------|")
+    for size, build_ms in build_times.items():
+        print(f"| {size} | {build_ms} |")
+
+
+if __name__ == "__main__":
+    main()
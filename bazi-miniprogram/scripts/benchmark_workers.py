@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多worker吞吐量基准测试 - 对比 1 个与 N 个worker下主要接口的吞吐和延迟
+
+依次以不同worker数启动 serve.py，就绪后对每个接口用多线程长连接并发压测固定时长，
+输出每秒请求数与 p50/p99 延迟。只依赖标准库。
+
+用法（在 bazi-miniprogram 目录下）:
+    python scripts/benchmark_workers.py --workers 1 4 --concurrency 16 --duration 20
+"""
+
+import argparse
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# 压测用出生信息，循环使用以覆盖缓存命中与未命中
+BIRTH_SAMPLES = [
+    {"year": 1960 + i % 50, "month": 1 + i % 12, "day": 1 + i % 28, "hour": i % 24,
+     "gender": "male" if i % 2 else "female"}
+    for i in range(200)
+]
+
+
+def build_requests(index):
+    """各接口第index次请求的 (方法, 路径, 请求体)"""
+    birth = BIRTH_SAMPLES[index % len(BIRTH_SAMPLES)]
+    return {
+        "health": ("GET", "/health", None),
+        "calculate_bazi": ("POST", "/api/v1/calculate-bazi", birth),
+        "calculate_bazi_batch": ("POST", "/api/v1/calculate-bazi", {
+            "batch": True,
+            "members_data": [dict(BIRTH_SAMPLES[(index + k) % len(BIRTH_SAMPLES)], id=k, name=f"成员{k}")
+                             for k in range(5)]
+        }),
+        "search_characters": ("POST", "/api/v1/naming/search-characters",
+                              {"keyword": ["智慧", "美丽", "勇敢", "平安"][index % 4], "count": 20}),
+        "naming_generate": ("POST", "/api/v1/naming/generate", {
+            "surname": "李", "gender": birth["gender"], "birth_year": birth["year"],
+            "birth_month": birth["month"], "birth_day": birth["day"], "birth_hour": birth["hour"],
+            "count": 5
+        })
+    }
+
+
+def run_load(port, endpoint, concurrency, duration):
+    """并发压测单个接口，返回吞吐和延迟统计"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def worker(thread_index):
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        local_latencies = []
+        local_errors = 0
+        index = thread_index
+        while time.time() < deadline:
+            method, path, body = build_requests(index)[endpoint]
+            index += concurrency
+            payload = json.dumps(body) if body is not None else None
+            started = time.perf_counter()
+            try:
+                connection.request(method, path, body=payload,
+                                   headers={"Content-Type": "application/json"})
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    local_errors += 1
+            except Exception:
+                local_errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                continue
+            local_latencies.append(time.perf_counter() - started)
+        connection.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - started
+
+    latencies.sort()
+
+    def percentile(p):
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(0.50), 1),
+        "p99_ms": round(percentile(0.99), 1)
+    }
+
+
+def start_server(workers, port):
+    """启动 serve.py 并等待就绪"""
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--bind", f"127.0.0.1:{port}"],
+        cwd=PROJECT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health/ready", timeout=2) as response:
+                if response.status == 200:
+                    # 等待其余worker完成预热
+                    time.sleep(2 + workers)
+                    return process
+        except Exception:
+            pass
+        time.sleep(0.5)
+    process.kill()
+    raise RuntimeError("服务启动超时")
+
+
+def stop_server(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多worker吞吐量基准测试")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4], help="要对比的worker数")
+    parser.add_argument("--concurrency", type=int, default=16, help="并发连接数")
+    parser.add_argument("--duration", type=float, default=20.0, help="每个接口压测秒数")
+    parser.add_argument("--port", type=int, default=18003, help="测试端口")
+    parser.add_argument("--endpoints", nargs="+", default=list(build_requests(0).keys()), help="要压测的接口")
+    parser.add_argument("--json", help="同时将原始数据写入该文件")
+    args = parser.parse_args()
+
+    results = {}
+    for workers in args.workers:
+        print(f"🚀 启动 {workers} 个worker...")
+        process = start_server(workers, args.port)
+        try:
+            for endpoint in args.endpoints:
+                # 预跑一轮，避免首次请求的缓存未命中影响对比
+                run_load(args.port, endpoint, args.concurrency, min(2.0, args.duration))
+                results[(workers, endpoint)] = run_load(args.port, endpoint, args.concurrency, args.duration)
+                print(f"   {endpoint}: {results[(workers, endpoint)]}")
+        finally:
+            stop_server(process)
+
+    print()
+    print("| 接口 | worker数 | 请求/秒 | p50(ms) | p99(ms) | 错误数 |")
+    print("|------|---------|---------|---------|---------|--------|")
+    for endpoint in args.endpoints:
+        for workers in args.workers:
+            r = results[(workers, endpoint)]
+            print(f"| {endpoint} | {workers} | {r['rps']} | {r['p50_ms']} | {r['p99_ms']} | {r['errors']} |")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([dict(workers=w, endpoint=e, **r) for (w, e), r in results.items()],
+                      f, ensure_ascii=False, indent=2)
+        print(f"\n📄 原始数据已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成全字符属性库（backend/data/cjk/cjk_char_store.bin）
+
+从 Unicode Unihan 数据库提取CJK统一汉字的笔画、部首、拼音，计算康熙笔画和五行:
+    - 笔画:     kTotalStrokes（第一个值，即规范字形）
+    - 康熙笔画: 康熙部首笔画 + 部首外笔画（kRSKangXi，新版Unihan中为 kRSUnicode）；
+                简化字取繁体字（kTraditionalVariant）的康熙笔画，数字一至十按字义计数
+    - 拼音:     kMandarin（第一个读音），声调由声调符号得出
+    - 五行:     起名字库中已有的字以字库为准；其他字按部首归属（木、火、土、金、水等部首），
+                无法按部首判断时按康熙笔画尾数（1、2木，3、4火，5、6土，7、8金，9、0水）
+起名字库（chars_main.json）中已有的字，笔画、五行、拼音以字库为准。
+
+数据文件不提交到仓库，部署脚本在启动服务前执行一次；未生成时查询回退到估算。
+
+用法（在 bazi-miniprogram 目录下）:
+    python scripts/build_cjk_char_store.py                          # 下载最新Unihan并生成
+    python scripts/build_cjk_char_store.py --unihan Unihan.zip      # 使用本地Unihan（zip或解压目录）
+    python scripts/build_cjk_char_store.py --unihan Unihan.zip --all-planes  # 包含扩展B区及以后
+"""
+
+import argparse
+import glob
+import io
+import json
+import os
+import sys
+import tempfile
+import unicodedata
+import urllib.request
+import zipfile
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DATA_DIR = os.path.join(PROJECT_DIR, 'backend', 'data')
+sys.path.insert(0, os.path.join(PROJECT_DIR, 'backend', 'app'))
+
+from cjk_char_store import DEFAULT_STORE_PATH, build_cjk_char_store  # noqa: E402
+
+UNIHAN_URL = "https://www.unicode.org/Public/UCD/latest/ucd/Unihan.zip"
+
+FIELDS = {'kTotalStrokes', 'kRSKangXi', 'kRSUnicode', 'kMandarin', 'kTraditionalVariant'}
+
+# 默认收录的码位范围：扩展A区、基本区、兼容汉字
+BMP_RANGES = [(0x3400, 0x4DBF), (0x4E00, 0x9FFF), (0xF900, 0xFAFF)]
+
+# 康熙部首（1-214）的笔画数：每项为该笔画数的最后一个部首序号
+_RADICAL_STROKE_BOUNDS = [
+    (6, 1), (29, 2), (60, 3), (94, 4), (117, 5), (146, 6), (166, 7), (175, 8),
+    (186, 9), (194, 10), (200, 11), (204, 12), (208, 13), (210, 14), (211, 15), (213, 16), (214, 17)
+]
+
+# 数字按字义计笔画（姓名学惯例）
+NUMERAL_STROKES = {'一': 1, '二': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9, '十': 10}
+
+# 部首五行（康熙部首序号）
+RADICAL_WUXING = {
+    75: '木', 118: '木', 140: '木', 120: '木', 105: '木',
+    86: '火', 72: '火', 73: '火', 106: '火', 184: '火',
+    32: '土', 46: '土', 112: '土', 102: '土', 96: '土', 170: '土', 163: '土',
+    167: '金', 14: '金', 18: '金', 62: '金', 69: '金', 154: '金',
+    85: '水', 15: '水', 173: '水', 195: '水', 174: '水',
+}
+
+STROKE_TAIL_WUXING = {1: '木', 2: '木', 3: '火', 4: '火', 5: '土', 6: '土', 7: '金', 8: '金', 9: '水', 0: '水'}
+
+# 声调符号（分解后的组合字符）→ 声调
+TONE_MARKS = {'̄': 1, '́': 2, '̌': 3, '̀': 4}
+
+
+def radical_strokes(radical: int) -> int:
+    for last, strokes in _RADICAL_STROKE_BOUNDS:
+        if radical <= last:
+            return strokes
+    raise ValueError(f"无效的康熙部首: {radical}")
+
+
+def pinyin_tone(pinyin: str) -> int:
+    """带声调符号拼音的声调，轻声为5"""
+    for mark in unicodedata.normalize('NFD', pinyin):
+        if mark in TONE_MARKS:
+            return TONE_MARKS[mark]
+    return 5
+
+
+def _unihan_lines(path):
+    """逐行读取Unihan数据（zip包或解压后的目录）"""
+    if os.path.isdir(path):
+        for name in sorted(glob.glob(os.path.join(path, 'Unihan*.txt'))):
+            with open(name, encoding='utf-8') as f:
+                yield from f
+        return
+    with zipfile.ZipFile(path) as archive:
+        for name in sorted(archive.namelist()):
+            if name.endswith('.txt'):
+                with archive.open(name) as f:
+                    yield from io.TextIOWrapper(f, encoding='utf-8')
+
+
+def read_unihan(path, ranges):
+    """{码位: {字段: 值}}，只保留所需字段和码位范围"""
+    entries = {}
+    for line in _unihan_lines(path):
+        if not line.startswith('U+'):
+            continue
+        codepoint, field, value = line.rstrip('\n').split('\t', 2)
+        if field not in FIELDS:
+            continue
+        codepoint = int(codepoint[2:], 16)
+        if ranges and not any(start <= codepoint <= end for start, end in ranges):
+            continue
+        entries.setdefault(codepoint, {})[field] = value
+    return entries
+
+
+def _radical_residual(value):
+    """'85.3' → (85, 3)；简化部首 "120'.3" 按对应的康熙部首 → (120, 3)"""
+    radical, residual = value.split()[0].split('.')
+    return int(radical.strip("'\"")), int(residual)
+
+
+def records_from_unihan(entries):
+    """Unihan字段 → 全字符库记录"""
+    def kangxi(codepoint, depth=0):
+        entry = entries.get(codepoint, {})
+        char = chr(codepoint)
+        if char in NUMERAL_STROKES:
+            return NUMERAL_STROKES[char], None
+        value = entry.get('kRSKangXi') or entry.get('kRSUnicode')
+        if not value:
+            return None, None
+        radical, residual = _radical_residual(value)
+        traditional = entry.get('kTraditionalVariant')
+        if traditional and depth == 0:
+            traditional_codepoint = int(traditional.split()[0][2:].split('<')[0], 16)
+            if traditional_codepoint != codepoint and traditional_codepoint in entries:
+                strokes, traditional_radical = kangxi(traditional_codepoint, 1)
+                if strokes:
+                    return strokes, traditional_radical
+        # 没有繁体对应的简化部首字：按康熙部首加部首外笔画近似
+        return radical_strokes(radical) + residual, radical
+
+    records = {}
+    for codepoint, entry in entries.items():
+        total = entry.get('kTotalStrokes')
+        if not total:
+            continue
+        stroke = int(total.split()[0])
+        kangxi_stroke, radical = kangxi(codepoint)
+        kangxi_stroke = kangxi_stroke or stroke
+        pinyin = entry.get('kMandarin', '').split()[0] if entry.get('kMandarin') else None
+        records[chr(codepoint)] = {
+            'stroke': stroke,
+            'kangxi_stroke': kangxi_stroke,
+            'wuxing': RADICAL_WUXING.get(radical) or STROKE_TAIL_WUXING[kangxi_stroke % 10],
+            'pinyin': pinyin,
+            'tone': pinyin_tone(pinyin) if pinyin else None
+        }
+    return records
+
+
+def merge_char_database(records, chars_file):
+    """起名字库中已有的字以字库的笔画、五行、拼音为准"""
+    if not os.path.exists(chars_file):
+        return 0
+    with open(chars_file, encoding='utf-8') as f:
+        chars = json.load(f).get('chars', {})
+    for char, info in chars.items():
+        record = records.setdefault(char, {})
+        for field in ['stroke', 'wuxing', 'pinyin']:
+            if info.get(field):
+                record[field] = info[field]
+        record.setdefault('kangxi_stroke', record.get('stroke'))
+        if record.get('pinyin'):
+            record['tone'] = pinyin_tone(record['pinyin'])
+    return len(chars)
+
+
+def download_unihan(target_dir):
+    path = os.path.join(target_dir, 'Unihan.zip')
+    print(f"⬇️  下载 {UNIHAN_URL}")
+    urllib.request.urlretrieve(UNIHAN_URL, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成全字符属性库")
+    parser.add_argument("--unihan", help="Unihan.zip 或解压目录（默认下载最新版本）")
+    parser.add_argument("--all-planes", action="store_true", help="包含扩展B区及以后（辅助平面）")
+    parser.add_argument("--chars", default=os.path.join(DATA_DIR, 'chars', 'chars_main.json'),
+                        help="起名字库JSON（其中的字以字库为准）")
+    parser.add_argument("--output", default=DEFAULT_STORE_PATH, help="输出文件")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        unihan = args.unihan or download_unihan(temp_dir)
+        entries = read_unihan(unihan, None if args.all_planes else BMP_RANGES)
+
+    records = records_from_unihan(entries)
+    merged = merge_char_database(records, args.chars)
+    summary = build_cjk_char_store(records, args.output, source={
+        "unihan": os.path.basename(args.unihan) if args.unihan else UNIHAN_URL,
+        "chars": os.path.basename(args.chars)
+    })
+    print(f"✅ 全字符库: {summary['chars']} 个字符（其中 {merged} 个以起名字库为准），"
+          f"{summary['blocks']} 个区块，{summary['size'] / 1024:.0f}KB → {summary['output']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+字库内存报告 - 共享实例 vs 重复加载
+
+在全新进程中分别模拟两种情况，测量字库相关对象占用的内存（tracemalloc）、
+进程RSS增量和加载耗时:
+  - duplicate: 改造前的行为，模块导入时创建全局 char_db，起名计算器再创建一个
+  - shared:    所有使用者通过 get_character_database() 共用一个实例
+
+用法（在 bazi-miniprogram 目录下）:
+    python scripts/char_database_memory_report.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+CHILD_CODE = r'''
+import json, os, sys, time, tracemalloc
+sys.path.insert(0, "backend/app")
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+import enhanced_char_database
+from naming_calculator import ChineseCharDatabase
+
+rss_before = rss_mb()
+tracemalloc.start()
+started = time.perf_counter()
+if sys.argv[1] == "duplicate":
+    global_db = enhanced_char_database.EnhancedCharDatabase()
+    naming_db = ChineseCharDatabase(enhanced_char_database.EnhancedCharDatabase())
+    loads = 2
+else:
+    global_db = enhanced_char_database.get_character_database()
+    naming_db = ChineseCharDatabase()
+    loads = 1 if naming_db.enhanced_db is global_db else 2
+elapsed = time.perf_counter() - started
+current, peak = tracemalloc.get_traced_memory()
+print(json.dumps({
+    "loads": loads,
+    "traced_mb": round(current / (1024 * 1024), 2),
+    "peak_mb": round(peak / (1024 * 1024), 2),
+    "rss_delta_mb": round(rss_mb() - rss_before, 2),
+    "load_ms": round(elapsed * 1000, 1)
+}))
+'''
+
+
+def measure(mode):
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD_CODE, mode], cwd=PROJECT_DIR,
+        capture_output=True, text=True, timeout=300
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr[-2000:])
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    results = {mode: measure(mode) for mode in ("duplicate", "shared")}
+
+    print("| 模式 | 加载次数 | 字库对象(MB) | 峰值(MB) | RSS增量(MB) | 加载耗时(ms) |")
+    print("|------|---------|-------------|---------|------------|-------------|")
+    for mode, r in results.items():
+        print(f"| {mode} | {r['loads']} | {r['traced_mb']} | {r['peak_mb']} | {r['rss_delta_mb']} | {r['load_ms']} |")
+
+    saved = round(results["duplicate"]["traced_mb"] - results["shared"]["traced_mb"], 2)
+    print(f"\n每个进程节省约 {saved} MB 字库对象内存，"
+          f"加载耗时减少 {round(results['duplicate']['load_ms'] - results['shared']['load_ms'], 1)} ms")
+
+
+if __name__ == "__main__":
+    main()
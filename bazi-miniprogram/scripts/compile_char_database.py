@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+编译字库 - 将字库JSON编译为mmap加载的列式二进制文件（backend/data/chars/*.bin）
+
+修改字库JSON后运行本脚本；编译文件过期时服务会自动回退到JSON加载，不会读到旧数据。
+编译文件不提交到仓库，部署脚本在启动服务前执行一次。
+
+用法（在 bazi-miniprogram 目录下）:
+    python scripts/compile_char_database.py                   # 编译
+    python scripts/compile_char_database.py --check           # 只检查是否过期，过期时退出码为1
+    python scripts/compile_char_database.py --compare         # 对比JSON与编译字库的启动耗时
+    python scripts/compile_char_database.py --compare --synthetic 50000
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DATA_DIR = os.path.join(PROJECT_DIR, 'backend', 'data')
+sys.path.insert(0, os.path.join(PROJECT_DIR, 'backend', 'app'))
+
+from compiled_char_database import (  # noqa: E402
+    compile_char_database, compiled_path_for, load_compiled_if_fresh
+)
+
+SOURCE_FILES = ['expanded_chars_database.json', 'chars_main.json']
+
+# 子进程中测量字库加载耗时或内存（tracemalloc会拖慢解码，两者分开测量），结果以一行JSON输出
+CHILD_CODE = r'''
+import json, os, sys, time, tracemalloc
+sys.path.insert(0, os.path.join("backend", "app"))
+import enhanced_char_database
+if sys.argv[2] == "memory":
+    tracemalloc.start()
+started = time.perf_counter()
+db = enhanced_char_database.EnhancedCharDatabase(sys.argv[1])
+loaded = time.perf_counter()
+db.get_chars_by_wuxing("木", "male", 20)
+db.search_chars_by_meaning("智慧", count=10)
+queried = time.perf_counter()
+current, _ = tracemalloc.get_traced_memory()
+print(json.dumps({
+    "load_ms": round((loaded - started) * 1000, 1),
+    "first_query_ms": round((queried - loaded) * 1000, 1),
+    "memory_mb": round(current / (1024 * 1024), 2)
+}))
+'''
+
+
+def source_paths(data_dir):
+    chars_dir = os.path.join(data_dir, 'chars')
+    return [os.path.join(chars_dir, name) for name in SOURCE_FILES
+            if os.path.exists(os.path.join(chars_dir, name))]
+
+
+def compile_all(data_dir):
+    for source in source_paths(data_dir):
+        summary = compile_char_database(source)
+        print(f"✅ {os.path.basename(source)} -> {os.path.basename(summary['output'])}: "
+              f"{summary['chars']} 字, {summary['keywords']} 个关键词, "
+              f"{summary['source_bytes'] / 1024:.0f} KB -> {summary['compiled_bytes'] / 1024:.0f} KB")
+
+
+def check_all(data_dir):
+    """检查编译文件是否存在且未过期"""
+    fresh = True
+    for source in source_paths(data_dir):
+        compiled = load_compiled_if_fresh(source)
+        if compiled is None:
+            fresh = False
+            print(f"❌ {os.path.basename(compiled_path_for(source))} 缺失或已过期")
+        else:
+            compiled.close()
+            print(f"✅ {os.path.basename(compiled_path_for(source))} 为最新")
+    return fresh
+
+
+def measure(data_dir, use_compiled, runs):
+    env = dict(os.environ, BAZI_COMPILED_CHAR_DB="1" if use_compiled else "0")
+
+    def run_child(mode):
+        completed = subprocess.run(
+            [sys.executable, "-c", CHILD_CODE, data_dir, mode], cwd=PROJECT_DIR, env=env,
+            capture_output=True, text=True, timeout=600
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(completed.stderr[-2000:])
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    timings = [run_child("time") for _ in range(runs)]
+    result = {key: statistics.median(r[key] for r in timings) for key in ("load_ms", "first_query_ms")}
+    result["total_ms"] = round(result["load_ms"] + result["first_query_ms"], 1)
+    # 内存为加载并完成首次查询后字库相关对象的占用
+    result["memory_mb"] = run_child("memory")["memory_mb"]
+    return result
+
+
+def synthesize(size, workdir):
+    """按现有字库循环生成指定规模的字库目录"""
+    with open(os.path.join(DATA_DIR, 'chars', 'chars_main.json'), 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    template = list(data['chars'].values())
+    # 基本区（U+4E00-U+9FFF）用完后接扩展B区，避免落入代理区
+    codepoints = [0x4E00 + i if i < 0x5200 else 0x20000 + i - 0x5200 for i in range(size)]
+    data['chars'] = {chr(cp): template[i % len(template)] for i, cp in enumerate(codepoints)}
+
+    chars_dir = os.path.join(workdir, 'chars')
+    os.makedirs(chars_dir)
+    with open(os.path.join(chars_dir, 'chars_main.json'), 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    shutil.copy(os.path.join(DATA_DIR, 'chars', 'chars_meaning_tags.json'), chars_dir)
+    return workdir
+
+
+def compare(data_dir, runs, label):
+    compile_all(data_dir)
+    json_result = measure(data_dir, False, runs)
+    compiled_result = measure(data_dir, True, runs)
+    rows = [(label, "JSON", json_result), (label, "编译字库(mmap)", compiled_result)]
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="编译字库JSON为二进制文件")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="字库数据目录（含chars子目录）")
+    parser.add_argument("--check", action="store_true", help="只检查编译文件是否最新")
+    parser.add_argument("--compare", action="store_true", help="对比JSON与编译字库的加载耗时和内存")
+    parser.add_argument("--synthetic", type=int, nargs="*", default=[], help="同时用合成的指定规模字库对比")
+    parser.add_argument("--runs", type=int, default=5, help="对比时每种方式的测量轮数（取中位数）")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if check_all(args.data_dir) else 1)
+
+    if not args.compare:
+        compile_all(args.data_dir)
+        return
+
+    rows = compare(args.data_dir, args.runs, "现有字库")
+    for size in args.synthetic:
+        with tempfile.TemporaryDirectory() as workdir:
+            rows.extend(compare(synthesize(size, workdir), args.runs, f"合成 {size} 字"))
+
+    print()
+    print("| 字库 | 加载方式 | 加载耗时(ms) | 首次查询(ms) | 合计(ms) | 字库内存(MB) |")
+    print("|------|---------|-------------|-------------|---------|-------------|")
+    for label, mode, r in rows:
+        print(f"| {label} | {mode} | {r['load_ms']} | {r['first_query_ms']} | {r['total_ms']} | {r['memory_mb']} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预计算双字名排名（backend/data/rankings/name_rankings.bin）
+
+按 常见姓氏 × 喜用神/忌神组合 × 性别 计算双字名候选网格，保存每张网格加权基础分最高的前 top_n 个名字，
+在线起名时直接查表（见 backend/app/name_rankings.py）。喜用神/忌神组合由八字的五行数量
+（8个天干地支）全部取值经 WuxingAnalyzer.calculate_xiyongshen 得出；笔画总数相同的姓共用一份排名。
+
+修改字库JSON或重新生成全字符库后需要重新运行（过期的排名不会被使用，起名回退到在线网格评分）。
+数据文件不提交到仓库，部署脚本在启动服务前执行一次（需要numpy）。
+
+用法（在 bazi-miniprogram 目录下）:
+    python scripts/precompute_name_rankings.py                    # 生成
+    python scripts/precompute_name_rankings.py --top-n 1000       # 每个排名保留的名字数
+    python scripts/precompute_name_rankings.py --surnames 张 欧阳  # 指定姓氏（默认为常见的100个姓）
+    python scripts/precompute_name_rankings.py --check            # 只检查是否过期，过期时退出码为1
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(PROJECT_DIR, 'backend', 'app'))
+
+from name_grid_scorer import NUMPY_AVAILABLE  # noqa: E402
+from name_rankings import (  # noqa: E402
+    DEFAULT_RANKINGS_PATH, DEFAULT_TOP_N, WUXING_ORDER, NameRankingStore, build_name_rankings, ranking_key
+)
+from naming_calculator import NameGenerator  # noqa: E402
+
+# 人口最多的100个姓（第七次全国人口普查）
+TOP_SURNAMES = [
+    '王', '李', '张', '刘', '陈', '杨', '黄', '赵', '吴', '周', '徐', '孙', '马', '胡', '朱', '郭', '何', '罗', '高', '林',
+    '郑', '梁', '谢', '唐', '许', '冯', '宋', '韩', '邓', '彭', '曹', '曾', '田', '于', '肖', '潘', '袁', '董', '叶', '杜',
+    '丁', '蒋', '程', '余', '吕', '魏', '蔡', '苏', '任', '卢', '沈', '姜', '姚', '钟', '崔', '陆', '谭', '汪', '石', '付',
+    '贾', '范', '金', '方', '韦', '夏', '廖', '侯', '白', '孟', '邹', '秦', '尹', '江', '熊', '薛', '邱', '闫', '段', '雷',
+    '季', '史', '陶', '毛', '贺', '龙', '万', '顾', '关', '郝', '孔', '向', '龚', '邵', '钱', '武', '严', '黎', '汤', '戴'
+]
+
+GENDERS = ('male', 'female')
+
+# 八字四柱的天干地支共8个
+BAZI_ELEMENTS = 8
+
+
+def xiyongshen_profiles(analyzer):
+    """五行数量全部取值对应的 (喜用神, 忌神) 组合（另含五行数量缺失时的默认组合）"""
+    profiles = {}
+    counts_options = [counts for counts in itertools.product(range(BAZI_ELEMENTS + 1), repeat=len(WUXING_ORDER))
+                      if sum(counts) in (0, BAZI_ELEMENTS)]
+    for counts in counts_options:
+        result = analyzer.calculate_xiyongshen(dict(zip(WUXING_ORDER, counts)))
+        profiles.setdefault((tuple(result['喜用神']), tuple(result['忌神'])), None)
+    return list(profiles)
+
+
+def generate(output_path, surnames, top_n):
+    generator = NameGenerator()
+    stroke_count = generator.nameology_calculator.calculate_stroke_count
+    # 笔画总数相同的姓共用一份排名，每组取一个姓计算
+    representatives = {}
+    for surname in surnames:
+        strokes = tuple(stroke_count(char) for char in surname)
+        representatives.setdefault((len(strokes), sum(strokes)), surname)
+    profiles = xiyongshen_profiles(generator.wuxing_analyzer)
+    print(f"🧮 {len(surnames)} 个姓（{len(representatives)} 种笔画），{len(profiles)} 种喜用神/忌神组合，"
+          f"{len(GENDERS)} 种性别，每个排名前 {top_n} 个名字")
+
+    char_lists = {}
+
+    def rankings():
+        for xiyongshen, jishen in profiles:
+            wuxing_analysis = {'xiyongshen': list(xiyongshen), 'jishen': list(jishen)}
+            for gender in GENDERS:
+                if (xiyongshen, gender) not in char_lists:
+                    chars = generator._filter_chars_by_xiyongshen(list(xiyongshen), gender)
+                    char_lists[(xiyongshen, gender)] = generator._expand_name_chars(chars)
+                char_list = char_lists[(xiyongshen, gender)]
+                for surname in representatives.values():
+                    scorer = generator._build_name_grid(surname, char_list, wuxing_analysis)
+                    key = ranking_key([stroke_count(char) for char in surname], xiyongshen, jishen, gender)
+                    yield key, char_list, len(scorer), scorer.ranking(top_n)
+
+    started = time.perf_counter()
+    summary = build_name_rankings(rankings(), output_path, top_n=top_n)
+    print(f"✅ {os.path.basename(summary['output'])}: {summary['rankings']} 个排名，{summary['names']} 个名字，"
+          f"{summary['size'] / (1024 * 1024):.1f} MB，耗时 {time.perf_counter() - started:.1f}s")
+
+
+def check(path):
+    """检查排名文件是否存在且未过期"""
+    if not os.path.exists(path):
+        print(f"❌ {os.path.basename(path)} 不存在")
+        return False
+    store = NameRankingStore(path)
+    try:
+        reason = store.stale_reason()
+    finally:
+        store.close()
+    if reason:
+        print(f"❌ {os.path.basename(path)} 已过期: {reason}")
+        return False
+    print(f"✅ {os.path.basename(path)} 为最新")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预计算常见姓氏的双字名排名")
+    parser.add_argument("--output", default=os.getenv("BAZI_NAME_RANKINGS", DEFAULT_RANKINGS_PATH), help="输出文件")
+    parser.add_argument("--surnames", nargs="+", default=TOP_SURNAMES, help="姓氏（默认为常见的100个姓）")
+    parser.add_argument("--top-n", type=int, default=DEFAULT_TOP_N, help="每个排名保留的名字数")
+    parser.add_argument("--check", action="store_true", help="只检查排名文件是否最新")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if check(args.output) else 1)
+
+    if not NUMPY_AVAILABLE:
+        print("❌ 预计算排名需要numpy")
+        sys.exit(1)
+    generate(args.output, args.surnames, args.top_n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多worker内存对比报告 - 主进程预加载 vs 各worker独立加载
+
+分别以 BAZI_PRELOAD=0 / 1 启动 gunicorn（gunicorn.conf.py），等待就绪后读取每个
+worker的 /proc/<pid>/smaps_rollup，输出 RSS、PSS、共享/私有内存对比表。
+PSS按共享进程数分摊共享页，比RSS更能反映每个worker的实际占用。
+
+仅支持Linux。用法（在 bazi-miniprogram 目录下）:
+    python scripts/worker_memory_report.py --workers 4
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+MEMORY_FIELDS = ["Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"]
+
+
+def read_memory_kb(pid):
+    """读取进程内存统计（kB）"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup", 'r') as f:
+        for line in f:
+            parts = line.split()
+            name = parts[0].rstrip(':')
+            if name in MEMORY_FIELDS:
+                values[name] = int(parts[1])
+    return values
+
+
+def child_pids(parent_pid):
+    """查找直接子进程"""
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", 'r') as f:
+                # 进程名可能含空格，从最后一个右括号之后解析
+                fields = f.read().rsplit(')', 1)[1].split()
+            if int(fields[1]) == parent_pid:
+                children.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return sorted(children)
+
+
+def wait_until_ready(port, workers, master_pid, timeout):
+    """等待就绪探针返回200且全部worker已启动"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health/ready", timeout=2) as response:
+                if response.status == 200 and len(child_pids(master_pid)) >= workers:
+                    return True
+        except Exception:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def measure(preload, workers, port, settle, timeout):
+    """以指定模式启动gunicorn并采集各worker内存"""
+    env = dict(os.environ, BAZI_PRELOAD="1" if preload else "0",
+               BAZI_WORKERS=str(workers), BAZI_BIND=f"127.0.0.1:{port}")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+        cwd=PROJECT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        if not wait_until_ready(port, workers, process.pid, timeout):
+            raise RuntimeError(f"gunicorn 在 {timeout} 秒内未就绪")
+        time.sleep(settle)
+
+        worker_stats = [read_memory_kb(pid) for pid in child_pids(process.pid)]
+        return {
+            "preload": preload,
+            "master": read_memory_kb(process.pid),
+            "workers": worker_stats
+        }
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def summarize(report):
+    """汇总worker平均值和合计PSS"""
+    workers = report["workers"]
+    count = len(workers) or 1
+    averages = {field: sum(w.get(field, 0) for w in workers) / count for field in MEMORY_FIELDS}
+    total_pss = sum(w.get("Pss", 0) for w in workers) + report["master"].get("Pss", 0)
+    return averages, total_pss
+
+
+def print_table(reports):
+    """输出Markdown对比表（单位MB）"""
+    print("| 模式 | worker数 | 平均RSS | 平均PSS | 平均共享 | 平均私有 | 总PSS(含主进程) |")
+    print("|------|---------|---------|---------|----------|----------|-----------------|")
+    for report in reports:
+        averages, total_pss = summarize(report)
+        shared = averages["Shared_Clean"] + averages["Shared_Dirty"]
+        private = averages["Private_Clean"] + averages["Private_Dirty"]
+        mode = "主进程预加载" if report["preload"] else "worker独立加载"
+        print(f"| {mode} | {len(report['workers'])} | {averages['Rss'] / 1024:.1f} | "
+              f"{averages['Pss'] / 1024:.1f} | {shared / 1024:.1f} | {private / 1024:.1f} | "
+              f"{total_pss / 1024:.1f} |")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多worker内存对比报告")
+    parser.add_argument("--workers", type=int, default=4, help="worker数量")
+    parser.add_argument("--port", type=int, default=18001, help="测试端口")
+    parser.add_argument("--settle", type=float, default=3.0, help="就绪后等待秒数")
+    parser.add_argument("--timeout", type=float, default=120.0, help="启动超时秒数")
+    parser.add_argument("--json", help="同时将原始数据写入该文件")
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("❌ 当前系统不支持 /proc/<pid>/smaps_rollup，仅支持Linux 4.14+")
+        sys.exit(1)
+
+    reports = []
+    for preload in (False, True):
+        print(f"🔍 测量{'主进程预加载' if preload else 'worker独立加载'}模式...")
+        reports.append(measure(preload, args.workers, args.port, args.settle, args.timeout))
+
+    print()
+    print_table(reports)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+        print(f"\n📄 原始数据已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
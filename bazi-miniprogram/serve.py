@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+八字运势小程序 - 生产环境启动入口
+多worker（gunicorn + uvicorn worker），主进程预加载参考数据，每个worker预热完成后才接收请求
+
+用法:
+    python serve.py --workers 4 --bind 0.0.0.0:8001
+    python serve.py --help
+
+命令行参数优先于环境变量，环境变量说明见 gunicorn.conf.py。开发调试仍使用 python main.py
+"""
+
+import argparse
+import os
+import sys
+
+from uvicorn.workers import UvicornWorker
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_FILE = os.path.join(PROJECT_DIR, "gunicorn.conf.py")
+
+# 命令行参数与环境变量的对应关系
+ARGUMENT_ENV = {
+    "bind": "BAZI_BIND",
+    "workers": "BAZI_WORKERS",
+    "backlog": "BAZI_BACKLOG",
+    "keep_alive": "BAZI_KEEPALIVE",
+    "limit_concurrency": "BAZI_LIMIT_CONCURRENCY",
+    "timeout": "BAZI_TIMEOUT",
+    "graceful_timeout": "BAZI_GRACEFUL_TIMEOUT",
+    "drain_timeout": "BAZI_DRAIN_TIMEOUT",
+    "warmup_top_n": "WARMUP_TOP_N"
+}
+
+
+class BaziUvicornWorker(UvicornWorker):
+    """
+    Uvicorn worker：补充并发上限和优雅退出超时
+
+    收到SIGTERM后停止接收新连接，等待进行中的请求（包括批量计算）完成，
+    再执行应用的shutdown钩子；超时前留出余量，避免被主进程强制结束
+    """
+    CONFIG_KWARGS = {
+        **UvicornWorker.CONFIG_KWARGS,
+        "limit_concurrency": int(os.getenv("BAZI_LIMIT_CONCURRENCY", "0")) or None,
+        "timeout_graceful_shutdown": max(int(os.getenv("BAZI_GRACEFUL_TIMEOUT", "30")) - 5, 1)
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="八字运势小程序生产服务")
+    parser.add_argument("--bind", help="监听地址，如 0.0.0.0:8001")
+    parser.add_argument("--workers", type=int, help="worker进程数，默认CPU核数")
+    parser.add_argument("--backlog", type=int, help="监听队列长度")
+    parser.add_argument("--keep-alive", type=int, help="keep-alive超时秒数")
+    parser.add_argument("--limit-concurrency", type=int, help="单worker最大并发连接数，超出返回503")
+    parser.add_argument("--timeout", type=int, help="worker无响应超时秒数")
+    parser.add_argument("--graceful-timeout", type=int, help="优雅退出等待秒数")
+    parser.add_argument("--drain-timeout", type=float, help="退出时等待后台重算结束的秒数")
+    parser.add_argument("--warmup-top-n", type=int, help="启动预热回放的常见请求数")
+    parser.add_argument("--no-preload", action="store_true", help="不在主进程预加载（每个worker各自加载）")
+    parser.add_argument("--background-warmup", action="store_true",
+                        help="后台预热，worker启动后立即接收请求（就绪探针在预热完成前返回503）")
+    return parser.parse_args(argv)
+
+
+def apply_arguments(args):
+    """将命令行参数写入环境变量，供 gunicorn.conf.py 和 main.py 读取"""
+    for name, env_name in ARGUMENT_ENV.items():
+        value = getattr(args, name)
+        if value is not None:
+            os.environ[env_name] = str(value)
+    if args.no_preload:
+        os.environ["BAZI_PRELOAD"] = "0"
+    os.environ["BAZI_WARMUP_BLOCKING"] = "0" if args.background_warmup else "1"
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    apply_arguments(args)
+
+    # main.py 按相对路径加载 backend/app 和数据文件
+    os.chdir(PROJECT_DIR)
+    sys.path.insert(0, PROJECT_DIR)
+
+    from gunicorn.app.base import Application
+
+    class ProductionServer(Application):
+        """加载 gunicorn.conf.py 并由应用工厂创建应用"""
+
+        def init(self, parser, opts, args):
+            return None
+
+        def load_config(self):
+            # 不解析gunicorn自身的命令行参数，配置全部来自 gunicorn.conf.py
+            self.load_config_from_file(CONFIG_FILE)
+
+        def load(self):
+            from main import create_app
+            return create_app()
+
+    ProductionServer().run()
+
+
+if __name__ == "__main__":
+    main()
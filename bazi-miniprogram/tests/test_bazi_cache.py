@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+测试八字结果缓存（LRU + SQLite 两级缓存）
+"""
+import sys
+import os
+sys.path.append('.')
+
+from backend.app.enhanced_bazi_cache import (
+    BaziCacheManager, DeterministicBaziCalculator, LRUCache
+)
+
+SAMPLE_INPUT = (1990, 5, 15, 14, "male", "solar")
+
+
+def test_lru_eviction():
+    """测试LRU容量上限与淘汰顺序"""
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_cache_persists_across_instances(tmp_path):
+    """测试结果写入SQLite后，新实例可直接读取"""
+    manager = BaziCacheManager(cache_dir=str(tmp_path))
+    manager.save_to_cache(*SAMPLE_INPUT, result={"bazi": {"year": "庚午"}})
+
+    reloaded = BaziCacheManager(cache_dir=str(tmp_path))
+    assert reloaded.load_from_cache(*SAMPLE_INPUT) == {"bazi": {"year": "庚午"}}
+
+    stats = reloaded.get_cache_stats()
+    assert stats["total_entries"] == 1
+    assert stats["expired_count"] == 0
+
+
+def test_algorithm_version_invalidates(tmp_path):
+    """测试算法版本变化后旧缓存不再命中"""
+    BaziCacheManager(cache_dir=str(tmp_path)).save_to_cache(*SAMPLE_INPUT, result={"v": 1})
+    upgraded = BaziCacheManager(cache_dir=str(tmp_path), algorithm_version="next")
+    assert upgraded.load_from_cache(*SAMPLE_INPUT) is None
+
+
+def test_expired_entries_purged(tmp_path):
+    """测试过期条目不返回且可按索引清理"""
+    manager = BaziCacheManager(cache_dir=str(tmp_path), ttl_days=-1)
+    manager.save_to_cache(*SAMPLE_INPUT, result={"v": 1})
+    manager.memory_cache.clear()
+
+    assert manager.load_from_cache(*SAMPLE_INPUT) is None
+    assert manager.clear_expired_cache() == 1
+    assert manager.get_cache_stats()["total_entries"] == 0
+
+
+def test_calculate_many_matches_single(tmp_path):
+    """测试批量计算与单条计算结果一致，且返回副本不污染缓存"""
+    calculator = DeterministicBaziCalculator(BaziCacheManager(cache_dir=str(tmp_path)))
+    inputs = dict(zip(["year", "month", "day", "hour", "gender", "calendar_type"], SAMPLE_INPUT))
+
+    single = calculator.calculate_with_cache(*SAMPLE_INPUT)
+    single["daily_fortune"] = {"overall_score": 80}
+
+    batch = calculator.calculate_many([inputs, dict(inputs, month=13), inputs])
+    assert batch[0]["bazi"] == single["bazi"]
+    assert "daily_fortune" not in batch[0]
+    assert isinstance(batch[1], ValueError)
+    assert batch[2]["bazi"] == single["bazi"]
+
+
+def test_version_bump_serves_stale_until_refreshed(tmp_path):
+    """测试版本升级后旧结果继续服务，后台重算后被新版本替换"""
+    old_calculator = DeterministicBaziCalculator(
+        BaziCacheManager(cache_dir=str(tmp_path), algorithm_version="old"))
+    old_result = old_calculator.calculate_with_cache(*SAMPLE_INPUT)
+
+    calculator = DeterministicBaziCalculator(
+        BaziCacheManager(cache_dir=str(tmp_path), algorithm_version="new"))
+    stale = calculator.calculate_with_cache(*SAMPLE_INPUT)
+    assert stale["cache_stale"] is True
+    assert stale["bazi"] == old_result["bazi"]
+
+    assert calculator.refresher.wait(timeout=30)
+    refreshed = calculator.calculate_with_cache(*SAMPLE_INPUT)
+    assert "cache_stale" not in refreshed
+    assert refreshed["cache_version"] == "new"
+    assert calculator.cache_manager.get_cache_stats()["total_entries"] == 1
+
+
+def test_refresh_hottest_first(tmp_path):
+    """测试后台重算按命中次数从高到低安排"""
+    old_manager = BaziCacheManager(cache_dir=str(tmp_path), algorithm_version="old")
+    cold = (1985, 2, 3, 8, "female", "solar")
+    old_manager.save_many([(SAMPLE_INPUT, {"v": 1}), (cold, {"v": 2})])
+    for _ in range(3):
+        old_manager.memory_cache.clear()
+        old_manager.load_from_cache(*SAMPLE_INPUT)
+    old_manager.flush_hit_counts()
+
+    manager = BaziCacheManager(cache_dir=str(tmp_path), algorithm_version="new")
+    hottest = manager.hottest_stale_inputs(limit=2)
+    assert [inputs["year"] for inputs, _ in hottest] == [1990, 1985]
+    assert hottest[0][1] == 3
+
+
+if __name__ == "__main__":
+    import tempfile
+    test_lru_eviction()
+    with tempfile.TemporaryDirectory() as tmp:
+        from pathlib import Path
+        test_cache_persists_across_instances(Path(tmp))
+    print("✅ 缓存测试通过")
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+测试字库共享实例与属性位图索引
+"""
+import json
+import os
+import shutil
+import sys
+import threading
+sys.path.append('.')
+
+import pytest
+
+from backend.app import enhanced_char_database
+from backend.app.char_attribute_index import CharAttributeIndex
+from backend.app.compiled_char_database import compile_char_database, load_compiled_if_fresh
+from backend.app.enhanced_char_database import EnhancedCharDatabase, get_character_database
+from backend.app.meaning_ngram_index import MeaningNgramIndex
+from backend.app.naming_calculator import ChineseCharDatabase, NamingCalculator
+
+
+def test_char_database_loads_once(monkeypatch):
+    """测试并发获取、起名计算器和模块属性访问共用同一个字库实例"""
+    loads = []
+    original_load = EnhancedCharDatabase._load_all_databases
+
+    def counting_load(self):
+        loads.append(self)
+        original_load(self)
+
+    monkeypatch.setattr(EnhancedCharDatabase, "_load_all_databases", counting_load)
+    monkeypatch.setattr(enhanced_char_database.character_database_snapshot, "_current", None)
+
+    instances = []
+    barrier = threading.Barrier(8)
+
+    def fetch():
+        barrier.wait()
+        instances.append(get_character_database())
+
+    threads = [threading.Thread(target=fetch) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    shared = instances[0]
+    assert all(instance is shared for instance in instances)
+    assert ChineseCharDatabase().enhanced_db is shared
+    assert NamingCalculator().name_generator.char_database.enhanced_db is shared
+    assert enhanced_char_database.char_db is shared
+    assert len(loads) == 1
+
+
+def test_attribute_index_matches_scan():
+    """测试位图筛选与统计结果与逐字扫描一致，且保持字库顺序"""
+    char_database = get_character_database().char_database
+    index = CharAttributeIndex(char_database)
+
+    for wuxing in ['金', '木', '水', '火', '土']:
+        for gender in [None, 'male', 'female']:
+            expected = [
+                (char, info) for char, info in char_database.items()
+                if info['wuxing'] == wuxing and info['suitable_for_name']
+                and (gender is None or info['gender'] in (gender, 'neutral'))
+                and info['era'] == 'classical'
+            ]
+            mask = index.select(gender=gender, wuxing=wuxing, suitable_for_name=True, era='classical')
+            assert index.items(mask) == expected
+            assert index.count(mask) == len(expected)
+
+    by_era = {}
+    for info in char_database.values():
+        by_era[info['era']] = by_era.get(info['era'], 0) + 1
+    assert index.counts('era') == by_era
+
+
+def test_compiled_char_database_matches_json(tmp_path):
+    """测试编译字库解码结果、属性位图和倒排表与JSON一致，源文件修改后判定为过期"""
+    source = tmp_path / "chars_main.json"
+    shutil.copy(os.path.join('backend', 'data', 'chars', 'chars_main.json'), source)
+    with open(source, 'r', encoding='utf-8') as f:
+        char_database = json.load(f)['chars']
+
+    compile_char_database(str(source))
+    compiled = load_compiled_if_fresh(str(source))
+    assert compiled is not None
+    try:
+        assert list(compiled) == list(char_database)
+        for char, info in char_database.items():
+            assert list(compiled[char].items()) == list(info.items())
+
+        index = compiled.attribute_index()
+        expected_index = CharAttributeIndex(char_database)
+        assert index.chars == expected_index.chars
+        assert index.bitmaps == expected_index.bitmaps
+        mask = index.select(gender='female', wuxing='水', suitable_for_name=True)
+        assert index.items(mask) == expected_index.items(mask)
+
+        expected_meanings = {}
+        for char, info in char_database.items():
+            for keyword in info.get('meanings', []) + info.get('semantic_tags', []):
+                expected_meanings.setdefault(keyword, []).append(char)
+        meaning_index = compiled.meaning_index()
+        assert set(meaning_index) == set(expected_meanings)
+        for keyword, chars in expected_meanings.items():
+            assert [char for char, _ in meaning_index[keyword]] == chars
+
+        ngram_index = compiled.ngram_index()
+        expected_ngram_index = MeaningNgramIndex(char_database)
+        for keyword in ['美', '美玉', '智慧', '光明磊落']:
+            assert ngram_index.search(keyword) == expected_ngram_index.search(keyword)
+    finally:
+        compiled.close()
+
+    source.write_text(source.read_text(encoding='utf-8').replace('"wuxing": "木"', '"wuxing": "金"', 1),
+                      encoding='utf-8')
+    assert load_compiled_if_fresh(str(source)) is None
+
+
+def test_ngram_fuzzy_search_matches_scan():
+    """测试N-gram索引的模糊搜索结果（字、顺序、相关度）与逐字扫描一致"""
+    db = get_character_database()
+    keywords = {'美', '美玉', '智慧', '光明', '不存在的词'}
+    for info in list(db.char_database.values())[:200]:
+        for content in info.get('meanings', []) + info.get('semantic_tags', []):
+            keywords.update({content, content[:2], content[-2:], content[:1]})
+
+    for keyword in sorted(keywords):
+        indexed = [(char, relevance) for char, _, relevance in db._fuzzy_meaning_search(keyword)]
+        scanned = [(char, relevance) for char, _, relevance in db._scan_fuzzy_meaning_search(keyword)]
+        assert indexed == scanned, keyword
+
+
+def test_keyword_index_synonyms_and_suggestions():
+    """测试同义词反查与逐类别检查一致，搜索建议与按排名全量筛选一致"""
+    db = get_character_database()
+    index = db.keyword_index
+
+    keywords = set(db.meaning_tags)
+    for mapping in db.meaning_tags.values():
+        keywords.update(mapping.get('synonyms', []))
+    for keyword in keywords | {'不存在的词'}:
+        expected = [category for category, mapping in db.meaning_tags.items()
+                    if keyword == category or keyword in mapping.get('synonyms', [])]
+        assert index.categories_of(keyword) == expected
+
+    ranked = index.suggest('', len(index))
+    assert sorted(ranked) == sorted(index.char_counts)
+    for prefix in ['', '美', '智', '安', '聪明', '不存在']:
+        expected = [keyword for keyword in ranked if keyword.startswith(prefix)][:10]
+        assert db.get_search_suggestions(prefix) == expected
+    counts = [index.char_counts[keyword] for keyword in ranked]
+    assert counts == sorted(counts, reverse=True)
+
+
+def _golden_profiles(db):
+    """黄金测试集：各风格模板 × 流行度偏好，叠加自定义/避免关键词、重复语义类别和特殊偏好"""
+    profiles = []
+    for style in ['classical', 'modern', 'balanced', 'literary', 'simple']:
+        for popularity in ['popular', 'moderate', 'unique']:
+            profiles.append(db.create_user_preference_profile({
+                'style_preference': style,
+                'popularity_preference': popularity,
+                'meaning_keywords': ['美', '智慧', ''],
+                'avoid_keywords': ['病', '美'],
+                'gender': 'female' if popularity == 'unique' else 'male'
+            }))
+    profiles.append({
+        'era_weights': {'ancient': 0.7},
+        'semantic_preferences': ['智慧', '智慧', '品德', '不存在的类别'],
+        'preferred_sources': ['楚辞', '诗经'],
+        'custom_meanings': ['玉'],
+        'embrace_trends': True,
+        'avoid_complexity': True
+    })
+    profiles.append({'avoid_trends': ['热门'], 'preferred_sources': ['现代', ''], 'avoid_meanings': ['水', '水']})
+    return profiles
+
+
+def test_personalized_scoring_matches_golden(monkeypatch):
+    """测试特征矩阵评分与逐字评分在黄金测试集上完全一致（分数与推荐结果）"""
+    pytest.importorskip('numpy')
+    from backend.app.char_feature_matrix import CharFeatureMatrix
+
+    db = get_character_database()
+    profiles = _golden_profiles(db)
+
+    def recommendations(vectorized):
+        monkeypatch.setattr(enhanced_char_database, "NUMPY_AVAILABLE", vectorized)
+        return [db.get_personalized_recommendations(wuxing, profile, 30)
+                for profile in profiles for wuxing in ['金', '木', '水', '火', '土']]
+
+    assert recommendations(True) == recommendations(False)
+
+    # 现有字库没有出处和热度字段，另用带这些字段的字信息直接比对分数
+    chars = list(db.char_database)[:300]
+    records = [
+        dict(db.char_database[char], source=['诗经', '楚辞', '', '现代'][i % 4],
+             trend=['hot', None][i % 2], stroke=[None, 15, 16, 30][i % 4])
+        for i, char in enumerate(chars)
+    ]
+    matrix = CharFeatureMatrix(records, chars, db.semantic_network)
+
+    def matches(keyword):
+        counted = {}
+        for position, info in enumerate(records):
+            matched = sum(1 for meaning in info.get('meanings', [info.get('meaning', '')]) if keyword in meaning)
+            if matched:
+                counted[position] = matched
+        return counted
+
+    for profile in profiles:
+        scores = matrix.score(
+            profile,
+            [matches(keyword) for keyword in profile.get('custom_meanings', [])],
+            [matches(keyword) for keyword in profile.get('avoid_meanings', [])]
+        ).tolist()
+        assert scores == [db._calculate_personalized_score(char, info, profile)
+                          for char, info in zip(chars, records)]
+
+
+def test_cjk_char_store_blocks(tmp_path, monkeypatch):
+    """测试全字符库按区块加载、LRU淘汰，以及起名计算对字库外的字使用全字符库"""
+    from backend.app import cjk_char_store, kangxi_strokes
+    from backend.app.cjk_char_store import CJKCharStore, build_cjk_char_store
+    from backend.app.naming_calculator import NameologyCalculator
+
+    records = {
+        '龘': {'stroke': 48, 'kangxi_stroke': 48, 'wuxing': '火', 'pinyin': 'dá', 'tone': 2},
+        '㐀': {'stroke': 5, 'kangxi_stroke': 5, 'wuxing': '土', 'pinyin': 'qiū', 'tone': 1},
+        '䶵': {'stroke': 20, 'kangxi_stroke': 21, 'wuxing': None, 'pinyin': None, 'tone': None},
+        '𠀀': {'stroke': 4, 'kangxi_stroke': 4, 'wuxing': '金', 'pinyin': 'hē', 'tone': 1},
+    }
+    path = str(tmp_path / 'cjk_char_store.bin')
+    assert build_cjk_char_store(records, path)["chars"] == 4
+
+    store = CJKCharStore(path, max_blocks=2)
+    assert store.stats()["loaded_blocks"] == 0
+    for char, info in records.items():
+        assert store.lookup(char) == info
+    assert store.lookup('一') is None and store.lookup('ab') is None
+    # 4个字分属4个区块，只保留最近的2个：再次查询被淘汰的区块时重新读入
+    assert '龘' in store
+    assert store.stats()["loaded_blocks"] == 2 and (store.loads, store.evictions) == (5, 3)
+    store.close()
+
+    monkeypatch.setattr(cjk_char_store, "_store", CJKCharStore(path))
+    monkeypatch.setattr(cjk_char_store, "_store_loaded", True)
+    monkeypatch.setattr(kangxi_strokes, "_table", None)
+    assert '龘' not in get_character_database().char_database
+    properties = ChineseCharDatabase().get_char_properties('龘')
+    assert (properties['stroke'], properties['wuxing'], properties['pinyin']) == (48, '火', 'dá')
+    assert NameologyCalculator().calculate_stroke_count('龘') == 48
+
+
+def test_kangxi_stroke_table(monkeypatch):
+    """测试康熙笔画表按码位索引、优先于字库笔画，以及字库笔画的核对"""
+    from backend.app import kangxi_strokes
+    from backend.app.kangxi_strokes import KangxiStrokeTable
+    from backend.app.naming_calculator import NameologyCalculator
+
+    table = KangxiStrokeTable({'华': 14, '十': 10, '𠀀': 4})
+    assert table.strokes.itemsize == 1 and len(table.strokes) == kangxi_strokes.END_CODEPOINT - kangxi_strokes.BASE_CODEPOINT
+    assert (table.get('华'), table.get('十'), table.get('𠀀'), table.get('a'), table.get('丽')) == (14, 10, 4, 0, 0)
+    assert table.reconcile({'华': {'stroke': 6}, '十': {'stroke': 10}, '丽': {'stroke': 7}}) == {'华': (6, 14)}
+
+    monkeypatch.setattr(kangxi_strokes, "_table", None)
+    db = get_character_database()
+    calculator = NameologyCalculator()
+    # 简化字按繁体计：张=張11、刘=劉15、华=華14；数字十按字义计10
+    assert [calculator.calculate_stroke_count(char) for char in '张刘华十'] == [11, 15, 14, 10]
+    # 康熙笔画表中没有的字使用字库笔画，都没有时估算
+    char = next(char for char, info in db.char_database.items()
+                if char not in kangxi_strokes.COMMON_KANGXI_STROKES and info.get('stroke'))
+    assert calculator.calculate_stroke_count(char) == db.char_database[char]['stroke']
+    assert calculator.calculate_stroke_count('𠀀') == 12
+    assert db.get_stroke_mismatches()['华'] == (6, 14)
+    assert db.get_database_stats()['kangxi_stroke_mismatches'] == len(db.get_stroke_mismatches())
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+测试字库、模板快照的热更新
+"""
+import json
+import os
+import shutil
+import sys
+import threading
+sys.path.append('.')
+
+from backend.app import enhanced_char_database
+from backend.app.data_snapshot import DataFileWatcher, SnapshotHolder
+from backend.app.enhanced_char_database import (
+    EnhancedCharDatabase, _validate_character_database, character_database_sources
+)
+from backend.app.naming_calculator import ChineseCharDatabase
+
+DATA_DIR = os.path.join('backend', 'data')
+
+
+def test_pinned_request_keeps_old_snapshot():
+    """测试处理中的请求固定旧快照，替换后新请求使用新版本，构建失败时保留旧版本"""
+    versions = iter(['v1', 'v2', 'broken'])
+    holder = SnapshotHolder("demo", lambda: {"version": next(versions)},
+                            validate=lambda value: value["version"] != "broken" or 1 / 0)
+
+    in_request = threading.Event()
+    swapped = threading.Event()
+    seen = []
+
+    def request():
+        with holder.pin():
+            seen.append(holder.get()["version"])
+            in_request.set()
+            swapped.wait(5)
+            seen.append(holder.get()["version"])
+
+    worker = threading.Thread(target=request)
+    worker.start()
+    in_request.wait(5)
+    assert holder.reload(wait=True, timeout=5)
+    swapped.set()
+    worker.join()
+
+    assert seen == ['v1', 'v1']
+    assert holder.get()["version"] == 'v2'
+    assert holder.current().version == 2
+
+    holder.reload(wait=True, timeout=5)
+    assert holder.get()["version"] == 'v2'
+    assert holder.status()["failed"] == 1 and "ZeroDivisionError" in holder.status()["last_error"]
+
+
+def test_watcher_reloads_char_database(tmp_path, monkeypatch):
+    """测试修改字库文件后监视线程触发重新加载，起名计算器随之使用新字库；损坏的文件不替换"""
+    monkeypatch.setattr(enhanced_char_database, "USE_COMPILED_CHAR_DATABASE", False)
+    chars_dir = tmp_path / "chars"
+    chars_dir.mkdir()
+    for name in ['chars_main.json', 'chars_meaning_tags.json']:
+        shutil.copy(os.path.join(DATA_DIR, 'chars', name), chars_dir / name)
+
+    holder = SnapshotHolder(
+        "char_database", lambda: EnhancedCharDatabase(str(tmp_path)),
+        lambda: character_database_sources(str(tmp_path)), _validate_character_database
+    )
+    monkeypatch.setattr(enhanced_char_database, "character_database_snapshot", holder)
+    naming_db = ChineseCharDatabase()
+    old_db = naming_db.enhanced_db
+    assert '㐀' not in naming_db.char_database
+
+    main_file = chars_dir / 'chars_main.json'
+    data = json.loads(main_file.read_text(encoding='utf-8'))
+    data['chars']['㐀'] = dict(next(iter(data['chars'].values())))
+    main_file.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+
+    watcher = DataFileWatcher([holder])
+    # 第一轮发现变化，下一轮文件状态不变才重新加载
+    assert watcher.check() == []
+    assert watcher.check() == ['char_database']
+    assert holder.wait(30)
+    assert naming_db.enhanced_db is not old_db
+    assert '㐀' in naming_db.char_database
+    assert holder.current().version == 2
+    assert watcher.check() == []
+
+    main_file.write_text('{"chars": ', encoding='utf-8')
+    watcher.check()
+    watcher.check()
+    assert holder.wait(30)
+    assert '㐀' in naming_db.char_database
+    assert holder.current().version == 2 and holder.failed == 1
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
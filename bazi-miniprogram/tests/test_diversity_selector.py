@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+测试推荐结果多样性选择
+"""
+import random
+import sys
+sys.path.append('.')
+
+from backend.app.diversity_selector import rank_by_score, select_diverse
+from backend.app.enhanced_char_database import get_character_database
+
+
+def _reference_diversity(candidates):
+    """原 _ensure_diversity 的逐个比较实现，作为对照"""
+    if len(candidates) <= 10:
+        return candidates
+    limits = (8, 10, 8) if len(candidates) > 30 else (5, 7, 5)
+    results, era_counts, popularity_counts, stroke_counts = [], {}, {}, {}
+    for char, info, score in candidates:
+        era = info.get('era', 'classical')
+        popularity = info.get('popularity', 'medium')
+        stroke = info.get('stroke', 8)
+        stroke_range = 'simple' if stroke <= 8 else 'medium' if stroke <= 15 else 'complex'
+        if (era_counts.get(era, 0) < limits[0] and popularity_counts.get(popularity, 0) < limits[1]
+                and stroke_counts.get(stroke_range, 0) < limits[2]):
+            results.append((char, info, score))
+            era_counts[era] = era_counts.get(era, 0) + 1
+            popularity_counts[popularity] = popularity_counts.get(popularity, 0) + 1
+            stroke_counts[stroke_range] = stroke_counts.get(stroke_range, 0) + 1
+    if len(results) < 15:
+        results.extend([c for c in candidates if c not in results][:15 - len(results)])
+    return results
+
+
+def test_char_diversity_matches_reference():
+    """测试字推荐的多样性调整与原实现一致（含提前结束扫描时的前 count 个）"""
+    db = get_character_database()
+    items = list(db.char_database.items())
+    rng = random.Random(38)
+    for _ in range(300):
+        candidates = [(char, info, rng.random()) for char, info in rng.sample(items, rng.randint(0, 120))]
+        candidates.sort(key=lambda candidate: candidate[2], reverse=True)
+        for count in [None, 3, 15, 20]:
+            assert db._ensure_diversity(candidates, {}, count)[:count] == _reference_diversity(candidates)[:count]
+
+
+def test_quota_fill_and_strict():
+    """测试配额、补足和补充时仍遵守的严格配额"""
+    names = ['明轩', '明哲', '明远', '子轩', '明轩', '浩然']
+    scores = [99, 98, 97, 96, 95, 50]
+    ranked = rank_by_score(scores)
+    features = {'given_name': names, 'chars': [tuple(name) for name in names]}
+
+    # 每个字最多出现两次：明哲之后的明远、明轩被跳过
+    assert select_diverse(ranked, features, {'given_name': 1, 'chars': 2}) == [0, 1, 3, 5]
+    # 补足到5个时按排名补充明远，重复的明轩因同名配额仍被排除
+    assert select_diverse(ranked, features, {'given_name': 1, 'chars': 2},
+                          limit=5, fill_to=5, strict=['given_name']) == [0, 1, 3, 5, 2]
+
+
+def test_mmr_prefers_dissimilar():
+    """测试提供相似度时按MMR在高分候选中优先选出不相似的"""
+    groups = ['a', 'a', 'a', 'b', 'c']
+    scores = [1.0, 0.99, 0.98, 0.9, 0.8]
+    selected = select_diverse(
+        rank_by_score(scores), {'group': groups}, {'group': 3}, limit=3,
+        similarity=lambda i, j: 1.0 if groups[i] == groups[j] else 0.0, scores=scores, mmr_lambda=0.5
+    )
+    assert selected == [0, 3, 4]
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+测试双字名候选网格评分
+"""
+import sys
+sys.path.append('.')
+
+from backend.app.name_grid_scorer import SCORE_WEIGHTS
+from backend.app.naming_cache import naming_result_cache
+from backend.app.naming_calculator import NameGenerator, NamingCalculator
+
+BAZI_WUXING = {'xiyongshen': ['木', '水'], 'jishen': ['金']}
+BIRTH_INFO = {'year': 1990, 'month': 5, 'day': 15, 'hour': 10, 'calendar_type': 'solar'}
+
+
+def _candidate_chars(generator):
+    chars = generator.char_database.get_chars_by_wuxing('木', stroke_range=(3, 20))[:20]
+    return chars + generator.char_database.get_chars_by_wuxing('金', stroke_range=(3, 20))[:10]
+
+
+def test_grid_matches_per_name_scores():
+    """测试网格各项基础分与逐个名字评分一致，取前k个按分数降序并遵守单字配额"""
+    generator = NameGenerator()
+    chars = _candidate_chars(generator)
+    char_list = generator._expand_name_chars(chars)
+
+    for surname in ['张', '欧阳']:
+        scorer = generator._build_name_grid(surname, char_list, BAZI_WUXING)
+        ranked = generator._rank_two_char_names(surname, chars, BAZI_WUXING, 30, input_seed="seed")
+        assert len(ranked) == 30 and len(set(ranked)) == 30
+
+        for first in range(0, len(char_list), 3):
+            for second in range(1, len(char_list), 4):
+                if first == second:
+                    continue
+                given_name = char_list[first] + char_list[second]
+                name_wuxing = generator._analyze_name_wuxing(given_name)
+                sancai_wuge = generator.nameology_calculator.calculate_sancai_wuge(surname, given_name)
+                expected = [
+                    sancai_wuge['overall_evaluation']['score'],
+                    generator._calculate_wuxing_match_score(BAZI_WUXING, name_wuxing),
+                    generator._calculate_sancai_score(sancai_wuge['sancai_evaluation']),
+                    generator._calculate_phonetic_score(name_wuxing),
+                    generator._calculate_meaning_score(name_wuxing),
+                    generator._calculate_popularity_score(name_wuxing)
+                ]
+                assert [float(component[first, second]) for component in scorer.components.values()] == expected
+                assert scorer.score(given_name) == sum(w * e for w, e in zip(SCORE_WEIGHTS, expected))
+
+        # 单字配额：同一个字最多出现在 30 // 3 = 10 个名字中
+        for char in char_list:
+            assert sum(char in name for name in ranked) <= 10
+        # 不受配额限制的第一名即全网格最高分，分数按降序排列
+        scores = [scorer.score(name) for name in ranked]
+        assert scores[0] == scorer.scores.max() and scores == sorted(scores, reverse=True)
+
+    # 常用度只是加权中的一项（权重之和为1）：常用度为 low 的字（蓼）减分但仍参与排名，偏好独特稀少的字时加分
+    assert abs(sum(SCORE_WEIGHTS) - 1) < 1e-9
+    assert generator.char_database.get_char_properties('蓼')['popularity'] == 'low'
+    default = generator._build_name_grid('王', char_list + ['蓼'], BAZI_WUXING)
+    rare = generator._build_name_grid('王', char_list + ['蓼'], BAZI_WUXING, preferences={'popularity': 'low'})
+    name = char_list[0] + '蓼'
+    assert float('-inf') < default.score(name) < rare.score(name)
+    assert any('蓼' in default.chars[first] + default.chars[second]
+               for first, second, _ in default.ranking(len(default)))
+
+    # 同一种子的排名一致
+    assert (generator._rank_two_char_names('张', chars, BAZI_WUXING, 30, input_seed="seed")
+            == generator._rank_two_char_names('张', chars, BAZI_WUXING, 30, input_seed="seed"))
+
+
+def test_low_popularity_preference_keeps_rare_chars():
+    """测试偏好独特稀少的字（popularity=low）时推荐结果中仍有常用度为 low 的字，默认偏好常用字"""
+    calculator = NamingCalculator()
+    char_properties = calculator.name_generator.char_database.get_char_properties
+
+    def popularity_levels(preferences):
+        naming_result_cache.clear()
+        result = calculator.analyze_and_generate_personalized_names(
+            '王', 'male', BIRTH_INFO, 2, 10, preferences, 'popularity'
+        )
+        assert len(result['recommendations']) == 10
+        return [char_properties(char).get('popularity')
+                for rec in result['recommendations'] for char in rec['given_name']]
+
+    assert popularity_levels({'popularity': 'low'}).count('low') >= 10
+    assert 'low' not in popularity_levels(None)
+    naming_result_cache.clear()
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
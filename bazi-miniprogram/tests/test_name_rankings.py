@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+测试双字名预计算排名（生成、查表取名与网格评分一致、过期检查）
+"""
+import os
+import sys
+sys.path.append('.')
+
+import pytest
+
+from backend.app import name_rankings
+from backend.app.name_rankings import NameRankingStore, build_name_rankings, ranking_key
+from backend.app.naming_calculator import NameGenerator
+
+BAZI_WUXING = {'xiyongshen': ['木', '水'], 'jishen': ['金']}
+
+
+@pytest.fixture
+def rankings_file(tmp_path, monkeypatch):
+    """为'张'（及笔画总数相同的姓）、喜木水忌金、男生成排名，top_n 小于网格名字数"""
+    generator = NameGenerator()
+    chars = generator._filter_chars_by_xiyongshen(BAZI_WUXING['xiyongshen'], 'male')
+    char_list = generator._expand_name_chars(chars)
+    scorer = generator._build_name_grid('张', char_list, BAZI_WUXING)
+    strokes = [generator.nameology_calculator.calculate_stroke_count('张')]
+
+    source = tmp_path / 'chars_main.json'
+    source.write_text('{}', encoding='utf-8')
+    monkeypatch.setattr(name_rankings, 'ranking_sources', lambda: [str(source)])
+    path = str(tmp_path / 'name_rankings.bin')
+    build_name_rankings([(ranking_key(strokes, ['水', '木'], ['金'], 'male'), char_list, len(scorer),
+                          scorer.ranking(500))], path, top_n=500)
+
+    monkeypatch.setenv('BAZI_NAME_RANKINGS', path)
+    name_rankings.reset_name_ranking_store()
+    yield generator, chars, scorer, source
+    name_rankings.reset_name_ranking_store()
+
+
+def test_precomputed_ranking_matches_grid(rankings_file):
+    """测试查表取名的分数与网格一致，遵守单字配额，偏好字集合、排除名字和截断时回退"""
+    generator, chars, scorer, _ = rankings_file
+    store = name_rankings.get_name_ranking_store()
+    assert store is not None and len(store) == 1
+
+    ranking = store.lookup(ranking_key([11], ['木', '水'], ['金'], 'male'))
+    assert len(ranking) == 500 and ranking.truncated
+    for name, components in list(ranking.entries())[:50]:
+        index = (scorer.chars.index(name[0]), scorer.chars.index(name[1]))
+        assert components == tuple(int(component[index]) for component in scorer.components.values())
+
+    ranked = generator._rank_two_char_names('张', chars, BAZI_WUXING, 30, input_seed='seed', gender='male')
+    grid = generator._rank_two_char_names('张', chars, BAZI_WUXING, 30, input_seed='seed')
+    assert store.hits == 2 and len(ranked) == 30 and len(set(ranked)) == 30
+    scores = [scorer.score(name) for name in ranked]
+    assert scores == sorted(scores, reverse=True) and scores[0] == scorer.scores.max()
+    assert sorted(scores) == sorted(scorer.score(name) for name in grid)
+    for char in scorer.chars:
+        assert sum(char in name for name in ranked) <= 10
+
+    # 只用部分候选字（偏好筛选）时从排名中筛选；排除已返回的名字
+    subset = chars[::2]
+    ranked = generator._rank_two_char_names('张', subset, BAZI_WUXING, 6, input_seed='seed', gender='male',
+                                            exclude=ranked[:3])
+    allowed = set(generator._expand_name_chars(subset))
+    assert store.hits == 3 and len(ranked) == 6
+    assert all(name[0] in allowed and name[1] in allowed for name in ranked)
+
+    # 截断的排名不足以选出k个时返回None（调用方回退到网格）
+    assert ranking.top_k(400, char_quota=1) is None
+    # 没有对应排名（其他姓氏笔画、喜用神）时回退到网格评分
+    assert generator._rank_precomputed_names('欧阳', scorer.chars, BAZI_WUXING, 'male', 6, None) is None
+    assert generator._rank_precomputed_names('张', scorer.chars, BAZI_WUXING, 'female', 6, None) is None
+
+
+def test_stale_rankings_not_used(rankings_file):
+    """测试源文件修改或评分版本变化后排名视为过期"""
+    _, _, _, source = rankings_file
+    assert name_rankings.get_name_ranking_store() is not None
+
+    source.write_text('{"chars": {}}', encoding='utf-8')
+    name_rankings.reset_name_ranking_store()
+    assert name_rankings.get_name_ranking_store() is None
+
+    # 只改修改时间、内容不变时仍可使用
+    source.write_text('{}', encoding='utf-8')
+    os.utime(source, ns=(0, 0))
+    name_rankings.reset_name_ranking_store()
+    store = name_rankings.get_name_ranking_store()
+    assert store is not None
+
+    reopened = NameRankingStore(store.path)
+    reopened.meta['scoring_version'] += 1
+    assert reopened.stale_reason().startswith('评分版本')
+    reopened.close()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
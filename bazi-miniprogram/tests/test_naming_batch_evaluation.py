@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+测试批量评估用户给出的名字
+"""
+import sys
+sys.path.append('.')
+
+from backend.app.naming_calculator import NamingCalculator
+
+BIRTH_INFO = {'year': 1990, 'month': 6, 'day': 15, 'hour': 10, 'calendar_type': 'solar'}
+
+
+def test_evaluate_names_batch(monkeypatch):
+    """测试只排盘一次、按评分降序排名、重复的名字只评估一次、无效的名字单独列出"""
+    calculator = NamingCalculator()
+    generator = calculator.name_generator
+    chart_calls, stroke_calls = [], []
+    calculate_bazi = generator.bazi_calculator.calculate_bazi
+    calculate_stroke_count = generator.nameology_calculator.calculate_stroke_count
+
+    def counting_calculate_bazi(*args, **kwargs):
+        chart_calls.append(args)
+        return calculate_bazi(*args, **kwargs)
+
+    def counting_stroke_count(char):
+        stroke_calls.append(char)
+        return calculate_stroke_count(char)
+
+    monkeypatch.setattr(generator.bazi_calculator, 'calculate_bazi', counting_calculate_bazi)
+    monkeypatch.setattr(generator.nameology_calculator, 'calculate_stroke_count', counting_stroke_count)
+
+    given_names = ['明轩', '浩然', '子墨', ' 明轩', '博文', 'Tom', '明', '欧阳明德']
+    result = calculator.evaluate_names('张', given_names, 'male', BIRTH_INFO)
+    assert result['success'] and len(chart_calls) == 1
+    # 笔画在请求内按字缓存
+    assert sorted(stroke_calls) == sorted(set('张明轩浩然子墨博文'))
+
+    evaluations = result['evaluations']
+    assert [rec['given_name'] for rec in evaluations if rec['given_name'] == '明轩'] == ['明轩']
+    assert {rec['given_name'] for rec in evaluations} == {'明轩', '浩然', '子墨', '博文', '明'}
+    assert [rec['rank'] for rec in evaluations] == [1, 2, 3, 4, 5]
+    scores = [rec['overall_score'] for rec in evaluations]
+    assert scores == sorted(scores, reverse=True)
+    assert all('wuxing_match_score' in rec['score_breakdown'] for rec in evaluations)
+    assert [item['given_name'] for item in result['invalid_names']] == ['Tom', '欧阳明德']
+    assert 'evaluate' in result['timings_ms']
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
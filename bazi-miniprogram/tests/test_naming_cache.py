@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+测试确定性起名模式、结果缓存和“换一批”分页
+"""
+import sys
+sys.path.append('.')
+
+from backend.app import naming_calculator
+from backend.app.naming_cache import NamingResultCache, naming_cache_key
+from backend.app.naming_calculator import NamingCalculator
+
+BIRTH_INFO = {'year': 1990, 'month': 6, 'day': 15, 'hour': 10, 'calendar_type': 'solar'}
+
+
+def _names(result):
+    return [rec['given_name'] for rec in result['recommendations']]
+
+
+def test_deterministic_cache_and_pagination(monkeypatch):
+    """测试同一种子结果一致且命中缓存，换一批时从候选名字流接着取且不重复"""
+    cache = NamingResultCache(max_entries=2)
+    monkeypatch.setattr(naming_calculator, "naming_result_cache", cache)
+    calculator = NamingCalculator()
+
+    def generate(seed, page=1, preferences=None):
+        return calculator.analyze_and_generate_personalized_names(
+            '张', 'male', BIRTH_INFO, 2, 6, preferences, seed, deterministic=True, page=page
+        )
+
+    first = generate('s1')
+    assert first['success'] and len(first['recommendations']) == 6
+    assert first['pagination'] == {'page': 1, 'count': 6, 'has_more': True, 'deterministic': True, 'cached': False}
+
+    again = generate('s1')
+    assert again['pagination']['cached'] and again['recommendations'] == first['recommendations']
+
+    # 换一批：不重复已返回的名字，翻回第一页结果不变
+    seen = set(_names(first))
+    for page in range(2, 6):
+        result = generate('s1', page)
+        assert result['pagination']['cached'] and len(result['recommendations']) == 6
+        assert not seen & set(_names(result))
+        seen.update(_names(result))
+    assert generate('s1', 1)['recommendations'] == first['recommendations']
+    assert cache.stats()['entries'] == 1
+
+    # 不同种子的结果不同；缓存按LRU保留2个键
+    assert _names(generate('s2')) != _names(first)
+    generate('s3')
+    assert cache.stats() == {'entries': 2, 'max_entries': 2, 'hits': 6, 'misses': 3}
+    assert not generate('s1')['pagination']['cached']
+    assert generate('s1')['recommendations'] == first['recommendations']
+
+    # 非确定性模式不使用缓存
+    result = calculator.analyze_and_generate_personalized_names('张', 'male', BIRTH_INFO, 2, 6, None, 's1')
+    assert result['success'] and not result['pagination']['cached'] and not result['pagination']['deterministic']
+
+
+def test_cache_key_normalizes_preferences():
+    """测试缓存键中偏好的规范化（顺序、空值）和五行数量向量"""
+    counts = {'金': 2, '木': 1, '水': 0, '火': 3, '土': 2}
+    key = naming_cache_key('张', 'male', counts, 2, {'selected_chars': ['明', '轩'], 'era': 'modern'}, 's')
+    assert key == naming_cache_key('张', 'male', dict(reversed(list(counts.items()))), 2,
+                                   {'era': 'modern', 'selected_chars': ['轩', '明'], 'rarity': None}, 's')
+    assert key[2] == (2, 1, 0, 3, 2)
+    assert key != naming_cache_key('张', 'male', counts, 2, {'era': 'classical'}, 's')
+    assert naming_cache_key('张', 'male', counts, 2, None, None) == naming_cache_key('张', 'male', counts, 2, {}, '')
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+测试起名请求上下文（一次请求只排盘一次，各阶段耗时）
+"""
+import sys
+sys.path.append('.')
+
+from backend.app.naming_calculator import NamingCalculator
+from backend.app.naming_context import NamingContext
+
+BIRTH_INFO = {'year': 1990, 'month': 6, 'day': 15, 'hour': 10, 'calendar_type': 'solar'}
+
+
+def test_chart_computed_once_per_request(monkeypatch):
+    """测试生成、个性化生成、评估名字各只排盘一次，结果带各阶段耗时"""
+    calculator = NamingCalculator()
+    bazi_calculator = calculator.name_generator.bazi_calculator
+    calls = []
+    calculate_bazi = bazi_calculator.calculate_bazi
+
+    def counting_calculate_bazi(*args, **kwargs):
+        calls.append(args)
+        return calculate_bazi(*args, **kwargs)
+
+    monkeypatch.setattr(bazi_calculator, 'calculate_bazi', counting_calculate_bazi)
+
+    result = calculator.analyze_and_generate_names('张', 'male', BIRTH_INFO, 2, 6, 's')
+    assert result['success'] and len(calls) == 1
+    assert {'bazi', 'wuxing', 'char_pool', 'candidates', 'evaluate', 'select', 'total'} <= set(result['timings_ms'])
+
+    calls.clear()
+    result = calculator.analyze_and_generate_personalized_names(
+        '张', 'male', BIRTH_INFO, 2, 6, {'era': 'modern'}, 's', deterministic=True
+    )
+    assert result['success'] and len(calls) == 1
+    assert {'bazi', 'char_pool', 'evaluate', 'page', 'total'} <= set(result['timings_ms'])
+
+    calls.clear()
+    result = calculator.evaluate_specific_name('张', '明轩', 'male', BIRTH_INFO)
+    assert result['success'] and len(calls) == 1 and 'evaluate' in result['timings_ms']
+
+
+def test_context_memoizes_chart_and_char_pool():
+    """测试上下文在请求内缓存命盘、五行分析、候选字和单字属性"""
+    calculator = NamingCalculator()
+    context = NamingContext(calculator.name_generator, '张', 'female', BIRTH_INFO)
+
+    assert context.bazi_result is context.bazi_result
+    assert context.wuxing_analysis is context.wuxing_analysis
+    chars = context.suitable_chars({'era': 'modern', 'rarity': None})
+    assert chars is context.suitable_chars({'era': 'modern'})
+    assert chars is not context.suitable_chars()
+    assert context.char_properties('明') is context.char_properties('明')
+
+    # 混合策略扩充候选字时不修改缓存的列表
+    size = len(chars)
+    calculator._personalized_suitable_chars(context, {'era': 'modern'})
+    assert len(context.suitable_chars({'era': 'modern'})) == size
+
+    report = context.timings_report()
+    assert report['total'] >= report['char_pool'] >= 0
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
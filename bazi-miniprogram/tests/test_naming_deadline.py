@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+测试限时起名（按上界逐步扩大候选网格，时间用完时返回已有的最好结果）
+"""
+import sys
+import time
+from collections import Counter
+sys.path.append('.')
+
+import numpy as np
+
+from backend.app.name_grid_scorer import NameGridScorer, pair_score_bounds, progressive_top_k
+from backend.app.naming_cache import naming_result_cache
+from backend.app.naming_calculator import NameGenerator, NamingCalculator
+
+BAZI_WUXING = {'xiyongshen': ['木', '水'], 'jishen': ['金']}
+BIRTH_INFO = {'year': 1990, 'month': 6, 'day': 15, 'hour': 10, 'calendar_type': 'solar'}
+
+
+def test_progressive_top_k_bounds_and_budget():
+    """测试分数上界不低于网格各名字的分数；时间充足时与整张网格一致，时间用完时返回子网格的结果"""
+    generator = NameGenerator()
+    chars = generator._filter_chars_by_xiyongshen(BAZI_WUXING['xiyongshen'], 'male')
+    char_list = generator._expand_name_chars(chars)
+
+    for surname in ['张', '欧阳']:
+        features = generator._name_grid_features(surname, char_list, BAZI_WUXING)
+        scorer = NameGridScorer(*features)
+        constant, first, second = pair_score_bounds(*features[:1], *features[2:5], features[6])
+        assert (scorer.scores <= constant + np.add.outer(first, second) + 1e-9).all()
+
+        expected = sorted(score for _, score in scorer.top_k(20, seed=1))
+        ranked, complete = progressive_top_k(*features, 20, time.perf_counter() + 60, seed=1)
+        assert complete and sorted(score for _, score in ranked) == expected
+
+        ranked, complete = progressive_top_k(*features, 20, time.perf_counter(), seed=1, start=32)
+        assert not complete and len(ranked) == 20
+        assert len({name for name, _ in ranked}) == 20
+
+
+def test_deadline_returns_best_so_far():
+    """测试时间用完时仍返回请求数量的名字并标记不完整；不完整的个性化结果不缓存"""
+    calculator = NamingCalculator()
+
+    result = calculator.analyze_and_generate_names('张', 'male', BIRTH_INFO, 2, 6, 's', deadline_ms=0.001)
+    assert result['success'] and not result['complete'] and 'evaluate' in result['incomplete_stages']
+    assert len({rec['given_name'] for rec in result['recommendations']}) == 6
+
+    result = calculator.analyze_and_generate_names('张', 'male', BIRTH_INFO, 1, 6, 's', deadline_ms=60000)
+    assert result['success'] and result['complete'] and len(result['recommendations']) == 6
+
+    naming_result_cache.clear()
+    for _ in range(2):
+        result = calculator.analyze_and_generate_personalized_names(
+            '张', 'female', BIRTH_INFO, 2, 6, {'era': 'modern'}, 'deadline', deterministic=True, deadline_ms=0.001
+        )
+        assert not result['complete'] and not result['pagination']['cached']
+        assert len(result['recommendations']) == 6
+
+    result = calculator.analyze_and_generate_personalized_names(
+        '张', 'female', BIRTH_INFO, 2, 6, {'era': 'modern'}, 'deadline', deterministic=True, deadline_ms=60000
+    )
+    assert result['complete'] and not result['pagination']['cached']
+    result = calculator.analyze_and_generate_personalized_names(
+        '张', 'female', BIRTH_INFO, 2, 6, {'era': 'modern'}, 'deadline', deterministic=True, deadline_ms=0.001
+    )
+    assert result['complete'] and result['pagination']['cached']
+    naming_result_cache.clear()
+
+
+def test_deadline_keeps_char_quota_and_skips_surname():
+    """测试时间用完时同一个字仍最多出现在约1/3的名字中；名字中不含姓的字"""
+    calculator = NamingCalculator()
+    naming_result_cache.clear()
+    for surname in ['王', '张']:
+        for deadline_ms in [0.001, 60000]:
+            results = [
+                calculator.analyze_and_generate_names(surname, 'male', BIRTH_INFO, 2, 9, 's', deadline_ms=deadline_ms),
+                calculator.analyze_and_generate_personalized_names(
+                    surname, 'male', BIRTH_INFO, 2, 9, {'era': 'modern'}, 'quota', deterministic=True,
+                    deadline_ms=deadline_ms
+                )
+            ]
+            for result in results:
+                given_names = [rec['given_name'] for rec in result['recommendations']]
+                assert len(set(given_names)) == 9
+                assert max(Counter(char for name in given_names for char in set(name)).values()) <= 3
+                assert not any(char in surname for name in given_names for char in name)
+    naming_result_cache.clear()
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
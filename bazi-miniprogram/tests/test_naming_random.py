@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+测试起名流程使用请求种子派生的随机数生成器（同一种子结果一致，并发时互不影响）
+"""
+import random
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append('.')
+
+from backend.app.naming_cache import naming_result_cache
+from backend.app.naming_calculator import NameGenerator, NamingCalculator
+
+BIRTH_INFO = {'year': 1990, 'month': 6, 'day': 15, 'hour': 10, 'calendar_type': 'solar'}
+CASES = [('张', 'male', 2, 'seed-a'), ('李', 'female', 2, 'seed-b'), ('王', 'male', 1, 'seed-c')]
+
+
+def _run(generator, surname, gender, name_length, seed):
+    recommendations = generator.generate_names(surname, gender, BIRTH_INFO, name_length, 6, seed)
+    return [(rec.full_name, rec.overall_score, rec.score_breakdown) for rec in recommendations]
+
+
+def test_same_seed_reproducible_under_concurrency():
+    """测试同一种子在并发执行（且其他代码修改全局random）时与串行结果一致，不改变全局random状态"""
+    generator = NameGenerator()
+    expected = {case: _run(generator, *case) for case in CASES}
+    assert all(len(result) == 6 for result in expected.values())
+    assert expected[CASES[0]] != _run(generator, '张', 'male', 2, 'seed-other')
+
+    stop = threading.Event()
+
+    def reseed_global():
+        while not stop.is_set():
+            random.seed(0)
+            random.random()
+
+    noise = threading.Thread(target=reseed_global)
+    noise.start()
+    try:
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            futures = [(case, executor.submit(_run, generator, *case)) for case in CASES * 4]
+            results = [(case, future.result()) for case, future in futures]
+    finally:
+        stop.set()
+        noise.join()
+
+    for case, result in results:
+        assert result == expected[case]
+
+    random.seed(42)
+    reference = random.random()
+    random.seed(42)
+    _run(generator, *CASES[0])
+    assert random.random() == reference
+
+
+def test_session_seed_replays_names():
+    """测试起名接口的名字只由会话种子（及出生信息、偏好、名字长度）决定，传回同一种子重放同一结果"""
+    calculator = NamingCalculator()
+
+    def names(session_seed, preferences):
+        naming_result_cache.clear()
+        standard = calculator.analyze_and_generate_names('张', 'male', BIRTH_INFO, 2, 6, session_seed)
+        personalized = calculator.analyze_and_generate_personalized_names(
+            '张', 'male', BIRTH_INFO, 2, 6, preferences, session_seed
+        )
+        assert standard['session_seed'] == personalized['session_seed'] == session_seed
+        return [[(rec['given_name'], rec['overall_score']) for rec in result['recommendations']]
+                for result in (standard, personalized)]
+
+    first = names('replay', {'era': 'modern', 'keywords': ['智', '德']})
+    # 偏好按规范形式参与种子（键顺序、列表顺序不影响结果）
+    assert names('replay', {'keywords': ['德', '智'], 'era': 'modern'}) == first
+    assert names('other', {'era': 'modern', 'keywords': ['智', '德']}) != first
+    naming_result_cache.clear()
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+测试个性化起名事件流（先推送八字分析，再按批推送评估完的名字，最后推送本页结果）
+"""
+import sys
+sys.path.append('.')
+
+from backend.app import naming_calculator
+from backend.app.naming_cache import NamingResultCache
+from backend.app.naming_calculator import NamingCalculator
+
+BIRTH_INFO = {'year': 1990, 'month': 6, 'day': 15, 'hour': 10, 'calendar_type': 'solar'}
+
+
+def test_stream_events_match_result(monkeypatch):
+    """测试事件顺序；最终结果与非流式接口一致；缓存命中和换一批时不推送中间批次"""
+    calculator = NamingCalculator()
+
+    def stream(page=1):
+        return list(calculator.iter_personalized_names(
+            '张', 'female', BIRTH_INFO, 2, 6, {'era': 'modern'}, 's', deterministic=True, page=page
+        ))
+
+    monkeypatch.setattr(naming_calculator, "naming_result_cache", NamingResultCache())
+    events = stream()
+    kinds = [event for event, _ in events]
+    assert kinds[0] == 'analysis' and kinds[-1] == 'done' and 'names' in kinds
+    assert set(kinds[1:-1]) == {'names'}
+    assert 'paipan' in events[0][1]['bazi_analysis']
+
+    streamed = {rec['given_name'] for event, data in events if event == 'names' for rec in data['recommendations']}
+    done = events[-1][1]
+    assert not done['pagination']['cached'] and done['complete']
+    assert {rec['given_name'] for rec in done['recommendations']} <= streamed
+
+    monkeypatch.setattr(naming_calculator, "naming_result_cache", NamingResultCache())
+    result = calculator.analyze_and_generate_personalized_names(
+        '张', 'female', BIRTH_INFO, 2, 6, {'era': 'modern'}, 's', deterministic=True
+    )
+    assert result['success'] and result['recommendations'] == done['recommendations']
+    assert result['bazi_analysis'] == events[0][1]['bazi_analysis']
+
+    assert [event for event, _ in stream()] == ['analysis', 'done']
+    assert [event for event, _ in stream(page=2)] == ['analysis', 'done']
+
+
+def test_stream_reports_errors():
+    """测试出错时推送error事件后结束"""
+    events = list(NamingCalculator().iter_personalized_names('张', 'male', {'year': 1990}, 2, 6))
+    assert [event for event, _ in events] == ['error']
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+测试请求日志记录与启动预热
+"""
+import sys
+import os
+sys.path.append('.')
+
+from backend.app.enhanced_bazi_cache import BaziCacheManager, DeterministicBaziCalculator
+from backend.app.fortune_calculator import FortuneCalculator
+from backend.app.request_warmup import RequestLogRecorder, WarmupRunner, KIND_BAZI
+
+
+def test_recorder_keeps_hashes_only(tmp_path):
+    """测试八字请求只记录输入哈希，并按次数排序"""
+    recorder = RequestLogRecorder(str(tmp_path / "log.sqlite3"))
+    recorder.record_bazi("hash-a")
+    recorder.record_bazi("hash-b")
+    recorder.record_bazi("hash-b")
+    recorder.flush()
+
+    assert recorder.top(KIND_BAZI) == ["hash-b", "hash-a"]
+
+
+def test_warmup_replays_recorded_charts(tmp_path):
+    """测试预热按记录的哈希回放八字计算，完成后标记就绪"""
+    calculator = DeterministicBaziCalculator(BaziCacheManager(cache_dir=str(tmp_path)))
+    result = calculator.calculate_with_cache(1990, 5, 15, 14, "male", "solar")
+
+    recorder = RequestLogRecorder(str(tmp_path / "log.sqlite3"))
+    recorder.record_bazi(result["input_hash"])
+    recorder.record_fortune_day("2030-01-01")
+    recorder.flush()
+
+    restarted = DeterministicBaziCalculator(BaziCacheManager(cache_dir=str(tmp_path)))
+    runner = WarmupRunner(recorder, restarted, FortuneCalculator)
+    assert not runner.ready.is_set()
+
+    report = runner.run()
+    assert runner.ready.is_set()
+    assert report["steps"]["bazi"]["warmed"] == 1
+    assert report["steps"]["fortune_day"]["warmed"] == 3
+    assert len(restarted.cache_manager.memory_cache) == 1
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    with tempfile.TemporaryDirectory() as tmp:
+        test_warmup_replays_recorded_charts(Path(tmp))
+    print("✅ 预热测试通过")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+测试三才五格查表与记忆化
+"""
+import copy
+import json
+import pickle
+import sys
+sys.path.append('.')
+
+import pytest
+
+from backend.app import sancai_wuge
+from backend.app.naming_calculator import NameologyCalculator
+from backend.app.sancai_wuge import (
+    MATHEMATICS_LUCK, SANCAI_TABLE, FrozenDict, evaluate_sancai, is_wuxing_harmonious, sancai_wuge_by_strokes
+)
+
+
+def _reference_sancai_wuge(surname_strokes, given_strokes):
+    """原 calculate_sancai_wuge 的逐项计算，作为对照"""
+    def wuxing(number):
+        return {1: '木', 2: '木', 3: '火', 4: '火', 5: '土', 6: '土', 7: '金', 8: '金'}.get(number % 10, '水')
+
+    def luck(number):
+        return MATHEMATICS_LUCK[((number - 1) % 81)]
+
+    surname_total = sum(surname_strokes)
+    tiange = surname_total + 1 if len(surname_strokes) == 1 else surname_total
+    renge = surname_total + (given_strokes[0] if given_strokes else 1)
+    dige = sum(given_strokes) if given_strokes else 1
+    waige = tiange + dige - renge
+    zongge = surname_total + sum(given_strokes)
+    grids = dict(zip(['天格', '人格', '地格', '外格', '总格'], [tiange, renge, dige, waige, zongge]))
+    score_map = {'大吉': 95, '吉': 80, '半吉': 70, '平': 60, '凶': 40, '大凶': 20}
+    average = sum(score_map[luck(value)['luck']] for value in grids.values()) / 5
+    config = wuxing(tiange) + wuxing(renge) + wuxing(dige)
+    return {
+        'wuge_analysis': {name: {'value': value, 'wuxing': wuxing(value), 'luck': dict(luck(value))}
+                          for name, value in grids.items()},
+        'sancai_config': config,
+        'sancai_evaluation': dict(evaluate_sancai(*config)),
+        'score': round(average, 1)
+    }
+
+
+def test_tables_and_memo_match_reference(monkeypatch):
+    """测试查表结果与逐项计算一致，同一组笔画复用同一个结果"""
+    assert len(MATHEMATICS_LUCK) == 81 and len(SANCAI_TABLE) == 125
+    assert SANCAI_TABLE[0][0] == '木木木' and SANCAI_TABLE[0][1]['luck'] == '大吉'
+    assert dict(evaluate_sancai('土', '木', '水')) == {'luck': '凶', 'desc': '木土相克，发展受阻'}
+    assert is_wuxing_harmonious('金', '水', '土') and not is_wuxing_harmonious('木', '土', '土')
+
+    monkeypatch.setattr(sancai_wuge, "_cache", type(sancai_wuge._cache)())
+    for surname in [(1,), (7,), (11,), (20,), (5, 9), (16, 23)]:
+        for given in [(), (3,), (12,), (1, 1), (7, 19), (30, 40), (81, 2)]:
+            result = sancai_wuge_by_strokes(surname, given)
+            expected = _reference_sancai_wuge(surname, given)
+            assert json.loads(json.dumps(result['wuge_analysis'], ensure_ascii=False)) == expected['wuge_analysis']
+            assert result['sancai_config'] == expected['sancai_config']
+            assert result['sancai_evaluation'] == expected['sancai_evaluation']
+            assert result['overall_evaluation']['score'] == expected['score']
+            assert sancai_wuge_by_strokes(list(surname), list(given)) is result
+
+    # 笔画相同的名字（张伟、张国：伟=偉11、国=國11）共享结果
+    calculator = NameologyCalculator()
+    assert calculator.calculate_sancai_wuge('张', '伟') is calculator.calculate_sancai_wuge('张', '国')
+    assert sancai_wuge.sancai_wuge_cache_stats()['size'] == 43
+
+
+def test_results_are_frozen():
+    """测试共享结果不可修改，仍可序列化和复制"""
+    result = sancai_wuge_by_strokes((11,), (11, 8))
+    with pytest.raises(TypeError):
+        result['sancai_config'] = '木木木'
+    with pytest.raises(TypeError):
+        result['wuge_analysis']['天格'].update(value=1)
+    with pytest.raises(TypeError):
+        result['overall_evaluation'].pop('score')
+
+    assert copy.deepcopy(result) is result
+    restored = pickle.loads(pickle.dumps(result))
+    assert restored == result and isinstance(restored, FrozenDict)
+    assert json.loads(json.dumps(result, ensure_ascii=False))['sancai_config'] == result['sancai_config']
+    editable = dict(result)
+    editable['extra'] = True
+    assert 'extra' not in result
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))